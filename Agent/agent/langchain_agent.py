@@ -116,7 +116,7 @@ class LangChainAgentExecutor:
             output_budget = self._determine_output_budget(user_input, context)
             if not memory_budget.token_budget_enforced:
                 input_budget = memory_budget.model_context_window - output_budget
-            messages = self._build_messages(user_input, context, input_budget=input_budget)
+            messages = await self._build_messages_async(user_input, context, input_budget=input_budget)
             llm_for_request = self.llm.bind(max_tokens=output_budget)
             runtime_agent = create_react_agent(
                 model=llm_for_request,
@@ -316,6 +316,24 @@ class LangChainAgentExecutor:
 
         return result.messages
 
+    async def _build_messages_async(self, user_input: str, context: 'UnifiedContext', input_budget: int) -> List:
+        """_build_messages 的异步版本，RAG 检索不阻塞事件循环"""
+        from Agent.context.working_memory_assembler import get_working_memory_assembler
+
+        assembler = get_working_memory_assembler()
+        output_budget = self._determine_output_budget(user_input, context)
+
+        result = await assembler.assemble_async(
+            user_input=user_input,
+            context=context,
+            input_budget=input_budget,
+            output_budget=output_budget,
+        )
+
+        context.detected_intent = result.intent
+
+        return result.messages
+
     def _determine_input_budget(self, user_input: str, context: 'UnifiedContext') -> int:
         """
         动态输入预算上限。
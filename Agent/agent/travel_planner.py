@@ -408,6 +408,11 @@ class TravelPlanner:
             
             daily_itinerary = []
             items_per_day = len(ordered_route) / safe_travel_days
+            from Agent.memory.knowledge_graph import get_knowledge_graph
+            selected_ids = {item.get('id') for item in items}
+            kg = get_knowledge_graph()
+            if kg and not kg.is_connected():
+                kg = None
             
             current_item_idx = 0
             
@@ -463,7 +468,8 @@ class TravelPlanner:
                     'start_location': start_location if day == 1 else "上一个目的地",
                     'weather': day_weather_info,
                     'pace_label': self._analyze_pace_label(len(day_items)),
-                    'recommendations': []
+                    'recommendations': [],
+                    'nearby_heritages': self._nearby_heritages_for_day(kg, day_items, selected_ids)
                 }
                 daily_itinerary.append(day_plan)
             
@@ -492,6 +498,25 @@ class TravelPlanner:
         if item_count == 3: return "🏃 充实紧凑"
         return "🔥 特种兵打卡"
 
+    @staticmethod
+    def _nearby_heritages_for_day(kg, day_items: List[Dict], exclude_ids: set,
+                                  per_item: int = 2, max_km: float = 30.0) -> List[Dict]:
+        """当日各站点周边可顺访的其他非遗（知识图谱内存空间索引 k 近邻）"""
+        if not kg or not day_items:
+            return []
+        nearby = {}
+        for item in day_items:
+            lat, lng = item.get('latitude'), item.get('longitude')
+            if not lat or not lng:
+                continue
+            hits = kg.query_nearest_heritages(float(lat), float(lng),
+                                              k=per_item + len(exclude_ids), max_distance_km=max_km)
+            picked = [h for h in hits if h['id'] not in exclude_ids][:per_item]
+            for h in picked:
+                if h['id'] not in nearby or h['distance_km'] < nearby[h['id']]['distance_km']:
+                    nearby[h['id']] = {**h, 'near': item.get('name', '')}
+        return sorted(nearby.values(), key=lambda h: h['distance_km'])
+
     def _fallback_itinerary(self, items, days):
         """兜底的行程生成逻辑"""
         daily = []
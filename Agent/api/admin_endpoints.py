@@ -6,15 +6,19 @@
 
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from loguru import logger
 
 from Agent.core.startup import get_startup_manager
 from Agent.memory.heritage_query_service import get_heritage_query_service
-from Agent.api.session_dependencies import get_current_user_from_session, TokenData
+from Agent.api.session_dependencies import (
+    get_current_user_from_session, require_admin_from_session, TokenData,
+)
 
 
 admin_router = APIRouter(prefix='/api/admin/knowledge-graph', tags=['知识图谱管理'])
+# 运行指标（独立于知识图谱管理路由单独挂载，仅限 AGENT_ADMIN_USER_IDS 中的管理员访问）
+metrics_router = APIRouter(prefix='/api/admin/metrics', tags=['运行指标'])
 
 
 class HeritageData(BaseModel):
@@ -63,6 +67,9 @@ class SyncResponse(BaseModel):
     category_count: Optional[int] = None
     region_count: Optional[int] = None
     vector_count: Optional[int] = None
+    vector_batch_count: Optional[int] = None
+    vector_elapsed_ms: Optional[float] = None
+    vector_batches: Optional[List[Dict[str, Any]]] = None
 
 
 class StatusResponse(BaseModel):
@@ -89,7 +96,10 @@ async def sync_all_heritage(current_user: TokenData = Depends(get_current_user_f
                 heritage_count=result.get('heritage_count', 0),
                 category_count=result.get('knowledge_graph', {}).get('category_count', 0),
                 region_count=result.get('knowledge_graph', {}).get('region_count', 0),
-                vector_count=result.get('vector_store', {}).get('vector_count', 0)
+                vector_count=result.get('vector_store', {}).get('vector_count', 0),
+                vector_batch_count=result.get('vector_store', {}).get('batch_count', 0),
+                vector_elapsed_ms=result.get('vector_store', {}).get('elapsed_ms', 0.0),
+                vector_batches=result.get('vector_store', {}).get('batches', [])
             )
         else:
             return SyncResponse(
@@ -219,3 +229,57 @@ async def query_by_category(category: str,
     except Exception as e:
         logger.error(f"按类别查询失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@metrics_router.get('/neo4j', summary="Neo4j 查询统计")
+async def get_neo4j_query_stats(top: Optional[int] = None,
+                                sort_by: str = 'total_ms',
+                                current_user: TokenData = Depends(require_admin_from_session)):
+    """
+    按调用方归类的 Neo4j 查询延迟直方图、行数、错误、慢查询日志（参数已脱敏）与 PROFILE 采样结果
+
+    sort_by: total_ms / p95_ms / max_ms / count / errors
+    """
+    from Agent.memory.knowledge_graph.instrumentation import get_query_monitor
+
+    try:
+        return get_query_monitor().get_stats(top=top, sort_by=sort_by)
+    except Exception as e:
+        logger.error(f"获取 Neo4j 查询统计失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@metrics_router.post('/neo4j/reset', summary="重置 Neo4j 查询统计")
+async def reset_neo4j_query_stats(current_user: TokenData = Depends(require_admin_from_session)):
+    """
+    清空 Neo4j 查询统计与慢查询日志
+    """
+    from Agent.memory.knowledge_graph.instrumentation import get_query_monitor
+
+    get_query_monitor().reset()
+    return {'success': True}
+
+
+@metrics_router.get('/recommendations', summary="个性化推荐统计")
+async def get_recommendation_stats(current_user: TokenData = Depends(require_admin_from_session)):
+    """
+    推荐结果缓存命中率、失效次数与各推荐策略的耗时 / 命中数 / 失败 / 超时，
+    以及图扩展增强因子缓存（graph_boost）的命中率
+    """
+    from Agent.memory.l2_graph_store import get_l2_graph_store
+
+    try:
+        return get_l2_graph_store().get_recommendation_stats()
+    except Exception as e:
+        logger.error(f"获取推荐统计失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@metrics_router.get('/l2-maintenance', summary="L2 全局维护报告")
+async def get_l2_maintenance_report(current_user: TokenData = Depends(require_admin_from_session)):
+    """
+    最近一次 L2 全局维护（衰减 / 过期 / 关系清理 / 孤儿回收）的处理条数与各步骤耗时
+    """
+    from Agent.memory.l2_maintenance import get_l2_maintenance_job
+
+    return get_l2_maintenance_job().get_last_report()
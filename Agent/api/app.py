@@ -39,6 +39,7 @@ from Agent.api.error_models import error_response
 # 导入路由
 from Agent.api.edit_endpoints import edit_router
 from Agent.api.travel_endpoints import travel_router
+from Agent.api.admin_endpoints import metrics_router
 
 # 设置日志
 setup_logger()
@@ -144,6 +145,7 @@ app.add_middleware(
 # 注册路由器
 app.include_router(travel_router)
 app.include_router(edit_router)
+app.include_router(metrics_router)
 
 # ── Unified error response handlers ─────────────────────────────────
 
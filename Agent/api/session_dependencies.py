@@ -119,6 +119,19 @@ async def get_current_user_optional_from_session(
         return None
 
 
+async def require_admin_from_session(
+    user: TokenData = Depends(get_current_user_from_session)
+) -> TokenData:
+    """要求当前用户在管理员白名单（AGENT_ADMIN_USER_IDS）中"""
+    if user.user_id not in Config.AGENT_ADMIN_USER_IDS:
+        logger.warning(f"非管理员访问管理接口被拒绝: user_id={user.user_id}")
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限",
+        )
+    return user
+
+
 def require_auth_from_session(user: TokenData = Depends(get_current_user_from_session)) -> TokenData:
     """强制要求Django session认证的依赖项"""
     return user
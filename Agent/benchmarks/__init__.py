@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准脚本
+每个脚本可独立运行: python -m Agent.benchmarks.<脚本名>
+"""
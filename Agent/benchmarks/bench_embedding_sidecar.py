@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+共享嵌入服务对比
+分别以"进程内加载模型"和"连接共享嵌入服务"两种模式启动 N 个模拟 worker 进程，
+报告每个 worker 的模型就绪耗时与 RSS，以及嵌入服务进程自身的 RSS。
+
+用法:
+    python -m Agent.benchmarks.bench_embedding_sidecar [--workers 4] [--url http://127.0.0.1:8765]
+
+未检测到运行中的服务时，脚本会自行启动一个嵌入服务子进程并在结束后关闭。
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from Agent.memory.embedding_service import EmbeddingServiceClient
+
+# 模拟 worker：构建 EmbeddingModel 单例并完成一次编码后上报运行时统计
+_WORKER_CODE = """
+import json
+from Agent.memory.vector_store import get_vector_store
+vs = get_vector_store()
+vs.embedding_model.encode_single('秦腔的历史渊源')
+print('__STATS__' + json.dumps(vs.embedding_model.get_runtime_stats()))
+"""
+
+
+def _run_workers(count: int, service_url: str) -> List[Dict]:
+    env = dict(os.environ, EMBEDDING_SERVICE_URL=service_url)
+    procs = [
+        subprocess.Popen([sys.executable, '-c', _WORKER_CODE], env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for _ in range(count)
+    ]
+    results = []
+    for proc in procs:
+        out, _ = proc.communicate()
+        for line in out.splitlines():
+            if line.startswith('__STATS__'):
+                results.append(json.loads(line[len('__STATS__'):]))
+    return results
+
+
+def _wait_for_service(client: EmbeddingServiceClient, timeout: float) -> Optional[Dict]:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        health = client.health()
+        if health:
+            return health
+        time.sleep(1)
+    return None
+
+
+def _print_rows(title: str, rows: List[Dict]):
+    print(f"\n{title}")
+    if not rows:
+        print("  (无 worker 结果)")
+        return
+    for i, r in enumerate(rows):
+        print(f"  worker{i}: mode={r['mode']:<6} startup={r['startup_ms']:>9}ms  rss={r['rss_mb']:>8}MB")
+    total = sum(r['rss_mb'] for r in rows)
+    print(f"  合计 RSS: {total:.1f}MB, 平均就绪耗时: "
+          f"{sum(r['startup_ms'] or 0 for r in rows) / len(rows):.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享嵌入服务 RSS / 启动耗时对比")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--service-timeout', type=float, default=120)
+    args = parser.parse_args()
+
+    local_rows = _run_workers(args.workers, '')
+    _print_rows("进程内加载模型", local_rows)
+
+    client = EmbeddingServiceClient(args.url, timeout=5)
+    service_proc = None
+    health = client.health()
+    if not health:
+        port = args.url.rsplit(':', 1)[-1].strip('/')
+        service_proc = subprocess.Popen(
+            [sys.executable, '-m', 'Agent.memory.embedding_service', '--port', port],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        health = _wait_for_service(client, args.service_timeout)
+    try:
+        if not health:
+            print("\n嵌入服务未就绪，跳过共享模式对比")
+            return
+        remote_rows = _run_workers(args.workers, args.url)
+        _print_rows("共享嵌入服务", remote_rows)
+        health = client.health() or health
+        print(f"  嵌入服务: startup={health['startup_ms']}ms  rss={health['rss_mb']}MB")
+        total = sum(r['rss_mb'] for r in remote_rows) + health['rss_mb']
+        print(f"  合计 RSS（含服务）: {total:.1f}MB")
+    finally:
+        if service_proc:
+            service_proc.terminate()
+            service_proc.wait(timeout=10)
+
+
+if __name__ == '__main__':
+    main()
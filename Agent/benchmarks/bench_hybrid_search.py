@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+混合检索微基准
+对比旧路径（三路检索各自编码、串行查询）与 hybrid_search（单次编码、并发查询）
+
+旧路径分两种口径:
+  legacy(3x未缓存) — 每路都直接调用模型编码（绕过内存 / 持久化嵌入缓存），即三次前向计算
+  legacy(缓存)     — 依次调用 search_*，第 2、3 路的编码命中第 1 路写入的嵌入缓存，
+                     实际只有一次前向计算，差异主要来自串行查询
+hybrid_search 每轮使用新查询，编码同样未命中缓存（一次前向计算）。
+
+合成查询不应污染生产缓存：基准关闭持久化嵌入缓存，并在进程内加载模型
+（不经共享嵌入服务，避免写入服务端的持久化缓存）。
+
+用法:
+    python -m Agent.benchmarks.bench_hybrid_search [--rounds 50] [--n-results 3]
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from Agent.config.settings import config
+from Agent.memory.vector_store import get_vector_store
+
+QUERIES = [
+    "秦腔的历史渊源", "西安鼓乐", "凤翔木版年画的制作工艺",
+    "华县皮影戏", "安塞腰鼓表演", "陕北民歌", "耀州窑陶瓷烧制技艺",
+]
+
+
+def _legacy_uncached(vs, query: str, user_id: str, n_results: int) -> Dict[str, List]:
+    """旧实现（无嵌入缓存）：三路检索各自调用模型编码查询并串行执行"""
+    encode = vs.embedding_model._encode_uncached
+    return {
+        'conversations': vs._search_conversations_by_embedding(
+            encode([query])[0], user_id, n_results),
+        'heritage_knowledge': vs._search_heritage_by_embedding(
+            query, encode([query])[0], n_results, None),
+        'attractions': vs._search_attractions_by_embedding(encode([query])[0], n_results),
+    }
+
+
+def _legacy_cached(vs, query: str, user_id: str, n_results: int) -> Dict[str, List]:
+    """旧实现（经嵌入缓存）：依次调用 search_*，后两路编码命中缓存"""
+    return {
+        'conversations': vs.search_conversations(query, user_id, n_results),
+        'heritage_knowledge': vs.search_heritage_knowledge(query, n_results),
+        'attractions': vs.search_attractions(query, n_results),
+    }
+
+
+def _measure(fn: Callable[[str], Dict], rounds: int, tag: str) -> Dict[str, float]:
+    timings = []
+    for i in range(rounds):
+        # 每轮使用不同查询，避免命中嵌入缓存与查询缓存
+        query = f"{QUERIES[i % len(QUERIES)]} {tag}{i}"
+        start = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hybrid_search 微基准")
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--n-results', type=int, default=3)
+    parser.add_argument('--user-id', default='bench_user')
+    args = parser.parse_args()
+
+    config.EMBEDDING_CACHE_ENABLED = False
+    config.EMBEDDING_SERVICE_URL = None
+    vs = get_vector_store()
+    # 预热模型与集合
+    vs.hybrid_search("预热", args.user_id, args.n_results)
+
+    uncached = _measure(
+        lambda q: _legacy_uncached(vs, q, args.user_id, args.n_results),
+        args.rounds, 'legacy_uncached')
+    cached = _measure(
+        lambda q: _legacy_cached(vs, q, args.user_id, args.n_results),
+        args.rounds, 'legacy_cached')
+    current = _measure(
+        lambda q: vs.hybrid_search(q, args.user_id, args.n_results),
+        args.rounds, 'hybrid')
+
+    print(f"{'路径':<20}{'mean(ms)':>10}{'p50(ms)':>10}{'p95(ms)':>10}")
+    for name, stats in (('legacy(3x未缓存)', uncached), ('legacy(缓存)', cached),
+                        ('hybrid_search', current)):
+        print(f"{name:<20}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}")
+    if current['mean_ms']:
+        print(f"加速比: 相对 3x未缓存 {uncached['mean_ms'] / current['mean_ms']:.2f}x, "
+              f"相对缓存口径 {cached['mean_ms'] / current['mean_ms']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+非遗关键词检索对比
+对比全文索引路径（db.index.fulltext.queryNodes，按相关度排序）与旧 CONTAINS 扫描路径，
+输出延迟分位数、命中条数与两路结果的重合度。
+
+用法:
+    python -m Agent.benchmarks.bench_keyword_search [--rounds 50] [--limit 10]
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from Agent.memory.knowledge_graph import get_knowledge_graph
+
+QUERIES = [
+    "秦腔", "皮影", "剪纸", "年画", "腰鼓", "民歌", "陶瓷烧制",
+    "西安", "宝鸡", "传统技艺", "传统音乐", "民俗",
+]
+
+
+def _measure(fn: Callable[[str], List[Dict]], rounds: int) -> Dict[str, float]:
+    timings = []
+    hits = 0
+    for i in range(rounds):
+        query = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        hits += len(fn(query))
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'avg_hits': hits / rounds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="非遗关键词检索对比")
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    kg = get_knowledge_graph()
+    if not kg or not kg.is_connected():
+        print("知识图谱未连接")
+        return
+    if not kg.ensure_fulltext_index():
+        print("全文索引不可用，仅能测试 CONTAINS 路径")
+        return
+
+    def fulltext(q):
+        return kg.search_heritage_by_keyword(q, limit=args.limit)
+
+    def contains(q):
+        return kg.search_heritage_by_keyword(q, limit=args.limit, use_fulltext=False)
+
+    # 预热连接池与查询计划缓存
+    fulltext(QUERIES[0])
+    contains(QUERIES[0])
+
+    results = {'contains': _measure(contains, args.rounds),
+               'fulltext': _measure(fulltext, args.rounds)}
+
+    print(f"{'path':<10} {'mean_ms':>9} {'p50_ms':>9} {'p95_ms':>9} {'avg_hits':>9}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['mean_ms']:>9.2f} {r['p50_ms']:>9.2f} "
+              f"{r['p95_ms']:>9.2f} {r['avg_hits']:>9.1f}")
+
+    print(f"\n{'query':<10} {'contains':>9} {'fulltext':>9} {'overlap':>8}  top1(fulltext)")
+    for q in QUERIES:
+        a = {r['id'] for r in contains(q)}
+        full = fulltext(q)
+        b = {r['id'] for r in full}
+        top = f"{full[0]['name']} ({full[0]['score']:.2f})" if full else '-'
+        print(f"{q:<10} {len(a):>9} {len(b):>9} {len(a & b):>8}  {top}")
+
+
+if __name__ == '__main__':
+    main()
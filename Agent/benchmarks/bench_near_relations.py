@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+NEAR 关系点对枚举对比
+在陕西范围内随机生成 N 个坐标点，比较旧实现（两两 Haversine，O(n²)）
+与网格空间索引（只比较相邻网格）的点对枚举耗时，并校验两者结果一致。
+
+用法:
+    python -m Agent.benchmarks.bench_near_relations [--sizes 200 1000 5000] [--max-km 100]
+    python -m Agent.benchmarks.bench_near_relations --neo4j   # 额外对当前图谱执行一次全量重建
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List, Set, Tuple
+
+from Agent.memory.knowledge_graph._base import EntityMixin
+from Agent.memory.knowledge_graph.spatial import GridSpatialIndex
+
+# 陕西省经纬度范围
+_LAT_RANGE = (31.7, 39.6)
+_LON_RANGE = (105.5, 111.2)
+
+
+def _make_points(n: int, seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    return [
+        {'id': i, 'latitude': rng.uniform(*_LAT_RANGE), 'longitude': rng.uniform(*_LON_RANGE)}
+        for i in range(n)
+    ]
+
+
+def _legacy_pairs(points: List[Dict], max_km: float) -> Set[Tuple[int, int]]:
+    pairs = set()
+    for i, h1 in enumerate(points):
+        for h2 in points[i + 1:]:
+            distance = EntityMixin.calculate_distance(
+                h1['latitude'], h1['longitude'], h2['latitude'], h2['longitude'])
+            if distance <= max_km:
+                pairs.add((h1['id'], h2['id']))
+    return pairs
+
+
+def _grid_pairs(points: List[Dict], max_km: float) -> Set[Tuple[int, int]]:
+    index = GridSpatialIndex(points, cell_km=max_km)
+    return {(index.items[i]['id'], index.items[j]['id'])
+            for i, j, _ in index.pairs_within(max_km)}
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NEAR 关系点对枚举对比")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 1000, 5000])
+    parser.add_argument('--max-km', type=float, default=100)
+    parser.add_argument('--neo4j', action='store_true', help="对当前知识图谱执行一次全量 NEAR 重建")
+    args = parser.parse_args()
+
+    print(f"{'N':>6} {'edges':>9} {'legacy_ms':>11} {'grid_ms':>9} {'speedup':>8} match")
+    for n in args.sizes:
+        points = _make_points(n)
+        legacy, legacy_ms = _timed(_legacy_pairs, points, args.max_km)
+        grid, grid_ms = _timed(_grid_pairs, points, args.max_km)
+        print(f"{n:>6} {len(grid):>9} {legacy_ms:>11.1f} {grid_ms:>9.1f} "
+              f"{legacy_ms / max(grid_ms, 1e-6):>7.1f}x {legacy == grid}")
+
+    if args.neo4j:
+        from Agent.memory.knowledge_graph import get_knowledge_graph
+        kg = get_knowledge_graph()
+        if not kg or not kg.is_connected():
+            print("\n知识图谱未连接，跳过全量重建")
+            return
+        kg.build_near_relations(max_distance_km=args.max_km)
+        print(f"\n全量重建: {kg.get_near_build_stats()}")
+
+
+if __name__ == '__main__':
+    main()
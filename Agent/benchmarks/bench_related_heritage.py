@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+相关非遗预计算对比
+随机生成 N 个非遗的类别 / 地区 / 级别 / 朝代与知识向量，比较逐对 Python 打分（O(n²) 循环）
+与分块向量化打分（score_related）的 top-K 计算耗时，并校验两者结果一致。
+
+用法:
+    python -m Agent.benchmarks.bench_related_heritage [--sizes 200 1000 3000] [--top-k 20]
+    python -m Agent.benchmarks.bench_related_heritage --neo4j   # 额外对比当前图谱上邻接表查表与实时 Cypher
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from Agent.memory.knowledge_graph.related import (
+    RELATED_DIMENSIONS, RELATED_WEIGHTS, score_related,
+)
+
+_CATEGORIES = [f"类别{i}" for i in range(10)]
+_REGIONS = [f"地区{i}" for i in range(30)]
+_LEVELS = ["国家级", "省级", "市级"]
+_DYNASTIES = [f"朝代{i}" for i in range(15)]
+
+
+def _make_corpus(n: int, dim: int = 64, seed: int = 42):
+    rng = random.Random(seed)
+    features = [{
+        'id': i,
+        'category': [rng.choice(_CATEGORIES)],
+        'region': rng.sample(_REGIONS, rng.randint(1, 2)),
+        'level': [rng.choice(_LEVELS)],
+        'dynasty': rng.sample(_DYNASTIES, rng.randint(0, 2)),
+    } for i in range(n)]
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return features, {i: vectors[i] for i in range(n)}
+
+
+def _legacy_top_k(features: List[Dict], embeddings: Dict, top_k: int) -> Dict[int, List[Tuple[int, float]]]:
+    """旧思路：逐对比较集合交集 + 逐对余弦"""
+    norms = {hid: v / (np.linalg.norm(v) or 1.0) for hid, v in embeddings.items()}
+    sets = [{dim: set(f[dim]) for dim in RELATED_DIMENSIONS} for f in features]
+    result = {}
+    for i, f1 in enumerate(features):
+        scored = []
+        for j, f2 in enumerate(features):
+            if i == j:
+                continue
+            score = sum(RELATED_WEIGHTS[dim] for dim in RELATED_DIMENSIONS
+                        if sets[i][dim] & sets[j][dim])
+            cos = float(np.dot(norms[f1['id']], norms[f2['id']]))
+            score += RELATED_WEIGHTS['embedding'] * min(max(cos, 0.0), 1.0)
+            if score > 0:
+                scored.append((score, f2['id']))
+        result[f1['id']] = [(hid, s) for s, hid in heapq.nlargest(top_k, scored)]
+    return result
+
+
+def _vectorized_top_k(features: List[Dict], embeddings: Dict, top_k: int) -> Dict[int, List[Tuple[int, float]]]:
+    result: Dict[int, List[Tuple[int, float]]] = {}
+    for row in score_related(features, embeddings, top_k):
+        result.setdefault(row['a'], []).append((row['b'], row['score']))
+    return result
+
+
+def _same(a: Dict, b: Dict) -> bool:
+    """比较每个非遗的邻居得分序列（同分邻居顺序可能不同）"""
+    return all(
+        np.allclose([s for _, s in a[k]], [s for _, s in b.get(k, [])], atol=1e-3)
+        for k in a
+    )
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def _latency(fn, ids: List[int]) -> Dict[str, float]:
+    timings = []
+    for hid in ids:
+        start = time.perf_counter()
+        fn(hid)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {'mean_ms': statistics.mean(timings), 'p95_ms': timings[int(len(timings) * 0.95) - 1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="相关非遗预计算对比")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 1000, 3000])
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--neo4j', action='store_true', help="对当前知识图谱比较查表与实时 Cypher 延迟")
+    args = parser.parse_args()
+
+    print(f"{'N':>6} {'edges':>9} {'legacy_ms':>11} {'numpy_ms':>9} {'speedup':>8} match")
+    for n in args.sizes:
+        features, embeddings = _make_corpus(n)
+        legacy, legacy_ms = _timed(_legacy_top_k, features, embeddings, args.top_k)
+        vectorized, numpy_ms = _timed(_vectorized_top_k, features, embeddings, args.top_k)
+        edges = sum(len(v) for v in vectorized.values())
+        print(f"{n:>6} {edges:>9} {legacy_ms:>11.1f} {numpy_ms:>9.1f} "
+              f"{legacy_ms / max(numpy_ms, 1e-6):>7.1f}x {_same(legacy, vectorized)}")
+
+    if args.neo4j:
+        from Agent.memory.knowledge_graph import get_knowledge_graph
+        kg = get_knowledge_graph()
+        if not kg or not kg.is_connected():
+            print("\n知识图谱未连接，跳过查询对比")
+            return
+        if kg._get_related_index() is None or not len(kg._get_related_index()):
+            print("\n图谱中尚无 RELATED_TO 边，先执行预计算")
+            kg.build_related_heritage()
+        ids = [h['id'] for h in kg.get_all_heritages_with_coordinates()][:200]
+        if not ids:
+            print("\n图谱中无非遗数据")
+            return
+        indexed = _latency(lambda hid: kg.query_related_heritage(hid, limit=5), ids)
+        live = _latency(lambda hid: kg._query_related_heritage_live(hid, 5, 'category'), ids)
+        print(f"\n邻接表查表: mean {indexed['mean_ms']:.2f}ms p95 {indexed['p95_ms']:.2f}ms")
+        print(f"实时 Cypher: mean {live['mean_ms']:.2f}ms p95 {live['p95_ms']:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
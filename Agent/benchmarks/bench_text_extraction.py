@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+朝代 / 传承人文本抽取对比
+在真实非遗语料上比较:
+  - 朝代识别: 旧实现（DIRECT / MULTI / 别名逐条 re.search）与 Aho-Corasick 单次扫描
+  - 传承人解析: 旧实现（各规则逐条 re.search）与预编译合并正则
+  - 批量抽取: 串行与进程池（map_in_processes）
+并校验各路径结果一致。
+
+语料默认通过后端 API 分页拉取（与启动同步相同），也可用 --file 指定导出的 JSON 列表。
+
+用法:
+    python -m Agent.benchmarks.bench_text_extraction [--file heritage.json] [--repeat 10] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+from typing import Dict, List, Set
+
+from Agent.memory.knowledge_graph.dynasty import DynastyMixin
+from Agent.memory.knowledge_graph.inheritor import InheritorMixin
+from Agent.memory.knowledge_graph.text_match import map_in_processes
+
+
+def _legacy_match_dynasties(history_text: str) -> Set[str]:
+    """旧实现：三组规则逐条扫描"""
+    if not history_text or not history_text.strip():
+        return set()
+    matched: Set[str] = set()
+    for pattern, dynasty in DynastyMixin.DIRECT_PATTERNS:
+        if re.search(pattern, history_text):
+            matched.add(dynasty)
+    for pattern, dynasties in DynastyMixin.MULTI_DYNASTY_PATTERNS:
+        if re.search(pattern, history_text):
+            matched.update(dynasties)
+    for alias, standard in DynastyMixin.DYNASTY_ALIASES.items():
+        if alias in history_text:
+            matched.add(standard)
+    if len(matched) > 1:
+        specific_dynasties = matched - {'上古'}
+        if specific_dynasties:
+            matched = specific_dynasties
+    return matched
+
+
+def _legacy_parse_inheritors(text: str) -> List[Dict]:
+    """旧实现：每条规则在调用时逐条 re.search / re.finditer"""
+    if not text or not text.strip():
+        return []
+
+    original = text.strip()
+    text = text.replace('（', '(').replace('）', ')')
+    text = text.replace('；', ';')
+
+    # 集体传承检测
+    collective_patterns = [
+        r'以.*集体传承.*为主',
+        r'无特定的代表性传承人认定',
+        r'以班社集体传承为主',
+        r'以村社和社火队集体传承为主',
+        r'以集体传承为主',
+        r'以家庭传承和餐饮业传承为主',
+        r'以乐社集体传承为主要方式',
+        r'尚未有公布国家级或省级代表性传承人',
+        r'采用院团集体传承与师徒个体传承相结合',
+        r'传承人众多',
+    ]
+    if any(re.search(p, original) for p in collective_patterns):
+        return []
+
+    # 截断尾部描述（"另有..."、"早期传承人:"等）
+    tail_cut = re.search(
+        r'[。;；](?:另有|其中|传统班社|全县|'
+        r'各社均|历代传承谱系|历史谱系|'
+        r'历史上|家族传承谱系|传承方式|'
+        r'早期传承人)', text)
+    if tail_cut:
+        text = text[:tail_cut.start()]
+
+    # 用栈匹配括号，处理嵌套
+    entries = []
+    for m in re.finditer(r'([一-鿿･]{2,4})\(', text):
+        name = m.group(1)
+        if name in InheritorMixin._NON_PERSON_NAMES:
+            continue
+        if name.endswith('等'):
+            continue
+        if re.search(r'[村社系]', name):
+            continue
+        if re.match(r'^第[一二三四五六七八九十\d]', name):
+            continue
+
+        start = m.end() - 1
+        depth = 0
+        end = start
+        for i in range(start, len(text)):
+            if text[i] == '(':
+                depth += 1
+            elif text[i] == ')':
+                depth -= 1
+                if depth == 0:
+                    end = i
+                    break
+        if end > start:
+            entries.append((name, text[start + 1:end]))
+
+    # 历史谱系链
+    hist_entries = []
+    hist_match = re.search(
+        r'(?:历代传承谱系|历史谱系|历史上)[:：]\s*(.+?)(?:[。]|$)',
+        original)
+    if hist_match:
+        for m in re.finditer(r'([一-鿿･]{2,4})\(([^)]+)\)', hist_match.group(1)):
+            hname, hbio = m.group(1), m.group(2)
+            if hname not in InheritorMixin._NON_PERSON_NAMES:
+                hist_entries.append((hname, hbio))
+
+    # 链式师承 A→B→C
+    chain_teachers = {}
+    if hist_match:
+        chain_names = re.findall(r'[一-鿿･]{2,4}(?=\(|→|$)', hist_match.group(1))
+        for i in range(len(chain_names) - 1):
+            chain_teachers[chain_names[i + 1]] = chain_names[i]
+
+    # ── 解析辅助函数 ──
+
+    def _extract_level(bio):
+        if re.search(r'国家级(?:代表性)?传承人', bio):
+            return '国家级'
+        if re.search(r'省级(?:代表性)?传承人', bio):
+            return '省级'
+        if re.search(r'市级(?:非遗)?代表性传承人|'
+                     r'西安市(?:非遗)?代表性传承人|'
+                     r'延安市级非遗', bio):
+            return '市级'
+        if re.search(r'县级(?:代表性)?传承人', bio):
+            return '县级'
+        if re.search(r'新一代传承人|传承人|老艺人|'
+                     r'著名画家|[第第].*传人', bio):
+            return '未定级'
+        return ''
+
+    def _extract_birth_year(bio):
+        m = re.search(r'(\d{4})年生', bio)
+        if m:
+            y = int(m.group(1))
+            if 1900 <= y <= 2020:
+                return (y, None)
+        m = re.search(r'(?:^|[,\s])(\d{4})-(\d{4})(?:$|[,\s)])', bio)
+        if m:
+            return (int(m.group(1)), int(m.group(2)))
+        return (None, None)
+
+    def _extract_gender(bio):
+        if re.search(r'(?:^|[,\s])女(?:$|[,\s,;])', bio):
+            return '女'
+        if re.search(r'(?:^|[,\s])男(?:$|[,\s,;])', bio):
+            return '男'
+        return ''
+
+    def _extract_generation(bio):
+        m = re.search(r'第([一二三四五六七八九十\d]+)代(?:\s*传人|\s*代表性传承人)?', bio)
+        if not m:
+            m = re.search(r'第([一二三四五六七八九十\d]+)代(?:$|[,\s;])', bio)
+        if m:
+            g = m.group(1)
+            gen_map = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5,
+                       '六': 6, '七': 7, '八': 8, '九': 9, '十': 10,
+                       '十一': 11, '十二': 12, '十八': 18,
+                       '十九': 19, '二十': 20}
+            return gen_map.get(g, int(g) if g.isdigit() else None)
+        return None
+
+    def _is_valid_teacher(t, name=''):
+        if t == name:
+            return False
+        for inv in InheritorMixin._INVALID_TEACHERS:
+            if inv in t:
+                return False
+        if t.endswith(('学', '和', '的', '了', '是', '等')):
+            return False
+        return len(t) >= 2
+
+    def _extract_teacher(bio, name=''):
+        m = re.search(r'师从([一-鿿･]{2,3})', bio)
+        if m and _is_valid_teacher(m.group(1), name):
+            return m.group(1)
+        m = re.search(r'([一-鿿･]{2,3})弟子', bio)
+        if m and _is_valid_teacher(m.group(1), name):
+            return m.group(1)
+        m = re.search(r'(?<![一-鿿･])([一-鿿･]{2,3})之(?:子|女|侄|孙)', bio)
+        if m and _is_valid_teacher(m.group(1), name):
+            return m.group(1)
+        m = re.search(r'随(?:祖父|父亲|外祖母|伯父|'
+                      r'外祖父|家人|母亲|姥姥|和|的)?'
+                      r'([一-鿿･]{2,3})(?:学艺|学习|学)', bio)
+        if m and _is_valid_teacher(m.group(1), name):
+            return m.group(1)
+        return None
+
+    # ── 合并解析 ──
+    all_entries = entries + hist_entries
+    seen_names = set()
+    results = []
+
+    for name, bio_text in all_entries:
+        if name in seen_names:
+            for r in results:
+                if r['name'] == name and bio_text and bio_text not in r['bio']:
+                    r['bio'] += '; ' + bio_text
+            continue
+        seen_names.add(name)
+
+        birth_year, death_year = _extract_birth_year(bio_text)
+        teacher = _extract_teacher(bio_text, name)
+        if not teacher and name in chain_teachers:
+            teacher = chain_teachers[name]
+
+        results.append({
+            'name': name.strip(),
+            'level': _extract_level(bio_text),
+            'birth_year': birth_year,
+            'death_year': death_year,
+            'status': '已故' if ('已故' in bio_text or '逝世' in bio_text or death_year) else '健在',
+            'gender': _extract_gender(bio_text),
+            'generation': _extract_generation(bio_text),
+            'bio': bio_text.strip(),
+            'teacher': teacher,
+        })
+
+    return results
+
+
+def _load_corpus(path: str = None) -> List[Dict]:
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('results', data) if isinstance(data, dict) else data
+    from Agent.core.startup import get_startup_manager
+    return asyncio.run(get_startup_manager()._fetch_heritage_from_mysql())
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="朝代 / 传承人文本抽取对比")
+    parser.add_argument('--file', help="非遗数据 JSON（列表或含 results 的分页响应）")
+    parser.add_argument('--repeat', type=int, default=10, help="语料重复次数，放大批量规模")
+    parser.add_argument('--workers', type=int, default=0, help="进程数，0 为按 CPU 自动选择")
+    args = parser.parse_args()
+
+    corpus = _load_corpus(args.file)
+    if not corpus:
+        print("未获取到非遗语料")
+        return
+    histories = [h['history'] for h in corpus if h.get('history')] * args.repeat
+    inheritors = [h['inheritors'] for h in corpus if h.get('inheritors')] * args.repeat
+    print(f"语料: {len(corpus)} 条非遗 × {args.repeat}，history {len(histories)} 条，"
+          f"inheritors {len(inheritors)} 条\n")
+
+    legacy, legacy_ms = _timed(lambda: [_legacy_match_dynasties(t) for t in histories])
+    automaton, automaton_ms = _timed(
+        lambda: [DynastyMixin.match_dynasties_from_text(t) for t in histories])
+    pooled, pooled_ms = _timed(
+        map_in_processes, DynastyMixin.match_dynasties_from_text, histories, args.workers, 0)
+
+    print(f"{'朝代识别':<14} {'ms':>9} {'speedup':>8} match")
+    print(f"{'legacy':<14} {legacy_ms:>9.1f} {'1.0x':>8} -")
+    print(f"{'automaton':<14} {automaton_ms:>9.1f} {legacy_ms / max(automaton_ms, 1e-6):>7.1f}x "
+          f"{automaton == legacy}")
+    print(f"{'automaton+pool':<14} {pooled_ms:>9.1f} {legacy_ms / max(pooled_ms, 1e-6):>7.1f}x "
+          f"{pooled == legacy}")
+
+    legacy, legacy_ms = _timed(lambda: [_legacy_parse_inheritors(t) for t in inheritors])
+    compiled, compiled_ms = _timed(
+        lambda: [InheritorMixin.parse_inheritors_from_text(t) for t in inheritors])
+    pooled, pooled_ms = _timed(
+        map_in_processes, InheritorMixin.parse_inheritors_from_text, inheritors, args.workers, 0)
+
+    print(f"\n{'传承人解析':<14} {'ms':>9} {'speedup':>8} match")
+    print(f"{'legacy':<14} {legacy_ms:>9.1f} {'1.0x':>8} -")
+    print(f"{'compiled':<14} {compiled_ms:>9.1f} {legacy_ms / max(compiled_ms, 1e-6):>7.1f}x "
+          f"{compiled == legacy}")
+    print(f"{'compiled+pool':<14} {pooled_ms:>9.1f} {legacy_ms / max(pooled_ms, 1e-6):>7.1f}x "
+          f"{pooled == legacy}")
+
+
+if __name__ == '__main__':
+    main()
@@ -148,6 +148,48 @@ class MemoryBudgetConfig:
     # 环境变量: SIFTER_ENABLED  默认: true
     sifter_enabled: bool = _get_bool("SIFTER_ENABLED", True)
 
+    # ── L2 写后队列（write-behind）─────────────────────
+    # 开启后 coordinator 的 L2 写入（活跃时间 / 偏好 / 非遗关联）按用户合并后由后台线程批量落库
+    # 环境变量: L2_WRITE_BEHIND_ENABLED  默认: true
+    l2_write_behind_enabled: bool = _get_bool("L2_WRITE_BEHIND_ENABLED", True)
+
+    # 合并窗口（毫秒），用户的首条待写条目最多等待该时长后落库
+    # 环境变量: L2_WRITE_BEHIND_WINDOW_MS  默认: 2000
+    l2_write_behind_window_ms: int = _get_int("L2_WRITE_BEHIND_WINDOW_MS", 2000)
+
+    # 待写条目达到该数量时不等窗口到期，立即落库
+    # 环境变量: L2_WRITE_BEHIND_MAX_BATCH  默认: 200
+    l2_write_behind_max_batch: int = _get_int("L2_WRITE_BEHIND_MAX_BATCH", 200)
+
+    # 待写条目总数上限，超出后新写入回退为同步直写
+    # 环境变量: L2_WRITE_BEHIND_MAX_PENDING  默认: 5000
+    l2_write_behind_max_pending: int = _get_int("L2_WRITE_BEHIND_MAX_PENDING", 5000)
+
+    # 落库失败后的最大重试次数（按窗口指数退避），超出后丢弃并计数
+    # 环境变量: L2_WRITE_BEHIND_MAX_RETRIES  默认: 3
+    l2_write_behind_max_retries: int = _get_int("L2_WRITE_BEHIND_MAX_RETRIES", 3)
+
+    # ── L2 个性化推荐 ───────────────────────────────────
+    # 推荐结果缓存的最大用户数（LRU），用户偏好或非遗关系变更时失效
+    # 环境变量: L2_RECOMMEND_CACHE_SIZE  默认: 1000
+    l2_recommend_cache_size: int = _get_int("L2_RECOMMEND_CACHE_SIZE", 1000)
+
+    # 每个推荐策略取回的候选数（缓存的排序列表按此长度计算，limit 更大时重算）
+    # 环境变量: L2_RECOMMEND_POOL_SIZE  默认: 20
+    l2_recommend_pool_size: int = _get_int("L2_RECOMMEND_POOL_SIZE", 20)
+
+    # 推荐策略并发线程数
+    # 环境变量: L2_RECOMMEND_WORKERS  默认: 8
+    l2_recommend_workers: int = _get_int("L2_RECOMMEND_WORKERS", 8)
+
+    # 单次推荐等待各策略的上限（秒），语义推荐含 LLM 类别映射（自身超时 15 秒）
+    # 环境变量: L2_RECOMMEND_STRATEGY_TIMEOUT  默认: 20
+    l2_recommend_strategy_timeout: float = float(os.getenv("L2_RECOMMEND_STRATEGY_TIMEOUT", "20"))
+
+    # 图扩展增强因子的按用户缓存时长（秒），用户偏好或非遗关系变更时提前失效；0 表示不缓存
+    # 环境变量: L2_GRAPH_BOOST_CACHE_TTL  默认: 60
+    l2_graph_boost_cache_ttl: float = float(os.getenv("L2_GRAPH_BOOST_CACHE_TTL", "60"))
+
     # ── Sifter 关键词 ───────────────────────────────────
     # 触发长期记忆沉淀的热词列表（逗号分隔）
     # 环境变量: MEMORY_SIFTER_KEYWORDS
@@ -276,6 +318,36 @@ class MemoryBudgetConfig:
     # 环境变量: CROSS_SESSION_MAX_CHARS  默认: 800
     cross_session_max_chars: int = _get_int("CROSS_SESSION_MAX_CHARS", 800)
 
+    # ── 向量保留与压缩配置 ───────────────────────────────
+    # 对话 / 归档向量保留任务开关（由 ResourceManager 定时器调度）
+    # 开启后会删除用户的对话与归档向量，默认关闭；可先执行 get_vector_retention_job().run(dry_run=True) 查看回收量再开启
+    # 环境变量: VECTOR_RETENTION_ENABLED  默认: False
+    vector_retention_enabled: bool = _get_bool("VECTOR_RETENTION_ENABLED", False)
+
+    # 两次保留任务的最小间隔（小时）
+    # 环境变量: VECTOR_RETENTION_INTERVAL_HOURS  默认: 6
+    vector_retention_interval_hours: int = _get_int("VECTOR_RETENTION_INTERVAL_HOURS", 6)
+
+    # 对话向量保留天数（归档向量沿用 SESSION_ARCHIVE_TTL_DAYS），0 表示不按时间过期
+    # 环境变量: CONVERSATION_VECTOR_TTL_DAYS  默认: 90
+    conversation_vector_ttl_days: int = _get_int("CONVERSATION_VECTOR_TTL_DAYS", 90)
+
+    # 写入后的宽限期（天），宽限期内不按重要性回收
+    # 环境变量: VECTOR_RETENTION_GRACE_DAYS  默认: 7
+    vector_retention_grace_days: int = _get_int("VECTOR_RETENTION_GRACE_DAYS", 7)
+
+    # 时间衰减后的重要性低于该阈值即回收
+    # 环境变量: VECTOR_RETENTION_MIN_IMPORTANCE  默认: 0.15
+    vector_retention_min_importance: float = float(os.getenv("VECTOR_RETENTION_MIN_IMPORTANCE", "0.15"))
+
+    # 每个用户在每个集合中最多保留的向量数，超出按衰减分数降采样，0 表示不限
+    # 环境变量: VECTOR_RETENTION_USER_QUOTA  默认: 500
+    vector_retention_user_quota: int = _get_int("VECTOR_RETENTION_USER_QUOTA", 500)
+
+    # 每批删除条数
+    # 环境变量: VECTOR_RETENTION_DELETE_BATCH  默认: 500
+    vector_retention_delete_batch: int = _get_int("VECTOR_RETENTION_DELETE_BATCH", 500)
+
     # ── 记忆重要性评分与遗忘配置 ──────────────────────────
     # 每次会话衰减系数（Ebbinghaus 遗忘曲线）
     # 环境变量: IMPORTANCE_DECAY_RATE  默认: 0.85
@@ -332,6 +404,22 @@ class MemoryBudgetConfig:
     # 环境变量: MERGE_MIN_IMPORTANCE  默认: 0.15
     merge_min_importance: float = float(os.getenv("MERGE_MIN_IMPORTANCE", "0.15"))
 
+    # 全局维护任务开关（ResourceManager 定时器按 MERGE_TIME_THRESHOLD_HOURS 间隔对全部用户执行衰减与过期）
+    # 环境变量: L2_MAINTENANCE_ENABLED  默认: true
+    l2_maintenance_enabled: bool = _get_bool("L2_MAINTENANCE_ENABLED", True)
+
+    # 全局维护每个事务处理的行数（CALL {} IN TRANSACTIONS OF N ROWS）
+    # 环境变量: L2_MAINTENANCE_BATCH_SIZE  默认: 1000
+    l2_maintenance_batch_size: int = _get_int("L2_MAINTENANCE_BATCH_SIZE", 1000)
+
+    # PLANNED / EXPORTED / HAS_PREFERENCE 关系的保留天数
+    # 环境变量: L2_MAINTENANCE_STALE_DAYS  默认: 30
+    l2_maintenance_stale_days: int = _get_int("L2_MAINTENANCE_STALE_DAYS", 30)
+
+    # 低置信度清理阈值，置信度低于该值的偏好直接删除，0 表示不启用
+    # 环境变量: L2_MAINTENANCE_MIN_CONFIDENCE  默认: 0
+    l2_maintenance_min_confidence: float = float(os.getenv("L2_MAINTENANCE_MIN_CONFIDENCE", "0"))
+
     # ── PDF 导出记忆注入配置 ───────────────────────────
     # PDF 提示词中单个非遗项目的描述最大字符数
     # 环境变量: PDF_HERITAGE_ITEM_MAX_CHARS  默认: 500
@@ -167,6 +167,13 @@ class Config:
     # 环境变量: AGENT_CORS_ALLOWED_ORIGINS  默认: None
     AGENT_CORS_ALLOWED_ORIGINS = os.getenv('AGENT_CORS_ALLOWED_ORIGINS')
 
+    # ── 管理员 ────────────────────────────────────────────
+    # 允许访问 /api/admin/metrics/* 的用户 ID（逗号分隔），为空时拒绝所有请求
+    # 环境变量: AGENT_ADMIN_USER_IDS  默认: 空
+    AGENT_ADMIN_USER_IDS = [
+        uid.strip() for uid in os.getenv('AGENT_ADMIN_USER_IDS', '').split(',') if uid.strip()
+    ]
+
     # ── 旅游规划参数 ──────────────────────────────────────
     TRAVEL_CONFIG = {
         'max_daily_attractions': int(os.getenv('TRAVEL_MAX_DAILY_ATTRACTIONS', '0')),
@@ -212,12 +219,115 @@ class Config:
     NEO4J_USER = os.getenv('NEO4J_USER')
     # 环境变量: NEO4J_PASSWORD  默认: None
     NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD')
+    # 邻近查询内存空间索引的最长有效期（秒），同步与管理写入会主动失效
+    # 环境变量: KG_NEARBY_INDEX_TTL  默认: 600
+    KG_NEARBY_INDEX_TTL = int(os.getenv('KG_NEARBY_INDEX_TTL', '600'))
+    # 内存 Region 层级索引（祖先/后代闭包 + 地区非遗倒排）的最长有效期（秒），同步与管理写入会主动失效
+    # 环境变量: KG_REGION_INDEX_TTL  默认: 600
+    KG_REGION_INDEX_TTL = int(os.getenv('KG_REGION_INDEX_TTL', '600'))
+    # 同步时为每个非遗预计算并保留的相关非遗数（RELATED_TO top-K）
+    # 环境变量: KG_RELATED_TOP_K  默认: 20
+    KG_RELATED_TOP_K = int(os.getenv('KG_RELATED_TOP_K', '20'))
+    # 相关非遗内存邻接表的最长有效期（秒），过期后从 RELATED_TO 边重新加载
+    # 环境变量: KG_RELATED_INDEX_TTL  默认: 600
+    KG_RELATED_INDEX_TTL = int(os.getenv('KG_RELATED_INDEX_TTL', '600'))
+    # 知识图谱批量写入（UNWIND）每个事务的行数
+    # 环境变量: KG_WRITE_BATCH_SIZE  默认: 1000
+    KG_WRITE_BATCH_SIZE = int(os.getenv('KG_WRITE_BATCH_SIZE', '1000'))
+    # 朝代 / 传承人批量抽取的进程数，0 表示按 CPU 核数自动选择（最多 8），1 表示串行
+    # 同步在 API 服务进程内执行，默认串行；进程池（spawn 启动）适合大批量离线同步
+    # 环境变量: KG_EXTRACT_WORKERS  默认: 1
+    KG_EXTRACT_WORKERS = int(os.getenv('KG_EXTRACT_WORKERS', '1'))
+    # 批量抽取启用进程池的最小条目数（进程启动有固定开销，小批量串行更快）
+    # 环境变量: KG_EXTRACT_PARALLEL_MIN  默认: 200
+    KG_EXTRACT_PARALLEL_MIN = int(os.getenv('KG_EXTRACT_PARALLEL_MIN', '200'))
+    # 非遗目录快照（ID / 名称查询缓存）全量刷新周期（秒），本进程内的编辑会立即失效
+    # 环境变量: HERITAGE_CATALOG_TTL  默认: 300
+    HERITAGE_CATALOG_TTL = int(os.getenv('HERITAGE_CATALOG_TTL', '300'))
+    # 非遗详情档案（节点 + 传承人 + 朝代 + 邻近）缓存条数上限，0 表示不缓存
+    # 环境变量: HERITAGE_DOSSIER_CACHE_SIZE  默认: 512
+    HERITAGE_DOSSIER_CACHE_SIZE = int(os.getenv('HERITAGE_DOSSIER_CACHE_SIZE', '512'))
+    # 非遗详情档案缓存有效期（秒），本进程内的写入与同步会主动失效
+    # 环境变量: HERITAGE_DOSSIER_CACHE_TTL  默认: 300
+    HERITAGE_DOSSIER_CACHE_TTL = int(os.getenv('HERITAGE_DOSSIER_CACHE_TTL', '300'))
+    # Neo4j 查询观测：按调用方统计延迟直方图 / 行数 / 错误（关闭后驱动不做包装）
+    # 环境变量: NEO4J_QUERY_METRICS_ENABLED  默认: true
+    NEO4J_QUERY_METRICS_ENABLED = os.getenv('NEO4J_QUERY_METRICS_ENABLED', 'true').lower() == 'true'
+    # 慢查询阈值（毫秒），超过时写入慢查询日志（参数只记录类型与长度）
+    # 环境变量: NEO4J_SLOW_QUERY_MS  默认: 200
+    NEO4J_SLOW_QUERY_MS = float(os.getenv('NEO4J_SLOW_QUERY_MS', '200'))
+    # 内存中保留的最近慢查询条数
+    # 环境变量: NEO4J_SLOW_QUERY_LOG_SIZE  默认: 200
+    NEO4J_SLOW_QUERY_LOG_SIZE = int(os.getenv('NEO4J_SLOW_QUERY_LOG_SIZE', '200'))
+    # 慢查询另写 JSONL 文件（为空时只写 loguru 日志）
+    # 环境变量: NEO4J_SLOW_QUERY_LOG_FILE  默认: ''
+    NEO4J_SLOW_QUERY_LOG_FILE = os.getenv('NEO4J_SLOW_QUERY_LOG_FILE', '')
+    # PROFILE 采样：对 p95 最高的若干只读查询名，在后台以 PROFILE 重放慢查询（会额外执行一次查询）
+    # 环境变量: NEO4J_PROFILE_SAMPLING  默认: false
+    NEO4J_PROFILE_SAMPLING = os.getenv('NEO4J_PROFILE_SAMPLING', 'false').lower() == 'true'
+    # 参与 PROFILE 采样的最慢查询名个数
+    # 环境变量: NEO4J_PROFILE_TOP_N  默认: 5
+    NEO4J_PROFILE_TOP_N = int(os.getenv('NEO4J_PROFILE_TOP_N', '5'))
+    # 同一查询名两次 PROFILE 的最小间隔（秒）
+    # 环境变量: NEO4J_PROFILE_INTERVAL  默认: 300
+    NEO4J_PROFILE_INTERVAL = float(os.getenv('NEO4J_PROFILE_INTERVAL', '300'))
+    # 请求路径只读查询使用 AsyncGraphDatabase（关闭后异步接口回退为线程池调用同步驱动）
+    # 环境变量: NEO4J_ASYNC_ENABLED  默认: true
+    NEO4J_ASYNC_ENABLED = os.getenv('NEO4J_ASYNC_ENABLED', 'true').lower() == 'true'
+    # 异步驱动连接池上限（与同步驱动的连接池相互独立）
+    # 环境变量: NEO4J_ASYNC_POOL_SIZE  默认: 50
+    NEO4J_ASYNC_POOL_SIZE = int(os.getenv('NEO4J_ASYNC_POOL_SIZE', '50'))
+    # 异步驱动从连接池获取连接的超时（秒）
+    # 环境变量: NEO4J_ASYNC_ACQUIRE_TIMEOUT  默认: 10
+    NEO4J_ASYNC_ACQUIRE_TIMEOUT = float(os.getenv('NEO4J_ASYNC_ACQUIRE_TIMEOUT', '10'))
+    # 异步驱动连接最长存活时间（秒），应小于服务端 / 负载均衡的空闲断开时间
+    # 环境变量: NEO4J_ASYNC_MAX_LIFETIME  默认: 3600
+    NEO4J_ASYNC_MAX_LIFETIME = float(os.getenv('NEO4J_ASYNC_MAX_LIFETIME', '3600'))
 
     # ── ChromaDB 向量数据库（可选）────────────────────────
     # 环境变量: CHROMADB_PERSIST_DIRECTORY  默认: None
     CHROMADB_PERSIST_DIRECTORY = os.getenv('CHROMADB_PERSIST_DIRECTORY')
     # 环境变量: EMBEDDING_MODEL  默认: None
     EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL')
+    # 非遗知识批量向量化的每批文档数（编码 + 一次 upsert）
+    # 环境变量: VECTOR_SYNC_BATCH_SIZE  默认: 64
+    VECTOR_SYNC_BATCH_SIZE = int(os.getenv('VECTOR_SYNC_BATCH_SIZE', '64'))
+    # 持久化嵌入缓存开关（Agent/data/embedding_cache，重启后复用已编码文本）
+    # 环境变量: EMBEDDING_CACHE_ENABLED  默认: true
+    EMBEDDING_CACHE_ENABLED = os.getenv('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+    # 持久化嵌入缓存最大条数，超出按 LRU 淘汰（bge-small-zh 每条约 2KB）
+    # 环境变量: EMBEDDING_CACHE_MAX_ENTRIES  默认: 50000
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '50000'))
+    # 单条编码微批调度开关（并发请求合并为一次批量前向）
+    # 环境变量: EMBEDDING_BATCH_ENABLED  默认: true
+    EMBEDDING_BATCH_ENABLED = os.getenv('EMBEDDING_BATCH_ENABLED', 'true').lower() == 'true'
+    # 微批等待窗口（毫秒），窗口内到达的请求合并编码
+    # 环境变量: EMBEDDING_BATCH_WINDOW_MS  默认: 5
+    EMBEDDING_BATCH_WINDOW_MS = float(os.getenv('EMBEDDING_BATCH_WINDOW_MS', '5'))
+    # 微批最大条数，达到即立即编码
+    # 环境变量: EMBEDDING_BATCH_MAX_SIZE  默认: 32
+    EMBEDDING_BATCH_MAX_SIZE = int(os.getenv('EMBEDDING_BATCH_MAX_SIZE', '32'))
+    # 异步向量检索专用线程池大小（与工具线程池、RAG 线程池隔离）
+    # 环境变量: VECTOR_SEARCH_MAX_WORKERS  默认: 4
+    VECTOR_SEARCH_MAX_WORKERS = int(os.getenv('VECTOR_SEARCH_MAX_WORKERS', '4'))
+    # 非遗知识精确向量索引（NumPy 全量余弦检索，启动时从 Chroma 加载，替代 HNSW）
+    # 环境变量: HERITAGE_EXACT_INDEX_ENABLED  默认: true
+    HERITAGE_EXACT_INDEX_ENABLED = os.getenv('HERITAGE_EXACT_INDEX_ENABLED', 'true').lower() == 'true'
+    # 对话 / 会话归档向量的量化存储: none（Chroma 全精度）/ float16 / int8
+    # 环境变量: VECTOR_QUANTIZATION  默认: none
+    VECTOR_QUANTIZATION = os.getenv('VECTOR_QUANTIZATION', 'none')
+    # 量化检索的候选倍数（近似打分取 n×factor 条后全精度重排），<=1 关闭重排
+    # 环境变量: VECTOR_QUANTIZED_RERANK_FACTOR  默认: 4
+    VECTOR_QUANTIZED_RERANK_FACTOR = int(os.getenv('VECTOR_QUANTIZED_RERANK_FACTOR', '4'))
+    # 量化集合从同名 Chroma 集合导入完成后是否删除原集合（删除后无法直接回退到全精度存储）
+    # 环境变量: VECTOR_QUANTIZED_DROP_SOURCE  默认: false
+    VECTOR_QUANTIZED_DROP_SOURCE = os.getenv('VECTOR_QUANTIZED_DROP_SOURCE', 'false').lower() == 'true'
+    # 共享嵌入服务地址（python -m Agent.memory.embedding_service），为空则各进程自行加载模型
+    # 环境变量: EMBEDDING_SERVICE_URL  默认: None
+    EMBEDDING_SERVICE_URL = os.getenv('EMBEDDING_SERVICE_URL')
+    # 共享嵌入服务请求超时（秒），超时或失败时回退为进程内加载
+    # 环境变量: EMBEDDING_SERVICE_TIMEOUT  默认: 10
+    EMBEDDING_SERVICE_TIMEOUT = float(os.getenv('EMBEDDING_SERVICE_TIMEOUT', '10'))
 
     # ── MinIO 对象存储 ────────────────────────────────────
     # 环境变量: MINIO_ENDPOINT  默认: None
@@ -134,13 +134,46 @@ class WorkingMemoryAssembler:
         # 2. 预算分配
         allocation = self._allocate_budget(intent, input_budget, context, user_input)
 
+        rag_ctx = self._build_rag_context(user_input, context, allocation.rag_context)
+        return self._assemble_with_rag(
+            user_input, context, input_budget, intent, allocation, rag_ctx)
+
+    async def assemble_async(
+        self,
+        user_input: str,
+        context: UnifiedContext,
+        input_budget: int,
+        output_budget: int,
+    ) -> AssembleResult:
+        """
+        assemble 的异步版本
+
+        RAG 检索（嵌入计算 + Chroma I/O）在 VectorStore 专用线程池中执行，
+        不阻塞事件循环上的其他流式请求；其余组装步骤与 assemble 一致。
+        """
+        intent = self._detect_intent(user_input, context)
+        allocation = self._allocate_budget(intent, input_budget, context, user_input)
+
+        rag_ctx = await self._build_rag_context_async(user_input, context, allocation.rag_context)
+        return self._assemble_with_rag(
+            user_input, context, input_budget, intent, allocation, rag_ctx)
+
+    def _assemble_with_rag(
+        self,
+        user_input: str,
+        context: UnifiedContext,
+        input_budget: int,
+        intent: IntentType,
+        allocation: BudgetAllocation,
+        rag_ctx: str,
+    ) -> AssembleResult:
+        """在已得到 RAG 上下文的前提下完成其余部分组装"""
         # 3. 各部分在预算内组装
         system_content = self._build_system_content(allocation.system)
         intent_hint = self._build_intent_hint(intent, allocation.intent_hint)
         plan_ctx = self._build_plan_context(context, allocation.plan_context)
         wm_ctx = self._build_working_memory(user_input, context, intent, allocation.working_memory)
         l2_ctx = self._build_l2_context(context, allocation.l2_preferences)
-        rag_ctx = self._build_rag_context(user_input, context, allocation.rag_context)
         summary_ctx = self._build_summary_context(context, allocation.session_summary)
         cross_session_ctx = self._build_cross_session_context(context, user_input, allocation.cross_session)
         guide_ctx = self._build_guide_slot(context, allocation.guide_slot)
@@ -707,6 +740,23 @@ class WorkingMemoryAssembler:
             logger.warning(f"[WMA] L2偏好构建失败: {e}")
             return ""
 
+    @staticmethod
+    def _rag_top_k(budget: int) -> int:
+        """按 RAG 预算动态决定 top_k"""
+        if budget >= 3000:
+            return memory_budget.rag_top_k_max
+        if budget >= 1500:
+            return max(memory_budget.rag_top_k_min, memory_budget.rag_top_k_max - 1)
+        return memory_budget.rag_top_k_min
+
+    def _wrap_rag_prompt(self, rag_prompt: str, budget: int) -> str:
+        if not rag_prompt:
+            return ""
+        content = f"\n# 相关知识\n{rag_prompt}"
+        if self._estimate_tokens(content) > budget:
+            content = self._truncate_to_budget(content, budget)
+        return content
+
     def _build_rag_context(
         self, user_input: str, context: UnifiedContext, budget: int
     ) -> str:
@@ -715,27 +765,30 @@ class WorkingMemoryAssembler:
             return ""
 
         try:
-            # 动态 top_k
-            if budget >= 3000:
-                top_k = memory_budget.rag_top_k_max
-            elif budget >= 1500:
-                top_k = max(memory_budget.rag_top_k_min, memory_budget.rag_top_k_max - 1)
-            else:
-                top_k = memory_budget.rag_top_k_min
-
             rag_prompt = self.rag_retriever.build_rag_prompt(
                 query=user_input,
                 user_id=context.user_id,
-                top_k=top_k
+                top_k=self._rag_top_k(budget)
             )
+            return self._wrap_rag_prompt(rag_prompt, budget)
+        except Exception as e:
+            logger.warning(f"[WMA] RAG上下文构建失败: {e}")
+            return ""
 
-            if not rag_prompt:
-                return ""
+    async def _build_rag_context_async(
+        self, user_input: str, context: UnifiedContext, budget: int
+    ) -> str:
+        """构建 RAG 检索上下文（异步，检索不占用事件循环）"""
+        if not self.rag_retriever or budget <= 0:
+            return ""
 
-            content = f"\n# 相关知识\n{rag_prompt}"
-            if self._estimate_tokens(content) > budget:
-                content = self._truncate_to_budget(content, budget)
-            return content
+        try:
+            rag_prompt = await self.rag_retriever.build_rag_prompt_async(
+                query=user_input,
+                user_id=context.user_id,
+                top_k=self._rag_top_k(budget)
+            )
+            return self._wrap_rag_prompt(rag_prompt, budget)
         except Exception as e:
             logger.warning(f"[WMA] RAG上下文构建失败: {e}")
             return ""
@@ -798,16 +851,11 @@ class WorkingMemoryAssembler:
             if not heritage_names:
                 return ""
 
-            from Agent.config.memory_budget import memory_budget
-            boosts = []
-            for name in heritage_names[:3]:
-                if not name:
-                    continue
-                boost = self.l2_store.get_graph_expansion_boost(
-                    context.user_id, name
-                )
-                if boost > 0:
-                    boosts.append((name, boost))
+            # 全部候选一次查询取回增强因子，再按关联度取前 3
+            scored = self.l2_store.get_graph_expansion_boosts(
+                context.user_id, heritage_names
+            ) or {}
+            boosts = [(name, boost) for name, boost in scored.items() if boost > 0]
 
             if not boosts:
                 return ""
@@ -78,6 +78,31 @@ class ResourceManager:
         
         logger.info("资源清理完成")
     
+    async def run_vector_retention(self, force: bool = False) -> Dict[str, Any]:
+        """按间隔执行对话 / 归档向量的保留与压缩，返回回收报告"""
+        from Agent.config.memory_budget import memory_budget
+        if not memory_budget.vector_retention_enabled:
+            return {}
+        
+        from Agent.memory.vector_retention import get_vector_retention_job
+        job = get_vector_retention_job()
+        if not force and not job.is_due():
+            return {}
+        # 扫描与删除均为阻塞调用，放到线程中执行
+        return await asyncio.to_thread(job.run)
+    
+    async def run_l2_maintenance(self, force: bool = False) -> Dict[str, Any]:
+        """按间隔对全部用户执行 L2 偏好衰减与过期清理，返回各步骤处理条数与耗时"""
+        from Agent.config.memory_budget import memory_budget
+        if not memory_budget.l2_maintenance_enabled:
+            return {}
+        
+        from Agent.memory.l2_maintenance import get_l2_maintenance_job
+        job = get_l2_maintenance_job()
+        if not force and not job.is_due():
+            return {}
+        return await asyncio.to_thread(job.run)
+    
     async def start_scheduler(self, interval: int = 300):
         """启动定时清理"""
         while not self._shutdown_event.is_set():
@@ -91,6 +116,14 @@ class ResourceManager:
                     await self.cleanup_all()
                 except Exception as e:
                     logger.warning(f"定时清理失败: {e}")
+                try:
+                    await self.run_vector_retention()
+                except Exception as e:
+                    logger.warning(f"向量保留任务失败: {e}")
+                try:
+                    await self.run_l2_maintenance()
+                except Exception as e:
+                    logger.warning(f"L2 全局维护任务失败: {e}")
             except Exception:
                 await asyncio.sleep(60)
     
@@ -144,10 +177,38 @@ class ResourceManager:
         except Exception as e:
             logger.warning(f"关闭MCP服务失败: {e}")
         
+        try:
+            from Agent.memory.l2_write_queue import shutdown_l2_write_queue
+            # 落库会用到知识图谱与嵌入模型，需在二者关闭前执行
+            await asyncio.to_thread(shutdown_l2_write_queue)
+        except Exception as e:
+            logger.warning(f"刷新 L2 写后队列失败: {e}")
+        
+        try:
+            from Agent.memory.recommendation_engine import shutdown_recommend_executor
+            shutdown_recommend_executor()
+        except Exception as e:
+            logger.warning(f"关闭推荐策略线程池失败: {e}")
+        
+        try:
+            from Agent.memory.vector_store import shutdown_search_executor
+            shutdown_search_executor()
+        except Exception as e:
+            logger.warning(f"关闭向量检索线程池失败: {e}")
+        
+        try:
+            from Agent.memory.vector_store import EmbeddingModel
+            embedding_model = EmbeddingModel._instance
+            if embedding_model and (embedding_model.model is not None or embedding_model.is_remote):
+                embedding_model.shutdown()
+        except Exception as e:
+            logger.warning(f"关闭嵌入模型失败: {e}")
+        
         try:
             from Agent.memory.knowledge_graph import get_knowledge_graph
             kg = get_knowledge_graph()
             if kg:
+                await kg.aclose()
                 kg.close()
         except Exception as e:
             logger.warning(f"关闭知识图谱失败: {e}")
@@ -66,6 +66,27 @@ class StartupManager:
             sort_keys=True, ensure_ascii=False
         )
         return hashlib.md5(data_str.encode()).hexdigest()
+
+    def _compute_record_hashes(self, heritage_list: List[Dict]) -> Dict[str, str]:
+        """计算逐条内容哈希 {str(id): md5}，用于增量同步比对"""
+        return {
+            str(h.get('id')): hashlib.md5(json.dumps(
+                [h.get(f) for f in self._HASH_FIELDS],
+                ensure_ascii=False, default=str
+            ).encode()).hexdigest()
+            for h in heritage_list
+            if h.get('id') is not None
+        }
+
+    @staticmethod
+    def _diff_record_hashes(current: Dict[str, str],
+                            stored: Dict[str, str]) -> Dict[str, List[str]]:
+        """比对逐条哈希，返回 {added, changed, removed} 的 id 列表"""
+        return {
+            'added': [k for k in current if k not in stored],
+            'changed': [k for k in current if k in stored and current[k] != stored[k]],
+            'removed': [k for k in stored if k not in current],
+        }
     
     async def initialize_all(self) -> Dict[str, Any]:
         """并行初始化所有组件（按依赖分层并行）"""
@@ -144,8 +165,10 @@ class StartupManager:
         
         kg = get_knowledge_graph()
         if kg and kg.is_connected():
+            catalog_size = await asyncio.to_thread(kg.load_heritage_catalog)
             return {
-                'connected': True
+                'connected': True,
+                'heritage_catalog': catalog_size
             }
         return {
             'connected': False
@@ -158,9 +181,11 @@ class StartupManager:
         vs = get_vector_store()
         if vs:
             stats = vs.get_collection_stats()
+            index_count = await asyncio.to_thread(vs.load_heritage_index)
             return {
                 'available': True,
-                'stats': stats
+                'stats': stats,
+                'heritage_index': index_count
             }
         return {
             'available': False,
@@ -265,13 +290,28 @@ class StartupManager:
                     'error': '未获取到非遗数据'
                 }
             
+            phases = {'fetch_ms': round((datetime.now() - start_time).total_seconds() * 1000, 2)}
+            
+            t0 = datetime.now()
             current_hash = self._compute_data_hash(heritage_list)
             stored_hash = self.sync_status.get('data_hash')
+            current_records = self._compute_record_hashes(heritage_list)
+            stored_records = self.sync_status.get('record_hashes') or {}
+            diff = self._diff_record_hashes(current_records, stored_records)
+            phases['diff_ms'] = round((datetime.now() - t0).total_seconds() * 1000, 2)
             
             kg_empty = await self._check_knowledge_graph_empty()
             vs_empty = self._check_vector_store_empty()
+            stores_ready = not kg_empty and not vs_empty
+            
+            # 旧版同步状态只有整体哈希：整体未变时补记逐条哈希，不触发同步
+            if not force and stores_ready and not stored_records and current_hash == stored_hash:
+                self.sync_status['record_hashes'] = current_records
+                self._save_sync_status()
+                stored_records = current_records
+                diff = self._diff_record_hashes(current_records, stored_records)
             
-            if not force and current_hash == stored_hash and not kg_empty and not vs_empty:
+            if not force and stores_ready and stored_records and not any(diff.values()):
                 logger.info("数据无变化，跳过同步")
                 return {
                     'success': True,
@@ -284,33 +324,93 @@ class StartupManager:
             if vs_empty:
                 logger.info("向量数据库为空，强制同步")
             
-            logger.info(f"检测到数据变化，开始同步 {len(heritage_list)} 条数据...")
-            
-            kg_result = await self._sync_to_knowledge_graph(heritage_list)
-            vs_result = await self._sync_to_vector_store(heritage_list)
-            
-            self.sync_status = {
-                'last_sync': datetime.now().isoformat(),
-                'heritage_count': len(heritage_list),
-                'data_hash': current_hash,
-                'phase_one_inheritors': kg_result.get('inheritor_node_count', 0) > 0,
-                'phase_two_dynasty_region': (
+            full_sync = force or not stores_ready or not stored_records
+            if full_sync:
+                logger.info(f"开始全量同步 {len(heritage_list)} 条数据...")
+                
+                t0 = datetime.now()
+                kg_result = await self._sync_to_knowledge_graph(heritage_list)
+                phases['knowledge_graph_ms'] = round((datetime.now() - t0).total_seconds() * 1000, 2)
+                
+                t0 = datetime.now()
+                vs_result = await self._sync_to_vector_store(heritage_list)
+                phases['vector_store_ms'] = round((datetime.now() - t0).total_seconds() * 1000, 2)
+                
+                phase_one = kg_result.get('inheritor_node_count', 0) > 0
+                phase_two = (
                     kg_result.get('dynasty_nodes', 0) > 0 and
                     kg_result.get('part_of_relations', 0) > 0
-                ),
-            }
-            self._save_sync_status()
+                )
+            else:
+                logger.info(
+                    f"增量同步: 新增 {len(diff['added'])} 条, 变更 {len(diff['changed'])} 条, "
+                    f"删除 {len(diff['removed'])} 条"
+                )
+                upsert_ids = set(diff['added']) | set(diff['changed'])
+                upsert_list = [h for h in heritage_list if str(h.get('id')) in upsert_ids]
+                removed_ids = [self._parse_heritage_id(k) for k in diff['removed']]
+                changed_ids = [self._parse_heritage_id(k) for k in diff['changed']]
+                
+                t0 = datetime.now()
+                removal_result = await self._remove_heritage_records(removed_ids)
+                phases['removal_ms'] = round((datetime.now() - t0).total_seconds() * 1000, 2)
+                
+                t0 = datetime.now()
+                kg_result = await self._sync_to_knowledge_graph_incremental(upsert_list, changed_ids)
+                phases['knowledge_graph_ms'] = round((datetime.now() - t0).total_seconds() * 1000, 2)
+                
+                t0 = datetime.now()
+                vs_result = (await self._sync_to_vector_store(upsert_list) if upsert_list
+                             else {'success': True, 'vector_count': 0})
+                phases['vector_store_ms'] = round((datetime.now() - t0).total_seconds() * 1000, 2)
+                
+                kg_result['removed'] = removal_result
+                phase_one = self.sync_status.get('phase_one_inheritors', False)
+                phase_two = self.sync_status.get('phase_two_dynasty_region', False)
+            
+            # 相关非遗依赖朝代关系与知识向量，两侧同步完成后全量重算
+            t0 = datetime.now()
+            kg_result['related_heritage'] = await self._build_related_heritage()
+            phases['related_heritage_ms'] = round((datetime.now() - t0).total_seconds() * 1000, 2)
+            
+            # 任一侧写入失败时保留上次的哈希，下次同步仍能比对出这些记录并重试
+            kg_ok = bool(kg_result.get('success'))
+            vs_ok = bool(vs_result.get('success')) and not vs_result.get('failed_count')
+            synced = kg_ok and vs_ok
+            if synced:
+                self.sync_status = {
+                    'last_sync': datetime.now().isoformat(),
+                    'heritage_count': len(heritage_list),
+                    'data_hash': current_hash,
+                    'record_hashes': current_records,
+                    'phase_one_inheritors': phase_one,
+                    'phase_two_dynasty_region': phase_two,
+                }
+                self._save_sync_status()
             
             elapsed = (datetime.now() - start_time).total_seconds()
-            logger.info(f"同步完成，耗时 {elapsed:.2f}s")
+            phases['total_ms'] = round(elapsed * 1000, 2)
+            if synced:
+                logger.info(f"同步完成，耗时 {elapsed:.2f}s，阶段耗时 {phases}")
+            else:
+                logger.warning(
+                    f"同步未完成（知识图谱: {'成功' if kg_ok else '失败'}, "
+                    f"向量数据库: {'成功' if vs_ok else '失败'}），保留上次同步状态以便重试"
+                )
             
-            return {
-                'success': True,
+            result = {
+                'success': synced,
+                'mode': 'full' if full_sync else 'incremental',
                 'heritage_count': len(heritage_list),
+                'diff': {k: len(v) for k, v in diff.items()},
                 'knowledge_graph': kg_result,
                 'vector_store': vs_result,
+                'phases': phases,
                 'elapsed_seconds': elapsed
             }
+            if not synced:
+                result['error'] = '知识图谱或向量数据库同步失败'
+            return result
             
         except Exception as e:
             logger.error(f"自动同步失败: {e}")
@@ -340,14 +440,7 @@ class StartupManager:
             return True
         try:
             stats = vs.get_collection_stats()
-            hk_count = 0
-            for col_stat in stats.values():
-                if isinstance(col_stat, dict) and col_stat.get('collection_name') == 'heritage_knowledge':
-                    hk_count = col_stat.get('count', 0)
-                    break
-            if hk_count == 0:
-                return True
-            return False
+            return stats.get('heritage_knowledge', 0) == 0
         except Exception:
             return True
     
@@ -421,78 +514,137 @@ class StartupManager:
         if not kg or not kg.is_connected():
             return {'success': False, 'error': '知识图谱未连接'}
         
-        categories = set()
-        regions = set()
-        levels = set()
-        batches = set()
-        
-        for heritage in heritage_list:
-            if heritage.get('category'):
-                categories.add(heritage['category'])
-            if heritage.get('region'):
-                regions.add(heritage['region'])
-            if heritage.get('level'):
-                levels.add(heritage['level'])
-            if heritage.get('batch'):
-                batches.add(heritage['batch'])
-        
-        for category in categories:
-            kg.create_category_node(category, '')
-        for region in regions:
-            kg.create_region_node(region, '陕西', region, '地级市')
-        for level in levels:
-            kg.create_level_node(level, 0)
-        for batch in batches:
-            kg.create_batch_node(batch)
-        
-        heritage_count = 0
-        for heritage in heritage_list:
-            if kg.create_heritage_node(heritage):
-                heritage_count += 1
-                kg.build_heritage_relations(
-                    heritage_id=heritage['id'],
-                    category=heritage.get('category', ''),
-                    region=heritage.get('region', ''),
-                    level=heritage.get('level', ''),
-                    batch=heritage.get('batch', ''),
-                    latitude=heritage.get('latitude'),
-                    longitude=heritage.get('longitude'),
-                    name=heritage.get('name', '')
-                )
+        merged = kg.sync_heritage_records(heritage_list)
         
         near_count = kg.build_near_relations(max_distance_km=100)
+        kg.refresh_nearby_index()
+        kg.load_heritage_catalog()
 
         # 阶段一：传承人图谱同步
         inheritor_stats = kg.sync_inheritors_from_heritage_list(heritage_list)
 
         # 阶段二：Region 层级树展开 + 细粒度地区关联
         region_tree_stats = kg.expand_region_tree()
-        refine_count = 0
-        for heritage in heritage_list:
-            text = (heritage.get('description', '') + ' ' +
-                    heritage.get('history', ''))
-            if kg.refine_heritage_region(heritage['id'], text):
-                refine_count += 1
+        refine_stats = kg.sync_region_refinements(heritage_list)
 
         # 阶段二：朝代图谱同步
         dynasty_stats = kg.sync_dynasties_from_heritage_list(heritage_list)
 
+        failed_writes = self._count_write_failures(
+            merged, kg.get_near_build_stats(), inheritor_stats, region_tree_stats,
+            refine_stats, dynasty_stats)
         return {
-            'success': True,
-            'heritage_count': heritage_count,
-            'category_count': len(categories),
-            'region_count': len(regions),
+            'success': failed_writes == 0,
+            'failed_writes': failed_writes,
+            'heritage_count': merged['heritage_count'],
+            'category_count': merged['category_count'],
+            'region_count': merged['region_count'],
             'near_relation_count': near_count,
+            'near_relation_build': kg.get_near_build_stats(),
             'inheritor_node_count': inheritor_stats['inheritor_nodes'],
             'has_inheritor_relation_count': inheritor_stats['has_inheritor_relations'],
             'studied_under_relation_count': inheritor_stats['studied_under_relations'],
             'region_tree_nodes': region_tree_stats['region_nodes'],
             'part_of_relations': region_tree_stats['part_of_relations'],
-            'refined_heritage_regions': refine_count,
+            'refined_heritage_regions': refine_stats['refined_heritages'],
             'dynasty_nodes': dynasty_stats['dynasty_nodes'],
             'originated_in_relations': dynasty_stats['originated_in_relations'],
         }
     
+    async def _build_related_heritage(self) -> Dict[str, Any]:
+        """预计算相关非遗 top-K（RELATED_TO），知识向量不可用时只按图谱特征打分"""
+        from Agent.memory.knowledge_graph import get_knowledge_graph
+        from Agent.memory.vector_store import get_vector_store
+        
+        kg = get_knowledge_graph()
+        if not kg or not kg.is_connected():
+            return {'success': False, 'error': '知识图谱未连接'}
+        
+        vs = get_vector_store()
+        embeddings = vs.get_heritage_embeddings() if vs else {}
+        edge_count = await asyncio.to_thread(kg.build_related_heritage, embeddings)
+        return {'success': True, 'edge_count': edge_count, **kg.get_related_build_stats()}
+    
+    @staticmethod
+    def _count_write_failures(*stats: Dict[str, Any]) -> int:
+        """汇总各同步步骤批量写入失败的行数"""
+        return sum(int(s.get('failed', 0) or 0) for s in stats if s)
+    
+    @staticmethod
+    def _parse_heritage_id(key: str):
+        """sync_status 中的 id 以字符串保存，还原为原始类型"""
+        return int(key) if key.isdigit() else key
+    
+    async def _sync_to_knowledge_graph_incremental(self, heritage_list: List[Dict],
+                                                   changed_ids: List) -> Dict[str, Any]:
+        """增量同步到知识图谱：先清除变更记录的旧关系，再只为新增/变更记录重建节点与关联"""
+        from Agent.memory.knowledge_graph import get_knowledge_graph
+        
+        kg = get_knowledge_graph()
+        if not kg or not kg.is_connected():
+            return {'success': False, 'error': '知识图谱未连接'}
+        
+        # 清除旧关系前后各统计一次用户关系，校验增量同步没有误删 L2 用户数据
+        user_relations_before = kg.count_user_heritage_relations(changed_ids)
+        for heritage_id in changed_ids:
+            kg.detach_heritage_relations(heritage_id)
+        
+        merged = kg.sync_heritage_records(heritage_list)
+        near_count = kg.build_near_relations_for(
+            [h['id'] for h in heritage_list], max_distance_km=100)
+        kg.refresh_nearby_index()
+        kg.load_heritage_catalog()
+        inheritor_stats = kg.sync_inheritors_from_heritage_list(heritage_list)
+        refine_stats = kg.sync_region_refinements(heritage_list)
+        dynasty_stats = kg.sync_dynasties_from_heritage_list(heritage_list)
+        
+        failed_writes = self._count_write_failures(
+            merged, kg.get_near_build_stats(), inheritor_stats, refine_stats, dynasty_stats)
+        user_relations_after = kg.count_user_heritage_relations(changed_ids)
+        if user_relations_after < user_relations_before:
+            logger.error(
+                f"增量同步后用户非遗关系减少: {user_relations_before} → {user_relations_after}"
+            )
+        
+        return {
+            'success': failed_writes == 0,
+            'failed_writes': failed_writes,
+            'user_relations': {'before': user_relations_before, 'after': user_relations_after},
+            'heritage_count': merged['heritage_count'],
+            'category_count': merged['category_count'],
+            'region_count': merged['region_count'],
+            'near_relation_count': near_count,
+            'near_relation_build': kg.get_near_build_stats(),
+            'inheritor_node_count': inheritor_stats['inheritor_nodes'],
+            'has_inheritor_relation_count': inheritor_stats['has_inheritor_relations'],
+            'studied_under_relation_count': inheritor_stats['studied_under_relations'],
+            'refined_heritage_regions': refine_stats['refined_heritages'],
+            'originated_in_relations': dynasty_stats['originated_in_relations'],
+        }
+    
+    async def _remove_heritage_records(self, heritage_ids: List) -> Dict[str, int]:
+        """从知识图谱和向量库中删除已下线的非遗"""
+        if not heritage_ids:
+            return {'knowledge_graph': 0, 'vector_store': 0}
+        
+        from Agent.memory.knowledge_graph import get_knowledge_graph
+        from Agent.memory.vector_store import get_vector_store
+        
+        kg_removed = 0
+        kg = get_knowledge_graph()
+        if kg and kg.is_connected():
+            for heritage_id in heritage_ids:
+                if kg.delete_heritage(heritage_id):
+                    kg_removed += 1
+        
+        vs_removed = 0
+        vs = get_vector_store()
+        if vs:
+            vs_removed = await asyncio.to_thread(vs.delete_heritage_knowledge, heritage_ids)
+        
+        logger.info(f"已删除下线非遗: 知识图谱 {kg_removed} 条, 向量 {vs_removed} 条")
+        return {'knowledge_graph': kg_removed, 'vector_store': vs_removed}
+    
     async def _sync_to_vector_store(self, heritage_list: List[Dict]) -> Dict[str, int]:
         """同步到向量数据库"""
         from Agent.memory.vector_store import get_vector_store
@@ -501,25 +653,31 @@ class StartupManager:
         if not vs:
             return {'success': False, 'error': '向量数据库不可用'}
         
-        vector_count = 0
-        for heritage in heritage_list:
-            content = self._build_heritage_content(heritage)
-            if vs.add_heritage_knowledge(
-                heritage_id=heritage['id'],
-                name=heritage.get('name', ''),
-                content=content,
-                metadata={
+        documents = (
+            {
+                'heritage_id': heritage['id'],
+                'name': heritage.get('name', ''),
+                'content': self._build_heritage_content(heritage),
+                'metadata': {
                     'category': heritage.get('category', ''),
                     'region': heritage.get('region', ''),
                     'level': heritage.get('level', ''),
                     'batch': heritage.get('batch', '')
                 }
-            ):
-                vector_count += 1
+            }
+            for heritage in heritage_list
+        )
+        # 编码为 CPU 密集操作，放到线程中执行避免阻塞事件循环
+        result = await asyncio.to_thread(vs.add_heritage_knowledge_bulk, documents)
+        vs.clear_query_cache()
         
         return {
-            'success': True,
-            'vector_count': vector_count
+            'success': result.get('vector_count', 0) > 0,
+            'vector_count': result.get('vector_count', 0),
+            'failed_count': result.get('failed_count', 0),
+            'batch_count': result.get('batch_count', 0),
+            'elapsed_ms': result.get('elapsed_ms', 0.0),
+            'batches': result.get('batches', []),
         }
     
     def _build_heritage_content(self, heritage: Dict) -> str:
@@ -20,6 +20,11 @@ try:
 except Exception:
     get_l2_graph_store = None
 
+try:
+    from Agent.memory.l2_write_queue import get_l2_write_queue
+except Exception:
+    get_l2_write_queue = None
+
 try:
     from Agent.memory.l3_sqlite_ledger import get_l3_sqlite_ledger
 except Exception:
@@ -98,6 +103,11 @@ class MemoryCoordinator:
         self.l3_enabled = memory_budget.l3_ledger_enabled and self.l3_ledger is not None
         self.rag_enabled = self.vector_store is not None
         self.sifter_enabled = memory_budget.sifter_enabled
+        self.l2_write_queue = None
+        if self.l2_enabled and memory_budget.l2_write_behind_enabled and get_l2_write_queue:
+            self.l2_write_queue = get_l2_write_queue()
+            # 写后队列落库后再失效上下文缓存，使下一轮对话读到已落库的 L2 数据
+            self.l2_write_queue.add_flush_listener(self._on_l2_flushed)
         self._stats = {
             "turns_written": 0,
             "turn_write_failures": 0,
@@ -375,7 +385,8 @@ class MemoryCoordinator:
         4) L2 用户活跃时间更新（每次对话都更新）
         """
         if self.l2_enabled and user_id:
-            self.l2_store.touch_user_active(user_id, username=username)
+            if not (self.l2_write_queue and self.l2_write_queue.enqueue_touch(user_id, username=username)):
+                self.l2_store.touch_user_active(user_id, username=username)
 
         if self.l3_enabled:
             meta = {
@@ -415,8 +426,12 @@ class MemoryCoordinator:
             if should:
                 prefs = await self.sifter.extract_preferences_async(content)
                 if prefs:
-                    ok = self.l2_store.upsert_user_preferences(user_id=user_id, preferences=prefs, username=username)
-                    if ok:
+                    if self.l2_write_queue and self.l2_write_queue.enqueue_preferences(
+                            user_id=user_id, preferences=prefs, username=username, session_id=session_id):
+                        # 落库后由 _on_l2_flushed 失效上下文缓存
+                        self._stats["l2_upserts"] += 1
+                        logger.debug(f"L2偏好已入写后队列: user={user_id}, prefs={prefs}")
+                    elif self.l2_store.upsert_user_preferences(user_id=user_id, preferences=prefs, username=username):
                         self._stats["l2_upserts"] += 1
                         logger.debug(f"L2偏好写入成功: user={user_id}, prefs={prefs}")
                         # L2 更新后失效上下文缓存，使下一轮对话重新加载 L2 数据
@@ -446,34 +461,41 @@ class MemoryCoordinator:
 
         if heritage_id:
             try:
-                self.l2_store.link_user_heritage(
-                    user_id, int(heritage_id),
-                    rel_type="PREFERS",
-                    confidence=float(pref.get("confidence", 0.6)),
-                    source="dialogue",
-                )
+                self._link_user_heritage(user_id, int(heritage_id), float(pref.get("confidence", 0.6)))
                 logger.debug(f"对话意图→非遗关联: user={user_id}, heritage_id={heritage_id}")
             except Exception as e:
                 logger.debug(f"对话意图→非遗关联失败: {e}")
         elif heritage_name:
-            resolved_id = self._resolve_heritage_by_name(heritage_name)
+            resolved_id = await self._resolve_heritage_by_name(heritage_name)
             if resolved_id:
                 try:
-                    self.l2_store.link_user_heritage(
-                        user_id, resolved_id,
-                        rel_type="PREFERS",
-                        confidence=float(pref.get("confidence", 0.5)),
-                        source="dialogue",
-                    )
+                    self._link_user_heritage(user_id, resolved_id, float(pref.get("confidence", 0.5)))
                     logger.debug(f"对话意图→非遗关联(名称解析): user={user_id}, name={heritage_name}→id={resolved_id}")
                 except Exception as e:
                     logger.debug(f"对话意图→非遗关联(名称解析)失败: {e}")
 
-    def _resolve_heritage_by_name(self, name: str) -> Optional[int]:
+    def _link_user_heritage(self, user_id: str, heritage_id: int, confidence: float):
+        """对话意图 → PREFERS 关联：优先进入写后队列，队列不可用或已满时同步直写"""
+        if self.l2_write_queue and self.l2_write_queue.enqueue_heritage_link(
+                user_id, heritage_id, rel_type="PREFERS", confidence=confidence, source="dialogue"):
+            return
+        self.l2_store.link_user_heritage(
+            user_id, heritage_id,
+            rel_type="PREFERS",
+            confidence=confidence,
+            source="dialogue",
+        )
+
+    def _on_l2_flushed(self, user_id: str, session_ids: set):
+        """写后队列落库回调（后台线程）：失效涉及会话的上下文缓存"""
+        for session_id in session_ids:
+            self._invalidate_context_cache(session_id)
+
+    async def _resolve_heritage_by_name(self, name: str) -> Optional[int]:
         try:
             from Agent.memory.heritage_query_service import get_heritage_query_service
             service = get_heritage_query_service()
-            results = service.hybrid_query(name, top_k=1)
+            results = await service.hybrid_query_async(name, top_k=1)
             if results and results[0].get('id'):
                 return int(results[0]['id'])
         except Exception as e:
@@ -556,11 +578,12 @@ class MemoryCoordinator:
 
     async def run_maintenance(self, user_id: str) -> Dict[str, Any]:
         """
-        定时维护任务：时间感知衰减 + 双阈值过期清理 + 过期关系清理
+        单用户维护：时间感知衰减 + 双阈值过期清理 + 过期关系清理
 
-        由 app.py lifespan 定时调用（建议每 6 小时一次）。
+        全部用户的定时维护（含全局孤儿 Preference 回收）由 L2MaintenanceJob 批量执行，
+        此方法仅用于针对单个用户的按需维护。
         """
-        result = {"decayed": 0, "expired_dual": 0, "stale_relations": {}, "global_orphans": 0}
+        result = {"decayed": 0, "expired_dual": 0, "stale_relations": {}}
 
         if not self.l2_enabled:
             return result
@@ -583,24 +606,20 @@ class MemoryCoordinator:
 
         try:
             result["stale_relations"] = self.l2_store.cleanup_stale_user_relations(
-                user_id, max_age_days=30
+                user_id, max_age_days=memory_budget.l2_maintenance_stale_days
             )
         except Exception as e:
             logger.warning(f"过期关系清理失败: {e}")
 
-        try:
-            result["global_orphans"] = self.l2_store.cleanup_global_orphan_preferences()
-        except Exception as e:
-            logger.warning(f"全局孤儿Preference回收失败: {e}")
-
         logger.info(f"维护任务完成: user={user_id}, {result}")
         return result
 
     def _maybe_trigger_merge(self, user_id: str):
         """
-        计数触发合并检查: 写入量超过阈值时异步触发维护。
+        计数触发合并检查: 写入量达到阈值时提醒全局维护任务检查是否到期。
 
-        在 append_turn 中调用，不阻塞用户对话。
+        在 append_turn 中调用，不阻塞用户对话；是否执行由 L2MaintenanceJob.is_due 决定，
+        不再按用户逐个执行维护。
         """
         self._stats["turns_written"] += 1  # (已在 append_turn 中递增，此处为保护)
         total_writes = (
@@ -610,8 +629,9 @@ class MemoryCoordinator:
         )
         if total_writes > 0 and total_writes % memory_budget.merge_count_threshold == 0:
             import asyncio
-            asyncio.create_task(self.run_maintenance(user_id))
-            logger.info(f"计数触发合并: user={user_id}, writes={total_writes}")
+            from Agent.core.resource_manager import get_resource_manager
+            asyncio.create_task(get_resource_manager().run_l2_maintenance())
+            logger.debug(f"计数触发全局维护检查: user={user_id}, writes={total_writes}")
 
     def get_stats(self) -> Dict[str, Any]:
         return {
@@ -619,6 +639,7 @@ class MemoryCoordinator:
             "l2_enabled": self.l2_enabled,
             "l3_enabled": self.l3_enabled,
             "sifter_enabled": self.sifter_enabled,
+            "l2_write_queue": self.l2_write_queue.get_stats() if self.l2_write_queue else None,
         }
 
 
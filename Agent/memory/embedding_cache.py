@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+持久化嵌入缓存
+以文本内容哈希为键，将嵌入向量写入内存映射的 float32 矩阵，重启后仍可复用
+
+文件布局（位于 Agent/data/embedding_cache/）:
+  vectors.f32  — np.memmap 矩阵，形状 (capacity, dimension)
+  index.json   — {model_name, dimension, capacity, entries: [[key, slot], ...]}
+                 entries 按 LRU 顺序排列（最久未用在前）
+
+EMBEDDING_MODEL、向量维度或容量变化时整体失效重建。
+
+崩溃安全: 满容量时按批淘汰最久未用的条目，先落盘不含这些键的索引，再复用其槽位，
+磁盘上的索引因此永远不会把键映射到已写入其他文本向量的槽位。
+
+多进程: 缓存文件只允许一个进程打开（目录内 .lock 文件加排他锁）。
+多个 worker 进程不共享同一组文件，后启动的进程依次使用 worker-1 … worker-N 子目录；
+全部被占用时抛出异常，调用方退回仅内存缓存。共享嵌入服务（sidecar）模式下只有服务进程打开缓存。
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 主目录被占用时最多尝试的 worker 子目录数
+_MAX_PROCESS_DIRS = 16
+
+
+def _try_lock(lock_path: Path):
+    """非阻塞获取文件排他锁，成功返回打开的文件句柄（进程存活期间持有），失败返回 None"""
+    fh = open(lock_path, 'a+')
+    try:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        return fh
+    except OSError:
+        fh.close()
+        return None
+
+
+def _lock_cache_dir(base_dir: Path):
+    """为当前进程选择一个未被其他进程占用的缓存目录，返回 (目录, 锁文件句柄)"""
+    candidates = [base_dir] + [base_dir / f"worker-{i}" for i in range(1, _MAX_PROCESS_DIRS + 1)]
+    for cache_dir in candidates:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        fh = _try_lock(cache_dir / ".lock")
+        if fh is not None:
+            if cache_dir != base_dir:
+                logger.info(f"嵌入缓存主目录已被其他进程占用，使用 {cache_dir}")
+            return cache_dir, fh
+    raise RuntimeError(f"嵌入缓存目录均被其他进程占用: {base_dir}")
+
+
+class PersistentEmbeddingCache:
+    """内容哈希 → 嵌入向量的磁盘缓存，超出容量按 LRU 淘汰"""
+
+    VECTORS_FILE = "vectors.f32"
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir: str, model_name: str, dimension: int,
+                 capacity: int = 50000, flush_every: int = 200):
+        """
+        Args:
+            cache_dir: 缓存目录
+            model_name: 嵌入模型名，变化时缓存失效
+            dimension: 向量维度
+            capacity: 最大缓存条数
+            flush_every: 每新增 N 条写一次索引文件；满容量时每次淘汰的条数也以此为上限
+        """
+        self.cache_dir, self._lock_file = _lock_cache_dir(Path(cache_dir))
+        self.model_name = model_name
+        self.dimension = int(dimension)
+        self.capacity = max(1, int(capacity))
+        self.flush_every = max(1, int(flush_every))
+
+        self._lock = threading.Lock()
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free_slots: List[int] = []
+        self._dirty = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._vectors_path = self.cache_dir / self.VECTORS_FILE
+        self._index_path = self.cache_dir / self.INDEX_FILE
+        self._vectors = self._open()
+
+    # ──────────────────────────────
+    # 打开 / 失效
+    # ──────────────────────────────
+
+    def _open(self) -> np.memmap:
+        """加载已有缓存；模型、维度或容量不匹配时重建"""
+        index = self._load_index()
+        expected_bytes = self.capacity * self.dimension * 4
+        valid = (
+            index is not None
+            and index.get('model_name') == self.model_name
+            and index.get('dimension') == self.dimension
+            and index.get('capacity') == self.capacity
+            and self._vectors_path.exists()
+            and self._vectors_path.stat().st_size == expected_bytes
+        )
+
+        if not valid:
+            if index is not None:
+                logger.info(
+                    f"嵌入缓存失效（model={index.get('model_name')}→{self.model_name}, "
+                    f"dim={index.get('dimension')}→{self.dimension}），重建"
+                )
+            return self._reset()
+
+        vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r+',
+                            shape=(self.capacity, self.dimension))
+        used = set()
+        for key, slot in index.get('entries', []):
+            if 0 <= slot < self.capacity and slot not in used:
+                self._slots[key] = slot
+                used.add(slot)
+        self._free_slots = [s for s in range(self.capacity - 1, -1, -1) if s not in used]
+        logger.info(f"嵌入缓存已加载: {len(self._slots)}/{self.capacity} 条")
+        return vectors
+
+    def _reset(self) -> np.memmap:
+        """清空并按当前配置重建缓存文件"""
+        self._slots.clear()
+        self._free_slots = list(range(self.capacity - 1, -1, -1))
+        vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='w+',
+                            shape=(self.capacity, self.dimension))
+        vectors.flush()
+        self._write_index()
+        return vectors
+
+    def _load_index(self) -> Optional[Dict[str, Any]]:
+        if not self._index_path.exists():
+            return None
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"读取嵌入缓存索引失败，将重建: {e}")
+            return None
+
+    def _write_index(self):
+        """原子写索引文件（先写临时文件再替换）"""
+        data = {
+            'model_name': self.model_name,
+            'dimension': self.dimension,
+            'capacity': self.capacity,
+            'entries': [[k, s] for k, s in self._slots.items()],
+        }
+        tmp_path = self._index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self._index_path)
+        self._dirty = 0
+
+    # ──────────────────────────────
+    # 读写
+    # ──────────────────────────────
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                self._misses += 1
+                return None
+            self._slots.move_to_end(key)
+            self._hits += 1
+            return self._vectors[slot].tolist()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """批量读取，返回命中的 {key: embedding}"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                slot = self._slots.get(key)
+                if slot is None:
+                    self._misses += 1
+                    continue
+                self._slots.move_to_end(key)
+                self._hits += 1
+                found[key] = self._vectors[slot].tolist()
+        return found
+
+    def set(self, key: str, embedding: List[float]):
+        self.set_many({key: embedding})
+
+    def set_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        with self._lock:
+            for key, embedding in items.items():
+                if len(embedding) != self.dimension:
+                    continue
+                slot = self._slots.get(key)
+                if slot is None:
+                    if not self._free_slots and not self._evict_locked():
+                        break
+                    slot = self._free_slots.pop()
+                self._slots[key] = slot
+                self._slots.move_to_end(key)
+                self._vectors[slot] = np.asarray(embedding, dtype=np.float32)
+                self._dirty += 1
+            if self._dirty >= self.flush_every:
+                self._flush_locked()
+
+    def _evict_locked(self) -> bool:
+        """按 LRU 批量淘汰，落盘不含被淘汰键的索引后才把槽位放回空闲列表
+
+        落盘失败时恢复被淘汰的键并返回 False（本次不再写入新条目）。
+        """
+        count = max(1, min(self.flush_every, self.capacity // 10, len(self._slots)))
+        evicted = [self._slots.popitem(last=False) for _ in range(count)]
+        try:
+            self._vectors.flush()
+            self._write_index()
+        except Exception as e:
+            for key, slot in reversed(evicted):
+                self._slots[key] = slot
+                self._slots.move_to_end(key, last=False)
+            logger.warning(f"嵌入缓存淘汰时索引落盘失败: {e}")
+            return False
+        self._free_slots.extend(slot for _, slot in reversed(evicted))
+        self._evictions += count
+        return True
+
+    def _flush_locked(self):
+        try:
+            self._vectors.flush()
+            self._write_index()
+        except Exception as e:
+            logger.warning(f"嵌入缓存落盘失败: {e}")
+
+    def flush(self):
+        """将矩阵和索引同步到磁盘"""
+        with self._lock:
+            if self._dirty:
+                self._flush_locked()
+
+    def close(self):
+        """落盘并释放缓存目录锁"""
+        self.flush()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def clear(self):
+        with self._lock:
+            self._vectors = self._reset()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'size': len(self._slots),
+                'capacity': self.capacity,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': round(self._hits / total, 4) if total else 0.0,
+            }
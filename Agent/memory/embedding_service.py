@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+共享嵌入服务（sidecar）
+多个 uvicorn worker 各自持有 EmbeddingModel 时，bge-small-zh 会被加载 N 次。
+本模块提供一个本机 HTTP 服务独占一份模型（含微批调度与持久化缓存），
+worker 侧 EmbeddingModel 配置 EMBEDDING_SERVICE_URL 后以客户端模式调用，
+服务不可达时自动回退为进程内加载。
+
+启动:
+    python -m Agent.memory.embedding_service [--host 127.0.0.1] [--port 8765]
+
+接口:
+    POST /encode   {"texts": [...]}  →  {"embeddings": [[...]], "dimension": int}
+    GET  /health   →  {model, dimension, startup_ms, rss_mb, disk_cache, batch_scheduler}
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+from loguru import logger
+
+
+def process_rss_mb() -> float:
+    """当前进程常驻内存（MB），优先读 /proc，其他平台取峰值 RSS"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except Exception:
+        return 0.0
+
+
+# ──────────────────────────────
+# 客户端
+# ──────────────────────────────
+
+class EmbeddingServiceClient:
+    """嵌入服务 HTTP 客户端（线程安全，复用连接）"""
+
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._latency_ms_total = 0.0
+
+    def health(self) -> Optional[Dict[str, Any]]:
+        """服务可用时返回健康信息，否则返回 None"""
+        try:
+            response = self._session.get(f"{self.base_url}/health", timeout=self.timeout)
+            if response.status_code == 200:
+                return response.json()
+        except Exception as e:
+            logger.debug(f"嵌入服务健康检查失败: {e}")
+        return None
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        try:
+            response = self._session.post(
+                f"{self.base_url}/encode", json={'texts': texts}, timeout=self.timeout)
+            response.raise_for_status()
+            embeddings = response.json()['embeddings']
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+        with self._lock:
+            self._requests += 1
+            self._latency_ms_total += (time.perf_counter() - start) * 1000
+        return embeddings
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'url': self.base_url,
+                'requests': self._requests,
+                'errors': self._errors,
+                'avg_latency_ms': round(self._latency_ms_total / self._requests, 2)
+                if self._requests else 0.0,
+            }
+
+
+# ──────────────────────────────
+# 服务端
+# ──────────────────────────────
+
+class _EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    """/encode 与 /health 处理器，模型实例挂在 server.embedding_model 上"""
+
+    protocol_version = 'HTTP/1.1'
+    # 长连接下头部与正文分两次写出，关闭 Nagle 避免与延迟 ACK 叠加出 ~40ms 等待
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, {'error': 'not found'})
+            return
+        model = self.server.embedding_model
+        self._send_json(200, {
+            'model': model.model_name,
+            'dimension': model.dimension,
+            'startup_ms': self.server.startup_ms,
+            'rss_mb': process_rss_mb(),
+            'disk_cache': model.get_cache_stats(),
+            'batch_scheduler': model.get_scheduler_stats(),
+        })
+
+    def do_POST(self):
+        if self.path != '/encode':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            texts = json.loads(self.rfile.read(length) or b'{}').get('texts') or []
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                self._send_json(400, {'error': 'texts 必须是字符串列表'})
+                return
+            model = self.server.embedding_model
+            # 单条请求走微批调度，与其他 worker 的并发请求合并编码
+            if len(texts) == 1:
+                embeddings = [model.encode_single(texts[0])]
+            else:
+                embeddings = model.encode(texts)
+            self._send_json(200, {'embeddings': embeddings, 'dimension': model.dimension})
+        except Exception as e:
+            logger.error(f"嵌入服务编码失败: {e}")
+            self._send_json(500, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        logger.debug(f"嵌入服务 {self.address_string()} {format % args}")
+
+
+def create_server(host: str, port: int) -> ThreadingHTTPServer:
+    """加载模型并创建服务（不启动循环）"""
+    from Agent.config.settings import config
+    from Agent.memory.vector_store import EmbeddingModel
+
+    start = time.perf_counter()
+    # 与 VectorStore 相同的模型参数，保证缓存与向量空间一致
+    local_model_path = os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), 'data', 'models', 'bge-small-zh')
+    model = EmbeddingModel(config.EMBEDDING_MODEL, local_model_path, allow_remote=False)
+
+    server = ThreadingHTTPServer((host, port), _EmbeddingRequestHandler)
+    server.daemon_threads = True
+    server.embedding_model = model
+    server.startup_ms = round((time.perf_counter() - start) * 1000, 2)
+    logger.info(
+        f"嵌入服务就绪: http://{host}:{port}，模型加载 {server.startup_ms}ms，"
+        f"RSS {process_rss_mb()}MB"
+    )
+    return server
+
+
+def main():
+    from urllib.parse import urlparse
+    from Agent.config.settings import config
+
+    # 默认监听 EMBEDDING_SERVICE_URL 指向的地址，与 worker 配置保持一致
+    url = urlparse(config.EMBEDDING_SERVICE_URL or 'http://127.0.0.1:8765')
+    parser = argparse.ArgumentParser(description="共享嵌入服务")
+    parser.add_argument('--host', default=url.hostname or '127.0.0.1')
+    parser.add_argument('--port', type=int, default=url.port or 8765)
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.embedding_model.shutdown()
+        logger.info("嵌入服务已停止")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+小规模集合的精确向量索引
+将全部向量归一化后放入一块连续的 float32 矩阵，检索即一次矩阵-向量乘法，
+适用于 heritage_knowledge 这类仅数百条的集合，绕开 HNSW 近似检索与其损坏风险。
+
+元数据中的 category / region / level 以列数组保存，过滤条件先转换为布尔掩码
+再取 top-k（过滤下推），不会出现"先取 top-k 再过滤导致结果不足"的问题。
+"""
+
+import threading
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+from loguru import logger
+
+
+class ExactVectorIndex:
+    """NumPy 精确余弦检索索引（写时复制，读无锁）"""
+
+    # 支持下推过滤的元数据列
+    FILTER_COLUMNS = ('category', 'region', 'level')
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self._lock = threading.Lock()
+        self._snapshot = self._empty_snapshot()
+
+    @staticmethod
+    def _empty_snapshot() -> Dict[str, Any]:
+        return {
+            'ids': [],
+            'matrix': np.zeros((0, 0), dtype=np.float32),
+            'documents': [],
+            'metadatas': [],
+            'columns': {},
+        }
+
+    # ──────────────────────────────
+    # 构建
+    # ──────────────────────────────
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+    def _build_snapshot(self, ids: List[str], embeddings, documents: List[str],
+                        metadatas: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not ids:
+            return self._empty_snapshot()
+        matrix = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        metadatas = [m or {} for m in metadatas]
+        columns = {
+            col: np.array([str(m.get(col) or '') for m in metadatas], dtype=object)
+            for col in self.FILTER_COLUMNS
+        }
+        return {
+            'ids': list(ids),
+            'matrix': matrix,
+            'documents': list(documents),
+            'metadatas': metadatas,
+            'columns': columns,
+        }
+
+    def load(self, ids: List[str], embeddings, documents: List[str],
+             metadatas: List[Dict[str, Any]]):
+        """整体替换索引内容"""
+        snapshot = self._build_snapshot(ids, embeddings, documents, metadatas)
+        with self._lock:
+            self._snapshot = snapshot
+        logger.info(f"精确向量索引 '{self.name}' 已加载: {len(ids)} 条")
+
+    def load_from_collection(self, collection) -> int:
+        """从 Chroma 集合全量加载，返回条数"""
+        data = collection.get(include=['embeddings', 'documents', 'metadatas'])
+        ids = data.get('ids') or []
+        embeddings = data.get('embeddings')
+        if embeddings is None:
+            embeddings = []
+        self.load(ids, embeddings, data.get('documents') or [''] * len(ids),
+                  data.get('metadatas') or [{}] * len(ids))
+        return len(ids)
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str],
+               metadatas: List[Dict[str, Any]]):
+        """增量写入（整体重建快照，适用于小集合）"""
+        with self._lock:
+            current = self._snapshot
+            merged = dict(zip(current['ids'], zip(
+                current['matrix'], current['documents'], current['metadatas'])))
+            for doc_id, emb, doc, meta in zip(ids, embeddings, documents, metadatas):
+                merged[doc_id] = (np.asarray(emb, dtype=np.float32), doc, meta)
+            self._snapshot = self._build_snapshot(
+                list(merged.keys()),
+                [v[0] for v in merged.values()],
+                [v[1] for v in merged.values()],
+                [v[2] for v in merged.values()],
+            )
+
+    def remove(self, ids: List[str]):
+        drop = set(ids)
+        with self._lock:
+            current = self._snapshot
+            keep = [i for i, doc_id in enumerate(current['ids']) if doc_id not in drop]
+            if len(keep) == len(current['ids']):
+                return
+            self._snapshot = self._build_snapshot(
+                [current['ids'][i] for i in keep],
+                current['matrix'][keep] if keep else [],
+                [current['documents'][i] for i in keep],
+                [current['metadatas'][i] for i in keep],
+            )
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = self._empty_snapshot()
+
+    # ──────────────────────────────
+    # 检索
+    # ──────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._snapshot['ids'])
+
+    def _filter_mask(self, snapshot: Dict[str, Any],
+                     filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """将过滤条件转为布尔掩码；值可为单值或列表（列表按任一相等匹配）"""
+        if not filters:
+            return None
+        mask = np.ones(len(snapshot['ids']), dtype=bool)
+        for col, expected in filters.items():
+            if expected in (None, '', []):
+                continue
+            column = snapshot['columns'].get(col)
+            if column is None:
+                column = np.array([str(m.get(col) or '') for m in snapshot['metadatas']],
+                                  dtype=object)
+            values = expected if isinstance(expected, (list, tuple, set)) else [expected]
+            mask &= np.isin(column, [str(v) for v in values])
+        return mask
+
+    def search(self, query_embedding, top_k: int = 5,
+               filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """精确 top-k 检索
+
+        Returns:
+            [{content, metadata, distance}]，distance 为余弦距离 (1 - cos)，
+            与 Chroma cosine 空间的返回值一致
+        """
+        snapshot = self._snapshot
+        if not snapshot['ids'] or top_k <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        # 先按元数据掩码裁剪候选行，再只对候选行打分
+        mask = self._filter_mask(snapshot, filters)
+        if mask is not None:
+            candidates = np.flatnonzero(mask)
+            if candidates.size == 0:
+                return []
+            scores = snapshot['matrix'][candidates] @ query
+        else:
+            candidates = None
+            scores = snapshot['matrix'] @ query
+
+        k = min(top_k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for idx in top:
+            pos = int(candidates[idx]) if candidates is not None else int(idx)
+            results.append({
+                'content': snapshot['documents'][pos],
+                'metadata': snapshot['metadatas'][pos],
+                'distance': float(1.0 - scores[idx]),
+            })
+        return results
+
+    def export(self):
+        """返回当前快照的 (metadatas, 归一化向量矩阵)，供离线计算使用（只读）"""
+        snapshot = self._snapshot
+        return snapshot['metadatas'], snapshot['matrix']
+
+    def get_stats(self) -> Dict[str, Any]:
+        matrix = self._snapshot['matrix']
+        return {
+            'size': len(self),
+            'dimension': int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            'matrix_bytes': int(matrix.nbytes),
+        }
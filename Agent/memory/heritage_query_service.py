@@ -4,6 +4,7 @@
 统一查询接口，优先从知识图谱和向量数据库查询，完全解耦 MySQL
 """
 
+import asyncio
 from typing import Dict, Any, List, Optional
 from loguru import logger
 
@@ -21,19 +22,8 @@ class HeritageQueryService:
         self.knowledge_graph = get_knowledge_graph()
         self.vector_store = get_vector_store()
     
-    def query_by_ids(self, heritage_ids: List) -> List[Dict[str, Any]]:
-        """
-        根据 ID 列表精确查询非遗项目
-        
-        Args:
-            heritage_ids: 非遗 ID 列表（支持整数或字符串）
-        
-        Returns:
-            非遗项目列表
-        """
-        if not heritage_ids:
-            return []
-        
+    @staticmethod
+    def _convert_ids(heritage_ids: List) -> List[int]:
         converted_ids = []
         for hid in heritage_ids:
             if isinstance(hid, int):
@@ -48,9 +38,25 @@ class HeritageQueryService:
                     converted_ids.append(int(hid))
                 except (ValueError, TypeError):
                     logger.warning(f"无法转换 heritage_id: {hid}，跳过")
-        
         if not converted_ids:
             logger.warning(f"没有有效的 heritage_id，原始输入: {heritage_ids}")
+        return converted_ids
+    
+    def query_by_ids(self, heritage_ids: List) -> List[Dict[str, Any]]:
+        """
+        根据 ID 列表精确查询非遗项目
+        
+        Args:
+            heritage_ids: 非遗 ID 列表（支持整数或字符串）
+        
+        Returns:
+            非遗项目列表
+        """
+        if not heritage_ids:
+            return []
+        
+        converted_ids = self._convert_ids(heritage_ids)
+        if not converted_ids:
             return []
         
         if self.knowledge_graph and self.knowledge_graph.is_connected():
@@ -62,6 +68,23 @@ class HeritageQueryService:
         logger.warning(f"知识图谱查询失败，未找到 ID: {converted_ids}")
         return []
     
+    async def query_by_ids_async(self, heritage_ids: List) -> List[Dict[str, Any]]:
+        """query_by_ids 的异步版本（走知识图谱异步驱动）"""
+        if not heritage_ids:
+            return []
+        
+        converted_ids = self._convert_ids(heritage_ids)
+        if not converted_ids or not self.knowledge_graph:
+            return []
+        
+        results = await self.knowledge_graph.aquery_heritage_by_ids(converted_ids)
+        if results:
+            logger.info(f"从知识图谱查询到 {len(results)} 条非遗数据")
+            return results
+        
+        logger.warning(f"知识图谱查询失败，未找到 ID: {converted_ids}")
+        return []
+    
     def query_by_id(self, heritage_id: int) -> Optional[Dict[str, Any]]:
         """
         根据 ID 查询单个非遗项目
@@ -75,45 +98,77 @@ class HeritageQueryService:
         results = self.query_by_ids([heritage_id])
         return results[0] if results else None
     
-    def query_by_semantic(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    async def query_by_id_async(self, heritage_id: int) -> Optional[Dict[str, Any]]:
+        """query_by_id 的异步版本"""
+        results = await self.query_by_ids_async([heritage_id])
+        return results[0] if results else None
+    
+    @staticmethod
+    def _format_semantic_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """将向量检索结果转换为非遗条目"""
+        return [
+            {
+                'id': r['metadata'].get('heritage_id'),
+                'name': r['metadata'].get('name'),
+                'category': r['metadata'].get('category'),
+                'region': r['metadata'].get('region'),
+                'level': r['metadata'].get('level'),
+                'distance': r.get('distance', 0),
+                'content': r.get('content', '')
+            }
+            for r in results
+        ]
+    
+    @staticmethod
+    def _semantic_filters(region: str = None, category: str = None,
+                          level: str = None) -> Optional[Dict[str, Any]]:
+        filters = {k: v for k, v in (('region', region), ('category', category),
+                                     ('level', level)) if v}
+        return filters or None
+    
+    def query_by_semantic(self, query: str, top_k: int = 5, region: str = None,
+                          category: str = None, level: str = None) -> List[Dict[str, Any]]:
+        """语义检索非遗，region/category/level 在向量层过滤（精确索引可用时为下推过滤）"""
         if not query or query.strip() == "":
             return []
         
         if self.vector_store:
-            results = self.vector_store.search_heritage_knowledge(query, top_k)
+            results = self.vector_store.search_heritage_knowledge(
+                query, top_k, self._semantic_filters(region, category, level))
             if results:
                 logger.info(f"向量检索到 {len(results)} 条相关非遗")
-                return [
-                    {
-                        'id': r['metadata'].get('heritage_id'),
-                        'name': r['metadata'].get('name'),
-                        'category': r['metadata'].get('category'),
-                        'region': r['metadata'].get('region'),
-                        'level': r['metadata'].get('level'),
-                        'distance': r.get('distance', 0),
-                        'content': r.get('content', '')
-                    }
-                    for r in results
-                ]
+                return self._format_semantic_results(results)
         
         logger.warning(f"向量检索失败，降级到知识图谱关键词搜索: {query}")
         return self._fallback_kg_keyword_search(query, top_k)
     
+    async def query_by_semantic_async(self, query: str, top_k: int = 5, region: str = None,
+                                      category: str = None, level: str = None) -> List[Dict[str, Any]]:
+        """query_by_semantic 的异步版本，向量检索在专用线程池中执行"""
+        if not query or query.strip() == "":
+            return []
+        
+        if self.vector_store:
+            results = await self.vector_store.search_heritage_knowledge_async(
+                query, top_k, self._semantic_filters(region, category, level))
+            if results:
+                logger.info(f"向量检索到 {len(results)} 条相关非遗")
+                return self._format_semantic_results(results)
+        
+        logger.warning(f"向量检索失败，降级到知识图谱关键词搜索: {query}")
+        return await asyncio.to_thread(self._fallback_kg_keyword_search, query, top_k)
+    
+    @staticmethod
+    def _keyword_item(record: Dict[str, Any]) -> Dict[str, Any]:
+        """关键词检索结果裁剪为列表展示字段"""
+        return {k: record.get(k) for k in ('id', 'name', 'category', 'region', 'level', 'score')}
+    
     def _fallback_kg_keyword_search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         if not self.knowledge_graph or not self.knowledge_graph.is_connected():
             return []
         try:
-            with self.knowledge_graph.driver.session() as session:
-                result = session.run(
-                    "MATCH (h:Heritage) "
-                    "WHERE h.name CONTAINS $kw OR h.category CONTAINS $kw "
-                    "OR h.region CONTAINS $kw OR h.description CONTAINS $kw "
-                    "RETURN h.id AS id, h.name AS name, h.category AS category, "
-                    "h.region AS region, h.level AS level "
-                    "LIMIT $top_k",
-                    kw=query, top_k=top_k,
-                )
-                items = [dict(r) for r in result]
+            items = [self._keyword_item(r) for r in
+                     self.knowledge_graph.search_heritage_by_keyword(query, limit=top_k)]
             if items:
                 logger.info(f"知识图谱关键词搜索到 {len(items)} 条非遗: {query}")
                 return items
@@ -208,13 +263,9 @@ class HeritageQueryService:
         
         return []
     
-    def hybrid_query(self, query: str, region: str = None, 
-                    category: str = None, top_k: int = 5) -> List[Dict[str, Any]]:
-        if not query or query.strip() == "":
-            return []
-        
-        semantic_results = self.query_by_semantic(query, top_k * 2)
-        
+    @staticmethod
+    def _filter_semantic_results(semantic_results: List[Dict[str, Any]], region: str,
+                                 category: str, top_k: int) -> List[Dict[str, Any]]:
         filtered_results = []
         for item in semantic_results:
             if region and item.get('region') != region:
@@ -224,37 +275,43 @@ class HeritageQueryService:
             filtered_results.append(item)
             if len(filtered_results) >= top_k:
                 break
+        return filtered_results
+    
+    def hybrid_query(self, query: str, region: str = None, 
+                    category: str = None, top_k: int = 5) -> List[Dict[str, Any]]:
+        if not query or query.strip() == "":
+            return []
+        
+        semantic_results = self.query_by_semantic(query, top_k * 2, region, category)
+        filtered_results = self._filter_semantic_results(semantic_results, region, category, top_k)
         
         if not filtered_results and (region or category):
             filtered_results = self._kg_structured_query(query, region, category, top_k)
         
         return filtered_results
     
+    async def hybrid_query_async(self, query: str, region: str = None,
+                                 category: str = None, top_k: int = 5) -> List[Dict[str, Any]]:
+        """hybrid_query 的异步版本"""
+        if not query or query.strip() == "":
+            return []
+        
+        semantic_results = await self.query_by_semantic_async(query, top_k * 2, region, category)
+        filtered_results = self._filter_semantic_results(semantic_results, region, category, top_k)
+        
+        if not filtered_results and (region or category):
+            filtered_results = await asyncio.to_thread(
+                self._kg_structured_query, query, region, category, top_k)
+        
+        return filtered_results
+    
     def _kg_structured_query(self, query: str, region: str, category: str, top_k: int) -> List[Dict[str, Any]]:
         if not self.knowledge_graph or not self.knowledge_graph.is_connected():
             return []
         try:
-            conditions = ["h.name CONTAINS $kw OR h.category CONTAINS $kw OR h.description CONTAINS $kw"]
-            if region:
-                conditions.append("h.region CONTAINS $region")
-            if category:
-                conditions.append("h.category CONTAINS $category")
-            where_clause = " AND ".join(conditions)
-            params = {"kw": query, "top_k": top_k}
-            if region:
-                params["region"] = region
-            if category:
-                params["category"] = category
-            
-            with self.knowledge_graph.driver.session() as session:
-                result = session.run(
-                    f"MATCH (h:Heritage) WHERE {where_clause} "
-                    "RETURN h.id AS id, h.name AS name, h.category AS category, "
-                    "h.region AS region, h.level AS level "
-                    "LIMIT $top_k",
-                    **params,
-                )
-                items = [dict(r) for r in result]
+            items = [self._keyword_item(r) for r in
+                     self.knowledge_graph.search_heritage_by_keyword(
+                         query, limit=top_k, region=region, category=category)]
             if items:
                 logger.info(f"知识图谱结构化查询到 {len(items)} 条非遗: query={query}, region={region}, category={category}")
             return items
@@ -300,10 +357,17 @@ class HeritageQueryService:
             stats['knowledge_graph']['connected'] = self.knowledge_graph.is_connected()
             if stats['knowledge_graph']['connected']:
                 stats['knowledge_graph']['stats'] = self.knowledge_graph.get_stats()
+            stats['knowledge_graph']['heritage_catalog'] = self.knowledge_graph.get_catalog_stats()
+            stats['knowledge_graph']['dossier_cache'] = self.knowledge_graph.get_dossier_cache_stats()
+            stats['knowledge_graph']['region_index'] = self.knowledge_graph.get_region_index_stats()
+            stats['knowledge_graph']['related_index'] = self.knowledge_graph.get_related_index_stats()
         
         if self.vector_store:
             stats['vector_store']['available'] = True
             stats['vector_store']['stats'] = self.vector_store.get_collection_stats()
+            stats['vector_store']['embedding'] = self.vector_store.get_embedding_stats()
+            stats['vector_store']['heritage_index'] = self.vector_store.get_heritage_index_stats()
+            stats['vector_store']['quantization'] = self.vector_store.get_quantization_stats()
         
         return stats
 
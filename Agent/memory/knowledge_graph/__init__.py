@@ -4,10 +4,17 @@
 使用 Neo4j 存储非遗项目知识图谱，支持关联推理和精确查询
 
 架构:
-  _base.py     — EntityMixin: 通用 MERGE 写操作 + Haversine 距离计算
+  _base.py     — EntityMixin: 通用 MERGE 写操作 + UNWIND 批量写入器 + Haversine 距离计算
   heritage.py  — HeritageMixin: 核心实体 (Heritage/Category/Region/Level/Batch/Location)
+  spatial.py   — GridSpatialIndex: 经纬度网格索引 (NEAR 点对枚举 / 半径 / k 近邻)
+  related.py   — 相关非遗 top-K 预计算 (分块向量化打分) + RelatedIndex: RELATED_TO 内存邻接表
+  region_index.py — RegionIndex: Region 层级物化 (祖先/后代闭包 + 地区非遗倒排 + 邻近地区)
+  catalog.py   — HeritageCatalog: 非遗记录进程内快照 (ID / 名称读穿透缓存) + HeritageDossierCache: 详情档案缓存
   inheritor.py — InheritorMixin: 传承人正则解析 + 节点/关系/批量同步
+  text_match.py — AhoCorasick 多模式匹配 + 进程池批量抽取 (朝代 / 传承人)
   queries.py   — QueryMixin: 多维度查询 (ID/关联/维度/邻近)
+  instrumentation.py — QueryMonitor: 按调用方归类的查询延迟直方图 / 慢查询日志 (参数脱敏) / PROFILE 采样
+  async_queries.py — AsyncQueryMixin: 请求路径只读查询的异步版本 (AsyncGraphDatabase，独立连接池)
   admin.py     — AdminMixin: 管理操作 (删除/更新/统计/清空)
 """
 
@@ -34,19 +41,24 @@ from .heritage import HeritageMixin
 from .inheritor import InheritorMixin
 from .dynasty import DynastyMixin
 from .queries import QueryMixin
+from .async_queries import AsyncQueryMixin
 from .admin import AdminMixin
+from .catalog import HeritageCatalog, HeritageDossierCache
+from .instrumentation import instrument_driver
 
 
-class KnowledgeGraph(EntityMixin, HeritageMixin, InheritorMixin, DynastyMixin, QueryMixin, AdminMixin):
-    """知识图谱管理器 — 由 6 个功能 Mixin 组装而成
+class KnowledgeGraph(EntityMixin, HeritageMixin, InheritorMixin, DynastyMixin, QueryMixin,
+                     AsyncQueryMixin, AdminMixin):
+    """知识图谱管理器 — 由 7 个功能 Mixin 组装而成
 
     继承链:
-      EntityMixin     → _merge_node / _merge_relation / calculate_distance
-      HeritageMixin   → create_heritage_node / build_heritage_relations / build_near_relations / expand_region_tree
+      EntityMixin     → _merge_node / _merge_relation / batch_writer / calculate_distance
+      HeritageMixin   → create_heritage_node / sync_heritage_records / build_near_relations / build_related_heritage / expand_region_tree
       InheritorMixin  → parse_inheritors_from_text / create_inheritor_node / sync_inheritors_from_heritage_list
       DynastyMixin    → match_dynasties_from_text / create_dynasty_node / sync_dynasties_from_heritage_list
-      QueryMixin      → query_heritage_by_id(s) / query_by_(region|category|level) / query_nearby_*
-      AdminMixin      → delete_heritage / update_heritage / get_stats / clear_all
+      QueryMixin      → query_heritage_by_id(s) / query_heritage_dossier / search_heritage_by_keyword / query_by_(region|category|level) / query_region_tree / query_nearby_*
+      AsyncQueryMixin → aquery_heritage_by_id(s) / aquery_heritage_dossier / asearch_heritage_by_keyword / aquery_nearby_heritages_by_id / aquery_inheritors_by_heritage
+      AdminMixin      → delete_heritage / update_heritage / get_stats / get_query_stats / clear_all
     """
 
     def __init__(self, uri: str = None, user: str = None, password: str = None):
@@ -56,6 +68,9 @@ class KnowledgeGraph(EntityMixin, HeritageMixin, InheritorMixin, DynastyMixin, Q
         self.password = password or config.NEO4J_PASSWORD
 
         self.driver = None
+        self.heritage_catalog = HeritageCatalog(config.HERITAGE_CATALOG_TTL)
+        self.heritage_dossier_cache = HeritageDossierCache(
+            config.HERITAGE_DOSSIER_CACHE_SIZE, config.HERITAGE_DOSSIER_CACHE_TTL)
         self._last_conn_check: float = 0
         self._last_conn_ok: bool = False
         self._connect()
@@ -67,10 +82,12 @@ class KnowledgeGraph(EntityMixin, HeritageMixin, InheritorMixin, DynastyMixin, Q
     def _connect(self):
         """连接 Neo4j 数据库"""
         try:
-            self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+            self.driver = instrument_driver(
+                GraphDatabase.driver(self.uri, auth=(self.user, self.password)))
             with self.driver.session() as session:
                 session.run("RETURN 1")
             logger.info(f"知识图谱连接成功: {self.uri}")
+            self.ensure_fulltext_index()
         except Exception as e:
             logger.warning(f"知识图谱连接失败: {e}")
             self.driver = None
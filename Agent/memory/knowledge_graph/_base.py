@@ -4,14 +4,119 @@
 - 节点/关系标签定义
 - 通用节点创建 (_merge_node)
 - 通用关系创建 (_merge_relation)
+- 批量写入器 (GraphBatchWriter / batch_writer)
 - 工具方法 (calculate_distance)
 """
 
 import math
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from loguru import logger
 
 
+def _unique_key(label: str) -> str:
+    """Heritage 使用 id 作为唯一键，其余使用 name"""
+    return 'id' if label == 'Heritage' else 'name'
+
+
+class GraphBatchWriter:
+    """节点 / 关系 MERGE 批量写入器
+
+    写入先按标签（节点）或 (起点标签, 关系类型, 终点标签)（关系）分组缓存，
+    同一节点/关系多次写入时属性按调用顺序合并（后写覆盖），
+    flush 时先写节点再写关系，每组以参数化 UNWIND 分块提交，每块一个写事务。
+
+    用法:
+        with kg.batch_writer() as writer:
+            writer.merge_node('Category', 'name', name='民俗')
+            writer.merge_relation('Heritage', 1, 'BELONGS_TO', 'Category', '民俗')
+        writer.stats  # {'Category': 1, 'BELONGS_TO': 1, 'failed': 0}
+    """
+
+    def __init__(self, driver, batch_size: int = 1000):
+        self.driver = driver
+        self.batch_size = max(1, int(batch_size))
+        self._nodes: Dict[Tuple[str, str], Dict[Any, Dict[str, Any]]] = {}
+        self._relations: Dict[Tuple[str, str, str], Dict[Tuple[Any, Any], Dict[str, Any]]] = {}
+        self.stats: Dict[str, int] = {'failed': 0}
+
+    def __enter__(self) -> 'GraphBatchWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+    # ──────────────────────────────
+    # 缓存写入
+    # ──────────────────────────────
+
+    def merge_node(self, label: str, key: str, **properties):
+        """缓存一次节点 MERGE，参数同 EntityMixin._merge_node"""
+        rows = self._nodes.setdefault((label, key), {})
+        props = {k: v for k, v in properties.items() if k != key}
+        rows.setdefault(properties[key], {}).update(props)
+
+    def merge_relation(self, from_label: str, from_id: Any, relation_type: str,
+                       to_label: str, to_id: Any, properties: Dict = None):
+        """缓存一次关系 MERGE，参数同 EntityMixin._merge_relation"""
+        rows = self._relations.setdefault((from_label, relation_type, to_label), {})
+        rows.setdefault((from_id, to_id), {}).update(properties or {})
+
+    def pending(self) -> int:
+        return (sum(len(rows) for rows in self._nodes.values())
+                + sum(len(rows) for rows in self._relations.values()))
+
+    # ──────────────────────────────
+    # 提交
+    # ──────────────────────────────
+
+    def _run_chunks(self, session, query: str, rows: list, name: str):
+        def _write(tx, chunk):
+            tx.run(query, rows=chunk).consume()
+
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            try:
+                session.execute_write(_write, chunk)
+                self.stats[name] = self.stats.get(name, 0) + len(chunk)
+            except Exception as e:
+                self.stats['failed'] += len(chunk)
+                logger.error(f"批量写入 {name} 失败 ({len(chunk)} 条): {e}")
+
+    def flush(self) -> Dict[str, int]:
+        """提交全部缓存的写入，返回按标签/关系类型累计的写入条数"""
+        if not self.driver or not self.pending():
+            return self.stats
+
+        nodes, self._nodes = self._nodes, {}
+        relations, self._relations = self._relations, {}
+
+        with self.driver.session() as session:
+            for (label, key), rows in nodes.items():
+                query = (
+                    f"UNWIND $rows AS row "
+                    f"MERGE (n:{label} {{{key}: row.key}}) "
+                    f"SET n += row.props, n.updated_at = datetime()"
+                )
+                payload = [{'key': k, 'props': props} for k, props in rows.items()]
+                self._run_chunks(session, query, payload, label)
+
+            for (from_label, relation_type, to_label), rows in relations.items():
+                query = (
+                    f"UNWIND $rows AS row "
+                    f"MATCH (a:{from_label} {{{_unique_key(from_label)}: row.from_id}}) "
+                    f"MATCH (b:{to_label} {{{_unique_key(to_label)}: row.to_id}}) "
+                    f"MERGE (a)-[r:{relation_type}]->(b) "
+                    f"SET r += row.props"
+                )
+                payload = [{'from_id': a, 'to_id': b, 'props': props}
+                           for (a, b), props in rows.items()]
+                self._run_chunks(session, query, payload, relation_type)
+
+        return self.stats
+
+
 class EntityMixin:
     """Mixin 基类，提供所有实体 Mixin 共享的基础能力"""
 
@@ -49,14 +154,20 @@ class EntityMixin:
     # 通用写操作：节点
     # ──────────────────────────────
 
-    def _merge_node(self, label: str, key: str, **properties) -> bool:
+    def _merge_node(self, label: str, key: str,
+                    writer: Optional[GraphBatchWriter] = None, **properties) -> bool:
         """通过 MERGE 创建/更新节点，幂等安全
 
         Args:
             label: 节点标签 (如 'Heritage', 'Inheritor')
             key:  唯一键属性名 (如 'id', 'name')
+            writer: 批量写入器，传入时仅加入批次，由 writer.flush() 统一提交；
+                    此时返回 True 只表示已入队，写入结果以 writer.stats 为准
             **properties: 其余属性
         """
+        if writer is not None:
+            writer.merge_node(label, key, **properties)
+            return True
         if not self.driver:
             return False
 
@@ -84,7 +195,8 @@ class EntityMixin:
 
     def _merge_relation(self, from_label: str, from_id: Any,
                         relation_type: str, to_label: str, to_id: Any,
-                        properties: Dict = None) -> bool:
+                        properties: Dict = None,
+                        writer: Optional[GraphBatchWriter] = None) -> bool:
         """通过 MERGE 创建关系，幂等安全
 
         Args:
@@ -94,13 +206,18 @@ class EntityMixin:
             to_label:      目标节点标签
             to_id:         目标节点唯一键值
             properties:    关系属性 (可选)
+            writer:        批量写入器 (可选)，传入时仅加入批次；返回 True 只表示已入队，
+                           写入结果以 writer.stats 为准
         """
+        if writer is not None:
+            writer.merge_relation(from_label, from_id, relation_type,
+                                  to_label, to_id, properties)
+            return True
         if not self.driver:
             return False
 
-        # Heritage 使用 id 作为唯一键，其余使用 name
-        from_key = 'id' if from_label == 'Heritage' else 'name'
-        to_key = 'id' if to_label == 'Heritage' else 'name'
+        from_key = _unique_key(from_label)
+        to_key = _unique_key(to_label)
 
         try:
             with self.driver.session() as session:
@@ -129,6 +246,17 @@ class EntityMixin:
             )
             return False
 
+    # ──────────────────────────────
+    # 批量写操作
+    # ──────────────────────────────
+
+    def batch_writer(self, batch_size: int = None) -> GraphBatchWriter:
+        """创建批量写入器，batch_size 默认取 KG_WRITE_BATCH_SIZE"""
+        if batch_size is None:
+            from Agent.config.settings import config
+            batch_size = config.KG_WRITE_BATCH_SIZE
+        return GraphBatchWriter(self.driver, batch_size)
+
     # ──────────────────────────────
     # 工具方法
     # ──────────────────────────────
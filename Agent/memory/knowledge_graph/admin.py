@@ -4,9 +4,19 @@
 负责节点删除、更新、统计与清空
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List
 from loguru import logger
 
+from .related import precomputed_related
+
+# 增量同步会为非遗重建的关系类型；清除旧关系时只删这些，
+# 用户侧的 PREFERS / PLANNED / EXPORTED 等关系由 L2 记忆维护，不可在同步中删除；
+# RELATED_TO 只删预计算边，手工添加的保留
+SYNC_REBUILT_RELATIONS = (
+    'BELONGS_TO', 'LOCATED_AT', 'HAS_LEVEL', 'IN_BATCH', 'AT_LOCATION',
+    'NEAR', 'HAS_INHERITOR', 'ORIGINATED_IN', 'RELATED_TO',
+)
+
 
 class AdminMixin:
     """知识图谱管理操作"""
@@ -28,11 +38,32 @@ class AdminMixin:
                     MATCH (h:Heritage {id: $id})
                     DETACH DELETE h
                 """, id=heritage_id)
+            self._heritage_changed([heritage_id])
             return True
         except Exception as e:
             logger.error(f"删除非遗失败: {e}")
             return False
 
+    def detach_heritage_relations(self, heritage_id: int) -> bool:
+        """删除非遗节点上由同步重建的关系（保留节点本身与用户关系），供增量同步重建关联前使用"""
+        if not self.driver:
+            return False
+
+        try:
+            with self.driver.session() as session:
+                session.run(f"""
+                    MATCH (h:Heritage {{id: $id}})-[r]-()
+                    WHERE type(r) IN $types
+                      AND (type(r) <> 'RELATED_TO' OR {precomputed_related('r')})
+                    DELETE r
+                """, id=heritage_id, types=list(SYNC_REBUILT_RELATIONS))
+            self.invalidate_dossiers([heritage_id])
+            self.invalidate_region_index()
+            return True
+        except Exception as e:
+            logger.error(f"清除非遗关系失败: {e}")
+            return False
+
     # ──────────────────────────────
     # 更新
     # ──────────────────────────────
@@ -50,6 +81,7 @@ class AdminMixin:
                     MATCH (h:Heritage {{id: $id}})
                     SET {set_clause}, h.updated_at = datetime()
                 """, id=heritage_id, **updates)
+            self._heritage_changed([heritage_id])
             return True
         except Exception as e:
             logger.error(f"更新非遗失败: {e}")
@@ -73,7 +105,7 @@ class AdminMixin:
         _STAT_RELATIONS = [
             'BELONGS_TO', 'LOCATED_AT', 'HAS_LEVEL', 'IN_BATCH',
             'HAS_INHERITOR', 'STUDIED_UNDER', 'ORIGINATED_IN',
-            'PART_OF', 'NEAR', 'AT_LOCATION',
+            'PART_OF', 'NEAR', 'AT_LOCATION', 'RELATED_TO',
         ]
 
         try:
@@ -102,6 +134,33 @@ class AdminMixin:
             logger.error(f"获取统计信息失败: {e}")
             return {}
 
+    def count_user_heritage_relations(self, heritage_ids: List) -> int:
+        """统计指向给定非遗的用户关系数（User → Heritage），用于校验增量同步未误删用户数据"""
+        if not self.driver or not heritage_ids:
+            return 0
+
+        try:
+            with self.driver.session() as session:
+                record = session.run("""
+                    MATCH (:User)-[r]->(h:Heritage)
+                    WHERE h.id IN $ids
+                    RETURN count(r) AS count
+                """, ids=list(heritage_ids)).single()
+                return record['count'] if record else 0
+        except Exception as e:
+            logger.error(f"统计用户非遗关系失败: {e}")
+            return 0
+
+    def get_query_stats(self, top: int = None, sort_by: str = 'total_ms') -> Dict[str, Any]:
+        """Neo4j 查询观测统计（按调用方归类的延迟直方图 / 行数 / 错误 / 慢查询日志 / PROFILE 采样）"""
+        from .instrumentation import get_query_monitor
+        return get_query_monitor().get_stats(top=top, sort_by=sort_by)
+
+    def reset_query_stats(self):
+        """清空 Neo4j 查询观测统计与慢查询日志"""
+        from .instrumentation import get_query_monitor
+        get_query_monitor().reset()
+
     # ──────────────────────────────
     # 清空
     # ──────────────────────────────
@@ -114,6 +173,7 @@ class AdminMixin:
         try:
             with self.driver.session() as session:
                 session.run("MATCH (n) DETACH DELETE n")
+            self._heritage_changed()
             logger.warning("知识图谱已清空")
             return True
         except Exception as e:
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+异步查询 Mixin — 请求路径只读接口
+基于 neo4j.AsyncGraphDatabase，供 async 工具与 RAG 检索直接 await，不占用事件循环也不额外起线程。
+Cypher 与结果整理复用 QueryMixin，本模块只负责驱动与执行。
+
+异步驱动在首次 await 时按当前事件循环惰性创建，连接池独立于同步驱动
+（NEO4J_ASYNC_POOL_SIZE / NEO4J_ASYNC_ACQUIRE_TIMEOUT / NEO4J_ASYNC_MAX_LIFETIME）。
+关闭 NEO4J_ASYNC_ENABLED 或异步驱动不可用时，各接口回退为线程池调用同步实现；
+创建失败后间隔 ASYNC_DRIVER_RETRY_SECONDS 秒重试，不会永久停用异步路径。
+"""
+
+import asyncio
+import sys
+import time
+from typing import Dict, Any, List, Optional
+from loguru import logger
+
+
+class AsyncQueryMixin:
+    """知识图谱异步只读查询"""
+
+    driver: object = None
+    _async_driver = None
+    _async_driver_loop = None
+    _async_driver_retry_at: float = 0.0
+    _async_driver_closing = None
+    # 异步驱动创建失败后的重试间隔（秒）
+    ASYNC_DRIVER_RETRY_SECONDS = 60.0
+
+    # ──────────────────────────────
+    # 驱动生命周期
+    # ──────────────────────────────
+
+    def _get_async_driver(self):
+        """取当前事件循环上的异步驱动，未启用或创建失败时返回 None"""
+        from Agent.config.settings import config
+
+        if not config.NEO4J_ASYNC_ENABLED or not self.driver:
+            return None
+
+        loop = asyncio.get_running_loop()
+        if self._async_driver is not None and self._async_driver_loop is loop:
+            return self._async_driver
+        if time.monotonic() < self._async_driver_retry_at:
+            return None
+
+        # 异步驱动绑定创建时的事件循环，循环变化（如脚本中多次 asyncio.run）时关闭旧驱动后重建
+        self._retire_async_driver(loop)
+        try:
+            from neo4j import AsyncGraphDatabase
+            self._async_driver = AsyncGraphDatabase.driver(
+                self.uri, auth=(self.user, self.password),
+                max_connection_pool_size=config.NEO4J_ASYNC_POOL_SIZE,
+                connection_acquisition_timeout=config.NEO4J_ASYNC_ACQUIRE_TIMEOUT,
+                max_connection_lifetime=config.NEO4J_ASYNC_MAX_LIFETIME,
+            )
+            self._async_driver_loop = loop
+            self._async_driver_retry_at = 0.0
+            logger.info(f"知识图谱异步驱动已创建: pool={config.NEO4J_ASYNC_POOL_SIZE}")
+        except Exception as e:
+            self._async_driver = None
+            self._async_driver_retry_at = time.monotonic() + self.ASYNC_DRIVER_RETRY_SECONDS
+            logger.warning(f"创建知识图谱异步驱动失败，{self.ASYNC_DRIVER_RETRY_SECONDS:.0f}s 内"
+                           f"异步查询回退为线程池: {e}")
+        return self._async_driver
+
+    def _retire_async_driver(self, loop):
+        """关闭绑定在旧事件循环上的驱动：旧循环仍在运行时投递到旧循环，否则在当前循环中关闭"""
+        driver, old_loop = self._async_driver, self._async_driver_loop
+        self._async_driver = None
+        self._async_driver_loop = None
+        if driver is None:
+            return
+
+        if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._close_async_driver(driver), old_loop)
+            return
+
+        # 保留任务引用，避免关闭完成前被回收
+        if self._async_driver_closing is None:
+            self._async_driver_closing = set()
+        task = loop.create_task(self._close_async_driver(driver))
+        self._async_driver_closing.add(task)
+        task.add_done_callback(self._async_driver_closing.discard)
+
+    @staticmethod
+    async def _close_async_driver(driver):
+        try:
+            await driver.close()
+        except Exception as e:
+            logger.warning(f"关闭知识图谱异步驱动失败: {e}")
+
+    async def aclose(self):
+        """关闭异步驱动（需在创建它的事件循环中调用）"""
+        driver, self._async_driver = self._async_driver, None
+        self._async_driver_loop = None
+        if driver is not None:
+            await self._close_async_driver(driver)
+
+    async def _aread(self, driver, cypher: str, **params) -> List[Dict[str, Any]]:
+        """在读事务中执行查询并返回字典列表（异常向上抛出），计入 Neo4j 查询统计"""
+        from Agent.config.settings import config
+        from .instrumentation import get_query_monitor
+
+        async def work(tx):
+            result = await tx.run(cypher, **params)
+            return await result.data()
+
+        if not config.NEO4J_QUERY_METRICS_ENABLED:
+            async with driver.session() as session:
+                return await session.execute_read(work)
+
+        name = f"async_queries.{sys._getframe(1).f_code.co_name}"
+        start = time.perf_counter()
+        try:
+            async with driver.session() as session:
+                rows = await session.execute_read(work)
+        except Exception as e:
+            get_query_monitor().record(name, cypher, params,
+                                       (time.perf_counter() - start) * 1000, 0, e)
+            raise
+        get_query_monitor().record(name, cypher, params,
+                                   (time.perf_counter() - start) * 1000, len(rows))
+        return rows
+
+    # ──────────────────────────────
+    # ID 查询
+    # ──────────────────────────────
+
+    async def aquery_heritage_by_ids(self, ids: List[int]) -> List[Dict[str, Any]]:
+        """query_heritage_by_ids 的异步版本（目录快照命中时不访问 Neo4j）"""
+        if not self.driver or not ids:
+            return []
+        driver = self._get_async_driver()
+        if driver is None or self.heritage_catalog is None:
+            return await asyncio.to_thread(self.query_heritage_by_ids, ids)
+
+        try:
+            catalog = self.heritage_catalog
+            if not catalog.is_fresh():
+                records = await self._aread(
+                    driver, f"MATCH (h:Heritage) {self._HERITAGE_RECORD_RETURN}")
+                catalog.load(records)
+                logger.info(f"非遗目录快照已加载: {len(records)} 条")
+            found, missing = catalog.lookup(ids)
+            loaded = []
+            if missing:
+                loaded = await self._aread(
+                    driver, f"MATCH (h:Heritage) WHERE h.id IN $ids {self._HERITAGE_RECORD_RETURN}",
+                    ids=missing)
+            return catalog.fill(found, loaded, missing)
+        except Exception as e:
+            logger.error(f"查询非遗失败: {e}")
+            return []
+
+    async def aquery_heritage_by_id(self, heritage_id: int) -> Optional[Dict[str, Any]]:
+        results = await self.aquery_heritage_by_ids([heritage_id])
+        return results[0] if results else None
+
+    async def aquery_heritage_dossier(self, heritage_id: int, nearby_limit: int = 3,
+                                      max_distance_km: float = 100) -> Optional[Dict[str, Any]]:
+        """query_heritage_dossier 的异步版本（与同步接口共用档案缓存）"""
+        if not self.driver:
+            return None
+        driver = self._get_async_driver()
+        if driver is None:
+            return await asyncio.to_thread(
+                self.query_heritage_dossier, heritage_id, nearby_limit, max_distance_km)
+
+        dossier = self._cached_dossier(heritage_id, max_distance_km)
+        if dossier is not None:
+            return self._trim_dossier(dossier, nearby_limit, max_distance_km)
+
+        radius = self._dossier_radius(max_distance_km)
+        try:
+            records = await self._aread(
+                driver, self._DOSSIER_QUERY, id=heritage_id, max_distance=radius,
+                nearby_limit=self.DOSSIER_NEARBY_MAX)
+        except Exception as e:
+            logger.error(f"查询非遗档案失败 (heritage_id={heritage_id}): {e}")
+            return None
+        if not records:
+            return None
+
+        dossier = self._build_dossier(heritage_id, records[0], radius)
+        if self.heritage_dossier_cache:
+            self.heritage_dossier_cache.put(heritage_id, dossier)
+        return self._trim_dossier(dossier, nearby_limit, max_distance_km)
+
+    # ──────────────────────────────
+    # 关键词 / 邻近 / 传承人
+    # ──────────────────────────────
+
+    async def asearch_heritage_by_keyword(self, keyword: str, limit: int = 10,
+                                          region: str = None, category: str = None,
+                                          expand_relations: bool = False) -> List[Dict[str, Any]]:
+        """search_heritage_by_keyword 的异步版本"""
+        if not self.driver or not keyword or not keyword.strip():
+            return []
+        driver = self._get_async_driver()
+        if driver is None:
+            return await asyncio.to_thread(
+                self.search_heritage_by_keyword, keyword, limit, region, category, expand_relations)
+
+        cypher, params = self._keyword_query(
+            keyword, limit, region, category, expand_relations, use_fulltext=True)
+        try:
+            return await self._aread(driver, cypher, **params)
+        except Exception as e:
+            logger.error(f"关键词检索非遗失败: {e}")
+            return []
+
+    async def aquery_nearby_heritages_by_id(self, heritage_id: int,
+                                            max_distance_km: float = 100,
+                                            limit: int = 5) -> List[Dict[str, Any]]:
+        """query_nearby_heritages_by_id 的异步版本
+
+        空间索引未过期时直接在内存计算；需要重建时放到线程池，避免阻塞事件循环。
+        """
+        if not self.driver:
+            return []
+        driver = self._get_async_driver()
+        if driver is None:
+            return await asyncio.to_thread(
+                self.query_nearby_heritages_by_id, heritage_id, max_distance_km, limit)
+
+        try:
+            index = self._fresh_nearby_index() or await asyncio.to_thread(self._get_nearby_index)
+            nearby = self._nearby_from_index(index, heritage_id, max_distance_km, limit)
+            if nearby is not None:
+                return nearby
+            return await self._aread(driver, self._NEAR_BY_ID_QUERY, id=heritage_id,
+                                     max_distance=max_distance_km, limit=limit)
+        except Exception as e:
+            logger.error(f"查询附近非遗失败: {e}")
+            return []
+
+    async def aquery_inheritors_by_heritage(self, heritage_id: int) -> List[Dict[str, Any]]:
+        """query_inheritors_by_heritage 的异步版本"""
+        if not self.driver:
+            return []
+        driver = self._get_async_driver()
+        if driver is None:
+            return await asyncio.to_thread(self.query_inheritors_by_heritage, heritage_id)
+
+        try:
+            records = await self._aread(driver, self._INHERITORS_QUERY, id=heritage_id)
+            return self._clean_inheritors(records)
+        except Exception as e:
+            logger.error(f"查询传承人失败 (heritage_id={heritage_id}): {e}")
+            return []
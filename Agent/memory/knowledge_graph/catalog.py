@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+非遗目录快照缓存
+Heritage 记录只在同步与管理编辑时变化，按 ID / 名称查询却几乎出现在每个工具调用中。
+本模块在进程内保存 {id: record} 与 {name: id} 两张表，由 QueryMixin 读穿透使用：
+命中直接返回副本，未命中再查 Neo4j 并回填。
+
+全量加载后目录视为完整，不存在的 ID 无需再回源；
+单条失效的 ID 记入脏集合，下次访问时单独回源。
+多进程部署下其他 worker 的编辑无法通知到本进程，因此全量快照另有 TTL。
+
+HeritageDossierCache 缓存单个非遗的详情档案（含传承人 / 朝代 / 邻近），
+因为档案跨多种关系，除 Heritage 写入外传承人、朝代、NEAR 同步后也会失效。
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Iterable, Callable, Tuple
+
+
+class HeritageCatalog:
+    """非遗记录进程内快照（写时复制，读无锁）"""
+
+    def __init__(self, ttl_seconds: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._by_id: Dict[Any, Dict[str, Any]] = {}
+        self._by_name: Dict[str, Any] = {}
+        self._dirty: set = set()
+        self._complete = False
+        self._loaded_at = 0.0
+        self._stats = {'hits': 0, 'misses': 0, 'loads': 0, 'invalidations': 0}
+
+    # ──────────────────────────────
+    # 写入
+    # ──────────────────────────────
+
+    def load(self, records: List[Dict[str, Any]]):
+        """以全量记录替换快照"""
+        by_id = {r['id']: r for r in records}
+        by_name = {r['name']: r['id'] for r in records if r.get('name')}
+        with self._lock:
+            self._by_id = by_id
+            self._by_name = by_name
+            self._dirty = set()
+            self._complete = True
+            self._loaded_at = time.time()
+            self._stats['loads'] += 1
+
+    def _put(self, records: List[Dict[str, Any]], requested: Iterable):
+        with self._lock:
+            by_id = dict(self._by_id)
+            by_name = dict(self._by_name)
+            for r in records:
+                by_id[r['id']] = r
+                if r.get('name'):
+                    by_name[r['name']] = r['id']
+            self._by_id = by_id
+            self._by_name = by_name
+            self._dirty = self._dirty - set(requested)
+
+    def invalidate(self, heritage_ids: Optional[Iterable] = None):
+        """失效指定 ID；不传则清空整个快照"""
+        with self._lock:
+            self._stats['invalidations'] += 1
+            if heritage_ids is None:
+                self._by_id = {}
+                self._by_name = {}
+                self._dirty = set()
+                self._complete = False
+                return
+            ids = set(heritage_ids)
+            self._by_id = {k: v for k, v in self._by_id.items() if k not in ids}
+            self._by_name = {k: v for k, v in self._by_name.items() if v not in ids}
+            self._dirty = self._dirty | ids
+
+    # ──────────────────────────────
+    # 读取
+    # ──────────────────────────────
+
+    def is_fresh(self) -> bool:
+        return self._complete and time.time() - self._loaded_at < self.ttl_seconds
+
+    def _count(self, hits: int, misses: int):
+        with self._lock:
+            self._stats['hits'] += hits
+            self._stats['misses'] += misses
+
+    def get_many(self, heritage_ids: List,
+                 loader: Callable[[List], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """读穿透批量取记录，返回副本，按 id 排序（与 Cypher ORDER BY h.id 一致）"""
+        found, missing = self.lookup(heritage_ids)
+        return self.fill(found, loader(missing) if missing else [], missing)
+
+    def lookup(self, heritage_ids: List):
+        """仅查快照，返回 ({id: record}, 需回源的 id 列表)；异步调用方自行回源后交给 fill"""
+        by_id, dirty, complete = self._by_id, self._dirty, self.is_fresh()
+        found = {}
+        missing = []
+        for hid in dict.fromkeys(heritage_ids):
+            record = by_id.get(hid)
+            if record is not None:
+                found[hid] = record
+            elif not complete or hid in dirty:
+                missing.append(hid)
+        self._count(len(found), len(missing))
+        return found, missing
+
+    def fill(self, found: Dict[Any, Dict[str, Any]], loaded: List[Dict[str, Any]],
+             missing: List) -> List[Dict[str, Any]]:
+        """回填回源结果并返回排序后的副本"""
+        if missing:
+            self._put(loaded, missing)
+            for r in loaded:
+                found[r['id']] = r
+        return [dict(found[k]) for k in sorted(found, key=lambda k: (str(type(k)), k))]
+
+    def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """按名称精确查找（仅查快照，不回源）"""
+        hid = self._by_name.get(name)
+        record = self._by_id.get(hid) if hid is not None else None
+        self._count(1 if record else 0, 0 if record else 1)
+        return dict(record) if record else None
+
+    def search_names(self, fragment: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """按名称包含匹配（仅查快照）"""
+        if not fragment:
+            return []
+        by_id = self._by_id
+        results = [dict(by_id[hid]) for name, hid in self._by_name.items()
+                   if fragment in name and hid in by_id]
+        return results[:limit]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'size': len(self._by_id),
+            'complete': self._complete,
+            'fresh': self.is_fresh(),
+            'dirty': len(self._dirty),
+            'age_seconds': round(time.time() - self._loaded_at, 1) if self._loaded_at else None,
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else 0.0,
+        })
+        return stats
+
+
+class HeritageDossierCache:
+    """非遗档案（节点 + 传承人 + 朝代 + 邻近）的 LRU + TTL 缓存，按 heritage_id 失效"""
+
+    def __init__(self, max_size: int = 512, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Any, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, heritage_id) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(heritage_id)
+            if entry is None or time.time() - entry[0] >= self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[heritage_id]
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(heritage_id)
+            self._stats['hits'] += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, heritage_id, dossier: Dict[str, Any]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[heritage_id] = (time.time(), copy.deepcopy(dossier))
+            self._entries.move_to_end(heritage_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, heritage_ids: Optional[Iterable] = None):
+        """失效指定 ID；不传则清空"""
+        with self._lock:
+            self._stats['invalidations'] += 1
+            if heritage_ids is None:
+                self._entries.clear()
+                return
+            for hid in heritage_ids:
+                self._entries.pop(hid, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
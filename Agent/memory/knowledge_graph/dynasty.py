@@ -8,6 +8,9 @@ import re
 from typing import Dict, Any, List, Optional, Set
 from loguru import logger
 
+from ._base import GraphBatchWriter
+from .text_match import compile_pattern_set, map_in_processes
+
 
 class DynastyMixin:
     """朝代实体与匹配器的写操作"""
@@ -141,12 +144,13 @@ class DynastyMixin:
     # ──────────────────────────────
 
     def create_dynasty_node(self, name: str, start_year: int = None,
-                            end_year: int = None, capital: str = '') -> bool:
+                            end_year: int = None, capital: str = '',
+                            writer: GraphBatchWriter = None) -> bool:
         """创建朝代节点（MERGE 保证幂等）"""
         if name not in self.DYNASTY_TABLE:
             logger.warning(f"未知朝代 '{name}'，跳过节点创建")
             return False
-        return self._merge_node('Dynasty', 'name',
+        return self._merge_node('Dynasty', 'name', writer=writer,
                                 name=name, start_year=start_year,
                                 end_year=end_year, capital=capital)
 
@@ -154,20 +158,36 @@ class DynastyMixin:
     # 关系
     # ──────────────────────────────
 
-    def create_originated_in_relation(self, heritage_id: int,
-                                      dynasty_name: str) -> bool:
+    def create_originated_in_relation(self, heritage_id: int, dynasty_name: str,
+                                      writer: GraphBatchWriter = None) -> bool:
         """创建 Heritage -[ORIGINATED_IN]-> Dynasty 关系"""
         return self._merge_relation('Heritage', heritage_id,
-                                    'ORIGINATED_IN', 'Dynasty', dynasty_name)
+                                    'ORIGINATED_IN', 'Dynasty', dynasty_name, writer=writer)
 
     # ──────────────────────────────
     # 匹配逻辑
     # ──────────────────────────────
 
+    @classmethod
+    def _dynasty_matcher(cls):
+        """DIRECT / MULTI / 别名三组规则编译成的自动机（按类缓存）"""
+        matcher = cls.__dict__.get('_dynasty_matcher_cache')
+        if matcher is None:
+            rules = [(p, frozenset([d])) for p, d in cls.DIRECT_PATTERNS]
+            rules += [(p, frozenset(ds)) for p, ds in cls.MULTI_DYNASTY_PATTERNS]
+            aliases = [(alias, frozenset([std])) for alias, std in cls.DYNASTY_ALIASES.items()]
+            automaton, residual = compile_pattern_set(rules, aliases)
+            matcher = (automaton, [(re.compile(p), ds) for p, ds in residual])
+            cls._dynasty_matcher_cache = matcher
+        return matcher
+
     @classmethod
     def match_dynasties_from_text(cls, history_text: str) -> Set[str]:
         """从 history 文本中识别起源朝代（纯规则，不含 LLM）
 
+        DIRECT_PATTERNS、MULTI_DYNASTY_PATTERNS 与 DYNASTY_ALIASES 编译为一个
+        Aho-Corasick 自动机，单次扫描得到全部命中；结果与逐条 re.search 一致。
+
         Args:
             history_text: 非遗项目的 history 字段
 
@@ -177,23 +197,14 @@ class DynastyMixin:
         if not history_text or not history_text.strip():
             return set()
 
+        automaton, residual = cls._dynasty_matcher()
         matched: Set[str] = set()
-
-        # 第一轮：直接正则匹配
-        for pattern, dynasty in cls.DIRECT_PATTERNS:
-            if re.search(pattern, history_text):
-                matched.add(dynasty)
-
-        # 第二轮：复合朝代模式（如 "唐宋" → 唐+宋）
-        for pattern, dynasties in cls.MULTI_DYNASTY_PATTERNS:
-            if re.search(pattern, history_text):
+        for dynasties in set(automaton.find_payloads(history_text)):
+            matched.update(dynasties)
+        for pattern, dynasties in residual:
+            if pattern.search(history_text):
                 matched.update(dynasties)
 
-        # 第三轮：别名表匹配（处理变体）
-        for alias, standard in cls.DYNASTY_ALIASES.items():
-            if alias in history_text:
-                matched.add(standard)
-
         # 去重：移除被更精确朝代覆盖的泛称
         # 如同时有 "秦" 和 "上古"，去掉 "上古"
         if len(matched) > 1:
@@ -203,35 +214,47 @@ class DynastyMixin:
 
         return matched
 
+    @classmethod
+    def match_dynasties_batch(cls, texts: List[str]) -> List[Set[str]]:
+        """批量识别朝代，条目较多时分发到进程池（KG_EXTRACT_WORKERS / KG_EXTRACT_PARALLEL_MIN）"""
+        from Agent.config.settings import config
+        return map_in_processes(cls.match_dynasties_from_text, texts,
+                                workers=config.KG_EXTRACT_WORKERS,
+                                min_items=config.KG_EXTRACT_PARALLEL_MIN)
+
     # ──────────────────────────────
     # 批量同步
     # ──────────────────────────────
 
     def sync_dynasties_from_heritage_list(self, heritage_list: List[Dict]) -> Dict[str, int]:
-        """从 heritage 列表同步朝代到知识图谱，返回统计信息"""
-        dynasty_node_count = 0
-        relation_count = 0
-        heritage_with_dynasty = 0
+        """从 heritage 列表同步朝代到知识图谱
 
-        # 先确保所有标准朝代节点存在
-        for name, (start, end, capital) in self.DYNASTY_TABLE.items():
-            if self.create_dynasty_node(name, start, end, capital or ''):
-                dynasty_node_count += 1
-
-        # 逐条匹配并创建关系
-        for heritage in heritage_list:
-            hid = heritage.get('id')
-            history = heritage.get('history', '')
-            if not history:
-                continue
-
-            dynasties = self.match_dynasties_from_text(history)
-            if dynasties:
-                heritage_with_dynasty += 1
-                for d in dynasties:
-                    if self.create_originated_in_relation(hid, d):
-                        relation_count += 1
+        Returns:
+            {dynasty_nodes, heritage_matched, originated_in_relations, failed}；
+            节点数与关系数取自批量写入器实际提交的结果
+        """
+        heritage_with_dynasty = 0
 
+        with self.batch_writer() as writer:
+            # 先确保所有标准朝代节点存在（flush 时节点先于关系写入）
+            for name, (start, end, capital) in self.DYNASTY_TABLE.items():
+                self.create_dynasty_node(name, start, end, capital or '', writer=writer)
+
+            # 批量匹配（可并行）后逐条加入批次
+            targets = [h for h in heritage_list if h.get('history')]
+            matches = self.match_dynasties_batch([h['history'] for h in targets])
+            for heritage, dynasties in zip(targets, matches):
+                hid = heritage.get('id')
+                if dynasties:
+                    heritage_with_dynasty += 1
+                    for d in dynasties:
+                        self.create_originated_in_relation(hid, d, writer=writer)
+
+        dynasty_node_count = writer.stats.get('Dynasty', 0)
+        relation_count = writer.stats.get('ORIGINATED_IN', 0)
+        if writer.stats['failed']:
+            logger.warning(f"朝代批量写入有 {writer.stats['failed']} 行失败")
+        self.invalidate_dossiers()
         logger.info(
             f"朝代同步完成: "
             f"{dynasty_node_count} 个 Dynasty 节点, "
@@ -242,6 +265,7 @@ class DynastyMixin:
             'dynasty_nodes': dynasty_node_count,
             'heritage_matched': heritage_with_dynasty,
             'originated_in_relations': relation_count,
+            'failed': writer.stats['failed'],
         }
 
     # ──────────────────────────────
@@ -4,9 +4,12 @@
 负责节点创建、基础关系和邻近关系的构建
 """
 
+import time
 from typing import Dict, Any, List
 from loguru import logger
 
+from ._base import GraphBatchWriter
+
 
 class HeritageMixin:
     """Heritage 及其附属实体 (Category/Region/Level/Batch/Location) 的写操作"""
@@ -17,59 +20,35 @@ class HeritageMixin:
     # Heritage 节点
     # ──────────────────────────────
 
-    def create_heritage_node(self, heritage_data: Dict[str, Any]) -> bool:
+    # Heritage 节点写入的属性字段（id 之外）
+    HERITAGE_PROPERTY_FIELDS = (
+        'name', 'pinyin_name', 'level', 'category', 'region', 'batch',
+        'description', 'history', 'features', 'value', 'status',
+        'protection_measures', 'inheritors', 'related_works',
+    )
+
+    @classmethod
+    def _heritage_properties(cls, heritage_data: Dict[str, Any]) -> Dict[str, Any]:
+        """从非遗数据中取出写入 Heritage 节点的属性"""
+        props = {f: heritage_data.get(f, '') for f in cls.HERITAGE_PROPERTY_FIELDS}
+        props['latitude'] = heritage_data.get('latitude')
+        props['longitude'] = heritage_data.get('longitude')
+        return props
+
+    def create_heritage_node(self, heritage_data: Dict[str, Any],
+                             writer: GraphBatchWriter = None) -> bool:
         """创建/更新非遗项目节点
 
         Args:
             heritage_data: 非遗数据，需含 id 及 content 字段
+            writer: 批量写入器（可选）
         """
-        if not self.driver:
-            return False
-
-        try:
-            with self.driver.session() as session:
-                session.run("""
-                    MERGE (h:Heritage {id: $id})
-                    SET h.name = $name,
-                        h.pinyin_name = $pinyin_name,
-                        h.level = $level,
-                        h.category = $category,
-                        h.region = $region,
-                        h.batch = $batch,
-                        h.description = $description,
-                        h.history = $history,
-                        h.features = $features,
-                        h.value = $value,
-                        h.status = $status,
-                        h.protection_measures = $protection_measures,
-                        h.inheritors = $inheritors,
-                        h.related_works = $related_works,
-                        h.latitude = $latitude,
-                        h.longitude = $longitude,
-                        h.updated_at = datetime()
-                """,
-                    id=heritage_data.get('id'),
-                    name=heritage_data.get('name', ''),
-                    pinyin_name=heritage_data.get('pinyin_name', ''),
-                    level=heritage_data.get('level', ''),
-                    category=heritage_data.get('category', ''),
-                    region=heritage_data.get('region', ''),
-                    batch=heritage_data.get('batch', ''),
-                    description=heritage_data.get('description', ''),
-                    history=heritage_data.get('history', ''),
-                    features=heritage_data.get('features', ''),
-                    value=heritage_data.get('value', ''),
-                    status=heritage_data.get('status', ''),
-                    protection_measures=heritage_data.get('protection_measures', ''),
-                    inheritors=heritage_data.get('inheritors', ''),
-                    related_works=heritage_data.get('related_works', ''),
-                    latitude=heritage_data.get('latitude'),
-                    longitude=heritage_data.get('longitude'),
-                )
-            return True
-        except Exception as e:
-            logger.error(f"创建非遗节点失败: {e}")
-            return False
+        ok = self._merge_node('Heritage', 'id', writer=writer, id=heritage_data.get('id'),
+                              **self._heritage_properties(heritage_data))
+        # 批量写入时由调用方在 flush 之后统一失效
+        if ok and writer is None:
+            self._heritage_changed([heritage_data.get('id')])
+        return ok
 
     # ──────────────────────────────
     # Location 节点
@@ -77,9 +56,9 @@ class HeritageMixin:
 
     def create_location_node(self, name: str, latitude: float,
                              longitude: float, location_type: str = 'heritage',
-                             region: str = '') -> bool:
+                             region: str = '', writer: GraphBatchWriter = None) -> bool:
         """创建位置节点"""
-        return self._merge_node('Location', 'name',
+        return self._merge_node('Location', 'name', writer=writer,
                                 name=name, latitude=latitude, longitude=longitude,
                                 type=location_type, region=region)
 
@@ -87,29 +66,33 @@ class HeritageMixin:
     # Category / Region / Level / Batch 节点
     # ──────────────────────────────
 
-    def create_category_node(self, name: str, description: str = '') -> bool:
+    def create_category_node(self, name: str, description: str = '',
+                             writer: GraphBatchWriter = None) -> bool:
         """创建类别节点"""
-        return self._merge_node('Category', 'name',
+        return self._merge_node('Category', 'name', writer=writer,
                                 name=name, description=description)
 
     def create_region_node(self, name: str, province: str = '陕西省',
                            city: str = '', level: str = '',
                            latitude: float = None,
-                           longitude: float = None) -> bool:
+                           longitude: float = None,
+                           writer: GraphBatchWriter = None) -> bool:
         """创建地区节点，level: 省/地级市/区县"""
-        return self._merge_node('Region', 'name',
+        return self._merge_node('Region', 'name', writer=writer,
                                 name=name, province=province, city=city,
                                 level=level, latitude=latitude,
                                 longitude=longitude)
 
-    def create_level_node(self, name: str, priority: int = 0) -> bool:
+    def create_level_node(self, name: str, priority: int = 0,
+                          writer: GraphBatchWriter = None) -> bool:
         """创建级别节点"""
-        return self._merge_node('Level', 'name',
+        return self._merge_node('Level', 'name', writer=writer,
                                 name=name, priority=priority)
 
-    def create_batch_node(self, name: str, year: int = None) -> bool:
+    def create_batch_node(self, name: str, year: int = None,
+                          writer: GraphBatchWriter = None) -> bool:
         """创建批次节点"""
-        return self._merge_node('Batch', 'name', name=name, year=year)
+        return self._merge_node('Batch', 'name', writer=writer, name=name, year=year)
 
     # ──────────────────────────────
     # Region 层级树
@@ -147,44 +130,43 @@ class HeritageMixin:
         '洛南县': '商洛市',
     }
 
-    def create_region_part_of_relation(self, child_region: str,
-                                       parent_region: str) -> bool:
+    def create_region_part_of_relation(self, child_region: str, parent_region: str,
+                                       writer: GraphBatchWriter = None) -> bool:
         """创建 Region -[PART_OF]-> Region 层级关系"""
         return self._merge_relation('Region', child_region,
-                                    'PART_OF', 'Region', parent_region)
+                                    'PART_OF', 'Region', parent_region, writer=writer)
 
     def expand_region_tree(self) -> Dict[str, int]:
         """展开陕西非遗 Region 层级树（省→市→区县三级）
 
-        创建所有层级 Region 节点和 PART_OF 关系。
-        返回 {region_nodes: int, part_of_relations: int}。
+        创建所有层级 Region 节点和 PART_OF 关系（批量写入）。
+        返回 {region_nodes, part_of_relations, failed}，条数取自批量写入器实际提交的结果。
         """
-        region_count = 0
-        relation_count = 0
-
-        # 省级
-        if self.create_region_node('陕西省', province='陕西省', level='省',
-                                   latitude=34.2658, longitude=108.9541):
-            region_count += 1
-
-        for city, districts in self.REGION_TREE.items():
-            if self.create_region_node(city, province='陕西省', level='地级市'):
-                region_count += 1
-            if self.create_region_part_of_relation(city, '陕西省'):
-                relation_count += 1
-
-            for district in districts:
-                if self.create_region_node(district, province='陕西省',
-                                           city=city, level='区县'):
-                    region_count += 1
-                if self.create_region_part_of_relation(district, city):
-                    relation_count += 1
-
+        with self.batch_writer() as writer:
+            # 省级
+            self.create_region_node('陕西省', province='陕西省', level='省',
+                                    latitude=34.2658, longitude=108.9541, writer=writer)
+
+            for city, districts in self.REGION_TREE.items():
+                self.create_region_node(city, province='陕西省', level='地级市', writer=writer)
+                self.create_region_part_of_relation(city, '陕西省', writer=writer)
+
+                for district in districts:
+                    self.create_region_node(district, province='陕西省',
+                                            city=city, level='区县', writer=writer)
+                    self.create_region_part_of_relation(district, city, writer=writer)
+
+        region_count = writer.stats.get('Region', 0)
+        relation_count = writer.stats.get('PART_OF', 0)
+        if writer.stats['failed']:
+            logger.warning(f"Region 层级树批量写入有 {writer.stats['failed']} 行失败")
         logger.info(
             f"Region 层级树展开完成: "
             f"{region_count} 个节点, {relation_count} 条 PART_OF 关系"
         )
-        return {'region_nodes': region_count, 'part_of_relations': relation_count}
+        self.refresh_region_index()
+        return {'region_nodes': region_count, 'part_of_relations': relation_count,
+                'failed': writer.stats['failed']}
 
     # ──────────────────────────────
     # Heritage 关系构建
@@ -193,38 +175,40 @@ class HeritageMixin:
     def build_heritage_relations(self, heritage_id: int, category: str,
                                  region: str, level: str, batch: str,
                                  latitude: float = None, longitude: float = None,
-                                 name: str = '') -> bool:
+                                 name: str = '', writer: GraphBatchWriter = None) -> bool:
         """构建单个非遗项目的全部基础关系 (BELONGS_TO / LOCATED_AT / HAS_LEVEL / IN_BATCH / AT_LOCATION)"""
         results = []
 
         if category:
-            self.create_category_node(category, '')
+            self.create_category_node(category, '', writer=writer)
             results.append(self._merge_relation(
-                'Heritage', heritage_id, 'BELONGS_TO', 'Category', category))
+                'Heritage', heritage_id, 'BELONGS_TO', 'Category', category, writer=writer))
 
         if region:
-            self.create_region_node(region, '陕西', '')
+            self.create_region_node(region, '陕西', '', writer=writer)
             results.append(self._merge_relation(
-                'Heritage', heritage_id, 'LOCATED_AT', 'Region', region))
+                'Heritage', heritage_id, 'LOCATED_AT', 'Region', region, writer=writer))
 
         if level:
-            self.create_level_node(level, 0)
+            self.create_level_node(level, 0, writer=writer)
             results.append(self._merge_relation(
-                'Heritage', heritage_id, 'HAS_LEVEL', 'Level', level))
+                'Heritage', heritage_id, 'HAS_LEVEL', 'Level', level, writer=writer))
 
         if batch:
-            self.create_batch_node(batch)
+            self.create_batch_node(batch, writer=writer)
             results.append(self._merge_relation(
-                'Heritage', heritage_id, 'IN_BATCH', 'Batch', batch))
+                'Heritage', heritage_id, 'IN_BATCH', 'Batch', batch, writer=writer))
 
         if latitude and longitude and name:
-            self.create_location_node(name, latitude, longitude, 'heritage', region or '')
+            self.create_location_node(name, latitude, longitude, 'heritage', region or '',
+                                      writer=writer)
             results.append(self._merge_relation(
-                'Heritage', heritage_id, 'AT_LOCATION', 'Location', name))
+                'Heritage', heritage_id, 'AT_LOCATION', 'Location', name, writer=writer))
 
         return all(results) if results else True
 
-    def refine_heritage_region(self, heritage_id: int, text: str) -> bool:
+    def refine_heritage_region(self, heritage_id: int, text: str,
+                               writer: GraphBatchWriter = None) -> bool:
         """将 Heritage 关联到最细粒度区县 Region
 
         从 description/history 文本中匹配区县名，
@@ -236,24 +220,124 @@ class HeritageMixin:
         for district, city in self.DISTRICT_TO_CITY.items():
             if district in text:
                 self.create_region_node(district, province='陕西省',
-                                        city=city, level='区县')
+                                        city=city, level='区县', writer=writer)
                 self._merge_relation('Heritage', heritage_id,
-                                     'LOCATED_AT', 'Region', district)
+                                     'LOCATED_AT', 'Region', district, writer=writer)
                 matched = True
         return matched
 
+    # ──────────────────────────────
+    # 批量同步
+    # ──────────────────────────────
+
+    def sync_heritage_records(self, heritage_list: List[Dict]) -> Dict[str, int]:
+        """批量 MERGE 附属实体节点、Heritage 节点及其基础关系
+
+        Returns:
+            {heritage_count, category_count, region_count, failed}；heritage_count 为实际提交的
+            Heritage 节点数，failed 为提交失败的行数（节点与关系合计）
+        """
+        categories = set()
+        regions = set()
+        levels = set()
+        batches = set()
+
+        for heritage in heritage_list:
+            if heritage.get('category'):
+                categories.add(heritage['category'])
+            if heritage.get('region'):
+                regions.add(heritage['region'])
+            if heritage.get('level'):
+                levels.add(heritage['level'])
+            if heritage.get('batch'):
+                batches.add(heritage['batch'])
+
+        with self.batch_writer() as writer:
+            for category in categories:
+                self.create_category_node(category, '', writer=writer)
+            for region in regions:
+                self.create_region_node(region, '陕西', region, '地级市', writer=writer)
+            for level in levels:
+                self.create_level_node(level, 0, writer=writer)
+            for batch in batches:
+                self.create_batch_node(batch, writer=writer)
+
+            for heritage in heritage_list:
+                if self.create_heritage_node(heritage, writer=writer):
+                    self.build_heritage_relations(
+                        heritage_id=heritage['id'],
+                        category=heritage.get('category', ''),
+                        region=heritage.get('region', ''),
+                        level=heritage.get('level', ''),
+                        batch=heritage.get('batch', ''),
+                        latitude=heritage.get('latitude'),
+                        longitude=heritage.get('longitude'),
+                        name=heritage.get('name', ''),
+                        writer=writer,
+                    )
+
+        self._heritage_changed([h['id'] for h in heritage_list])
+        if writer.stats['failed']:
+            logger.warning(f"非遗节点批量写入有 {writer.stats['failed']} 行失败")
+        return {
+            'heritage_count': writer.stats.get('Heritage', 0),
+            'category_count': len(categories),
+            'region_count': len(regions),
+            'failed': writer.stats['failed'],
+        }
+
+    def sync_region_refinements(self, heritage_list: List[Dict]) -> Dict[str, int]:
+        """批量将 Heritage 关联到文本中出现的区县 Region
+
+        Returns:
+            {refined_heritages: 匹配到区县的非遗数, located_at_relations: 实际提交的关系数, failed}
+        """
+        refine_count = 0
+        with self.batch_writer() as writer:
+            for heritage in heritage_list:
+                text = (heritage.get('description', '') + ' ' +
+                        heritage.get('history', ''))
+                if self.refine_heritage_region(heritage['id'], text, writer=writer):
+                    refine_count += 1
+        self.refresh_region_index()
+        if writer.stats['failed']:
+            logger.warning(f"区县细化批量写入有 {writer.stats['failed']} 行失败")
+        return {
+            'refined_heritages': refine_count,
+            'located_at_relations': writer.stats.get('LOCATED_AT', 0),
+            'failed': writer.stats['failed'],
+        }
+
     # ──────────────────────────────
     # NEAR 邻近关系
     # ──────────────────────────────
 
+    _last_near_build: Dict[str, Any] = {}
+
+    def _write_near_edges(self, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+        """批量 MERGE NEAR 边，返回批量写入器统计（NEAR 为提交条数，failed 为失败行数）
+
+        Args:
+            rows: [{a: heritage_id, b: heritage_id, d: distance_km}]
+        """
+        with self.batch_writer() as writer:
+            for row in rows:
+                self.create_near_relation(row['a'], row['b'], row['d'], writer=writer)
+        return writer.stats
+
     def build_near_relations(self, max_distance_km: float = 100) -> int:
         """全量重建 Heritage 间的 NEAR 关系
 
-        先清除旧 NEAR 边（仅 Heritage-Heritage），再基于当前坐标重新计算。
+        先清除旧 NEAR 边（仅 Heritage-Heritage），再用网格空间索引枚举候选点对，
+        只对相邻网格内的点计算距离，最后按批 UNWIND 写入。
+        耗时与边数见 get_near_build_stats()。
         """
         if not self.driver:
             return 0
 
+        from .spatial import GridSpatialIndex
+
+        start = time.perf_counter()
         try:
             # 清除旧 NEAR
             with self.driver.session() as session:
@@ -267,27 +351,182 @@ class HeritageMixin:
             if not heritages:
                 return 0
 
-            relation_count = 0
-            for i, h1 in enumerate(heritages):
-                for h2 in heritages[i + 1:]:
-                    distance = self.calculate_distance(
-                        h1['latitude'], h1['longitude'],
-                        h2['latitude'], h2['longitude'])
-                    if distance <= max_distance_km:
-                        self.create_near_relation(
-                            h1['id'], h2['id'], distance)
-                        relation_count += 1
-
-            logger.info(f"创建了 {relation_count} 个邻近关系")
+            t0 = time.perf_counter()
+            index = GridSpatialIndex(heritages, cell_km=max_distance_km)
+            rows = [
+                {'a': index.items[i]['id'], 'b': index.items[j]['id'], 'd': round(d, 2)}
+                for i, j, d in index.pairs_within(max_distance_km)
+            ]
+            pairing_ms = (time.perf_counter() - t0) * 1000
+
+            t0 = time.perf_counter()
+            write_stats = self._write_near_edges(rows)
+            relation_count = write_stats.get('NEAR', 0)
+            write_ms = (time.perf_counter() - t0) * 1000
+
+            self.invalidate_dossiers()
+            self._last_near_build = {
+                'mode': 'full',
+                'heritage_count': len(index),
+                'edge_count': relation_count,
+                'failed': write_stats['failed'],
+                'deleted_edges': deleted,
+                'pairing_ms': round(pairing_ms, 2),
+                'write_ms': round(write_ms, 2),
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+            }
+            logger.info(
+                f"创建了 {relation_count} 个邻近关系，耗时 {self._last_near_build['elapsed_ms']}ms "
+                f"(点对 {self._last_near_build['pairing_ms']}ms, 写入 {self._last_near_build['write_ms']}ms)"
+            )
             return relation_count
 
         except Exception as e:
             logger.error(f"构建邻近关系失败: {e}")
             return 0
 
+    def build_near_relations_for(self, heritage_ids: List[int],
+                                 max_distance_km: float = 100) -> int:
+        """仅为指定 Heritage 重新计算 NEAR 关系（增量同步用）
+
+        调用前应已清除这些节点上的旧关系；两端都在 heritage_ids 中的点对只建一次。
+        """
+        if not self.driver or not heritage_ids:
+            return 0
+
+        from .spatial import GridSpatialIndex
+
+        start = time.perf_counter()
+        try:
+            heritages = self.get_all_heritages_with_coordinates()
+            index = GridSpatialIndex(heritages, cell_km=max_distance_km)
+            targets = set(heritage_ids)
+            done = set()
+            rows = []
+            for h1 in index.items:
+                if h1['id'] not in targets:
+                    continue
+                for h2, distance in index.query_radius(
+                        h1['latitude'], h1['longitude'], max_distance_km):
+                    if h2['id'] == h1['id'] or h2['id'] in done:
+                        continue
+                    rows.append({'a': h1['id'], 'b': h2['id'], 'd': round(distance, 2)})
+                done.add(h1['id'])
+
+            write_stats = self._write_near_edges(rows)
+            relation_count = write_stats.get('NEAR', 0)
+            self.invalidate_dossiers()
+            self._last_near_build = {
+                'mode': 'incremental',
+                'heritage_count': len(targets),
+                'edge_count': relation_count,
+                'failed': write_stats['failed'],
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+            }
+            logger.info(
+                f"增量创建了 {relation_count} 个邻近关系（{len(targets)} 个非遗），"
+                f"耗时 {self._last_near_build['elapsed_ms']}ms"
+            )
+            return relation_count
+
+        except Exception as e:
+            logger.error(f"增量构建邻近关系失败: {e}")
+            return 0
+
+    def get_near_build_stats(self) -> Dict[str, Any]:
+        """最近一次 NEAR 构建的耗时与边数"""
+        return dict(self._last_near_build)
+
     def create_near_relation(self, heritage_id1: int, heritage_id2: int,
-                             distance_km: float) -> bool:
+                             distance_km: float, writer: GraphBatchWriter = None) -> bool:
         """创建两个 Heritage 之间的 NEAR 关系"""
         return self._merge_relation(
             'Heritage', heritage_id1, 'NEAR', 'Heritage', heritage_id2,
-            {'distance_km': round(distance_km, 2)})
+            {'distance_km': round(distance_km, 2)}, writer=writer)
+
+    # ──────────────────────────────
+    # RELATED_TO 相关非遗（预计算 top-K）
+    # ──────────────────────────────
+
+    _last_related_build: Dict[str, Any] = {}
+
+    def build_related_heritage(self, embeddings: Dict[Any, Any] = None,
+                               top_k: int = None) -> int:
+        """全量重算 Heritage 间的 RELATED_TO 边
+
+        一次读出全部非遗的类别 / 地区 / 级别 / 朝代，结合知识向量（可选）分块向量化打分，
+        每个非遗保留 top-K 邻居，替换旧的预计算 RELATED_TO 边（source='precomputed'）并刷新内存邻接表；
+        add_heritage_relation 手工添加的边保留不动，已有手工边的点对不再写预计算边。
+        应在朝代同步与向量同步之后调用；耗时与边数见 get_related_build_stats()。
+
+        Args:
+            embeddings: {heritage_id: 向量}，通常取自 VectorStore.get_heritage_embeddings()
+            top_k: 每个非遗保留的邻居数，默认 KG_RELATED_TOP_K
+        """
+        if not self.driver:
+            return 0
+
+        from Agent.config.settings import config
+        from .related import (
+            MANUAL_RELATED_PAIRS_QUERY, RELATED_FEATURES_QUERY, RELATED_SOURCE,
+            RelatedIndex, precomputed_related, score_related,
+        )
+
+        top_k = top_k or config.KG_RELATED_TOP_K
+        start = time.perf_counter()
+        try:
+            with self.driver.session() as session:
+                features = [dict(record) for record in session.run(RELATED_FEATURES_QUERY)]
+                manual_pairs = {(record['a'], record['b'])
+                                for record in session.run(MANUAL_RELATED_PAIRS_QUERY)}
+            if not features:
+                return 0
+
+            t0 = time.perf_counter()
+            rows = score_related(features, embeddings, top_k)
+            if manual_pairs:
+                rows = [row for row in rows if (row['a'], row['b']) not in manual_pairs]
+            scoring_ms = (time.perf_counter() - t0) * 1000
+
+            t0 = time.perf_counter()
+            with self.driver.session() as session:
+                result = session.run(
+                    "MATCH (:Heritage)-[r:RELATED_TO]->(:Heritage) "
+                    f"WHERE {precomputed_related('r')} DELETE r")
+                deleted = result.consume().counters.relationships_deleted
+            with self.batch_writer() as writer:
+                for row in rows:
+                    props = {k: v for k, v in row.items() if k not in ('a', 'b')}
+                    props['source'] = RELATED_SOURCE
+                    self._merge_relation('Heritage', row['a'], 'RELATED_TO',
+                                         'Heritage', row['b'], props, writer=writer)
+            relation_count = writer.stats.get('RELATED_TO', 0)
+            if writer.stats['failed']:
+                logger.warning(f"RELATED_TO 批量写入有 {writer.stats['failed']} 行失败")
+            write_ms = (time.perf_counter() - t0) * 1000
+
+            self._set_related_index(RelatedIndex(rows, top_k))
+            self._last_related_build = {
+                'heritage_count': len(features),
+                'with_embedding': sum(1 for f in features if embeddings and f['id'] in embeddings),
+                'top_k': top_k,
+                'edge_count': relation_count,
+                'failed': writer.stats['failed'],
+                'deleted_edges': deleted,
+                'scoring_ms': round(scoring_ms, 2),
+                'write_ms': round(write_ms, 2),
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+            }
+            logger.info(
+                f"创建了 {relation_count} 个相关非遗关系，耗时 {self._last_related_build['elapsed_ms']}ms "
+                f"(打分 {self._last_related_build['scoring_ms']}ms, 写入 {self._last_related_build['write_ms']}ms)"
+            )
+            return relation_count
+
+        except Exception as e:
+            logger.error(f"构建相关非遗关系失败: {e}")
+            return 0
+
+    def get_related_build_stats(self) -> Dict[str, Any]:
+        """最近一次 RELATED_TO 预计算的耗时与边数"""
+        return dict(self._last_related_build)
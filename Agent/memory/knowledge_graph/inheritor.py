@@ -8,6 +8,70 @@ import re
 from typing import Dict, Any, List
 from loguru import logger
 
+from ._base import GraphBatchWriter
+from .text_match import map_in_processes
+
+# ──────────────────────────────
+# 预编译规则
+# 同一组内互斥的规则合并为一个正则（单次扫描），按优先级取值的规则用零宽先行断言
+# 在每个位置同时尝试各分组，得到与逐条 re.search 相同的命中集合。
+# ──────────────────────────────
+
+# 集体传承（任一命中即不解析个人传承人）
+_COLLECTIVE_RE = re.compile('|'.join([
+    r'以.*集体传承.*为主',
+    r'无特定的代表性传承人认定',
+    r'以班社集体传承为主',
+    r'以村社和社火队集体传承为主',
+    r'以集体传承为主',
+    r'以家庭传承和餐饮业传承为主',
+    r'以乐社集体传承为主要方式',
+    r'尚未有公布国家级或省级代表性传承人',
+    r'采用院团集体传承与师徒个体传承相结合',
+    r'传承人众多',
+]))
+
+_TAIL_CUT_RE = re.compile(
+    r'[。;；](?:另有|其中|传统班社|全县|'
+    r'各社均|历代传承谱系|历史谱系|'
+    r'历史上|家族传承谱系|传承方式|'
+    r'早期传承人)')
+_NAME_PAREN_RE = re.compile(r'([一-鿿･]{2,4})\(')
+_NAME_PLACE_RE = re.compile(r'[村社系]')
+_NAME_GENERATION_RE = re.compile(r'^第[一二三四五六七八九十\d]')
+_HIST_RE = re.compile(r'(?:历代传承谱系|历史谱系|历史上)[:：]\s*(.+?)(?:[。]|$)')
+_HIST_ENTRY_RE = re.compile(r'([一-鿿･]{2,4})\(([^)]+)\)')
+_CHAIN_NAME_RE = re.compile(r'[一-鿿･]{2,4}(?=\(|→|$)')
+
+# 级别：分组顺序即优先级（各组首字符互不相同，同一位置不会互相遮挡）
+_LEVELS = ('国家级', '省级', '市级', '县级', '未定级')
+_LEVEL_RE = re.compile(
+    r'(?=(?P<l0>国家级(?:代表性)?传承人)'
+    r'|(?P<l1>省级(?:代表性)?传承人)'
+    r'|(?P<l2>市级(?:非遗)?代表性传承人|西安市(?:非遗)?代表性传承人|延安市级非遗)'
+    r'|(?P<l3>县级(?:代表性)?传承人)'
+    r'|(?P<l4>新一代传承人|传承人|老艺人|著名画家|[第第].*传人))')
+
+_BIRTH_RE = re.compile(r'(\d{4})年生')
+_LIFESPAN_RE = re.compile(r'(?:^|[,\s])(\d{4})-(\d{4})(?:$|[,\s)])')
+_GENDER_RE = re.compile(r'(?=(?:^|[,\s])(?:(?P<female>女)|(?P<male>男))(?:$|[,\s,;]))')
+_GENERATION_RE = re.compile(r'第([一二三四五六七八九十\d]+)代(?:\s*传人|\s*代表性传承人)?')
+_GENERATION_TAIL_RE = re.compile(r'第([一二三四五六七八九十\d]+)代(?:$|[,\s;])')
+_GENERATION_MAP = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5,
+                   '六': 6, '七': 7, '八': 8, '九': 9, '十': 10,
+                   '十一': 11, '十二': 12, '十八': 18,
+                   '十九': 19, '二十': 20}
+
+# 师承：按优先级依次尝试，首个通过校验的即为师傅
+_TEACHER_RES = [
+    re.compile(r'师从([一-鿿･]{2,3})'),
+    re.compile(r'([一-鿿･]{2,3})弟子'),
+    re.compile(r'(?<![一-鿿･])([一-鿿･]{2,3})之(?:子|女|侄|孙)'),
+    re.compile(r'随(?:祖父|父亲|外祖母|伯父|'
+               r'外祖父|家人|母亲|姥姥|和|的)?'
+               r'([一-鿿･]{2,3})(?:学艺|学习|学)'),
+]
+
 
 class InheritorMixin:
     """传承人实体与解析器的写操作"""
@@ -25,6 +89,7 @@ class InheritorMixin:
         '父亲', '母亲', '伯父', '祖父', '外祖母', '姥姥', '家人',
         '多人', '多名',
     }
+    _INVALID_TEACHER_RE = re.compile('|'.join(map(re.escape, sorted(_INVALID_TEACHERS))))
 
     # 非人名词（误匹配的代际标签、角色描述等）
     _NON_PERSON_NAMES = {
@@ -46,7 +111,7 @@ class InheritorMixin:
           - 姓名(生年—卒年,性别,级别) 如: 刘延河(1960—,男,国家级)
           - 师从关系: 师从XXX / XXX弟子 / XXX之子女
           - 链式谱系: A→B→C 连环师承
-          - 集体传承检测: 自动识别 9 种集体传承模式
+          - 集体传承检测: 自动识别 10 种集体传承模式
         """
         if not text or not text.strip():
             return []
@@ -56,41 +121,25 @@ class InheritorMixin:
         text = text.replace('；', ';')
 
         # 集体传承检测
-        collective_patterns = [
-            r'以.*集体传承.*为主',
-            r'无特定的代表性传承人认定',
-            r'以班社集体传承为主',
-            r'以村社和社火队集体传承为主',
-            r'以集体传承为主',
-            r'以家庭传承和餐饮业传承为主',
-            r'以乐社集体传承为主要方式',
-            r'尚未有公布国家级或省级代表性传承人',
-            r'采用院团集体传承与师徒个体传承相结合',
-            r'传承人众多',
-        ]
-        if any(re.search(p, original) for p in collective_patterns):
+        if _COLLECTIVE_RE.search(original):
             return []
 
         # 截断尾部描述（"另有..."、"早期传承人:"等）
-        tail_cut = re.search(
-            r'[。;；](?:另有|其中|传统班社|全县|'
-            r'各社均|历代传承谱系|历史谱系|'
-            r'历史上|家族传承谱系|传承方式|'
-            r'早期传承人)', text)
+        tail_cut = _TAIL_CUT_RE.search(text)
         if tail_cut:
             text = text[:tail_cut.start()]
 
         # 用栈匹配括号，处理嵌套
         entries = []
-        for m in re.finditer(r'([一-鿿･]{2,4})\(', text):
+        for m in _NAME_PAREN_RE.finditer(text):
             name = m.group(1)
             if name in InheritorMixin._NON_PERSON_NAMES:
                 continue
             if name.endswith('等'):
                 continue
-            if re.search(r'[村社系]', name):
+            if _NAME_PLACE_RE.search(name):
                 continue
-            if re.match(r'^第[一二三四五六七八九十\d]', name):
+            if _NAME_GENERATION_RE.match(name):
                 continue
 
             start = m.end() - 1
@@ -109,11 +158,9 @@ class InheritorMixin:
 
         # 历史谱系链
         hist_entries = []
-        hist_match = re.search(
-            r'(?:历代传承谱系|历史谱系|历史上)[:：]\s*(.+?)(?:[。]|$)',
-            original)
+        hist_match = _HIST_RE.search(original)
         if hist_match:
-            for m in re.finditer(r'([一-鿿･]{2,4})\(([^)]+)\)', hist_match.group(1)):
+            for m in _HIST_ENTRY_RE.finditer(hist_match.group(1)):
                 hname, hbio = m.group(1), m.group(2)
                 if hname not in InheritorMixin._NON_PERSON_NAMES:
                     hist_entries.append((hname, hbio))
@@ -121,84 +168,62 @@ class InheritorMixin:
         # 链式师承 A→B→C
         chain_teachers = {}
         if hist_match:
-            chain_names = re.findall(r'[一-鿿･]{2,4}(?=\(|→|$)', hist_match.group(1))
+            chain_names = _CHAIN_NAME_RE.findall(hist_match.group(1))
             for i in range(len(chain_names) - 1):
                 chain_teachers[chain_names[i + 1]] = chain_names[i]
 
         # ── 解析辅助函数 ──
 
         def _extract_level(bio):
-            if re.search(r'国家级(?:代表性)?传承人', bio):
-                return '国家级'
-            if re.search(r'省级(?:代表性)?传承人', bio):
-                return '省级'
-            if re.search(r'市级(?:非遗)?代表性传承人|'
-                         r'西安市(?:非遗)?代表性传承人|'
-                         r'延安市级非遗', bio):
-                return '市级'
-            if re.search(r'县级(?:代表性)?传承人', bio):
-                return '县级'
-            if re.search(r'新一代传承人|传承人|老艺人|'
-                         r'著名画家|[第第].*传人', bio):
-                return '未定级'
-            return ''
+            best = len(_LEVELS)
+            for m in _LEVEL_RE.finditer(bio):
+                best = min(best, int(m.lastgroup[1:]))
+                if best == 0:
+                    break
+            return _LEVELS[best] if best < len(_LEVELS) else ''
 
         def _extract_birth_year(bio):
-            m = re.search(r'(\d{4})年生', bio)
+            m = _BIRTH_RE.search(bio)
             if m:
                 y = int(m.group(1))
                 if 1900 <= y <= 2020:
                     return (y, None)
-            m = re.search(r'(?:^|[,\s])(\d{4})-(\d{4})(?:$|[,\s)])', bio)
+            m = _LIFESPAN_RE.search(bio)
             if m:
                 return (int(m.group(1)), int(m.group(2)))
             return (None, None)
 
         def _extract_gender(bio):
-            if re.search(r'(?:^|[,\s])女(?:$|[,\s,;])', bio):
+            found = {m.lastgroup for m in _GENDER_RE.finditer(bio)}
+            if 'female' in found:
                 return '女'
-            if re.search(r'(?:^|[,\s])男(?:$|[,\s,;])', bio):
+            if 'male' in found:
                 return '男'
             return ''
 
         def _extract_generation(bio):
-            m = re.search(r'第([一二三四五六七八九十\d]+)代(?:\s*传人|\s*代表性传承人)?', bio)
+            m = _GENERATION_RE.search(bio)
             if not m:
-                m = re.search(r'第([一二三四五六七八九十\d]+)代(?:$|[,\s;])', bio)
+                m = _GENERATION_TAIL_RE.search(bio)
             if m:
                 g = m.group(1)
-                gen_map = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5,
-                           '六': 6, '七': 7, '八': 8, '九': 9, '十': 10,
-                           '十一': 11, '十二': 12, '十八': 18,
-                           '十九': 19, '二十': 20}
-                return gen_map.get(g, int(g) if g.isdigit() else None)
+                return _GENERATION_MAP.get(g, int(g) if g.isdigit() else None)
             return None
 
         def _is_valid_teacher(t, name=''):
             if t == name:
                 return False
-            for inv in InheritorMixin._INVALID_TEACHERS:
-                if inv in t:
-                    return False
+            if InheritorMixin._INVALID_TEACHER_RE.search(t):
+                return False
             if t.endswith(('学', '和', '的', '了', '是', '等')):
                 return False
             return len(t) >= 2
 
         def _extract_teacher(bio, name=''):
-            m = re.search(r'师从([一-鿿･]{2,3})', bio)
-            if m and _is_valid_teacher(m.group(1), name):
-                return m.group(1)
-            m = re.search(r'([一-鿿･]{2,3})弟子', bio)
-            if m and _is_valid_teacher(m.group(1), name):
-                return m.group(1)
-            m = re.search(r'(?<![一-鿿･])([一-鿿･]{2,3})之(?:子|女|侄|孙)', bio)
-            if m and _is_valid_teacher(m.group(1), name):
-                return m.group(1)
-            m = re.search(r'随(?:祖父|父亲|外祖母|伯父|'
-                          r'外祖父|家人|母亲|姥姥|和|的)?'
-                          r'([一-鿿･]{2,3})(?:学艺|学习|学)', bio)
-            if m and _is_valid_teacher(m.group(1), name):
-                return m.group(1)
+            for pattern in _TEACHER_RES:
+                m = pattern.search(bio)
+                if m and _is_valid_teacher(m.group(1), name):
+                    return m.group(1)
             return None
 
         # ── 合并解析 ──
@@ -233,6 +258,14 @@ class InheritorMixin:
 
         return results
 
+    @staticmethod
+    def parse_inheritors_batch(texts: List[str]) -> List[List[Dict[str, Any]]]:
+        """批量解析传承人，条目较多时分发到进程池（KG_EXTRACT_WORKERS / KG_EXTRACT_PARALLEL_MIN）"""
+        from Agent.config.settings import config
+        return map_in_processes(InheritorMixin.parse_inheritors_from_text, texts,
+                                workers=config.KG_EXTRACT_WORKERS,
+                                min_items=config.KG_EXTRACT_PARALLEL_MIN)
+
     # ──────────────────────────────
     # Inheritor 节点
     # ──────────────────────────────
@@ -240,9 +273,10 @@ class InheritorMixin:
     def create_inheritor_node(self, name: str, level: str = '',
                                birth_year: int = None, death_year: int = None,
                                status: str = '', gender: str = '',
-                               generation: int = None, bio: str = '') -> bool:
+                               generation: int = None, bio: str = '',
+                               writer: GraphBatchWriter = None) -> bool:
         """创建传承人节点（MERGE 保证幂等）"""
-        return self._merge_node('Inheritor', 'name',
+        return self._merge_node('Inheritor', 'name', writer=writer,
                                 name=name, level=level,
                                 birth_year=birth_year, death_year=death_year,
                                 status=status, gender=gender,
@@ -252,60 +286,66 @@ class InheritorMixin:
     # Inheritor 关系
     # ──────────────────────────────
 
-    def create_heritage_inheritor_relation(self, heritage_id: int,
-                                            inheritor_name: str) -> bool:
+    def create_heritage_inheritor_relation(self, heritage_id: int, inheritor_name: str,
+                                            writer: GraphBatchWriter = None) -> bool:
         """创建 Heritage -[HAS_INHERITOR]-> Inheritor 关系"""
         return self._merge_relation('Heritage', heritage_id,
-                                    'HAS_INHERITOR', 'Inheritor', inheritor_name)
+                                    'HAS_INHERITOR', 'Inheritor', inheritor_name,
+                                    writer=writer)
 
-    def create_studied_under_relation(self, student_name: str,
-                                       teacher_name: str) -> bool:
+    def create_studied_under_relation(self, student_name: str, teacher_name: str,
+                                       writer: GraphBatchWriter = None) -> bool:
         """创建 Inheritor -[STUDIED_UNDER]-> Inheritor 师承关系"""
         if not student_name or not teacher_name:
             return False
         if student_name == teacher_name:
             return False
         return self._merge_relation('Inheritor', student_name,
-                                    'STUDIED_UNDER', 'Inheritor', teacher_name)
+                                    'STUDIED_UNDER', 'Inheritor', teacher_name,
+                                    writer=writer)
 
     # ──────────────────────────────
     # 批量同步
     # ──────────────────────────────
 
     def sync_inheritors_from_heritage_list(self, heritage_list: List[Dict]) -> Dict[str, int]:
-        """从 heritage 列表同步传承人到知识图谱，返回统计信息"""
-        inheritor_count = 0
-        relation_count = 0
-        teacher_count = 0
-
-        for heritage in heritage_list:
-            hid = heritage.get('id')
-            text = heritage.get('inheritors', '')
-            if not text:
-                continue
-
-            inheritors = self.parse_inheritors_from_text(text)
-            for inh in inheritors:
-                if not inh['name']:
-                    continue
-                if self.create_inheritor_node(
-                    name=inh['name'],
-                    level=inh['level'],
-                    birth_year=inh['birth_year'],
-                    death_year=inh['death_year'],
-                    status=inh['status'],
-                    gender=inh['gender'],
-                    generation=inh['generation'],
-                    bio=inh['bio'],
-                ):
-                    inheritor_count += 1
-
-                if self.create_heritage_inheritor_relation(hid, inh['name']):
-                    relation_count += 1
-
-                if inh.get('teacher') and self.create_studied_under_relation(inh['name'], inh['teacher']):
-                    teacher_count += 1
+        """从 heritage 列表同步传承人到知识图谱
 
+        Returns:
+            {inheritor_nodes, has_inheritor_relations, studied_under_relations, failed}；
+            条数取自批量写入器实际提交的结果（同名传承人只计一次）
+        """
+        targets = [h for h in heritage_list if h.get('inheritors')]
+        parsed = self.parse_inheritors_batch([h['inheritors'] for h in targets])
+
+        with self.batch_writer() as writer:
+            for heritage, inheritors in zip(targets, parsed):
+                hid = heritage.get('id')
+                for inh in inheritors:
+                    if not inh['name']:
+                        continue
+                    self.create_inheritor_node(
+                        name=inh['name'],
+                        level=inh['level'],
+                        birth_year=inh['birth_year'],
+                        death_year=inh['death_year'],
+                        status=inh['status'],
+                        gender=inh['gender'],
+                        generation=inh['generation'],
+                        bio=inh['bio'],
+                        writer=writer,
+                    )
+                    self.create_heritage_inheritor_relation(hid, inh['name'], writer=writer)
+                    if inh.get('teacher'):
+                        self.create_studied_under_relation(
+                            inh['name'], inh['teacher'], writer=writer)
+
+        inheritor_count = writer.stats.get('Inheritor', 0)
+        relation_count = writer.stats.get('HAS_INHERITOR', 0)
+        teacher_count = writer.stats.get('STUDIED_UNDER', 0)
+        if writer.stats['failed']:
+            logger.warning(f"传承人批量写入有 {writer.stats['failed']} 行失败")
+        self.invalidate_dossiers()
         logger.info(
             f"传承人同步完成: "
             f"{inheritor_count} 个节点, "
@@ -316,4 +356,5 @@ class InheritorMixin:
             'inheritor_nodes': inheritor_count,
             'has_inheritor_relations': relation_count,
             'studied_under_relations': teacher_count,
+            'failed': writer.stats['failed'],
         }
@@ -0,0 +1,489 @@
+# -*- coding: utf-8 -*-
+"""
+Neo4j 查询观测
+包装同步驱动的 session / transaction / result，按调用方（模块.函数）归类每条 Cypher，记录:
+  - 延迟直方图、调用次数、返回行数、错误数与最近一次错误
+  - 慢查询日志（参数只保留类型与长度，不记录值）
+  - 可选 PROFILE 采样：对最慢的只读查询名定期在后台以 PROFILE 重放一次，记录 dbHits 与热点算子
+
+结果对象是惰性的，延迟记到结果被读完 / consume / 所在 session 关闭为止，
+因此包含了记录流式传输的时间。异步驱动的查询由 AsyncQueryMixin._aread 直接调用 record。
+"""
+
+import json
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from loguru import logger
+
+# 直方图桶上界（毫秒），最后一个桶为 +inf
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# 含写子句的语句不做 PROFILE 重放
+_WRITE_CLAUSE_RE = re.compile(
+    r'\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV|IN\s+TRANSACTIONS)\b',
+    re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_SLOW_QUERY_TEXT_MAX = 500
+
+
+def redact_params(params: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """参数脱敏：只保留参数名与值的类型 / 长度"""
+    redacted = {}
+    for key, value in (params or {}).items():
+        if value is None:
+            redacted[key] = 'null'
+        elif isinstance(value, (str, bytes)):
+            redacted[key] = f'<{type(value).__name__}:{len(value)}>'
+        elif isinstance(value, (list, tuple, set, dict)):
+            redacted[key] = f'<{type(value).__name__}:{len(value)}>'
+        else:
+            redacted[key] = f'<{type(value).__name__}>'
+    return redacted
+
+
+def _normalize_query(query: str) -> str:
+    text = _WHITESPACE_RE.sub(' ', str(query)).strip()
+    return text if len(text) <= _SLOW_QUERY_TEXT_MAX else text[:_SLOW_QUERY_TEXT_MAX] + '...'
+
+
+def _summarize_profile(profile: Optional[Dict[str, Any]], top: int = 3) -> Dict[str, Any]:
+    """把 PROFILE 计划树汇总为总 dbHits 与 dbHits 最高的算子"""
+    operators = []
+
+    def walk(node):
+        operators.append({
+            'operator': node.get('operatorType'),
+            'db_hits': node.get('dbHits', 0),
+            'rows': node.get('rows', 0),
+        })
+        for child in node.get('children') or ():
+            walk(child)
+
+    if profile:
+        walk(profile)
+    operators.sort(key=lambda op: op['db_hits'], reverse=True)
+    return {
+        'total_db_hits': sum(op['db_hits'] for op in operators),
+        'rows': profile.get('rows', 0) if profile else 0,
+        'hot_operators': operators[:top],
+    }
+
+
+# ──────────────────────────────
+# 统计
+# ──────────────────────────────
+
+class _QueryStat:
+    __slots__ = ('count', 'errors', 'rows', 'total_ms', 'max_ms', 'buckets',
+                 'last_error', 'slow_count', 'profile')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.last_error: Optional[str] = None
+        self.slow_count = 0
+        self.profile: Optional[Dict[str, Any]] = None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按直方图估算分位数（返回所在桶的上界，末桶返回 max）"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 2)
+        return round(self.max_ms, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'rows': self.rows,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'max_ms': round(self.max_ms, 2),
+            'slow_count': self.slow_count,
+            'histogram': dict(zip([f'le_{b}' for b in LATENCY_BUCKETS_MS] + ['le_inf'], self.buckets)),
+            'last_error': self.last_error,
+            'profile': self.profile,
+        }
+
+
+class QueryMonitor:
+    """按查询名聚合的 Neo4j 查询统计（线程安全）"""
+
+    def __init__(self, slow_ms: float = 200, slow_log_size: int = 200,
+                 slow_log_file: str = None, profile_enabled: bool = False,
+                 profile_top_n: int = 5, profile_interval: float = 300):
+        self.slow_ms = slow_ms
+        self.slow_log_file = slow_log_file
+        self.profile_enabled = profile_enabled
+        self.profile_top_n = profile_top_n
+        self.profile_interval = profile_interval
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _QueryStat] = {}
+        self._slow_log: deque = deque(maxlen=max(1, slow_log_size))
+        self._profiled_at: Dict[str, float] = {}
+        self._profile_driver = None
+        self._profile_executor: Optional[ThreadPoolExecutor] = None
+        self._started_at = time.time()
+
+    # ──────────────────────────────
+    # 记录
+    # ──────────────────────────────
+
+    def record(self, name: str, query: str, params: Optional[Dict[str, Any]],
+               elapsed_ms: float, rows: int = 0, error: Optional[BaseException] = None):
+        """记录一次查询；超过慢查询阈值时写慢查询日志并视情况安排 PROFILE 采样"""
+        bucket = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                bucket = i
+                break
+        slow = elapsed_ms >= self.slow_ms
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = _QueryStat()
+            stat.count += 1
+            stat.rows += rows
+            stat.total_ms += elapsed_ms
+            stat.max_ms = max(stat.max_ms, elapsed_ms)
+            stat.buckets[bucket] += 1
+            if error is not None:
+                stat.errors += 1
+                stat.last_error = f"{type(error).__name__}: {str(error)[:200]}"
+            if slow:
+                stat.slow_count += 1
+
+        if slow:
+            self._log_slow(name, query, params, elapsed_ms, rows, error)
+            if self.profile_enabled and error is None:
+                self._maybe_profile(name, query, params)
+
+    def _log_slow(self, name: str, query: str, params: Optional[Dict[str, Any]],
+                  elapsed_ms: float, rows: int, error: Optional[BaseException]):
+        entry = {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'name': name,
+            'elapsed_ms': round(elapsed_ms, 2),
+            'rows': rows,
+            'error': type(error).__name__ if error is not None else None,
+            'query': _normalize_query(query),
+            'params': redact_params(params),
+        }
+        with self._lock:
+            self._slow_log.append(entry)
+        logger.warning(f"Neo4j 慢查询 {name}: {entry['elapsed_ms']}ms, rows={rows}, params={entry['params']}")
+        if self.slow_log_file:
+            try:
+                with open(self.slow_log_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            except OSError as e:
+                logger.debug(f"写入慢查询日志文件失败: {e}")
+
+    # ──────────────────────────────
+    # PROFILE 采样
+    # ──────────────────────────────
+
+    def attach_profile_driver(self, driver):
+        """PROFILE 重放使用的原始（未包装）驱动"""
+        self._profile_driver = driver
+
+    def _slowest_names(self) -> List[str]:
+        with self._lock:
+            ranked = sorted(self._stats.items(),
+                            key=lambda kv: kv[1].quantile(0.95) or 0.0, reverse=True)
+        return [name for name, _ in ranked[:self.profile_top_n]]
+
+    def _maybe_profile(self, name: str, query: str, params: Optional[Dict[str, Any]]):
+        if self._profile_driver is None or _WRITE_CLAUSE_RE.search(query or ''):
+            return
+        if query.lstrip()[:7].upper() in ('PROFILE', 'EXPLAIN'):
+            return
+        now = time.time()
+        with self._lock:
+            if now - self._profiled_at.get(name, 0.0) < self.profile_interval:
+                return
+        if name not in self._slowest_names():
+            return
+        with self._lock:
+            if now - self._profiled_at.get(name, 0.0) < self.profile_interval:
+                return
+            self._profiled_at[name] = now
+            if self._profile_executor is None:
+                self._profile_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='neo4j-profile')
+        self._profile_executor.submit(self._run_profile, name, query, dict(params or {}))
+
+    def _run_profile(self, name: str, query: str, params: Dict[str, Any]):
+        def work(tx):
+            return tx.run('PROFILE ' + query, **params).consume()
+
+        try:
+            start = time.perf_counter()
+            with self._profile_driver.session() as session:
+                summary = session.execute_read(work)
+            result = _summarize_profile(summary.profile)
+            result.update({
+                'profiled_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+            })
+            with self._lock:
+                if name in self._stats:
+                    self._stats[name].profile = result
+            logger.info(f"Neo4j PROFILE {name}: dbHits={result['total_db_hits']}, "
+                        f"热点算子={[op['operator'] for op in result['hot_operators']]}")
+        except Exception as e:
+            logger.debug(f"PROFILE 采样失败 ({name}): {e}")
+
+    # ──────────────────────────────
+    # 读取
+    # ──────────────────────────────
+
+    def get_stats(self, top: int = None, sort_by: str = 'total_ms') -> Dict[str, Any]:
+        """按 sort_by（total_ms / p95_ms / max_ms / count / errors）降序返回各查询名的统计"""
+        with self._lock:
+            queries = {name: stat.to_dict() for name, stat in self._stats.items()}
+            for name, stat in self._stats.items():
+                queries[name]['total_ms'] = round(stat.total_ms, 2)
+            slow_log = list(self._slow_log)
+        ranked = sorted(queries.items(), key=lambda kv: kv[1].get(sort_by) or 0, reverse=True)
+        if top:
+            ranked = ranked[:top]
+        return {
+            'since': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._started_at)),
+            'slow_ms': self.slow_ms,
+            'profile_enabled': self.profile_enabled,
+            'total_queries': sum(q['count'] for q in queries.values()),
+            'total_errors': sum(q['errors'] for q in queries.values()),
+            'queries': dict(ranked),
+            'slow_log': slow_log[-50:],
+        }
+
+    def get_slow_log(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._slow_log)[-limit:]
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self._slow_log.clear()
+            self._profiled_at = {}
+            self._started_at = time.time()
+
+
+# ──────────────────────────────
+# 驱动包装
+# ──────────────────────────────
+
+def _caller_name() -> str:
+    """本模块之外最近一层调用方，格式为 模块短名.函数名"""
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals.get('__name__') == __name__:
+        frame = frame.f_back
+    if frame is None:
+        return 'unknown'
+    module = frame.f_globals.get('__name__', '').rsplit('.', 1)[-1]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+def _query_params(parameters: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    params = dict(parameters or {})
+    params.update(kwargs)
+    return params
+
+
+class _InstrumentedResult:
+    """惰性结果代理：读完 / consume / 关闭时记录一次"""
+
+    def __init__(self, result, monitor: QueryMonitor, name: str, query: str,
+                 params: Dict[str, Any], start: float):
+        self._result = result
+        self._monitor = monitor
+        self._name = name
+        self._query = query
+        self._params = params
+        self._start = start
+        self._rows = 0
+        self._done = False
+
+    def _finish(self, error: Optional[BaseException] = None):
+        if self._done:
+            return
+        self._done = True
+        self._monitor.record(self._name, self._query, self._params,
+                             (time.perf_counter() - self._start) * 1000, self._rows, error)
+
+    def __iter__(self):
+        try:
+            for record in self._result:
+                self._rows += 1
+                yield record
+        except Exception as e:
+            self._finish(e)
+            raise
+        self._finish()
+
+    def _call(self, method: str, *args, rows=None, **kwargs):
+        try:
+            value = getattr(self._result, method)(*args, **kwargs)
+        except Exception as e:
+            self._finish(e)
+            raise
+        if rows is not None:
+            self._rows += rows(value)
+        self._finish()
+        return value
+
+    def single(self, *args, **kwargs):
+        return self._call('single', *args, rows=lambda v: 0 if v is None else 1, **kwargs)
+
+    def data(self, *args, **kwargs):
+        return self._call('data', *args, rows=len, **kwargs)
+
+    def values(self, *args, **kwargs):
+        return self._call('values', *args, rows=len, **kwargs)
+
+    def consume(self):
+        return self._call('consume')
+
+    def __getattr__(self, item):
+        return getattr(self._result, item)
+
+
+class _RunRecorder:
+    """session / transaction 共用的 run 包装，跟踪尚未结束的结果"""
+
+    def __init__(self, target, monitor: QueryMonitor, name: Optional[str] = None):
+        self._target = target
+        self._monitor = monitor
+        self._name = name
+        self._open: List[_InstrumentedResult] = []
+
+    def run(self, query, parameters=None, **kwargs):
+        name = self._name or _caller_name()
+        params = _query_params(parameters, kwargs)
+        # 驱动在发起下一条语句前会缓冲完上一条的结果，未读完的结果在此结束计时
+        self._finish_open()
+        start = time.perf_counter()
+        try:
+            result = self._target.run(query, parameters, **kwargs)
+        except Exception as e:
+            self._monitor.record(name, str(query), params,
+                                 (time.perf_counter() - start) * 1000, 0, e)
+            raise
+        wrapped = _InstrumentedResult(result, self._monitor, name, str(query), params, start)
+        self._open.append(wrapped)
+        return wrapped
+
+    def _finish_open(self, error: Optional[BaseException] = None):
+        open_results, self._open = self._open, []
+        for result in open_results:
+            result._finish(error)
+
+    def __getattr__(self, item):
+        return getattr(self._target, item)
+
+
+class InstrumentedSession(_RunRecorder):
+    """Session 代理：run / execute_read / execute_write 计入 QueryMonitor"""
+
+    def __enter__(self):
+        self._target.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            return self._target.__exit__(exc_type, exc, tb)
+        finally:
+            self._finish_open(exc)
+
+    def close(self):
+        try:
+            self._target.close()
+        finally:
+            self._finish_open()
+
+    def _execute(self, method: str, work, *args, **kwargs):
+        # 事务函数内的 tx.run 以 execute_* 的调用方命名
+        name = _caller_name()
+
+        def wrapped_work(tx, *a, **kw):
+            recorder = _RunRecorder(tx, self._monitor, name)
+            try:
+                return work(recorder, *a, **kw)
+            finally:
+                recorder._finish_open()
+
+        return getattr(self._target, method)(wrapped_work, *args, **kwargs)
+
+    def execute_read(self, work, *args, **kwargs):
+        return self._execute('execute_read', work, *args, **kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        return self._execute('execute_write', work, *args, **kwargs)
+
+
+class InstrumentedDriver:
+    """驱动代理：session() 返回 InstrumentedSession，其余属性透传"""
+
+    def __init__(self, driver, monitor: QueryMonitor):
+        self._driver = driver
+        self._monitor = monitor
+        monitor.attach_profile_driver(driver)
+
+    def session(self, *args, **kwargs) -> InstrumentedSession:
+        return InstrumentedSession(self._driver.session(*args, **kwargs), self._monitor)
+
+    def __getattr__(self, item):
+        return getattr(self._driver, item)
+
+
+# ──────────────────────────────
+# 单例
+# ──────────────────────────────
+
+_query_monitor: Optional[QueryMonitor] = None
+_query_monitor_lock = threading.Lock()
+
+
+def get_query_monitor() -> QueryMonitor:
+    """获取 Neo4j 查询统计单例（参数取自配置）"""
+    global _query_monitor
+    if _query_monitor is None:
+        with _query_monitor_lock:
+            if _query_monitor is None:
+                from Agent.config.settings import config
+                _query_monitor = QueryMonitor(
+                    slow_ms=config.NEO4J_SLOW_QUERY_MS,
+                    slow_log_size=config.NEO4J_SLOW_QUERY_LOG_SIZE,
+                    slow_log_file=config.NEO4J_SLOW_QUERY_LOG_FILE or None,
+                    profile_enabled=config.NEO4J_PROFILE_SAMPLING,
+                    profile_top_n=config.NEO4J_PROFILE_TOP_N,
+                    profile_interval=config.NEO4J_PROFILE_INTERVAL,
+                )
+    return _query_monitor
+
+
+def instrument_driver(driver):
+    """按配置包装驱动；关闭 NEO4J_QUERY_METRICS_ENABLED 时原样返回"""
+    from Agent.config.settings import config
+    if driver is None or not config.NEO4J_QUERY_METRICS_ENABLED:
+        return driver
+    return InstrumentedDriver(driver, get_query_monitor())
@@ -4,14 +4,19 @@
 提供非遗项目的多维度查询、邻近查询、关联查询等
 """
 
-from typing import Dict, Any, List, Optional
+import time
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 from loguru import logger
 
+from .catalog import HeritageCatalog, HeritageDossierCache
+
 
 class QueryMixin:
     """知识图谱查询操作"""
 
     driver: object = None
+    heritage_catalog: Optional[HeritageCatalog] = None
 
     # ──────────────────────────────
     # 基础查询
@@ -41,7 +46,8 @@ class QueryMixin:
                     MATCH (h:Heritage)
                     WHERE h.latitude IS NOT NULL AND h.longitude IS NOT NULL
                     RETURN h.id as id, h.name as name, h.latitude as latitude,
-                           h.longitude as longitude, h.region as region
+                           h.longitude as longitude, h.region as region,
+                           h.category as category, h.level as level
                 """)
                 heritages = []
                 for record in result:
@@ -55,38 +61,45 @@ class QueryMixin:
     # ID 查询
     # ──────────────────────────────
 
+    # Heritage 完整记录的文本字段（缺失时返回空串）
+    _HERITAGE_TEXT_FIELDS = (
+        'pinyin_name', 'level', 'category', 'region', 'batch', 'description', 'history',
+        'features', 'value', 'status', 'protection_measures', 'inheritors', 'related_works',
+    )
+
+    # Heritage 完整记录的投影字段
+    _HERITAGE_RECORD_RETURN = (
+        "RETURN h.id as id, h.name as name, "
+        + ''.join(f"COALESCE(h.{f}, '') as {f}, " for f in _HERITAGE_TEXT_FIELDS)
+        + "h.latitude as latitude, h.longitude as longitude ORDER BY h.id"
+    )
+
+    # 同一组字段的 map 投影（用于在一条语句中与其他关联结果一起返回）
+    _HERITAGE_RECORD_MAP = (
+        "{id: h.id, name: h.name, "
+        + ''.join(f"{f}: COALESCE(h.{f}, ''), " for f in _HERITAGE_TEXT_FIELDS)
+        + "latitude: h.latitude, longitude: h.longitude}"
+    )
+
+    def _fetch_heritage_records(self, ids: Optional[List] = None) -> List[Dict[str, Any]]:
+        """从 Neo4j 读取 Heritage 完整记录，ids 为 None 时读取全部（异常向上抛出）"""
+        where = "WHERE h.id IN $ids" if ids is not None else ""
+        with self.driver.session() as session:
+            result = session.run(
+                f"MATCH (h:Heritage) {where} {self._HERITAGE_RECORD_RETURN}", ids=ids)
+            return [dict(record) for record in result]
+
     def query_heritage_by_ids(self, ids: List[int]) -> List[Dict[str, Any]]:
-        """根据 ID 列表查询非遗项目"""
+        """根据 ID 列表查询非遗项目（优先读目录快照，未命中回源 Neo4j）"""
         if not self.driver or not ids:
             return []
 
         try:
-            with self.driver.session() as session:
-                result = session.run("""
-                    MATCH (h:Heritage)
-                    WHERE h.id IN $ids
-                    RETURN h.id as id, h.name as name,
-                           COALESCE(h.pinyin_name, '') as pinyin_name,
-                           COALESCE(h.level, '') as level,
-                           COALESCE(h.category, '') as category,
-                           COALESCE(h.region, '') as region,
-                           COALESCE(h.batch, '') as batch,
-                           COALESCE(h.description, '') as description,
-                           COALESCE(h.history, '') as history,
-                           COALESCE(h.features, '') as features,
-                           COALESCE(h.value, '') as value,
-                           COALESCE(h.status, '') as status,
-                           COALESCE(h.protection_measures, '') as protection_measures,
-                           COALESCE(h.inheritors, '') as inheritors,
-                           COALESCE(h.related_works, '') as related_works,
-                           h.latitude as latitude, h.longitude as longitude
-                    ORDER BY h.id
-                """, ids=ids)
-
-                heritages = []
-                for record in result:
-                    heritages.append(dict(record))
-                return heritages
+            if self.heritage_catalog is None:
+                return self._fetch_heritage_records(ids)
+            if not self.heritage_catalog.is_fresh():
+                self.load_heritage_catalog()
+            return self.heritage_catalog.get_many(ids, self._fetch_heritage_records)
         except Exception as e:
             logger.error(f"查询非遗失败: {e}")
             return []
@@ -96,22 +109,142 @@ class QueryMixin:
         results = self.query_heritage_by_ids([heritage_id])
         return results[0] if results else None
 
+    def query_heritage_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """按名称精确查询非遗项目（仅查目录快照）"""
+        if not self.driver or not name or self.heritage_catalog is None:
+            return None
+        if not self.heritage_catalog.is_fresh():
+            self.load_heritage_catalog()
+        return self.heritage_catalog.get_by_name(name.strip())
+
+    # ──────────────────────────────
+    # 目录快照
+    # ──────────────────────────────
+
+    def load_heritage_catalog(self) -> int:
+        """全量加载非遗目录快照，返回条数；失败时保持原快照"""
+        if not self.driver or self.heritage_catalog is None:
+            return 0
+        try:
+            records = self._fetch_heritage_records()
+        except Exception as e:
+            logger.warning(f"加载非遗目录快照失败: {e}")
+            return 0
+        self.heritage_catalog.load(records)
+        logger.info(f"非遗目录快照已加载: {len(records)} 条")
+        return len(records)
+
+    def get_catalog_stats(self) -> Dict[str, Any]:
+        if self.heritage_catalog is None:
+            return {}
+        return self.heritage_catalog.get_stats()
+
+    _heritage_generation: int = 0
+
+    def get_heritage_generation(self) -> int:
+        """Heritage 数据代数：每次 Heritage 写入或 RELATED_TO 重建后递增，供上层缓存判断是否过期"""
+        return self._heritage_generation
+
+    def _heritage_changed(self, heritage_ids: Optional[List] = None):
+        """Heritage 写入后调用：失效目录快照、档案缓存、邻近空间索引、Region 层级索引与相关非遗邻接表，不传 ids 表示全部失效"""
+        self._heritage_generation += 1
+        if self.heritage_catalog is not None:
+            self.heritage_catalog.invalidate(heritage_ids)
+        self.invalidate_dossiers(heritage_ids)
+        self.invalidate_nearby_index()
+        self.invalidate_region_index()
+        self.invalidate_related_index()
+
     # ──────────────────────────────
     # 关联查询
     # ──────────────────────────────
 
+    _related_index_lock = threading.Lock()
+    _related_cache: Optional[Tuple[Any, float]] = None
+    _related_index_version: int = 0
+
+    def invalidate_related_index(self):
+        """RELATED_TO 边变更后调用，下一次查询时从图谱重新加载邻接表"""
+        with self._related_index_lock:
+            self._related_index_version += 1
+            self._related_cache = None
+
+    def _set_related_index(self, index):
+        """预计算完成后直接替换邻接表，免去一次回读"""
+        self._heritage_generation += 1
+        with self._related_index_lock:
+            self._related_index_version += 1
+            self._related_cache = (index, time.time())
+
+    def _get_related_index(self):
+        """取相关非遗邻接表 (RelatedIndex)，过期或失效时从 RELATED_TO 边加载；不可用时返回 None"""
+        from Agent.config.settings import config
+        from .related import RelatedIndex, RELATED_EDGES_QUERY
+
+        cache = self._related_cache
+        if cache and time.time() - cache[1] < config.KG_RELATED_INDEX_TTL:
+            return cache[0]
+        if not self.driver:
+            return None
+
+        version = self._related_index_version
+        try:
+            with self.driver.session() as session:
+                rows = [dict(record) for record in session.run(RELATED_EDGES_QUERY)]
+        except Exception as e:
+            logger.warning(f"加载相关非遗邻接表失败: {e}")
+            return None
+        index = RelatedIndex(rows, config.KG_RELATED_TOP_K)
+        with self._related_index_lock:
+            if version == self._related_index_version:
+                self._related_cache = (index, time.time())
+        logger.debug(f"相关非遗邻接表已加载: {len(index)} 个非遗, {index.edge_count()} 条边")
+        return index
+
+    def get_related_index_stats(self) -> Dict[str, Any]:
+        cache = self._related_cache
+        if not cache:
+            return {'ready': False}
+        return {
+            'ready': True,
+            'heritages': len(cache[0]),
+            'edges': cache[0].edge_count(),
+            'top_k': cache[0].top_k,
+            'age_seconds': round(time.time() - cache[1], 1),
+        }
+
     def query_related_heritage(self, heritage_id: int, limit: int = 5,
                                 relation_type: str = None) -> List[Dict[str, Any]]:
         """查询相关非遗项目
 
+        优先读预计算的 RELATED_TO 邻接表（按综合得分排序，附 score）；
+        该非遗尚未预计算，或按类型过滤后被 top-K 截断时回退实时 Cypher。
+
         Args:
             heritage_id: 非遗项目 ID
             limit: 返回数量
-            relation_type: "category" / "region" / "level" 或 None(全部)
+            relation_type: "category" / "region" / "level" / "dynasty" 或 None(全部)
         """
         if not self.driver:
             return []
 
+        index = self._get_related_index()
+        if index is not None and heritage_id in index:
+            hits, complete = index.lookup(heritage_id, relation_type, limit)
+            if complete:
+                records = {r['id']: r for r in self.query_heritage_by_ids([hid for hid, _ in hits])}
+                return [
+                    {'id': hid, 'name': records[hid].get('name'),
+                     'category': records[hid].get('category'), 'region': records[hid].get('region'),
+                     'level': records[hid].get('level'),
+                     'description': records[hid].get('description'), 'score': score}
+                    for hid, score in hits if hid in records
+                ]
+        return self._query_related_heritage_live(heritage_id, limit, relation_type)
+
+    def _query_related_heritage_live(self, heritage_id: int, limit: int,
+                                     relation_type: str = None) -> List[Dict[str, Any]]:
+        """实时 Cypher 查询相关非遗（未预计算时使用）"""
         try:
             with self.driver.session() as session:
                 if relation_type == "category":
@@ -138,6 +271,14 @@ class QueryMixin:
                                h2.region as region, h2.level as level, h2.description as description
                         LIMIT $limit
                     """
+                elif relation_type == "dynasty":
+                    query = """
+                        MATCH (h1:Heritage {id: $id})-[:ORIGINATED_IN]->(d:Dynasty)<-[:ORIGINATED_IN]-(h2:Heritage)
+                        WHERE h1 <> h2
+                        RETURN DISTINCT h2.id as id, h2.name as name, h2.category as category,
+                               h2.region as region, h2.level as level, h2.description as description
+                        LIMIT $limit
+                    """
                 else:
                     query = """
                         MATCH (h1:Heritage {id: $id})-[]-(h2:Heritage)
@@ -157,6 +298,120 @@ class QueryMixin:
             logger.error(f"查询相关非遗失败: {e}")
             return []
 
+    # ──────────────────────────────
+    # 关键词检索（全文索引）
+    # ──────────────────────────────
+
+    # Heritage 全文索引名与覆盖字段，CJK 分析器按二元组切分中文
+    FULLTEXT_INDEX = 'heritage_fulltext'
+    FULLTEXT_FIELDS = ('name', 'category', 'region', 'description')
+
+    _fulltext_ready: bool = False
+
+    # Lucene 查询语法保留字符
+    _LUCENE_SPECIAL = set('+-&|!(){}[]^"~*?:\\/')
+
+    # 检索结果的关系扩展（RAG 需要类别 / 地区 / 级别锚定）
+    _KEYWORD_EXPAND = """
+        OPTIONAL MATCH (h)-[:BELONGS_TO]->(c:Category)
+        OPTIONAL MATCH (h)-[:LOCATED_AT]->(r:Region)
+        OPTIONAL MATCH (h)-[:HAS_LEVEL]->(l:Level)
+        WITH h, score,
+             collect(DISTINCT c.name) AS related_categories,
+             collect(DISTINCT r.name) AS related_regions,
+             collect(DISTINCT l.name) AS related_levels
+    """
+
+    def ensure_fulltext_index(self) -> bool:
+        """创建 Heritage 全文索引（已存在时跳过），写入由 Neo4j 自动维护"""
+        if not self.driver:
+            return False
+        fields = ', '.join(f'h.{f}' for f in self.FULLTEXT_FIELDS)
+        try:
+            with self.driver.session() as session:
+                session.run(
+                    f"CREATE FULLTEXT INDEX {self.FULLTEXT_INDEX} IF NOT EXISTS "
+                    f"FOR (h:Heritage) ON EACH [{fields}] "
+                    f"OPTIONS {{indexConfig: {{`fulltext.analyzer`: 'cjk'}}}}"
+                ).consume()
+            self._fulltext_ready = True
+            logger.info(f"全文索引就绪: {self.FULLTEXT_INDEX}")
+        except Exception as e:
+            self._fulltext_ready = False
+            logger.warning(f"创建全文索引失败，关键词检索回退为 CONTAINS 扫描: {e}")
+        return self._fulltext_ready
+
+    @classmethod
+    def _escape_lucene(cls, text: str) -> str:
+        return ''.join('\\' + ch if ch in cls._LUCENE_SPECIAL else ch for ch in text)
+
+    def _keyword_query(self, keyword: str, limit: int, region: str, category: str,
+                       expand_relations: bool, use_fulltext: bool) -> Tuple[str, Dict[str, Any]]:
+        """拼装关键词检索 Cypher 与参数（同步 / 异步接口共用）"""
+        keyword = keyword.strip()
+        filters = []
+        if region:
+            filters.append("h.region CONTAINS $region")
+        if category:
+            filters.append("h.category CONTAINS $category")
+
+        if use_fulltext and self._fulltext_ready:
+            source = (
+                f"CALL db.index.fulltext.queryNodes('{self.FULLTEXT_INDEX}', $query) "
+                f"YIELD node AS h, score "
+            )
+            if filters:
+                source += "WHERE " + " AND ".join(filters) + " "
+        else:
+            conditions = ' OR '.join(f'h.{f} CONTAINS $kw' for f in self.FULLTEXT_FIELDS)
+            source = f"MATCH (h:Heritage) WHERE ({conditions}) "
+            if filters:
+                source += "AND " + " AND ".join(filters) + " "
+            source += "WITH h, null AS score "
+
+        returns = (
+            "RETURN h.id AS id, h.name AS name, h.category AS category, "
+            "h.region AS region, h.level AS level, h.description AS description, score"
+        )
+        if expand_relations:
+            cypher = (source + self._KEYWORD_EXPAND + returns +
+                      ", related_categories, related_regions, related_levels ")
+        else:
+            cypher = source + returns + " "
+        cypher += "ORDER BY score DESC LIMIT $limit"
+        params = {'query': self._escape_lucene(keyword), 'kw': keyword,
+                  'region': region, 'category': category, 'limit': limit}
+        return cypher, params
+
+    def search_heritage_by_keyword(self, keyword: str, limit: int = 10,
+                                   region: str = None, category: str = None,
+                                   expand_relations: bool = False,
+                                   use_fulltext: bool = True) -> List[Dict[str, Any]]:
+        """关键词检索非遗，按相关度降序
+
+        全文索引可用时走 db.index.fulltext.queryNodes（带 score），
+        否则回退为 name/category/region/description 的 CONTAINS 扫描（score 为 None）。
+
+        Args:
+            keyword: 检索词
+            limit: 返回数量
+            region / category: 结果过滤（包含匹配）
+            expand_relations: 附带 related_categories / related_regions / related_levels
+            use_fulltext: False 时强制走 CONTAINS 路径（基准对比用）
+        """
+        if not self.driver or not keyword or not keyword.strip():
+            return []
+
+        cypher, params = self._keyword_query(
+            keyword, limit, region, category, expand_relations, use_fulltext)
+        try:
+            with self.driver.session() as session:
+                result = session.run(cypher, **params)
+                return [dict(record) for record in result]
+        except Exception as e:
+            logger.error(f"关键词检索非遗失败: {e}")
+            return []
+
     # ──────────────────────────────
     # 维度查询
     # ──────────────────────────────
@@ -233,6 +488,76 @@ class QueryMixin:
             logger.error(f"查询级别非遗失败: {e}")
             return []
 
+    # ──────────────────────────────
+    # 邻近空间索引（内存缓存）
+    # ──────────────────────────────
+
+    _nearby_index_lock = threading.Lock()
+    _nearby_cache: Optional[Tuple[Any, Dict[Any, Dict[str, Any]], float]] = None
+    _nearby_index_version: int = 0
+
+    def invalidate_nearby_index(self):
+        """坐标数据变更后调用，下一次邻近查询时重建索引"""
+        with self._nearby_index_lock:
+            self._nearby_index_version += 1
+            self._nearby_cache = None
+
+    def refresh_nearby_index(self) -> int:
+        """立即重建邻近空间索引，返回索引条数"""
+        self.invalidate_nearby_index()
+        index = self._get_nearby_index()
+        return len(index[0]) if index else 0
+
+    def _fresh_nearby_index(self) -> Optional[Tuple[Any, Dict[Any, Dict[str, Any]]]]:
+        """仅取未过期的缓存索引，不触发重建"""
+        from Agent.config.settings import config
+
+        cache = self._nearby_cache
+        if cache and time.time() - cache[2] < config.KG_NEARBY_INDEX_TTL:
+            return cache[0], cache[1]
+        return None
+
+    def _get_nearby_index(self) -> Optional[Tuple[Any, Dict[Any, Dict[str, Any]]]]:
+        """取邻近空间索引 (GridSpatialIndex, {id: item})，过期或失效时从图谱重建"""
+        from .spatial import GridSpatialIndex
+
+        cached = self._fresh_nearby_index()
+        if cached:
+            return cached
+        if not self.driver:
+            return None
+
+        version = self._nearby_index_version
+        heritages = self.get_all_heritages_with_coordinates()
+        if not heritages:
+            return None
+        index = GridSpatialIndex(heritages)
+        by_id = {item['id']: item for item in index.items}
+        with self._nearby_index_lock:
+            # 构建期间数据又被修改时只用于本次查询，不写入缓存
+            if version == self._nearby_index_version:
+                self._nearby_cache = (index, by_id, time.time())
+        logger.debug(f"邻近空间索引已重建: {len(index)} 个非遗")
+        return index, by_id
+
+    def get_nearby_index_stats(self) -> Dict[str, Any]:
+        cache = self._nearby_cache
+        if not cache:
+            return {'ready': False, 'size': 0}
+        return {
+            'ready': True,
+            'size': len(cache[0]),
+            'age_seconds': round(time.time() - cache[2], 1),
+        }
+
+    @staticmethod
+    def _with_distance(hits: List[Tuple[Dict[str, Any], float]],
+                       exclude: Any = None) -> List[Dict[str, Any]]:
+        return [
+            {**item, 'distance_km': round(distance, 2)}
+            for item, distance in hits if item['id'] != exclude
+        ]
+
     # ──────────────────────────────
     # 邻近查询
     # ──────────────────────────────
@@ -240,53 +565,79 @@ class QueryMixin:
     def query_nearby_heritages(self, latitude: float, longitude: float,
                                 max_distance_km: float = 50,
                                 limit: int = 10) -> List[Dict[str, Any]]:
-        """根据坐标查询附近的非遗项目（内存 Haversine 计算）"""
+        """根据坐标查询半径内的非遗项目（内存空间索引）"""
         if not self.driver:
             return []
 
         try:
-            heritages = self.get_all_heritages_with_coordinates()
+            index = self._get_nearby_index()
+            if not index:
+                return []
+            return self._with_distance(
+                index[0].query_radius(latitude, longitude, max_distance_km, limit=limit))
+
+        except Exception as e:
+            logger.error(f"查询附近非遗失败: {e}")
+            return []
 
-            nearby = []
-            for h in heritages:
-                distance = self.calculate_distance(
-                    latitude, longitude,
-                    h['latitude'], h['longitude']
-                )
-                if distance <= max_distance_km:
-                    h['distance_km'] = round(distance, 2)
-                    nearby.append(h)
+    def query_nearest_heritages(self, latitude: float, longitude: float,
+                                k: int = 5,
+                                max_distance_km: float = None) -> List[Dict[str, Any]]:
+        """根据坐标查询最近的 k 个非遗项目（内存空间索引），可选距离上限"""
+        if not self.driver:
+            return []
 
-            nearby.sort(key=lambda x: x['distance_km'])
-            return nearby[:limit]
+        try:
+            index = self._get_nearby_index()
+            if not index:
+                return []
+            return self._with_distance(
+                index[0].query_knn(latitude, longitude, k, max_km=max_distance_km))
 
         except Exception as e:
-            logger.error(f"查询附近非遗失败: {e}")
+            logger.error(f"查询最近非遗失败: {e}")
             return []
 
+    _NEAR_BY_ID_QUERY = """
+        MATCH (h1:Heritage {id: $id})-[n:NEAR]-(h2:Heritage)
+        WHERE n.distance_km <= $max_distance
+        RETURN h2.id as id, h2.name as name, h2.region as region,
+               h2.category as category, h2.level as level,
+               n.distance_km as distance_km
+        ORDER BY n.distance_km
+        LIMIT $limit
+    """
+
+    def _nearby_from_index(self, index, heritage_id: int, max_distance_km: float,
+                           limit: int) -> Optional[List[Dict[str, Any]]]:
+        """用空间索引做 k 近邻；索引中没有该非遗（无坐标）时返回 None"""
+        origin = index[1].get(heritage_id) if index else None
+        if not origin:
+            return None
+        hits = index[0].query_knn(origin['latitude'], origin['longitude'],
+                                  limit + 1, max_km=max_distance_km)
+        return self._with_distance(hits, exclude=heritage_id)[:limit]
+
     def query_nearby_heritages_by_id(self, heritage_id: int,
                                       max_distance_km: float = 100,
                                       limit: int = 5) -> List[Dict[str, Any]]:
-        """根据已有 NEAR 关系查询附近非遗（图查询，免计算）"""
+        """查询某个非遗附近的其他非遗
+
+        优先用内存空间索引做 k 近邻；索引中没有该非遗（无坐标）时回退到 NEAR 关系图查询。
+        """
         if not self.driver:
             return []
 
         try:
-            with self.driver.session() as session:
-                result = session.run("""
-                    MATCH (h1:Heritage {id: $id})-[n:NEAR]->(h2:Heritage)
-                    WHERE n.distance_km <= $max_distance
-                    RETURN h2.id as id, h2.name as name, h2.region as region,
-                           h2.category as category, h2.level as level,
-                           n.distance_km as distance_km
-                    ORDER BY n.distance_km
-                    LIMIT $limit
-                """, id=heritage_id, max_distance=max_distance_km, limit=limit)
-
-                nearby = []
-                for record in result:
-                    nearby.append(dict(record))
+            nearby = self._nearby_from_index(
+                self._get_nearby_index(), heritage_id, max_distance_km, limit)
+            if nearby is not None:
                 return nearby
+
+            with self.driver.session() as session:
+                result = session.run(self._NEAR_BY_ID_QUERY, id=heritage_id,
+                                     max_distance=max_distance_km, limit=limit)
+                return [dict(record) for record in result]
         except Exception as e:
             logger.error(f"查询附近非遗失败: {e}")
             return []
@@ -296,6 +647,10 @@ class QueryMixin:
         if not self.driver:
             return []
 
+        index = self._get_region_index()
+        if index is not None:
+            return index.nearby(region, distance_km)
+
         try:
             with self.driver.session() as session:
                 result = session.run("""
@@ -381,6 +736,68 @@ class QueryMixin:
             logger.error(f"查询非遗朝代失败: {e}")
             return []
 
+    # ──────────────────────────────
+    # Region 层级索引（内存物化）
+    # ──────────────────────────────
+
+    _region_index_lock = threading.Lock()
+    _region_cache: Optional[Tuple[Any, float]] = None
+    _region_index_version: int = 0
+
+    def invalidate_region_index(self):
+        """Region / PART_OF / LOCATED_AT / Region NEAR 变更后调用，下一次层级查询时重建"""
+        with self._region_index_lock:
+            self._region_index_version += 1
+            self._region_cache = None
+
+    def refresh_region_index(self) -> int:
+        """立即重建 Region 层级索引，返回地区数"""
+        self.invalidate_region_index()
+        index = self._get_region_index()
+        return len(index) if index else 0
+
+    def _get_region_index(self):
+        """取 Region 层级索引 (RegionIndex)，过期或失效时从图谱重建；不可用时返回 None"""
+        from Agent.config.settings import config
+        from .region_index import RegionIndex, REGION_INDEX_QUERY
+
+        cache = self._region_cache
+        if cache and time.time() - cache[1] < config.KG_REGION_INDEX_TTL:
+            return cache[0]
+        if not self.driver:
+            return None
+
+        version = self._region_index_version
+        try:
+            with self.driver.session() as session:
+                records = [dict(record) for record in session.run(REGION_INDEX_QUERY)]
+        except Exception as e:
+            logger.warning(f"加载 Region 层级索引失败: {e}")
+            return None
+        index = RegionIndex(records)
+        with self._region_index_lock:
+            if version == self._region_index_version:
+                self._region_cache = (index, time.time())
+        logger.debug(f"Region 层级索引已重建: {index.get_stats()}")
+        return index
+
+    def get_region_index_stats(self) -> Dict[str, Any]:
+        cache = self._region_cache
+        if not cache:
+            return {'ready': False}
+        return {'ready': True, **cache[0].get_stats(),
+                'age_seconds': round(time.time() - cache[1], 1)}
+
+    def get_valid_regions(self) -> set:
+        """关联了非遗的地区名集合"""
+        index = self._get_region_index()
+        return index.valid_regions() if index else set()
+
+    def match_region_name(self, input_name: str) -> Optional[str]:
+        """把用户输入的地区名对齐到关联了非遗的 Region，无匹配时返回 None"""
+        index = self._get_region_index()
+        return index.match_name(input_name) if index else None
+
     # ──────────────────────────────
     # Region 层级查询
     # ──────────────────────────────
@@ -393,12 +810,15 @@ class QueryMixin:
         if not self.driver:
             return []
 
+        index = self._get_region_index()
+        if index is not None:
+            return index.heritages_under(region, limit)
+
         try:
             with self.driver.session() as session:
                 result = session.run("""
-                    MATCH (h:Heritage)-[:LOCATED_AT]->(r:Region)
-                    OPTIONAL MATCH (r)-[:PART_OF*0..2]->(parent:Region)
-                    WHERE parent.name = $region OR r.name = $region
+                    MATCH (r:Region)-[:PART_OF*0..2]->(:Region {name: $region})
+                    MATCH (h:Heritage)-[:LOCATED_AT]->(r)
                     RETURN DISTINCT h.id as id, h.name as name, h.category as category,
                            h.level as level, r.name as region_name
                     ORDER BY h.name
@@ -415,10 +835,14 @@ class QueryMixin:
         if not self.driver:
             return []
 
+        index = self._get_region_index()
+        if index is not None:
+            return index.tree(region_name)
+
         try:
             with self.driver.session() as session:
                 result = session.run("""
-                    MATCH (r:Region {name: $name})-[rel:PART_OF*0..1]->(child:Region)
+                    MATCH (child:Region)-[:PART_OF*0..1]->(r:Region {name: $name})
                     OPTIONAL MATCH (h:Heritage)-[:LOCATED_AT]->(child)
                     RETURN child.name as name, child.level as level,
                            count(DISTINCT h) as heritage_count
@@ -434,6 +858,30 @@ class QueryMixin:
     # 传承人查询
     # ──────────────────────────────
 
+    _INHERITORS_QUERY = """
+        MATCH (h:Heritage {id: $id})-[:HAS_INHERITOR]->(i:Inheritor)
+        OPTIONAL MATCH (i)-[:STUDIED_UNDER]->(teacher:Inheritor)
+        OPTIONAL MATCH (student:Inheritor)-[:STUDIED_UNDER]->(i)
+        RETURN i.name as name,
+               COALESCE(i.level, '') as level,
+               i.birth_year as birth_year,
+               COALESCE(i.status, '') as status,
+               COALESCE(i.gender, '') as gender,
+               i.generation as generation,
+               COALESCE(i.bio, '') as bio,
+               COALESCE(teacher.name, '') as teacher,
+               collect(DISTINCT student.name) as students
+        ORDER BY i.generation, i.name
+    """
+
+    @staticmethod
+    def _clean_inheritors(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        inheritors = []
+        for inh in records:
+            inh['students'] = [s for s in inh.get('students') or [] if s]
+            inheritors.append(inh)
+        return inheritors
+
     def query_inheritors_by_heritage(self, heritage_id: int) -> List[Dict[str, Any]]:
         """查询指定非遗项目的所有传承人（含师承关系）
 
@@ -444,47 +892,152 @@ class QueryMixin:
 
         try:
             with self.driver.session() as session:
-                result = session.run("""
-                    MATCH (h:Heritage {id: $id})-[:HAS_INHERITOR]->(i:Inheritor)
-                    OPTIONAL MATCH (i)-[:STUDIED_UNDER]->(teacher:Inheritor)
-                    OPTIONAL MATCH (student:Inheritor)-[:STUDIED_UNDER]->(i)
-                    RETURN i.name as name,
-                           COALESCE(i.level, '') as level,
-                           i.birth_year as birth_year,
-                           COALESCE(i.status, '') as status,
-                           COALESCE(i.gender, '') as gender,
-                           i.generation as generation,
-                           COALESCE(i.bio, '') as bio,
-                           COALESCE(teacher.name, '') as teacher,
-                           collect(DISTINCT student.name) as students
-                    ORDER BY i.generation, i.name
-                """, id=heritage_id)
-
-                inheritors = []
-                for record in result:
-                    inh = dict(record)
-                    if inh.get('students'):
-                        inh['students'] = [s for s in inh['students'] if s]
-                    else:
-                        inh['students'] = []
-                    inheritors.append(inh)
-                return inheritors
+                result = session.run(self._INHERITORS_QUERY, id=heritage_id)
+                return self._clean_inheritors([dict(record) for record in result])
         except Exception as e:
             logger.error(f"查询传承人失败 (heritage_id={heritage_id}): {e}")
             return []
 
+    # ──────────────────────────────
+    # 非遗档案（单次往返）
+    # ──────────────────────────────
+
+    # 档案中邻近项目的最大条数（缓存按此上限计算，请求时再截断）
+    DOSSIER_NEARBY_MAX = 10
+    # 档案缓存的邻近半径下限（km）：按不小于该半径取邻近项目并记入缓存，
+    # 更小半径的请求从中按距离过滤，更大半径的请求视为未命中并以其半径重新缓存
+    DOSSIER_NEARBY_RADIUS_KM = 100
+
+    # 节点 + 传承人（含师承）+ 朝代 + NEAR 邻近，各子查询聚合为列表，一条语句返回
+    _DOSSIER_QUERY = f"""
+        MATCH (h:Heritage {{id: $id}})
+        CALL {{
+            WITH h
+            MATCH (h)-[:HAS_INHERITOR]->(i:Inheritor)
+            OPTIONAL MATCH (i)-[:STUDIED_UNDER]->(teacher:Inheritor)
+            OPTIONAL MATCH (student:Inheritor)-[:STUDIED_UNDER]->(i)
+            WITH i, teacher, collect(DISTINCT student.name) AS students
+            ORDER BY i.generation, i.name
+            RETURN collect({{
+                name: i.name, level: COALESCE(i.level, ''), birth_year: i.birth_year,
+                status: COALESCE(i.status, ''), gender: COALESCE(i.gender, ''),
+                generation: i.generation, bio: COALESCE(i.bio, ''),
+                teacher: COALESCE(teacher.name, ''), students: students
+            }}) AS inheritors
+        }}
+        CALL {{
+            WITH h
+            MATCH (h)-[:ORIGINATED_IN]->(d:Dynasty)
+            WITH d ORDER BY d.start_year
+            RETURN collect({{
+                name: d.name, start_year: d.start_year, end_year: d.end_year, capital: d.capital
+            }}) AS dynasties
+        }}
+        CALL {{
+            WITH h
+            MATCH (h)-[n:NEAR]-(h2:Heritage)
+            WHERE n.distance_km <= $max_distance
+            WITH h2, n ORDER BY n.distance_km LIMIT $nearby_limit
+            RETURN collect({{
+                id: h2.id, name: h2.name, region: h2.region, category: h2.category,
+                level: h2.level, distance_km: n.distance_km
+            }}) AS near_edges
+        }}
+        RETURN {_HERITAGE_RECORD_MAP} AS heritage, inheritors, dynasties, near_edges
+    """
+
+    heritage_dossier_cache: Optional[HeritageDossierCache] = None
+
+    def _build_dossier(self, heritage_id: int, record: Dict[str, Any],
+                       max_distance_km: float) -> Dict[str, Any]:
+        """整理档案查询结果；邻近项目优先取内存空间索引（与 query_nearby_heritages_by_id 一致）"""
+        nearby = self._nearby_from_index(
+            self._fresh_nearby_index(), heritage_id, max_distance_km, self.DOSSIER_NEARBY_MAX)
+        return {
+            'heritage': record['heritage'],
+            'inheritors': self._clean_inheritors(list(record['inheritors'])),
+            'dynasties': list(record['dynasties']),
+            'nearby_heritages': nearby if nearby is not None else list(record['near_edges']),
+            'nearby_radius_km': max_distance_km,
+        }
+
+    def _dossier_radius(self, max_distance_km: float) -> float:
+        return max(max_distance_km, self.DOSSIER_NEARBY_RADIUS_KM)
+
+    def _cached_dossier(self, heritage_id: int, max_distance_km: float) -> Optional[Dict[str, Any]]:
+        """取缓存档案；缓存时的邻近半径小于本次请求时视为未命中"""
+        cache = self.heritage_dossier_cache
+        dossier = cache.get(heritage_id) if cache else None
+        if dossier is None or dossier.get('nearby_radius_km', 0) < max_distance_km:
+            return None
+        return dossier
+
+    @staticmethod
+    def _trim_dossier(dossier: Dict[str, Any], nearby_limit: int,
+                      max_distance_km: float) -> Dict[str, Any]:
+        """按本次请求的半径与条数截取邻近项目（缓存中的列表按距离升序）"""
+        dossier.pop('nearby_radius_km', None)
+        dossier['nearby_heritages'] = [
+            item for item in dossier['nearby_heritages']
+            if (item.get('distance_km') or 0) <= max_distance_km
+        ][:nearby_limit]
+        return dossier
+
+    def query_heritage_dossier(self, heritage_id: int, nearby_limit: int = 3,
+                               max_distance_km: float = 100) -> Optional[Dict[str, Any]]:
+        """一次往返取非遗详情档案（带缓存）
+
+        Returns:
+            {heritage, inheritors, dynasties, nearby_heritages}；非遗不存在或查询失败时返回 None
+        """
+        if not self.driver:
+            return None
+
+        dossier = self._cached_dossier(heritage_id, max_distance_km)
+        if dossier is not None:
+            return self._trim_dossier(dossier, nearby_limit, max_distance_km)
+
+        radius = self._dossier_radius(max_distance_km)
+        try:
+            with self.driver.session() as session:
+                record = session.run(
+                    self._DOSSIER_QUERY, id=heritage_id, max_distance=radius,
+                    nearby_limit=self.DOSSIER_NEARBY_MAX).single()
+        except Exception as e:
+            logger.error(f"查询非遗档案失败 (heritage_id={heritage_id}): {e}")
+            return None
+        if record is None:
+            return None
+
+        dossier = self._build_dossier(heritage_id, dict(record), radius)
+        if self.heritage_dossier_cache:
+            self.heritage_dossier_cache.put(heritage_id, dossier)
+        return self._trim_dossier(dossier, nearby_limit, max_distance_km)
+
+    def invalidate_dossiers(self, heritage_ids: Optional[List] = None):
+        """传承人 / 朝代 / NEAR 等关联变更后调用，不传 ids 表示全部失效"""
+        if self.heritage_dossier_cache is not None:
+            self.heritage_dossier_cache.invalidate(heritage_ids)
+
+    def get_dossier_cache_stats(self) -> Dict[str, Any]:
+        if self.heritage_dossier_cache is None:
+            return {}
+        return self.heritage_dossier_cache.get_stats()
+
     # ──────────────────────────────
     # 附加关系
     # ──────────────────────────────
 
     def add_heritage_relation(self, from_id: int, to_id: int,
                                similarity: float = 0.5) -> bool:
-        """添加非遗项目之间的 RELATED_TO 关系"""
+        """添加非遗项目之间的 RELATED_TO 关系（标记为手工边，预计算重算时保留）"""
         return self._merge_relation('Heritage', from_id, 'RELATED_TO',
-                                    'Heritage', to_id, {'similarity': similarity})
+                                    'Heritage', to_id, {'similarity': similarity, 'source': 'manual'})
 
     def add_region_near_relation(self, region1: str, region2: str,
                                   distance_km: float) -> bool:
         """添加地区邻近关系"""
-        return self._merge_relation('Region', region1, 'NEAR',
-                                    'Region', region2, {'distance_km': distance_km})
+        ok = self._merge_relation('Region', region1, 'NEAR',
+                                  'Region', region2, {'distance_km': distance_km})
+        self.invalidate_region_index()
+        return ok
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Region 层级内存索引
+Region 节点只有数十个，PART_OF 层级与 LOCATED_AT 关联只在同步时变化，
+层级查询却每次都在 Cypher 中做变长路径展开。本模块把一次性读出的
+Region / PART_OF / LOCATED_AT / Region NEAR 物化为:
+  - 父子表与祖先 / 后代闭包（变长 PART_OF 展开 → 集合查表）
+  - 地区 → 直接关联非遗 ID 的倒排表，以及非遗摘要
+  - 地区邻近表（按距离排序）
+使地区范围内的查询成为进程内集合运算。
+"""
+
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Iterable, Set, FrozenSet
+
+# 全部 Region 及其父节点 / 直接关联非遗 / NEAR 邻居，单次往返读出
+REGION_INDEX_QUERY = """
+    MATCH (r:Region)
+    WHERE r.name IS NOT NULL
+    RETURN r.name AS name, r.level AS level,
+           [(r)-[:PART_OF]->(p:Region) | p.name] AS parents,
+           [(h:Heritage)-[:LOCATED_AT]->(r) | h {.id, .name, .category, .level}] AS heritages,
+           [(r)-[n:NEAR]->(r2:Region) | {name: r2.name, distance_km: n.distance_km}] AS near
+"""
+
+
+def match_region_name(input_name: str, candidates: Iterable[str]) -> Optional[str]:
+    """把用户输入的地区名对齐到已有 Region：精确 → 前缀互含 → 逐位重合率 > 0.7"""
+    if not input_name:
+        return None
+    candidates = candidates if isinstance(candidates, (list, tuple)) else sorted(candidates)
+    if input_name in candidates:
+        return input_name
+    for vr in candidates:
+        if vr.startswith(input_name) or input_name.startswith(vr):
+            return vr
+    for vr in candidates:
+        common = sum(1 for a, b in zip(input_name, vr) if a == b)
+        min_len = min(len(input_name), len(vr))
+        if min_len > 0 and common / min_len > 0.7:
+            return vr
+    return None
+
+
+class RegionIndex:
+    """Region 层级物化视图（构建后只读，可跨线程共享）"""
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        """
+        Args:
+            records: REGION_INDEX_QUERY 的结果行
+        """
+        self.levels: Dict[str, Optional[str]] = {}
+        self.parents: Dict[str, Set[str]] = defaultdict(set)
+        self.children: Dict[str, Set[str]] = defaultdict(set)
+        self.postings: Dict[str, FrozenSet] = {}
+        self.heritages: Dict[Any, Dict[str, Any]] = {}
+        self.near: Dict[str, List[tuple]] = {}
+
+        for rec in records:
+            name = rec['name']
+            self.levels[name] = rec.get('level')
+            for parent in rec.get('parents') or ():
+                if parent and parent != name:
+                    self.parents[name].add(parent)
+                    self.children[parent].add(name)
+            ids = set()
+            for h in rec.get('heritages') or ():
+                if h.get('id') is None:
+                    continue
+                ids.add(h['id'])
+                self.heritages.setdefault(h['id'], h)
+            self.postings[name] = frozenset(ids)
+            near = [(n['name'], n['distance_km']) for n in rec.get('near') or ()
+                    if n.get('name') and n.get('distance_km') is not None]
+            self.near[name] = sorted(near, key=lambda x: x[1])
+
+        self.ancestors: Dict[str, FrozenSet[str]] = {
+            name: self._closure(name, self.parents) for name in self.levels}
+        self.descendants: Dict[str, FrozenSet[str]] = {
+            name: self._closure(name, self.children) for name in self.levels}
+        self._valid = sorted(name for name, ids in self.postings.items() if ids)
+
+    @staticmethod
+    def _closure(start: str, edges: Dict[str, Set[str]]) -> FrozenSet[str]:
+        """沿 edges 的传递闭包（不含自身，容忍环）"""
+        seen: Set[str] = set()
+        stack = list(edges.get(start, ()))
+        while stack:
+            node = stack.pop()
+            if node in seen or node == start:
+                continue
+            seen.add(node)
+            stack.extend(edges.get(node, ()))
+        return frozenset(seen)
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def __contains__(self, region: str) -> bool:
+        return region in self.levels
+
+    # ──────────────────────────────
+    # 地区集合
+    # ──────────────────────────────
+
+    def valid_regions(self) -> Set[str]:
+        """至少关联一个非遗的地区名"""
+        return set(self._valid)
+
+    def match_name(self, input_name: str) -> Optional[str]:
+        """把输入对齐到有非遗关联的地区名"""
+        return match_region_name(input_name, self._valid)
+
+    def subtree(self, region: str) -> FrozenSet[str]:
+        """地区自身及全部下属地区"""
+        if region not in self.levels:
+            return frozenset()
+        return self.descendants[region] | {region}
+
+    def heritage_ids_under(self, region: str) -> Set:
+        """地区及下属地区直接关联的非遗 ID 并集"""
+        ids = set()
+        for name in self.subtree(region):
+            ids |= self.postings.get(name, frozenset())
+        return ids
+
+    # ──────────────────────────────
+    # 查询结果（与对应 Cypher 的返回字段一致）
+    # ──────────────────────────────
+
+    def heritages_under(self, region: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """地区及下属地区的非遗，每个 (非遗, 关联地区) 一行，按非遗名称排序"""
+        rows = []
+        for name in self.subtree(region):
+            for hid in self.postings.get(name, ()):
+                h = self.heritages[hid]
+                rows.append({'id': hid, 'name': h.get('name'), 'category': h.get('category'),
+                             'level': h.get('level'), 'region_name': name})
+        rows.sort(key=lambda r: (r['name'] is None, r['name'] or '', r['region_name']))
+        return rows[:limit]
+
+    def tree(self, region: str) -> List[Dict[str, Any]]:
+        """地区自身及直接下属地区，附各自直接关联的非遗数量"""
+        if region not in self.levels:
+            return []
+        rows = [
+            {'name': name, 'level': self.levels.get(name),
+             'heritage_count': len(self.postings.get(name, ()))}
+            for name in {region} | self.children.get(region, set())
+        ]
+        rows.sort(key=lambda r: (r['level'] is None, r['level'] or '', r['name']))
+        return rows
+
+    def nearby(self, region: str, distance_km: float = 100) -> List[str]:
+        """按距离排序的邻近地区名"""
+        return [name for name, distance in self.near.get(region, ()) if distance <= distance_km]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'regions': len(self.levels),
+            'part_of_edges': sum(len(p) for p in self.parents.values()),
+            'regions_with_heritage': len(self._valid),
+            'heritages': len(self.heritages),
+            'near_edges': sum(len(n) for n in self.near.values()),
+        }
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+相关非遗预计算
+同步时对全部非遗两两打分（共享类别 / 地区 / 级别 / 朝代 + 知识向量余弦相似度），
+每个非遗只保留 top-K 邻居，写为带权 RELATED_TO 边；请求路径从内存邻接表直接取结果。
+
+打分按行分块向量化：每个维度编码为 0/1 成员矩阵 X，块内共享关系即 (X[块] @ X.T) > 0，
+内存占用为 O(块大小 × N)，不随 N² 增长。
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+# 各维度权重（共享即得分，向量相似度按 [0, 1] 截断后加权）
+RELATED_WEIGHTS: Dict[str, float] = {
+    'category': 0.35,
+    'region': 0.25,
+    'level': 0.10,
+    'dynasty': 0.10,
+    'embedding': 0.20,
+}
+
+# 预计算边的来源标记；add_heritage_relation 手工添加的 RELATED_TO 边不带此标记，
+# 重算时不删除，推荐查询也不把预计算边当作邻近关系使用
+RELATED_SOURCE = 'precomputed'
+
+
+def precomputed_related(rel: str = 'r') -> str:
+    """Cypher 条件：关系变量 rel 是预计算的 RELATED_TO 边（兼容未打标记的旧预计算边，其带 rank）
+
+    用 coalesce 保证结果非 null，可安全地取 NOT。
+    """
+    return f"coalesce({rel}.source = '{RELATED_SOURCE}', {rel}.rank IS NOT NULL)"
+
+
+# 参与打分的离散维度（与 RELATED_TO 边上的 same_* 标记一一对应）
+RELATED_DIMENSIONS = ('category', 'region', 'level', 'dynasty')
+
+# 每个非遗的离散特征，单次往返读出
+RELATED_FEATURES_QUERY = """
+    MATCH (h:Heritage)
+    RETURN h.id AS id,
+           [(h)-[:BELONGS_TO]->(c:Category) | c.name] AS category,
+           [(h)-[:LOCATED_AT]->(r:Region) | r.name] AS region,
+           [(h)-[:HAS_LEVEL]->(l:Level) | l.name] AS level,
+           [(h)-[:ORIGINATED_IN]->(d:Dynasty) | d.name] AS dynasty
+"""
+
+# 手工添加的 RELATED_TO 点对（预计算时跳过，避免 MERGE 覆盖后被下一次重算删除）
+MANUAL_RELATED_PAIRS_QUERY = f"""
+    MATCH (h:Heritage)-[r:RELATED_TO]->(h2:Heritage)
+    WHERE NOT {precomputed_related('r')}
+    RETURN h.id AS a, h2.id AS b
+"""
+
+# 已写入的 RELATED_TO 邻接表（仅预计算边）
+RELATED_EDGES_QUERY = f"""
+    MATCH (h:Heritage)-[r:RELATED_TO]->(h2:Heritage)
+    WHERE {precomputed_related('r')}
+    RETURN h.id AS a, h2.id AS b, r.score AS score, r.rank AS rank,
+           r.same_category AS same_category, r.same_region AS same_region,
+           r.same_level AS same_level, r.same_dynasty AS same_dynasty
+    ORDER BY a, rank
+"""
+
+
+def _membership(values: List[List[Any]]) -> np.ndarray:
+    """多值特征 → 0/1 成员矩阵 (N × 取值数)"""
+    vocab: Dict[Any, int] = {}
+    for vs in values:
+        for v in vs:
+            if v:
+                vocab.setdefault(v, len(vocab))
+    matrix = np.zeros((len(values), max(len(vocab), 1)), dtype=np.float32)
+    for i, vs in enumerate(values):
+        for v in vs:
+            if v:
+                matrix[i, vocab[v]] = 1.0
+    return matrix
+
+
+def _embedding_matrix(ids: List[Any], embeddings: Optional[Dict[Any, Any]]) -> Optional[np.ndarray]:
+    """按 ids 顺序排列的归一化向量矩阵，缺向量的行为 0；无可用向量时返回 None"""
+    if not embeddings:
+        return None
+    dim = next((len(v) for v in embeddings.values() if v is not None and len(v)), 0)
+    if not dim:
+        return None
+    matrix = np.zeros((len(ids), dim), dtype=np.float32)
+    for i, hid in enumerate(ids):
+        vec = embeddings.get(hid)
+        if vec is not None and len(vec) == dim:
+            matrix[i] = vec
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def score_related(features: List[Dict[str, Any]],
+                  embeddings: Optional[Dict[Any, Any]] = None,
+                  top_k: int = 20,
+                  weights: Dict[str, float] = None,
+                  block_size: int = 512) -> List[Dict[str, Any]]:
+    """计算每个非遗的 top-K 相关非遗
+
+    Args:
+        features: RELATED_FEATURES_QUERY 的结果行
+        embeddings: {heritage_id: 向量}（可选，缺失时该维度不计分）
+        top_k: 每个非遗保留的邻居数
+        weights: 维度权重，默认 RELATED_WEIGHTS
+
+    Returns:
+        [{a, b, score, rank, same_category, same_region, same_level, same_dynasty}]，
+        同一 a 内按 score 降序（同分按 b 的输入顺序），只含 score > 0 的邻居
+    """
+    weights = weights or RELATED_WEIGHTS
+    ids = [f['id'] for f in features]
+    n = len(ids)
+    if n < 2 or top_k <= 0:
+        return []
+
+    members = {dim: _membership([f.get(dim) or [] for f in features])
+               for dim in RELATED_DIMENSIONS}
+    emb = _embedding_matrix(ids, embeddings)
+    k = min(top_k, n - 1)
+
+    rows = []
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        scores = np.zeros((stop - start, n), dtype=np.float32)
+        shared = {}
+        for dim in RELATED_DIMENSIONS:
+            shared[dim] = (members[dim][start:stop] @ members[dim].T) > 0
+            scores += weights.get(dim, 0.0) * shared[dim]
+        if emb is not None and weights.get('embedding'):
+            scores += weights['embedding'] * np.clip(emb[start:stop] @ emb.T, 0.0, 1.0)
+        local = np.arange(stop - start)
+        scores[local, local + start] = -np.inf
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for r in range(stop - start):
+            cand = top[r]
+            cand_scores = scores[r, cand]
+            order = np.lexsort((cand, -cand_scores))
+            rank = 0
+            for j in cand[order]:
+                score = float(scores[r, j])
+                if score <= 0:
+                    break
+                rows.append({
+                    'a': ids[start + r], 'b': ids[j], 'score': round(score, 4), 'rank': rank,
+                    **{f'same_{dim}': bool(shared[dim][r, j]) for dim in RELATED_DIMENSIONS},
+                })
+                rank += 1
+    return rows
+
+
+class RelatedIndex:
+    """相关非遗邻接表（构建后只读）"""
+
+    # relation_type → 边上的共享标记
+    RELATION_FLAGS = {'category': 'same_category', 'region': 'same_region',
+                      'level': 'same_level', 'dynasty': 'same_dynasty'}
+
+    def __init__(self, rows: List[Dict[str, Any]], top_k: int):
+        """
+        Args:
+            rows: score_related 的结果或 RELATED_EDGES_QUERY 的结果行（同一 a 内按 rank 升序）
+            top_k: 构建时的 K，用于判断邻接表是否已穷尽
+        """
+        self.top_k = top_k
+        self._neighbors: Dict[Any, List[Dict[str, Any]]] = {}
+        for row in rows:
+            self._neighbors.setdefault(row['a'], []).append(row)
+
+    def __len__(self) -> int:
+        return len(self._neighbors)
+
+    def __contains__(self, heritage_id: Any) -> bool:
+        return heritage_id in self._neighbors
+
+    def edge_count(self) -> int:
+        return sum(len(v) for v in self._neighbors.values())
+
+    def lookup(self, heritage_id: Any, relation_type: str = None,
+               limit: int = 5) -> Tuple[List[Tuple[Any, float]], bool]:
+        """返回 ([(邻居 id, score)], 是否完整)
+
+        按 relation_type 过滤后不足 limit 且邻接表被 K 截断时，结果可能不完整，
+        调用方应回退实时查询；不带类型时 top-K 本身即为完整答案。
+        """
+        neighbors = self._neighbors.get(heritage_id, [])
+        flag = self.RELATION_FLAGS.get(relation_type)
+        if flag:
+            matched = [r for r in neighbors if r.get(flag)]
+            complete = len(matched) >= limit or len(neighbors) < self.top_k
+        else:
+            matched = neighbors
+            complete = True
+        return [(r['b'], r['score']) for r in matched[:limit]], complete
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+经纬度网格空间索引
+按纬度/经度等分网格分桶，候选点只在相邻网格内查找，距离计算用 NumPy 向量化 Haversine。
+用于 NEAR 关系构建（近邻点对枚举）与邻近查询（半径 / k 近邻）。
+"""
+
+import math
+from collections import defaultdict
+from typing import Dict, Any, List, Tuple, Iterator, Optional
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+# 每纬度对应的公里数
+KM_PER_LAT_DEGREE = 110.574
+# 赤道处每经度对应的公里数
+KM_PER_LON_DEGREE = 111.320
+
+
+def haversine_many(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """一点到多点的 Haversine 距离（公里），结果与 EntityMixin.calculate_distance 一致"""
+    lat1 = math.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlon = np.radians(lons - lon)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class GridSpatialIndex:
+    """网格空间索引（构建后只读）"""
+
+    def __init__(self, items: List[Dict[str, Any]], cell_km: float = 25.0):
+        """
+        Args:
+            items: 含 latitude / longitude 的字典列表（缺坐标的条目被忽略）
+            cell_km: 网格边长（公里）
+        """
+        self.items = [
+            it for it in items
+            if it.get('latitude') is not None and it.get('longitude') is not None
+        ]
+        self.lats = np.array([float(it['latitude']) for it in self.items], dtype=np.float64)
+        self.lons = np.array([float(it['longitude']) for it in self.items], dtype=np.float64)
+        self.cell_km = max(float(cell_km), 0.1)
+        self._dlat, self._dlon = self._cell_degrees(self.cell_km)
+        self._cells = self._bucket(self._dlat, self._dlon)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    # ──────────────────────────────
+    # 分桶
+    # ──────────────────────────────
+
+    def _cell_degrees(self, cell_km: float, extra_lat: float = 0.0) -> Tuple[float, float]:
+        """网格边长换算为经纬度跨度；经度按最高纬度取保守值，保证相邻网格覆盖"""
+        max_abs_lat = float(np.abs(self.lats).max()) if len(self.lats) else 0.0
+        max_abs_lat = max(max_abs_lat, abs(extra_lat))
+        cos_lat = max(math.cos(math.radians(min(max_abs_lat, 89.0))), 1e-6)
+        return cell_km / KM_PER_LAT_DEGREE, cell_km / (KM_PER_LON_DEGREE * cos_lat)
+
+    def _bucket(self, dlat: float, dlon: float) -> Dict[Tuple[int, int], np.ndarray]:
+        cells = defaultdict(list)
+        rows = np.floor(self.lats / dlat).astype(np.int64)
+        cols = np.floor(self.lons / dlon).astype(np.int64)
+        for i, key in enumerate(zip(rows.tolist(), cols.tolist())):
+            cells[key].append(i)
+        return {k: np.array(v, dtype=np.int64) for k, v in cells.items()}
+
+    # ──────────────────────────────
+    # 点对枚举
+    # ──────────────────────────────
+
+    def pairs_within(self, max_km: float) -> Iterator[Tuple[int, int, float]]:
+        """枚举距离不超过 max_km 的所有无序点对 (i, j, distance_km)，i < j"""
+        if len(self.items) < 2:
+            return
+        dlat, dlon = self._cell_degrees(max_km)
+        cells = self._bucket(dlat, dlon)
+        for (row, col), members in cells.items():
+            neighbours = [
+                cells[(row + dr, col + dc)]
+                for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+                if (row + dr, col + dc) in cells
+            ]
+            candidates = np.concatenate(neighbours)
+            for i in members.tolist():
+                others = candidates[candidates > i]
+                if not others.size:
+                    continue
+                dist = haversine_many(self.lats[i], self.lons[i],
+                                      self.lats[others], self.lons[others])
+                hit = dist <= max_km
+                for j, d in zip(others[hit].tolist(), dist[hit].tolist()):
+                    yield i, j, d
+
+    # ──────────────────────────────
+    # 邻近查询
+    # ──────────────────────────────
+
+    def query_radius(self, lat: float, lon: float, radius_km: float,
+                     limit: Optional[int] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """返回半径内的 (item, distance_km)，按距离升序"""
+        if not self.items:
+            return []
+        row0 = math.floor(lat / self._dlat)
+        col0 = math.floor(lon / self._dlon)
+        span_r = int(math.ceil(radius_km / self.cell_km))
+        _, dlon_r = self._cell_degrees(radius_km, lat)
+        span_c = int(math.ceil(dlon_r / self._dlon))
+        if (2 * span_r + 1) * (2 * span_c + 1) >= len(self._cells):
+            candidates = np.arange(len(self.items))
+        else:
+            buckets = [
+                self._cells[(r, c)]
+                for r in range(row0 - span_r, row0 + span_r + 1)
+                for c in range(col0 - span_c, col0 + span_c + 1)
+                if (r, c) in self._cells
+            ]
+            if not buckets:
+                return []
+            candidates = np.concatenate(buckets)
+        dist = haversine_many(lat, lon, self.lats[candidates], self.lons[candidates])
+        hit = dist <= radius_km
+        order = np.argsort(dist[hit], kind='stable')
+        if limit is not None:
+            order = order[:limit]
+        idx, dist = candidates[hit][order], dist[hit][order]
+        return [(self.items[i], float(d)) for i, d in zip(idx.tolist(), dist.tolist())]
+
+    def query_knn(self, lat: float, lon: float, k: int,
+                  max_km: Optional[float] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """返回最近的 k 个 (item, distance_km)，可选距离上限"""
+        if not self.items or k <= 0:
+            return []
+        dist = haversine_many(lat, lon, self.lats, self.lons)
+        if max_km is not None:
+            candidates = np.flatnonzero(dist <= max_km)
+        else:
+            candidates = np.arange(len(dist))
+        if not candidates.size:
+            return []
+        k = min(k, candidates.size)
+        top = candidates[np.argpartition(dist[candidates], k - 1)[:k]]
+        top = top[np.argsort(dist[top], kind='stable')]
+        return [(self.items[i], float(dist[i])) for i in top.tolist()]
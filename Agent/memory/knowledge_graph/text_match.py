@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+多模式文本匹配
+朝代 / 传承人抽取的规则是一组互不相关的小正则，逐条 re.search 时每条规则都要扫一遍文本。
+本模块提供:
+  - expand_literals: 把只含字面量、(?:a|b) 分组、? 可选与顶层 | 的正则展开为有限字面串集合
+  - AhoCorasick: 字面串多模式自动机，单次扫描报告全部（含重叠）命中
+  - map_in_processes: 批量抽取的进程池分发（数量较少或进程池不可用时串行）
+
+正则 P 在文本中可匹配 ⇔ expand_literals(P) 中某个字面串是文本的子串，
+因此用自动机替换逐条 re.search 不改变匹配结果。
+"""
+
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Iterable, Callable, Tuple
+
+from loguru import logger
+
+# 展开后字面串数量上限，超过时视为不可展开（保留正则）
+_MAX_EXPANSION = 256
+
+_REGEX_META = set('.^$*+{}[]\\')
+
+
+# ──────────────────────────────
+# 正则 → 字面串展开
+# ──────────────────────────────
+
+def expand_literals(pattern: str) -> Optional[List[str]]:
+    """展开有限正则为字面串列表；含不支持的语法时返回 None"""
+    try:
+        strings, pos = _expand_alternation(pattern, 0)
+    except ValueError:
+        return None
+    if pos != len(pattern) or len(strings) > _MAX_EXPANSION or '' in strings:
+        return None
+    return sorted(set(strings))
+
+
+def _expand_alternation(pattern: str, pos: int) -> Tuple[List[str], int]:
+    branches = []
+    while True:
+        seq, pos = _expand_sequence(pattern, pos)
+        branches.extend(seq)
+        if pos < len(pattern) and pattern[pos] == '|':
+            pos += 1
+            continue
+        return branches, pos
+
+
+def _expand_sequence(pattern: str, pos: int) -> Tuple[List[str], int]:
+    results = ['']
+    while pos < len(pattern) and pattern[pos] not in '|)':
+        if pattern.startswith('(?:', pos):
+            atom, pos = _expand_alternation(pattern, pos + 3)
+            if pos >= len(pattern) or pattern[pos] != ')':
+                raise ValueError(pattern)
+            pos += 1
+        elif pattern[pos] == '(' or pattern[pos] in _REGEX_META or pattern[pos] == '?':
+            raise ValueError(pattern)
+        else:
+            atom = [pattern[pos]]
+            pos += 1
+        if pos < len(pattern) and pattern[pos] == '?':
+            atom = atom + ['']
+            pos += 1
+        results = [r + a for r in results for a in atom]
+        if len(results) > _MAX_EXPANSION:
+            raise ValueError(pattern)
+    return results, pos
+
+
+# ──────────────────────────────
+# Aho-Corasick 自动机
+# ──────────────────────────────
+
+class AhoCorasick:
+    """字面串多模式自动机（构建后只读，可跨线程 / 进程共享）
+
+    构建时把失败链展开为完整的确定性转移表，扫描时每个字符只做一次查表；
+    不属于任何模式的字符必然回到初始状态，因此先用正则切出只含模式字符的片段，
+    跳过其余文本（中文长文本中模式字符通常很稀疏）。
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        """
+        Args:
+            patterns: (字面串, 负载) 序列；同一字面串可对应多个负载
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[List[Any]] = [[]]
+        for literal, payload in patterns:
+            self._add(literal, payload)
+        self._build()
+        alphabet = {ch for edges in self._goto for ch in edges}
+        self._segment_re = re.compile(
+            '[' + ''.join(re.escape(ch) for ch in sorted(alphabet)) + ']+') if alphabet else None
+
+    def _add(self, literal: str, payload: Any):
+        state = 0
+        for ch in literal:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._out.append([])
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state].append(payload)
+
+    def _build(self):
+        """BFS 计算失败函数，并把失败转移与失败链输出并入每个状态"""
+        fail = [0] * len(self._goto)
+        delta: List[Dict[str, int]] = [dict(self._goto[0])]
+        delta.extend({} for _ in range(len(self._goto) - 1))
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # 父状态先出队，失败状态的转移表此时已完整
+            delta[state] = {**delta[fail[state]], **self._goto[state]}
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                self._out[nxt] = self._out[nxt] + self._out[fail[nxt]]
+        self._delta = delta
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def find_payloads(self, text: str) -> List[Any]:
+        """单次扫描返回全部命中的负载（含重叠命中，可能重复）"""
+        if self._segment_re is None:
+            return []
+        delta, out = self._delta, self._out
+        found = []
+        for segment in self._segment_re.findall(text):
+            state = 0
+            for ch in segment:
+                state = delta[state].get(ch, 0)
+                if out[state]:
+                    found.extend(out[state])
+        return found
+
+
+def compile_pattern_set(patterns: Iterable[Tuple[str, Any]],
+                        literals: Iterable[Tuple[str, Any]] = ()) -> Tuple[AhoCorasick, List[Tuple[str, Any]]]:
+    """把 (正则, 负载) 规则集与 (字面串, 负载) 编译为同一个自动机
+
+    无法展开的正则原样返回，由调用方继续用 re.search 匹配。
+    """
+    literals = list(literals)
+    residual = []
+    for pattern, payload in patterns:
+        expanded = expand_literals(pattern)
+        if expanded is None:
+            residual.append((pattern, payload))
+        else:
+            literals.extend((literal, payload) for literal in expanded)
+    return AhoCorasick(literals), residual
+
+
+# ──────────────────────────────
+# 进程池批量抽取
+# ──────────────────────────────
+
+def _map_chunk(fn: Callable, chunk: List) -> List:
+    return [fn(item) for item in chunk]
+
+
+def map_in_processes(fn: Callable, items: List, workers: int = 0,
+                     min_items: int = 200) -> List:
+    """在进程池中对 items 逐条执行 fn，结果保持输入顺序
+
+    fn 须可 pickle（模块级函数或类上的 static/classmethod）。
+    条目少于 min_items、workers 为 1 或进程池启动失败时串行执行。
+    子进程以 spawn 方式启动：API 服务进程内已有 Neo4j 驱动、嵌入调度器等后台线程，
+    fork 多线程进程可能使子进程死锁。
+
+    Args:
+        workers: 进程数，0 表示按 CPU 核数自动选择（最多 8）
+        min_items: 启用进程池的最小条目数（进程启动有固定开销）
+    """
+    if workers <= 0:
+        workers = min(os.cpu_count() or 1, 8)
+    if workers <= 1 or len(items) < max(min_items, 2):
+        return [fn(item) for item in items]
+
+    size = -(-len(items) // (workers * 4))
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = []
+            for part in pool.map(_map_chunk, [fn] * len(chunks), chunks):
+                results.extend(part)
+            return results
+    except Exception as e:
+        logger.warning(f"进程池批量抽取失败，改为串行: {e}")
+        return [fn(item) for item in items]
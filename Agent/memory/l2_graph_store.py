@@ -24,12 +24,17 @@ L2 图记忆存储
 """
 
 import json
+import threading
 import time
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 from loguru import logger
 
 from Agent.memory.knowledge_graph import get_knowledge_graph
+from Agent.memory.knowledge_graph.region_index import match_region_name
+from Agent.memory.knowledge_graph.related import precomputed_related
+from Agent.memory.recommendation_engine import RecommendationEngine
 
 _VALID_REL_TYPES = {"PREFERS", "PLANNED", "EXPORTED"}
 
@@ -53,6 +58,92 @@ _REL_SET_CLAUSES = {
     "EXPORTED": "r.source = $source, r.timestamp = $now, r.updated_at = $now",
 }
 
+# UNWIND 批量写入版本：参数取自每行 row（供写后队列使用）
+_REL_SET_ROW_CLAUSES = {k: v.replace("$", "row.") for k, v in _REL_SET_CLAUSES.items()}
+
+_BATCH_MERGE_USERS_CYPHER = """
+UNWIND $rows AS row
+MERGE (u:User {user_id: row.user_id})
+ON CREATE SET u.created_at = row.now
+SET u.last_active = row.now
+SET u.username = CASE
+    WHEN row.username IS NOT NULL THEN row.username
+    ELSE CASE WHEN u.username IS NULL THEN 'unknown' ELSE u.username END
+END
+"""
+
+_BATCH_UPSERT_PREFERENCES_CYPHER = """
+UNWIND $rows AS row
+MATCH (u:User {user_id: row.user_id})
+MERGE (p:Preference {user_id: row.user_id, type: row.type})
+SET p.value = row.value,
+    p.confidence = CASE
+        WHEN p.confidence IS NULL THEN row.confidence
+        ELSE CASE WHEN row.confidence > p.confidence THEN row.confidence ELSE p.confidence END
+    END,
+    p.source = row.source,
+    p.updated_at = row.now,
+    p.name = row.name
+MERGE (u)-[r:HAS_PREFERENCE]->(p)
+SET r.updated_at = row.now
+"""
+
+_BATCH_REGION_INTERESTS_CYPHER = """
+UNWIND $rows AS row
+MATCH (u:User {user_id: row.user_id})
+MERGE (r:Region {name: row.region})
+MERGE (u)-[rel:INTERESTED_IN]->(r)
+SET rel.confidence = row.confidence, rel.updated_at = row.now
+FOREACH (_ IN CASE WHEN row.pending THEN [1] ELSE [] END | SET r.pending_resolution = true)
+"""
+
+# 偏好桥接：目标标签 → (偏好类型, Cypher)
+_BATCH_TARGETS_CYPHER = {
+    label: (p_type, f"""
+UNWIND $rows AS row
+MATCH (u:User {{user_id: row.user_id}})-[:HAS_PREFERENCE]->(p:Preference {{type: '{p_type}'}})
+MERGE (t:{label} {{name: row.target}})
+MERGE (p)-[rel:TARGETS]->(t)
+SET rel.confidence = row.confidence
+""")
+    for label, p_type in (("Category", "interest"), ("Region", "region_interest"))
+}
+
+_BATCH_INDEGREE_CYPHER = """
+UNWIND $rows AS row
+MATCH (h:Heritage {id: row.heritage_id})<-[r:INTERESTED_IN|PREFERS]-(:User)
+WITH row, h, count(r) AS indegree
+WHERE indegree > $threshold
+OPTIONAL MATCH (u:User {user_id: row.user_id})
+          -[:HAS_PREFERENCE]->(p:Preference)
+WHERE p.type = 'heritage_interest'
+OPTIONAL MATCH (u)-[:OWNS]->(s:Session)-[:DISCUSSED]->(h)
+RETURN row.user_id AS user_id, row.heritage_id AS heritage_id,
+       count(p) > 0 AS has_preference, count(s) > 0 AS has_session
+"""
+
+# 偏好衰减后的最低置信度
+PREFERENCE_CONFIDENCE_FLOOR = 0.05
+
+# 偏好时间衰减（前接绑定 p 的 MATCH，参数 $now / $decay_lambda / $floor）：
+# 从上次衰减（未衰减过则为上次更新）起按整天衰减，并把 last_decayed_at 前移相应整天数，
+# 重复执行既不叠加也不丢失不足一天的部分
+DECAY_PREFERENCE_FILTER = """
+WHERE p.confidence > $floor
+  AND p.updated_at =~ '[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9:.]+'
+WITH p, CASE WHEN p.last_decayed_at > p.updated_at THEN p.last_decayed_at ELSE p.updated_at END AS ref
+WITH p, ref, duration.inDays(localdatetime(ref), localdatetime($now)).days AS days
+WHERE days > 0
+"""
+
+DECAY_PREFERENCE_SET = """
+SET p.confidence = CASE
+        WHEN p.confidence * exp(-$decay_lambda * days) < $floor THEN $floor
+        ELSE p.confidence * exp(-$decay_lambda * days)
+    END,
+    p.last_decayed_at = toString(localdatetime(ref) + duration({days: days}))
+"""
+
 _PREF_TYPE_LABELS = {
     "interest": "兴趣偏好",
     "region_interest": "地区偏好",
@@ -95,6 +186,105 @@ def _neo4j_safe(default=None):
     return decorator
 
 
+# 图扩展增强: 非遗间关联关系的权重，未列出的类型按默认权重计
+_GRAPH_BOOST_RELATION_WEIGHTS = {
+    'SAME_CATEGORY': 0.8,
+    'SAME_REGION': 0.6,
+    'COMPLEMENTARY': 0.7,
+    'SAME_ERA': 0.4,
+}
+_GRAPH_BOOST_DEFAULT_WEIGHT = 0.3
+
+# 一次查询为一组候选非遗计算关联路径数（仍以 user_id 为锚点沿出边遍历）
+_GRAPH_BOOST_BATCH_CYPHER = """
+MATCH (u:User {user_id: $user_id})
+      -[:HAS_PREFERENCE]->(p:Preference)
+      -[:TARGETS]->(target)
+MATCH (target)<-[:BELONGS_TO|LOCATED_AT]-(h1:Heritage)
+MATCH (h1)-[r]-(h2:Heritage)
+WHERE h2.name IN $names
+  AND type(r) IN ['SAME_CATEGORY', 'SAME_REGION', 'SAME_ERA', 'COMPLEMENTARY']
+RETURN h2.name AS entity_name, type(r) AS relation_type, count(r) AS path_count
+"""
+
+
+def _graph_boost_from_counts(counts: Dict[str, int]) -> float:
+    """{关系类型: 路径数} → 增强因子 (0-1)，每种关系最多按 3 条路径计"""
+    boost = 0.0
+    for relation_type, path_count in counts.items():
+        weight = _GRAPH_BOOST_RELATION_WEIGHTS.get(relation_type, _GRAPH_BOOST_DEFAULT_WEIGHT)
+        boost += weight * min(path_count, 3) / 3
+    return min(boost, 1.0)
+
+
+class _GraphBoostCache:
+    """按用户缓存图扩展增强因子（TTL + 用户数 LRU），用户偏好或非遗关系变更时失效"""
+
+    def __init__(self, ttl: float, max_users: int):
+        self.ttl = ttl
+        self.max_users = max(1, max_users)
+        self._lock = threading.Lock()
+        # user_id → {entity_name: (boost, 写入时间)}
+        self._cache: "OrderedDict[str, Dict[str, tuple]]" = OrderedDict()
+        # 失效时递增；查询期间发生过失效则结果不写缓存
+        self._epoch = 0
+        self._stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'queries': 0, 'invalidations': 0}
+
+    def lookup(self, user_id: str, names: List[str]):
+        """返回 (命中的 {name: boost}, 未命中的 names, 当前 epoch)"""
+        now = time.time()
+        found: Dict[str, float] = {}
+        missing: List[str] = []
+        with self._lock:
+            entries = self._cache.get(user_id)
+            if entries is not None:
+                self._cache.move_to_end(user_id)
+            for name in names:
+                entry = entries.get(name) if entries else None
+                if entry is not None and now - entry[1] < self.ttl:
+                    found[name] = entry[0]
+                else:
+                    missing.append(name)
+            self._stats['lookups'] += len(names)
+            self._stats['hits'] += len(found)
+            self._stats['misses'] += len(missing)
+            return found, missing, self._epoch
+
+    def store(self, user_id: str, boosts: Dict[str, float], epoch: int):
+        now = time.time()
+        with self._lock:
+            self._stats['queries'] += 1
+            if epoch != self._epoch or self.ttl <= 0:
+                return
+            entries = self._cache.setdefault(user_id, {})
+            for name in [n for n, (_, ts) in entries.items() if now - ts >= self.ttl]:
+                del entries[name]
+            for name, boost in boosts.items():
+                entries[name] = (boost, now)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_users:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, user_id: str = None):
+        with self._lock:
+            self._epoch += 1
+            self._stats['invalidations'] += 1
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(user_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['lookups']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'cached_users': len(self._cache),
+                'ttl_seconds': self.ttl,
+            }
+
+
 def _parse_json_value(val):
     try:
         parsed = json.loads(val)
@@ -111,6 +301,17 @@ class L2GraphStore:
         self.kg = get_knowledge_graph()
         self._categories_cache: List[str] = []
         self._categories_cache_time: float = 0
+        self.recommender = RecommendationEngine(self)
+        from Agent.config.memory_budget import memory_budget
+        self.graph_boost_cache = _GraphBoostCache(
+            ttl=memory_budget.l2_graph_boost_cache_ttl,
+            max_users=memory_budget.l2_recommend_cache_size,
+        )
+
+    def invalidate_user_caches(self, user_id: str = None):
+        """用户偏好或非遗关系变更后调用，使推荐结果与图扩展增强缓存失效；不传 user_id 表示全部失效"""
+        self.recommender.invalidate(user_id)
+        self.graph_boost_cache.invalidate(user_id)
 
     def is_available(self) -> bool:
         return bool(self.kg and self.kg.is_connected())
@@ -190,7 +391,14 @@ class L2GraphStore:
                 self._upsert_region_interests(session, user_id, p_type, raw_value, p_confidence, now_iso)
                 self._link_preference_targets(session, user_id, p_type, raw_value, p_confidence)
 
-        # 偏好向量化（异步触发，不阻塞主流程）
+        self.invalidate_user_caches(user_id)
+        self._vectorize_preferences(user_id, preferences)
+
+        logger.info(f"L2 偏好写入成功: user={user_id}, count={len(preferences)}")
+        return True
+
+    def _vectorize_preferences(self, user_id: str, preferences: List[Dict[str, Any]]):
+        """偏好向量化（失败不影响主流程）"""
         try:
             from Agent.memory.preference_vectorizer import get_preference_vectorizer
             vectorizer = get_preference_vectorizer()
@@ -207,9 +415,6 @@ class L2GraphStore:
         except Exception as e:
             logger.debug(f"偏好向量化失败（不影响主流程）: {e}")
 
-        logger.info(f"L2 偏好写入成功: user={user_id}, count={len(preferences)}")
-        return True
-
     def _generate_preference_name(self, p_type: str, raw_value: Any) -> str:
         label = _PREF_TYPE_LABELS.get(p_type, p_type)
         if isinstance(raw_value, dict):
@@ -265,17 +470,7 @@ class L2GraphStore:
                 logger.debug(f"地区兴趣写入失败(region={name}): {e}")
 
     def _match_region_name(self, input_name: str, valid_regions: set) -> Optional[str]:
-        if input_name in valid_regions:
-            return input_name
-        for vr in valid_regions:
-            if vr.startswith(input_name) or input_name.startswith(vr):
-                return vr
-        for vr in valid_regions:
-            common = sum(1 for a, b in zip(input_name, vr) if a == b)
-            min_len = min(len(input_name), len(vr))
-            if min_len > 0 and common / min_len > 0.7:
-                return vr
-        return None
+        return match_region_name(input_name, valid_regions)
 
     def _link_preference_targets(self, session, user_id: str, p_type: str,
                                    raw_value: Any, confidence: float):
@@ -377,10 +572,167 @@ class L2GraphStore:
                 cypher, user_id=user_id, heritage_data=heritage_data,
                 confidence=confidence, source=source, now=now_iso, extra_props=props,
             )
+        self.invalidate_user_caches(user_id)
 
         logger.info(f"L2 关联成功: user={user_id}, rel={rel_type}, count={len(heritage_data)}")
         return True
 
+    # ─── Write-behind batch ─────────────────────────────────────────
+
+    @_neo4j_safe(default=None)
+    def write_batch(self, users: List[Dict[str, Any]],
+                    preferences: List[Dict[str, Any]] = None,
+                    heritage_links: List[Dict[str, Any]] = None) -> Optional[Dict[str, int]]:
+        """
+        批量落库写后队列合并后的写入，全部 UNWIND 语句在同一个写事务中提交。
+
+        Args:
+            users: [{user_id, username, now}]，先于其余写入 MERGE
+            preferences: [{user_id, type, value, confidence, source, now, variants}]，
+                variants 为窗口内出现过的 [(value, confidence)]，用于地区兴趣与桥接边
+            heritage_links: [{user_id, heritage_id, rel_type, confidence, source, now,
+                extra_props, protect}]，protect=True 的行经过入度保护
+        Returns:
+            各类写入的行数；Neo4j 不可用或写入失败时返回 None
+        """
+        if not self.is_available():
+            return None
+        preferences = preferences or []
+        heritage_links = heritage_links or []
+
+        pref_rows, region_rows, target_rows = self._build_preference_rows(preferences)
+        counts = {"users": len(users), "preferences": len(pref_rows),
+                  "region_interests": len(region_rows), "heritage_links": 0, "blocked": 0}
+
+        with self.kg.driver.session() as session:
+            blocked = self._check_indegree_protection_batch(
+                session, [r for r in heritage_links if r.get("protect")])
+            link_rows: Dict[str, List[Dict[str, Any]]] = {}
+            for row in heritage_links:
+                if (row["user_id"], row["heritage_id"]) in blocked:
+                    counts["blocked"] += 1
+                    continue
+                link_rows.setdefault(row["rel_type"], []).append({
+                    "user_id": row["user_id"], "heritage_id": row["heritage_id"],
+                    "confidence": row["confidence"], "source": row["source"],
+                    "now": row["now"], "extra_props": row.get("extra_props") or {},
+                })
+            counts["heritage_links"] = sum(len(rows) for rows in link_rows.values())
+
+            def _write(tx):
+                if users:
+                    tx.run(_BATCH_MERGE_USERS_CYPHER, rows=users).consume()
+                if pref_rows:
+                    tx.run(_BATCH_UPSERT_PREFERENCES_CYPHER, rows=pref_rows).consume()
+                if region_rows:
+                    tx.run(_BATCH_REGION_INTERESTS_CYPHER, rows=region_rows).consume()
+                for label, (_, cypher) in _BATCH_TARGETS_CYPHER.items():
+                    rows = target_rows.get(label)
+                    if rows:
+                        tx.run(cypher, rows=rows).consume()
+                for rel_type, rows in link_rows.items():
+                    tx.run(
+                        f"UNWIND $rows AS row "
+                        f"MATCH (u:User {{user_id: row.user_id}}) "
+                        f"MATCH (h:Heritage {{id: row.heritage_id}}) "
+                        f"MERGE (u)-[r:{rel_type}]->(h) "
+                        f"SET {_REL_SET_ROW_CLAUSES[rel_type]} "
+                        f"SET r += row.extra_props",
+                        rows=rows,
+                    ).consume()
+
+            session.execute_write(_write)
+
+        changed_users = {row["user_id"] for row in pref_rows}
+        changed_users.update(row["user_id"] for rows in link_rows.values() for row in rows)
+        for user_id in changed_users:
+            self.invalidate_user_caches(user_id)
+
+        for user_id, prefs in self._group_by_user(preferences).items():
+            self._vectorize_preferences(user_id, prefs)
+
+        for row in region_rows:
+            if row["pending"]:
+                logger.info(f"创建待确认Region节点: {row['region']} (不在当前KG中，已标记pending_resolution)")
+        logger.info(f"L2 批量写入成功: {counts}")
+        return counts
+
+    @staticmethod
+    def _group_by_user(rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            grouped.setdefault(row["user_id"], []).append(row)
+        return grouped
+
+    def _build_preference_rows(self, preferences: List[Dict[str, Any]]):
+        """把合并后的偏好展开为 Preference / INTERESTED_IN / TARGETS 三组 UNWIND 行
+
+        语义与 upsert_user_preferences 逐条执行一致：同一 (用户, 地区/目标) 以窗口内最后一次写入为准。
+        """
+        pref_rows = []
+        regions: Dict[tuple, Dict[str, Any]] = {}
+        targets: Dict[tuple, Dict[str, Any]] = {}
+        valid_regions = None
+
+        for pref in preferences:
+            user_id, p_type, raw_value = pref["user_id"], pref["type"], pref["value"]
+            pref_rows.append({
+                "user_id": user_id, "type": p_type,
+                "value": json.dumps(raw_value, ensure_ascii=False) if isinstance(raw_value, dict) else str(raw_value),
+                "confidence": float(pref["confidence"]), "source": pref["source"],
+                "now": pref["now"], "name": self._generate_preference_name(p_type, raw_value),
+            })
+
+            for value, confidence in pref.get("variants") or [(raw_value, pref["confidence"])]:
+                if p_type == "region_interest":
+                    if isinstance(value, dict) and "regions" in value:
+                        names = value["regions"]
+                    elif isinstance(value, str):
+                        names = [value]
+                    else:
+                        names = []
+                    if valid_regions is None and names:
+                        valid_regions = self.get_valid_regions()
+                    for name in names:
+                        if not name or not isinstance(name, str):
+                            continue
+                        matched = self._match_region_name(name, valid_regions)
+                        region = matched or name
+                        regions.pop((user_id, region), None)
+                        regions[(user_id, region)] = {
+                            "user_id": user_id, "region": region, "confidence": confidence,
+                            "now": pref["now"], "pending": matched is None,
+                        }
+                        if isinstance(value, dict):
+                            targets[("Region", user_id, name)] = {
+                                "user_id": user_id, "target": name, "confidence": confidence}
+                elif p_type == "interest" and isinstance(value, dict) and value.get("category"):
+                    targets[("Category", user_id, value["category"])] = {
+                        "user_id": user_id, "target": value["category"], "confidence": confidence}
+
+        target_rows: Dict[str, List[Dict[str, Any]]] = {}
+        for (label, _, _), row in targets.items():
+            target_rows.setdefault(label, []).append(row)
+        return pref_rows, list(regions.values()), target_rows
+
+    def _check_indegree_protection_batch(self, session, rows: List[Dict[str, Any]]) -> set:
+        """入度保护的批量版本，返回被拦截的 (user_id, heritage_id) 集合"""
+        if not rows:
+            return set()
+        from Agent.config.memory_budget import memory_budget
+        result = session.run(
+            _BATCH_INDEGREE_CYPHER,
+            rows=[{"user_id": r["user_id"], "heritage_id": r["heritage_id"]} for r in rows],
+            threshold=memory_budget.graph_indegree_protection_threshold,
+        )
+        blocked = {
+            (rec["user_id"], rec["heritage_id"]) for rec in result
+            if not (rec["has_preference"] or rec["has_session"])
+        }
+        for user_id, heritage_id in blocked:
+            logger.debug(f"入度保护拦截: user={user_id}, heritage={heritage_id}")
+        return blocked
+
     # ─── Query methods ──────────────────────────────────────────────
 
     @_require_user_id(default={})
@@ -536,6 +888,7 @@ class L2GraphStore:
             record = r.single()
             removed["orphan_preferences"] = record["cnt"] if record else 0
 
+        self.invalidate_user_caches(user_id)
         logger.info(f"L2 用户关系清理完成: user={user_id}, {removed}")
         return removed
 
@@ -575,6 +928,8 @@ class L2GraphStore:
             record = r.single()
             cnt = record["cnt"] if record else 0
 
+        if cnt:
+            self.invalidate_user_caches(user_id)
         logger.info(f"L2 清理用户PLANNED关系: user={user_id}, count={cnt}")
         return cnt
 
@@ -584,7 +939,9 @@ class L2GraphStore:
     @_neo4j_safe(default=0)
     def decay_preferences(self, user_id: str, decay_lambda: float = 0.01) -> int:
         """
-        时间感知指数衰减: new_confidence = confidence * exp(-λ * days_since_update)
+        时间感知指数衰减: new_confidence = confidence * exp(-λ * days)
+
+        days 为距上次衰减（未衰减过则为上次更新）的整天数，重复执行不会叠加衰减。
 
         λ = 0.01: 30天保留74%, 90天保留41%
         λ = 0.005: 30天保留86%, 90天保留64%
@@ -597,42 +954,19 @@ class L2GraphStore:
         if not self.is_available():
             return 0
 
-        import math
-        count = 0
-        now = datetime.now()
         with self.kg.driver.session() as session:
             result = session.run(
-                """
-                MATCH (u:User {user_id: $user_id})-[:HAS_PREFERENCE]->(p:Preference)
-                WHERE p.updated_at IS NOT NULL
-                RETURN p.id AS pref_id, p.confidence AS confidence,
-                       p.updated_at AS updated_at
-                """,
-                user_id=user_id,
+                "MATCH (u:User {user_id: $user_id})-[:HAS_PREFERENCE]->(p:Preference) "
+                + DECAY_PREFERENCE_FILTER + DECAY_PREFERENCE_SET
+                + "RETURN count(p) AS cnt",
+                user_id=user_id, now=datetime.now().isoformat(),
+                decay_lambda=decay_lambda, floor=PREFERENCE_CONFIDENCE_FLOOR,
             )
-            for record in result:
-                try:
-                    updated = datetime.fromisoformat(record['updated_at'])
-                except (ValueError, TypeError):
-                    continue
-                days = (now - updated).days
-                if days <= 0:
-                    continue
-                new_conf = record['confidence'] * math.exp(-decay_lambda * days)
-                new_conf = max(new_conf, 0.05)  # 最低保留 0.05
-                if new_conf < record['confidence']:
-                    session.run(
-                        """
-                        MATCH (p:Preference {id: $pref_id})
-                        SET p.confidence = $new_conf,
-                            p.last_decayed_at = $now
-                        """,
-                        pref_id=record['pref_id'],
-                        new_conf=new_conf,
-                        now=now.isoformat(),
-                    )
-                    count += 1
+            record = result.single()
+            count = record["cnt"] if record else 0
 
+        if count:
+            self.invalidate_user_caches(user_id)
         logger.info(f"L2 时间感知衰减完成: user={user_id}, decayed={count}, lambda={decay_lambda}")
         return count
 
@@ -665,6 +999,8 @@ class L2GraphStore:
             record = result.single()
             count = record["cnt"] if record else 0
 
+        if count:
+            self.invalidate_user_caches(user_id)
         logger.info(f"L2 低置信度偏好清理: user={user_id}, removed={count}, threshold={threshold}")
         return count
 
@@ -728,6 +1064,8 @@ class L2GraphStore:
             record = result.single()
             count = record["cnt"] if record else 0
 
+        if count:
+            self.invalidate_user_caches(user_id)
         logger.info(f"L2 双阈值过期清理: user={user_id}, removed={count}")
         return count
 
@@ -740,37 +1078,40 @@ class L2GraphStore:
         计算图扩展增强因子 (0-1)，用于召回综合评分。
 
         用户偏好非遗A → A与B通过类别/地区/时代关联 → B获得扩展分。
+        多个候选请用 get_graph_expansion_boosts，一次查询完成。
         """
-        if not self.is_available() or not entity_name:
+        if not entity_name:
             return 0.0
+        return self.get_graph_expansion_boosts(user_id, [entity_name]).get(entity_name, 0.0)
 
-        relation_weights = {
-            'SAME_CATEGORY': 0.8,
-            'SAME_REGION': 0.6,
-            'COMPLEMENTARY': 0.7,
-            'SAME_ERA': 0.4,
-        }
+    @_require_user_id(default={})
+    @_neo4j_safe(default={})
+    def get_graph_expansion_boosts(self, user_id: str, entity_names: List[str]) -> Dict[str, float]:
+        """
+        批量计算一组候选非遗的图扩展增强因子，返回 {entity_name: boost}。
 
-        with self.kg.driver.session() as session:
-            result = session.run(
-                """
-                MATCH (u:User {user_id: $user_id})
-                      -[:HAS_PREFERENCE]->(p:Preference)
-                      -[:TARGETS]->(target)
-                MATCH (target)<-[:BELONGS_TO|LOCATED_AT]-(h1:Heritage)
-                MATCH (h1)-[r]-(h2:Heritage {name: $entity_name})
-                WHERE type(r) IN ['SAME_CATEGORY', 'SAME_REGION',
-                                  'SAME_ERA', 'COMPLEMENTARY']
-                RETURN type(r) as relation_type, count(r) as path_count
-                """,
-                user_id=user_id, entity_name=entity_name,
-            )
+        未命中按用户 TTL 缓存的名称合并为一次 Cypher 查询，无关联路径的名称得 0.0。
+        """
+        names = list(dict.fromkeys(name for name in entity_names if name))
+        if not names or not self.is_available():
+            return {name: 0.0 for name in names}
+
+        boosts, missing, epoch = self.graph_boost_cache.lookup(user_id, names)
+        if not missing:
+            return boosts
 
-            boost = 0.0
+        counts: Dict[str, Dict[str, int]] = {name: {} for name in missing}
+        with self.kg.driver.session() as session:
+            result = session.run(_GRAPH_BOOST_BATCH_CYPHER, user_id=user_id, names=missing)
             for record in result:
-                weight = relation_weights.get(record['relation_type'], 0.3)
-                boost += weight * min(record['path_count'], 3) / 3
-            return min(boost, 1.0)
+                per_entity = counts.get(record['entity_name'])
+                if per_entity is not None:
+                    per_entity[record['relation_type']] = record['path_count']
+
+        fetched = {name: _graph_boost_from_counts(c) for name, c in counts.items()}
+        self.graph_boost_cache.store(user_id, fetched, epoch)
+        boosts.update(fetched)
+        return boosts
 
     def recall_composite_score(self, user_id: str, entity_name: str,
                                 vector_similarity: float,
@@ -784,6 +1125,32 @@ class L2GraphStore:
                   + 0.1 * graph_expansion_boost
         """
         graph_boost = self.get_graph_expansion_boost(user_id, entity_name)
+        return self._composite_score(vector_similarity, importance, time_decay, graph_boost)
+
+    def recall_composite_scores(self, user_id: str,
+                                candidates: List[Dict[str, Any]]) -> List[float]:
+        """
+        批量召回综合评分，图扩展增强因子一次查询取回。
+
+        Args:
+            candidates: [{entity_name, vector_similarity, importance, time_decay}, ...]
+
+        Returns:
+            与 candidates 顺序一致的综合分列表
+        """
+        boosts = self.get_graph_expansion_boosts(
+            user_id, [c.get('entity_name') for c in candidates]) or {}
+        return [
+            self._composite_score(
+                c.get('vector_similarity', 0.0), c.get('importance', 0.0),
+                c.get('time_decay', 0.0), boosts.get(c.get('entity_name'), 0.0),
+            )
+            for c in candidates
+        ]
+
+    @staticmethod
+    def _composite_score(vector_similarity: float, importance: float,
+                         time_decay: float, graph_boost: float) -> float:
         return (
             0.4 * vector_similarity +
             0.3 * importance +
@@ -796,33 +1163,16 @@ class L2GraphStore:
     @_require_user_id(default=[])
     @_neo4j_safe(default=[])
     def recommend_for_user(self, user_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """个性化推荐：五个策略并发执行、加权合并，结果按用户缓存（见 RecommendationEngine）"""
         if not self.is_available():
             return []
+        return self.recommender.recommend(user_id, limit)
 
-        recommendations = []
-        seen_ids = set()
+    def get_recommendation_stats(self) -> Dict[str, Any]:
+        """推荐缓存命中率与各策略耗时，以及图扩展增强缓存命中率"""
+        return {**self.recommender.get_stats(), 'graph_boost': self.graph_boost_cache.get_stats()}
 
-        with self.kg.driver.session() as session:
-            existing_ids = self._get_existing_heritage_ids(session, user_id)
-
-            strategies = [
-                self._recommend_by_preference,
-                self._recommend_by_prefers_near,
-                self._recommend_by_region,
-                self._recommend_by_semantic,
-                self._recommend_by_association,
-            ]
-            for strategy in strategies:
-                if len(recommendations) >= limit:
-                    break
-                remaining = limit - len(recommendations)
-                new_recs = strategy(session, user_id, existing_ids, seen_ids, remaining)
-                for rec in new_recs:
-                    if rec["id"] not in seen_ids:
-                        seen_ids.add(rec["id"])
-                        recommendations.append(rec)
-
-        return recommendations
+    # 以下策略由 RecommendationEngine 在独立 session 中并发调用，seen_ids 恒为空集（合并时去重）
 
     def _get_existing_heritage_ids(self, session, user_id: str) -> set:
         result = session.run(
@@ -857,11 +1207,13 @@ class L2GraphStore:
 
     def _recommend_by_prefers_near(self, session, user_id: str, existing_ids: set,
                                      seen_ids: set, remaining: int) -> List[Dict]:
+        # 预计算的 RELATED_TO 边没有距离，不作为“兴趣关联”使用，只取 NEAR 与手工关联边
         result = session.run(
-            """
-            MATCH (u:User {user_id: $user_id})-[pref:PREFERS]->(h1:Heritage)
+            f"""
+            MATCH (u:User {{user_id: $user_id}})-[pref:PREFERS]->(h1:Heritage)
                   -[near:NEAR|RELATED_TO]->(h2:Heritage)
             WHERE NOT h2.id IN $existing_ids AND NOT h2.id IN $seen_ids
+              AND NOT (type(near) = 'RELATED_TO' AND {precomputed_related('near')})
             RETURN DISTINCT h2.id AS id, h2.name AS name, h2.category AS category,
                    h2.region AS region, h2.level AS level,
                    pref.confidence AS confidence, near.distance_km AS distance
@@ -975,13 +1327,10 @@ class L2GraphStore:
 
     @_neo4j_safe(default=set())
     def get_valid_regions(self) -> set:
+        """关联了非遗的地区名（取自知识图谱的 Region 层级内存索引）"""
         if not self.is_available():
             return set()
-        with self.kg.driver.session() as session:
-            result = session.run(
-                "MATCH (r:Region)<-[:LOCATED_AT]-(:Heritage) RETURN DISTINCT r.name AS name"
-            )
-            return {r["name"] for r in result if r["name"]}
+        return self.kg.get_valid_regions()
 
     @_neo4j_safe(default=[])
     def get_graph_categories(self) -> List[str]:
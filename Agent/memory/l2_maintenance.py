@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+L2 全局维护任务
+MemoryCoordinator.run_maintenance 按用户执行衰减 / 过期 / 关系清理，每个用户要多次往返，
+用户数上千时往返次数达数万。本任务对全部用户一次性执行同样的规则，每一步是一条集合式 Cypher，
+写入用 CALL {} IN TRANSACTIONS 分批提交，避免单个大事务占用过多内存：
+
+  1. 时间衰减: 全部 Preference 按距上次衰减 / 更新的天数指数衰减（与 decay_preferences 同一规则）
+  2. 低置信度清理（可选）: 置信度低于阈值的 Preference
+  3. 双阈值过期: 超过过期天数且置信度低于重要性阈值的 Preference
+  4. 过期关系: 超过保留天数的 PLANNED / EXPORTED 关系与 HAS_PREFERENCE 关系
+  5. 孤儿回收: 没有 User 关联的 Preference
+
+由 ResourceManager 定时器按 MERGE_TIME_THRESHOLD_HOURS 间隔调度。
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+from loguru import logger
+
+from Agent.config.memory_budget import memory_budget
+from .l2_graph_store import (
+    DECAY_PREFERENCE_FILTER, DECAY_PREFERENCE_SET, PREFERENCE_CONFIDENCE_FLOOR, get_l2_graph_store,
+)
+
+
+def _in_transactions(match: str, body: str, batch_size: int, returns: str = "count(*) AS cnt") -> str:
+    """MATCH ... CALL { body } IN TRANSACTIONS OF N ROWS RETURN ...（N 须为字面量）"""
+    return (
+        f"{match}\n"
+        f"CALL {{\n{body}\n}} IN TRANSACTIONS OF {int(batch_size)} ROWS\n"
+        f"RETURN {returns}"
+    )
+
+
+class L2MaintenanceJob:
+    """全部用户的 L2 偏好衰减与过期清理"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_run: float = 0.0
+        self._last_report: Dict[str, Any] = {}
+
+    # ──────────────────────────────
+    # 各步骤（返回处理条数）
+    # ──────────────────────────────
+
+    @staticmethod
+    def _count(result) -> int:
+        record = result.single()
+        return record["cnt"] if record else 0
+
+    def _decay(self, session, batch_size: int) -> int:
+        return self._count(session.run(
+            _in_transactions(
+                "MATCH (p:Preference)" + DECAY_PREFERENCE_FILTER,
+                "WITH p, ref, days" + DECAY_PREFERENCE_SET,
+                batch_size,
+            ),
+            now=datetime.now().isoformat(), decay_lambda=memory_budget.graph_decay_lambda,
+            floor=PREFERENCE_CONFIDENCE_FLOOR,
+        ))
+
+    def _prune_low_confidence(self, session, batch_size: int) -> int:
+        threshold = memory_budget.l2_maintenance_min_confidence
+        if threshold <= 0:
+            return 0
+        return self._count(session.run(
+            _in_transactions(
+                "MATCH (p:Preference) WHERE p.confidence < $threshold",
+                "WITH p DETACH DELETE p",
+                batch_size,
+            ),
+            threshold=threshold,
+        ))
+
+    def _expire_dual_threshold(self, session, batch_size: int) -> int:
+        cutoff = (datetime.now() - timedelta(days=memory_budget.merge_expire_days)).isoformat()
+        return self._count(session.run(
+            _in_transactions(
+                "MATCH (p:Preference) WHERE p.updated_at < $cutoff AND p.confidence < $min_importance",
+                "WITH p DETACH DELETE p",
+                batch_size,
+            ),
+            cutoff=cutoff, min_importance=memory_budget.merge_min_importance,
+        ))
+
+    def _cleanup_stale_relations(self, session, batch_size: int) -> Dict[str, int]:
+        cutoff = (datetime.now() - timedelta(days=memory_budget.l2_maintenance_stale_days)).isoformat()
+        removed = {"planned": 0, "exported": 0, "preferences": 0}
+        result = session.run(
+            _in_transactions(
+                "MATCH (:User)-[r:PLANNED|EXPORTED]->(:Heritage) "
+                "WHERE r.updated_at < $cutoff OR r.timestamp < $cutoff "
+                "WITH r, type(r) AS rel_type",
+                "WITH r DELETE r",
+                batch_size,
+                returns="rel_type, count(*) AS cnt",
+            ),
+            cutoff=cutoff,
+        )
+        for record in result:
+            removed[record["rel_type"].lower()] = record["cnt"]
+        removed["preferences"] = self._count(session.run(
+            _in_transactions(
+                "MATCH (:User)-[r:HAS_PREFERENCE]->(p:Preference) WHERE p.updated_at < $cutoff",
+                "WITH r DELETE r",
+                batch_size,
+            ),
+            cutoff=cutoff,
+        ))
+        return removed
+
+    def _cleanup_orphans(self, session, batch_size: int) -> int:
+        return self._count(session.run(
+            _in_transactions(
+                "MATCH (p:Preference) WHERE NOT (p)<-[:HAS_PREFERENCE]-(:User)",
+                "WITH p DETACH DELETE p",
+                batch_size,
+            )
+        ))
+
+    # ──────────────────────────────
+    # 执行
+    # ──────────────────────────────
+
+    def run(self) -> Dict[str, Any]:
+        """执行一轮全局维护，返回各步骤处理条数与耗时；已有一轮在执行时直接返回空报告"""
+        if not self._lock.acquire(blocking=False):
+            return {}
+        try:
+            return self._run()
+        finally:
+            self._lock.release()
+
+    def _run(self) -> Dict[str, Any]:
+        store = get_l2_graph_store()
+        if not store.is_available():
+            return {}
+
+        batch_size = max(1, memory_budget.l2_maintenance_batch_size)
+        steps = (
+            ("decayed", self._decay),
+            ("low_confidence", self._prune_low_confidence),
+            ("expired_dual", self._expire_dual_threshold),
+            ("stale_relations", self._cleanup_stale_relations),
+            ("global_orphans", self._cleanup_orphans),
+        )
+        report: Dict[str, Any] = {"steps_ms": {}, "errors": {}}
+        start = time.perf_counter()
+        with store.kg.driver.session() as session:
+            for name, step in steps:
+                step_start = time.perf_counter()
+                try:
+                    report[name] = step(session, batch_size)
+                except Exception as e:
+                    report[name] = {} if name == "stale_relations" else 0
+                    report["errors"][name] = str(e)
+                    logger.warning(f"L2 全局维护步骤 {name} 失败: {e}")
+                report["steps_ms"][name] = round((time.perf_counter() - step_start) * 1000, 2)
+
+        changed = sum(v if isinstance(v, int) else sum(v.values())
+                      for k, v in report.items() if k not in ("steps_ms", "errors"))
+        if changed:
+            store.invalidate_user_caches()
+
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        report["finished_at"] = datetime.now().isoformat()
+        self._last_run = time.time()
+        self._last_report = report
+        logger.info(f"L2 全局维护完成: 耗时 {report['elapsed_ms']}ms, {report}")
+        return report
+
+    def is_due(self) -> bool:
+        interval = memory_budget.merge_time_threshold_hours * 3600
+        return time.time() - self._last_run >= interval
+
+    def get_last_report(self) -> Dict[str, Any]:
+        return dict(self._last_report)
+
+
+_l2_maintenance_job: Optional[L2MaintenanceJob] = None
+
+
+def get_l2_maintenance_job() -> L2MaintenanceJob:
+    """获取 L2 全局维护任务单例"""
+    global _l2_maintenance_job
+    if _l2_maintenance_job is None:
+        _l2_maintenance_job = L2MaintenanceJob()
+    return _l2_maintenance_job
@@ -0,0 +1,427 @@
+# -*- coding: utf-8 -*-
+"""
+L2 写后队列（write-behind）
+MemoryCoordinator 每轮对话都会写 L2：用户活跃时间、Sifter 提取的偏好、对话意图 → 非遗关联，
+逐条 MERGE 链在对话路径上同步执行。本模块把这些写入按用户缓存在内存中：
+
+  - 同一用户在合并窗口内的写入合并为一份：同类型偏好只保留一条（值取最后一次，置信度取最大），
+    同一 (关系类型, 非遗) 只保留一条
+  - 后台线程在窗口到期或待写条目达到批量阈值时，以 UNWIND 批量语句单事务落库
+  - 待写条目总数有上限，超出后 enqueue 返回 False，由调用方回退同步直写
+  - 写入失败整体放回队列重试，超过重试次数后丢弃并计数
+  - 关闭时刷新全部待写条目，并暴露排队滞后等指标
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from Agent.config.memory_budget import memory_budget
+
+# 需要保留窗口内全部取值的偏好类型（每个取值各自产生地区兴趣 / 桥接边）
+_VARIANT_PREF_TYPES = {"interest", "region_interest"}
+
+_VALID_REL_TYPES = {"PREFERS", "PLANNED", "EXPORTED"}
+
+
+class _PendingUser:
+    """单个用户在窗口内合并后的待写条目"""
+
+    __slots__ = ('user_id', 'username', 'now', 'first_at', 'due_at', 'attempts',
+                 'preferences', 'links', 'session_ids', 'items')
+
+    def __init__(self, user_id: str, window: float):
+        self.user_id = user_id
+        self.username: Optional[str] = None
+        self.now: str = ''
+        # first_at 用于计算排队滞后，due_at 为计划落库时间（重试时退避后移）
+        self.first_at = time.monotonic()
+        self.due_at = self.first_at + window
+        self.attempts = 0
+        self.preferences: Dict[str, Dict[str, Any]] = {}
+        self.links: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self.session_ids: set = set()
+        # 用户节点本身计 1 条
+        self.items = 1
+
+    def touch(self, username: Optional[str], now_iso: str, session_id: Optional[str] = None):
+        if username is not None:
+            self.username = username
+        self.now = now_iso
+        if session_id:
+            self.session_ids.add(session_id)
+
+    def add_preference(self, pref: Dict[str, Any], now_iso: str) -> int:
+        """合并一条偏好，返回新增条目数（0 表示被已有条目吸收）"""
+        p_type = pref.get("type", "unknown")
+        value = pref.get("value", "")
+        confidence = float(pref.get("confidence", 0.5))
+        source = pref.get("source", "sifter")
+
+        entry = self.preferences.get(p_type)
+        added = 0
+        if entry is None:
+            entry = {"type": p_type, "confidence": confidence, "variants": {}}
+            self.preferences[p_type] = entry
+            added = 1
+        else:
+            entry["confidence"] = max(entry["confidence"], confidence)
+        entry.update(value=value, source=source, now=now_iso)
+
+        if p_type in _VARIANT_PREF_TYPES:
+            key = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+            variants = entry["variants"]
+            if key in variants:
+                variants.pop(key)
+            elif not added:
+                added = 1
+            variants[key] = (value, confidence)
+        self.items += added
+        return added
+
+    def add_link(self, link: Dict[str, Any]) -> int:
+        """合并一条非遗关联，返回新增条目数"""
+        key = (link["rel_type"], link["heritage_id"])
+        entry = self.links.get(key)
+        if entry is None:
+            self.links[key] = dict(link, extra_props=dict(link.get("extra_props") or {}))
+            self.items += 1
+            return 1
+        if link["rel_type"] == "PREFERS":
+            entry["confidence"] = max(entry["confidence"], link["confidence"])
+        else:
+            entry["confidence"] = link["confidence"]
+        entry["extra_props"].update(link.get("extra_props") or {})
+        entry.update(source=link["source"], now=link["now"],
+                     protect=entry["protect"] and link["protect"])
+        return 0
+
+    def absorb(self, newer: '_PendingUser'):
+        """把失败重排时窗口内新到的写入叠加到本条目之上（新写入优先）"""
+        self.touch(newer.username, newer.now or self.now)
+        self.session_ids |= newer.session_ids
+        for entry in newer.preferences.values():
+            variants = list(entry["variants"].values()) or [(entry["value"], entry["confidence"])]
+            for value, confidence in variants:
+                self.add_preference({"type": entry["type"], "value": value,
+                                     "confidence": confidence, "source": entry["source"]}, entry["now"])
+            self.preferences[entry["type"]]["value"] = entry["value"]
+        for link in newer.links.values():
+            self.add_link(link)
+
+    def to_rows(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        user = {"user_id": self.user_id, "username": self.username, "now": self.now}
+        prefs = [{
+            "user_id": self.user_id, "type": e["type"], "value": e["value"],
+            "confidence": e["confidence"], "source": e["source"], "now": e["now"],
+            "variants": list(e["variants"].values()),
+        } for e in self.preferences.values()]
+        links = [dict(link, user_id=self.user_id) for link in self.links.values()]
+        return user, prefs, links
+
+
+class L2WriteQueue:
+    """按用户合并 L2 写入、后台批量落库的写后队列"""
+
+    LAG_SAMPLES = 1000
+
+    def __init__(self, store=None, window_ms: float = None, max_batch: int = None,
+                 max_pending: int = None, max_retries: int = None):
+        if store is None:
+            from Agent.memory.l2_graph_store import get_l2_graph_store
+            store = get_l2_graph_store()
+        self.store = store
+        self.window = (memory_budget.l2_write_behind_window_ms if window_ms is None else window_ms) / 1000.0
+        self.max_batch = max(1, max_batch or memory_budget.l2_write_behind_max_batch)
+        self.max_pending = max(1, max_pending or memory_budget.l2_write_behind_max_pending)
+        self.max_retries = memory_budget.l2_write_behind_max_retries if max_retries is None else max_retries
+
+        self._cond = threading.Condition()
+        self._pending: Dict[str, _PendingUser] = {}
+        self._pending_items = 0
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._flush_requested = False
+        self._flushing = 0
+        self._listeners: List[Callable[[str, set], None]] = []
+
+        self._lags: deque = deque(maxlen=self.LAG_SAMPLES)
+        self._last_flush: Dict[str, Any] = {}
+        self._stats = {
+            "enqueued": 0,
+            "coalesced": 0,
+            "overflow_fallbacks": 0,
+            "flushes": 0,
+            "flushed_users": 0,
+            "flushed_preferences": 0,
+            "flushed_links": 0,
+            "blocked_links": 0,
+            "flush_failures": 0,
+            "retried_users": 0,
+            "dropped_users": 0,
+        }
+
+    # ──────────────────────────────
+    # 入队
+    # ──────────────────────────────
+
+    def add_flush_listener(self, listener: Callable[[str, set], None]):
+        """注册落库回调 listener(user_id, session_ids)，在后台线程中调用"""
+        self._listeners.append(listener)
+
+    def enqueue_touch(self, user_id: str, username: str = None) -> bool:
+        """更新用户活跃时间"""
+        return self._enqueue(user_id, username, None, 0, lambda entry, now: 0)
+
+    def enqueue_preferences(self, user_id: str, preferences: List[Dict[str, Any]],
+                            username: str = None, session_id: str = None) -> bool:
+        """缓存偏好写入，语义同 L2GraphStore.upsert_user_preferences"""
+        if not preferences:
+            return False
+
+        def apply(entry: _PendingUser, now: str) -> int:
+            return sum(entry.add_preference(pref, now) for pref in preferences)
+        return self._enqueue(user_id, username, session_id, len(preferences), apply)
+
+    def enqueue_heritage_link(self, user_id: str, heritage_id: int, rel_type: str = "PREFERS",
+                              confidence: float = 0.6, source: str = "dialogue",
+                              extra_props: dict = None, protect: bool = True,
+                              session_id: str = None) -> bool:
+        """缓存非遗关联写入，语义同 L2GraphStore.link_user_heritage（protect=True 时经过入度保护）"""
+        if rel_type not in _VALID_REL_TYPES:
+            logger.warning(f"非法关系类型: {rel_type}，允许值: {_VALID_REL_TYPES}")
+            return False
+        if not isinstance(heritage_id, int) or heritage_id <= 0:
+            logger.warning(f"非法heritage_id: {heritage_id}")
+            return False
+
+        def apply(entry: _PendingUser, now: str) -> int:
+            return entry.add_link({
+                "heritage_id": heritage_id, "rel_type": rel_type, "confidence": float(confidence),
+                "source": source, "now": now, "extra_props": extra_props, "protect": protect,
+            })
+        return self._enqueue(user_id, None, session_id, 1, apply)
+
+    def _enqueue(self, user_id: str, username: Optional[str], session_id: Optional[str],
+                 incoming: int, apply: Callable[[_PendingUser, str], int]) -> bool:
+        if not user_id:
+            return False
+        now_iso = datetime.now().isoformat()
+        with self._cond:
+            if self._closed:
+                return False
+            entry = self._pending.get(user_id)
+            # 按最坏情况（全部为新条目）检查上限，超出则由调用方同步直写
+            worst = incoming + (0 if entry else 1)
+            if self._pending_items + worst > self.max_pending:
+                self._stats["overflow_fallbacks"] += 1
+                self._flush_requested = True
+                self._cond.notify_all()
+                return False
+            if entry is None:
+                entry = self._pending[user_id] = _PendingUser(user_id, self.window)
+                self._pending_items += 1
+                self._cond.notify_all()
+            entry.touch(username, now_iso, session_id)
+            added = apply(entry, now_iso)
+            self._pending_items += added
+            self._stats["enqueued"] += incoming
+            self._stats["coalesced"] += incoming - added
+            if self._pending_items >= self.max_batch:
+                self._flush_requested = True
+                self._cond.notify_all()
+            self._ensure_worker()
+        return True
+
+    # ──────────────────────────────
+    # 落库
+    # ──────────────────────────────
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='l2-write-behind', daemon=True)
+            self._thread.start()
+
+    def _drain(self, force: bool) -> List[_PendingUser]:
+        """取出到期的用户条目（force 时全部取出），调用方持有锁"""
+        now = time.monotonic()
+        if force:
+            users = list(self._pending.values())
+            self._pending.clear()
+        else:
+            users = [e for e in self._pending.values() if e.due_at <= now]
+            for e in users:
+                del self._pending[e.user_id]
+        self._pending_items -= sum(e.items for e in users)
+        return users
+
+    def _next_timeout(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        due = min(e.due_at for e in self._pending.values())
+        return max(0.0, due - time.monotonic())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._flush_requested:
+                    timeout = self._next_timeout()
+                    if timeout == 0.0:
+                        break
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+                force = self._flush_requested
+                self._flush_requested = False
+                users = self._drain(force)
+                self._flushing += 1
+            try:
+                self._write(users)
+            finally:
+                with self._cond:
+                    self._flushing -= 1
+                    self._cond.notify_all()
+
+    def _write(self, users: List[_PendingUser]) -> bool:
+        if not users:
+            return True
+        rows_users, rows_prefs, rows_links = [], [], []
+        for entry in users:
+            user, prefs, links = entry.to_rows()
+            rows_users.append(user)
+            rows_prefs.extend(prefs)
+            rows_links.extend(links)
+
+        start = time.perf_counter()
+        try:
+            counts = self.store.write_batch(rows_users, rows_prefs, rows_links)
+        except Exception as e:
+            logger.warning(f"L2 写后队列落库异常: {e}")
+            counts = None
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        if counts is None:
+            self._requeue(users)
+            return False
+
+        done = time.monotonic()
+        lags = [(done - e.first_at) * 1000 for e in users]
+        with self._cond:
+            self._lags.extend(lags)
+            self._stats["flushes"] += 1
+            self._stats["flushed_users"] += len(users)
+            self._stats["flushed_preferences"] += len(rows_prefs)
+            self._stats["flushed_links"] += counts.get("heritage_links", 0)
+            self._stats["blocked_links"] += counts.get("blocked", 0)
+            self._last_flush = {
+                "at": datetime.now().isoformat(),
+                "users": len(users),
+                "items": sum(e.items for e in users),
+                "duration_ms": duration_ms,
+                "max_lag_ms": round(max(lags), 2),
+            }
+
+        for entry in users:
+            for listener in self._listeners:
+                try:
+                    listener(entry.user_id, entry.session_ids)
+                except Exception as e:
+                    logger.debug(f"L2 写后队列回调失败: {e}")
+        return True
+
+    def _requeue(self, users: List[_PendingUser]):
+        """写入失败：未超重试次数的条目放回队列（与窗口内新到写入合并），其余丢弃"""
+        with self._cond:
+            self._stats["flush_failures"] += 1
+            for entry in users:
+                entry.attempts += 1
+                if entry.attempts > self.max_retries:
+                    self._stats["dropped_users"] += 1
+                    logger.warning(f"L2 写后队列重试耗尽，丢弃用户写入: user={entry.user_id}, items={entry.items}")
+                    continue
+                entry.due_at = time.monotonic() + self.window * (2 ** entry.attempts)
+                newer = self._pending.pop(entry.user_id, None)
+                if newer is not None:
+                    self._pending_items -= newer.items
+                    entry.absorb(newer)
+                self._pending[entry.user_id] = entry
+                self._pending_items += entry.items
+                self._stats["retried_users"] += 1
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """立即落库全部待写条目（同步等待），返回是否全部成功"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._flushing and time.monotonic() < deadline:
+                self._cond.wait(deadline - time.monotonic())
+            users = self._drain(force=True)
+        return self._write(users)
+
+    def close(self, timeout: float = 10.0) -> bool:
+        """停止后台线程并刷新剩余条目"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        ok = self.flush(timeout)
+        with self._cond:
+            remaining = self._pending_items
+        if remaining:
+            logger.warning(f"L2 写后队列关闭时仍有 {remaining} 条写入未能落库")
+        else:
+            logger.info("L2 写后队列已刷新并关闭")
+        return ok
+
+    # ──────────────────────────────
+    # 指标
+    # ──────────────────────────────
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            oldest = min((e.first_at for e in self._pending.values()), default=None)
+            lags = sorted(self._lags)
+            enqueued = self._stats["enqueued"]
+            return {
+                **self._stats,
+                "pending_users": len(self._pending),
+                "pending_items": self._pending_items,
+                "max_pending": self.max_pending,
+                "oldest_pending_ms": round((now - oldest) * 1000, 2) if oldest is not None else 0.0,
+                "coalesce_ratio": round(self._stats["coalesced"] / enqueued, 4) if enqueued else 0.0,
+                "lag_ms": {
+                    "p50": round(lags[len(lags) // 2], 2) if lags else None,
+                    "p95": round(lags[min(len(lags) - 1, int(len(lags) * 0.95))], 2) if lags else None,
+                    "max": round(lags[-1], 2) if lags else None,
+                },
+                "last_flush": dict(self._last_flush),
+                "window_ms": self.window * 1000,
+                "closed": self._closed,
+            }
+
+
+_l2_write_queue: Optional[L2WriteQueue] = None
+_l2_write_queue_lock = threading.Lock()
+
+
+def get_l2_write_queue() -> L2WriteQueue:
+    """获取 L2 写后队列单例"""
+    global _l2_write_queue
+    if _l2_write_queue is None:
+        with _l2_write_queue_lock:
+            if _l2_write_queue is None:
+                _l2_write_queue = L2WriteQueue()
+    return _l2_write_queue
+
+
+def shutdown_l2_write_queue(timeout: float = 10.0):
+    """关闭时刷新待写条目（未创建过队列时不做任何事）"""
+    if _l2_write_queue is not None:
+        _l2_write_queue.close(timeout)
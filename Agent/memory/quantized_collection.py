@@ -0,0 +1,485 @@
+# -*- coding: utf-8 -*-
+"""
+量化向量集合
+为持续增长的 conversations / session_archives 集合提供紧凑的向量存储，
+实现 Chroma Collection 中本项目用到的接口子集（add / upsert / query / get /
+delete / count），可直接替换 VectorStore.collections 中的对应集合。
+
+量化格式（config.VECTOR_QUANTIZATION）:
+  float16 — 每维 2 字节
+  int8    — 每维 1 字节 + 每向量一个 float32 缩放系数（对称量化，max|x| → 127）
+
+检索流程:
+  1. 按 where 过滤得到候选行
+  2. 用量化向量近似打分，取 n_results × rerank_factor 个候选
+  3. 重排：用 rerank_encoder 重新取得候选文档的全精度向量（命中持久化嵌入缓存时
+     无需前向计算）计算精确余弦，取前 n_results；编码在释放集合锁之后进行，
+     不阻塞并发的写入与读取
+
+内存布局: 常驻内存的只有量化向量、id、元数据（where 过滤需要）与每行在日志中的字节偏移，
+文档正文不常驻，按偏移从日志读取（query / get 只读取返回的行与重排候选）。
+
+持久化（Agent/data/quantized/<集合名>/log.jsonl）:
+  首行为头部 {format, dimension}，其后每行一条追加操作
+  {"op": "put", "id", "doc", "meta", "vec": base64, "scale"} 或 {"op": "del", "id"}，
+  失效行过多时整体压缩重写。
+"""
+
+import os
+import json
+import base64
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+
+import numpy as np
+from loguru import logger
+
+
+QUANTIZATION_FORMATS = ('float16', 'int8')
+
+
+def quantize(vectors: np.ndarray, fmt: str):
+    """量化已归一化的向量矩阵，返回 (codes, scales)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if fmt == 'float16':
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    max_abs = np.abs(vectors).max(axis=1)
+    scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return codes.astype(np.float32) * scales[:, None]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def match_where(meta: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """按 Chroma where 语义匹配单条元数据（支持 $and/$or/$eq/$ne/$in/$nin/$gt/$gte/$lt/$lte）"""
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == '$and':
+            if not all(match_where(meta, c) for c in cond):
+                return False
+            continue
+        if key == '$or':
+            if not any(match_where(meta, c) for c in cond):
+                return False
+            continue
+        value = meta.get(key)
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+            continue
+        for op, expected in cond.items():
+            if op == '$eq' and value != expected:
+                return False
+            if op == '$ne' and value == expected:
+                return False
+            if op == '$in' and value not in expected:
+                return False
+            if op == '$nin' and value in expected:
+                return False
+            if op in ('$gt', '$gte', '$lt', '$lte'):
+                if value is None:
+                    return False
+                if op == '$gt' and not value > expected:
+                    return False
+                if op == '$gte' and not value >= expected:
+                    return False
+                if op == '$lt' and not value < expected:
+                    return False
+                if op == '$lte' and not value <= expected:
+                    return False
+    return True
+
+
+class QuantizedCollection:
+    """量化向量集合（Chroma Collection 接口子集）"""
+
+    LOG_FILE = "log.jsonl"
+    # 失效行超过该数量且多于存活行时触发压缩
+    COMPACT_MIN_DEAD = 1000
+
+    def __init__(self, name: str, directory: str, fmt: str = 'int8',
+                 rerank_factor: int = 4,
+                 rerank_encoder: Callable[[List[str]], List[List[float]]] = None):
+        """
+        Args:
+            name: 集合名
+            directory: 持久化目录
+            fmt: 量化格式 float16 / int8
+            rerank_factor: 近似打分阶段的候选倍数，<=1 时不重排
+            rerank_encoder: 文本 → 全精度向量，用于重排
+        """
+        if fmt not in QUANTIZATION_FORMATS:
+            raise ValueError(f"不支持的量化格式: {fmt}")
+        self.name = name
+        self.fmt = fmt
+        self.rerank_factor = int(rerank_factor)
+        self.rerank_encoder = rerank_encoder
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._log_path = self.directory / self.LOG_FILE
+
+        self._lock = threading.RLock()
+        self._dimension = 0
+        self._codes = None
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._ids: List[Optional[str]] = []
+        # 每行 put 记录在日志中的字节偏移；-1 表示写日志失败，文档暂存于 _unlogged
+        self._offsets: List[int] = []
+        self._unlogged: Dict[int, str] = {}
+        self._metadatas: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+
+        self._load()
+
+    # ──────────────────────────────
+    # 内部存储
+    # ──────────────────────────────
+
+    def _code_dtype(self):
+        return np.float16 if self.fmt == 'float16' else np.int8
+
+    def _ensure_capacity(self, extra: int, dimension: int):
+        if self._codes is None:
+            self._dimension = dimension
+            capacity = max(1024, extra)
+            self._codes = np.zeros((capacity, dimension), dtype=self._code_dtype())
+            self._scales = np.zeros(capacity, dtype=np.float32)
+            self._alive = np.zeros(capacity, dtype=bool)
+            return
+        if dimension != self._dimension:
+            raise ValueError(f"向量维度不匹配: {dimension} != {self._dimension}")
+        needed = self._size + extra
+        if needed <= len(self._codes):
+            return
+        capacity = max(needed, len(self._codes) * 2)
+        codes = np.zeros((capacity, self._dimension), dtype=self._code_dtype())
+        codes[:self._size] = self._codes[:self._size]
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[:self._size] = self._scales[:self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._codes, self._scales, self._alive = codes, scales, alive
+
+    def _put_rows(self, ids: List[str], codes: np.ndarray, scales: np.ndarray,
+                  offsets: List[int], metadatas: List[Dict[str, Any]],
+                  documents: List[str] = None):
+        """写入行；offsets 为 -1 的行把 documents 中的正文暂存在内存"""
+        self._ensure_capacity(len(ids), codes.shape[1])
+        for i, doc_id in enumerate(ids):
+            old = self._rows.get(doc_id)
+            if old is not None:
+                self._kill_row(old)
+            row = self._size
+            self._codes[row] = codes[i]
+            self._scales[row] = scales[i]
+            self._alive[row] = True
+            self._ids.append(doc_id)
+            self._offsets.append(offsets[i])
+            if offsets[i] < 0:
+                self._unlogged[row] = documents[i] if documents else ''
+            self._metadatas.append(metadatas[i])
+            self._rows[doc_id] = row
+            self._size += 1
+        self._columns.clear()
+
+    def _kill_row(self, row: int):
+        self._alive[row] = False
+        self._rows.pop(self._ids[row], None)
+        self._ids[row] = None
+        self._offsets[row] = -1
+        self._unlogged.pop(row, None)
+        self._metadatas[row] = {}
+
+    def _dead_count(self) -> int:
+        return self._size - len(self._rows)
+
+    # ──────────────────────────────
+    # 持久化
+    # ──────────────────────────────
+
+    def _encode_record(self, doc_id: str, code: np.ndarray, scale: float,
+                       document: str, metadata: Dict[str, Any]) -> str:
+        return json.dumps({
+            'op': 'put', 'id': doc_id, 'doc': document, 'meta': metadata,
+            'vec': base64.b64encode(code.tobytes()).decode('ascii'),
+            'scale': float(scale),
+        }, ensure_ascii=False)
+
+    def _header(self) -> bytes:
+        return (json.dumps({'format': self.fmt, 'dimension': self._dimension}) + '\n').encode('utf-8')
+
+    def _append_log(self, lines: List[str]) -> List[int]:
+        """追加日志行，返回每行的字节偏移（失败时全部为 -1）"""
+        offsets = []
+        try:
+            with open(self._log_path, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(self._header())
+                for line in lines:
+                    offsets.append(f.tell())
+                    f.write(line.encode('utf-8') + b'\n')
+            return offsets
+        except Exception as e:
+            logger.warning(f"量化集合 '{self.name}' 写日志失败: {e}")
+            return [-1] * len(lines)
+
+    def _read_documents(self, rows) -> List[str]:
+        """按日志偏移读取文档正文"""
+        docs = []
+        f = None
+        try:
+            for row in rows:
+                offset = self._offsets[row]
+                if offset < 0:
+                    docs.append(self._unlogged.get(row, ''))
+                    continue
+                if f is None:
+                    f = open(self._log_path, 'rb')
+                f.seek(offset)
+                docs.append(json.loads(f.readline()).get('doc', ''))
+        except Exception as e:
+            logger.warning(f"量化集合 '{self.name}' 读取文档失败: {e}")
+            docs.extend([''] * (len(rows) - len(docs)))
+        finally:
+            if f is not None:
+                f.close()
+        return docs
+
+    def _load(self):
+        if not self._log_path.exists():
+            return
+        try:
+            with open(self._log_path, 'rb') as f:
+                header = json.loads(f.readline() or b'{}')
+                stored_fmt = header.get('format', self.fmt)
+                stored_dtype = np.float16 if stored_fmt == 'float16' else np.int8
+                while True:
+                    offset = f.tell()
+                    line = f.readline()
+                    if not line:
+                        break
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get('op') == 'del':
+                        row = self._rows.get(record.get('id'))
+                        if row is not None:
+                            self._kill_row(row)
+                        continue
+                    code = np.frombuffer(base64.b64decode(record['vec']), dtype=stored_dtype)
+                    scale = np.array([record.get('scale', 1.0)], dtype=np.float32)
+                    if stored_fmt != self.fmt:
+                        code, scale = quantize(dequantize(code[None, :], scale), self.fmt)
+                    else:
+                        code = code[None, :]
+                    self._put_rows([record['id']], code, scale,
+                                   [offset], [record.get('meta') or {}])
+            logger.info(f"量化集合 '{self.name}' 已加载: {len(self._rows)} 条 ({self.fmt})")
+            if stored_fmt != self.fmt or self._dead_count() >= self.COMPACT_MIN_DEAD:
+                self._compact()
+        except Exception as e:
+            logger.warning(f"量化集合 '{self.name}' 加载失败: {e}")
+
+    def _compact(self):
+        """丢弃失效行并重写日志（先写临时文件，替换成功后才切换到新偏移）"""
+        live = [r for r in range(self._size) if self._alive[r]]
+        ids = [self._ids[r] for r in live]
+        codes = self._codes[live] if live else None
+        scales = self._scales[live]
+        metadatas = [self._metadatas[r] for r in live]
+        documents = self._read_documents(live)
+
+        tmp_path = self._log_path.with_suffix('.jsonl.tmp')
+        offsets = []
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(self._header())
+                for i, doc_id in enumerate(ids):
+                    offsets.append(f.tell())
+                    f.write(self._encode_record(
+                        doc_id, codes[i], scales[i], documents[i], metadatas[i]
+                    ).encode('utf-8') + b'\n')
+            os.replace(tmp_path, self._log_path)
+        except Exception as e:
+            logger.warning(f"量化集合 '{self.name}' 压缩失败: {e}")
+            return
+
+        self._codes, self._size = None, 0
+        self._ids, self._offsets, self._metadatas, self._rows = [], [], [], {}
+        self._unlogged = {}
+        if live:
+            self._put_rows(ids, codes, scales, offsets, metadatas)
+        logger.info(f"量化集合 '{self.name}' 压缩完成: {self._size} 条")
+
+    # ──────────────────────────────
+    # Chroma 兼容接口
+    # ──────────────────────────────
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str] = None,
+               metadatas: List[Dict[str, Any]] = None):
+        if not ids:
+            return
+        documents = documents or [''] * len(ids)
+        metadatas = metadatas or [{}] * len(ids)
+        codes, scales = quantize(_normalize(embeddings), self.fmt)
+        with self._lock:
+            offsets = self._append_log([
+                self._encode_record(ids[i], codes[i], scales[i], documents[i], metadatas[i] or {})
+                for i in range(len(ids))
+            ])
+            self._put_rows(list(ids), codes, scales, offsets,
+                           [dict(m or {}) for m in metadatas], list(documents))
+
+    def add(self, ids: List[str], embeddings, documents: List[str] = None,
+            metadatas: List[Dict[str, Any]] = None):
+        """与 Chroma 一致：已存在的 id 忽略"""
+        with self._lock:
+            keep = [i for i, doc_id in enumerate(ids) if doc_id not in self._rows]
+        if not keep:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        self.upsert(
+            [ids[i] for i in keep], embeddings[keep],
+            [documents[i] for i in keep] if documents else None,
+            [metadatas[i] for i in keep] if metadatas else None,
+        )
+
+    def _matching_rows(self, where: Optional[Dict[str, Any]],
+                       ids: Optional[List[str]] = None) -> np.ndarray:
+        if ids is not None:
+            rows = [self._rows[i] for i in ids if i in self._rows]
+            return np.array([r for r in rows if match_where(self._metadatas[r], where)], dtype=np.int64)
+        alive = np.flatnonzero(self._alive[:self._size])
+        if not where:
+            return alive
+        # 单字段等值过滤（最常见的 user_id 过滤）走列数组
+        if len(where) == 1:
+            field, cond = next(iter(where.items()))
+            if not field.startswith('$') and not isinstance(cond, dict):
+                column = self._columns.get(field)
+                if column is None:
+                    column = np.array([m.get(field) for m in self._metadatas], dtype=object)
+                    self._columns[field] = column
+                return alive[column[alive] == cond]
+        return np.array([r for r in alive if match_where(self._metadatas[r], where)], dtype=np.int64)
+
+    def _rerank(self, documents: List[str], query: np.ndarray,
+                approx_scores: np.ndarray) -> np.ndarray:
+        try:
+            exact = _normalize(self.rerank_encoder(documents))
+            return exact @ query
+        except Exception as e:
+            logger.debug(f"量化集合 '{self.name}' 重排失败，使用近似分数: {e}")
+            return approx_scores
+
+    def query(self, query_embeddings, n_results: int = 10,
+              where: Dict[str, Any] = None, include: List[str] = None,
+              **kwargs) -> Dict[str, Any]:
+        include = include or ['documents', 'metadatas', 'distances']
+        out = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        rerank = self.rerank_factor > 1 and self.rerank_encoder is not None
+        for q in query_embeddings:
+            query = _normalize(q)[0]
+            # 锁内只做近似打分并取出候选快照，重排编码在锁外进行
+            with self._lock:
+                rows = self._matching_rows(where)
+                if rows.size == 0 or n_results <= 0:
+                    hits, scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+                else:
+                    approx = (self._codes[rows].astype(np.float32) @ query) * self._scales[rows]
+                    k = min(n_results * max(1, self.rerank_factor), rows.size)
+                    top = np.argpartition(-approx, k - 1)[:k]
+                    hits, scores = rows[top], approx[top]
+                    if not rerank:
+                        order = np.argsort(-scores)[:n_results]
+                        hits, scores = hits[order], scores[order]
+                ids = [self._ids[r] for r in hits]
+                metadatas = [self._metadatas[r] for r in hits]
+                documents = (self._read_documents(hits)
+                             if rerank or 'documents' in include else [''] * len(hits))
+
+            if rerank and len(hits):
+                exact = self._rerank(documents, query, scores)
+                order = np.argsort(-exact)[:n_results]
+                scores = exact[order]
+                ids = [ids[i] for i in order]
+                metadatas = [metadatas[i] for i in order]
+                documents = [documents[i] for i in order]
+            out['ids'].append(ids)
+            out['documents'].append(documents)
+            out['metadatas'].append(metadatas)
+            out['distances'].append([float(1.0 - s) for s in scores])
+        return {k: v for k, v in out.items() if k == 'ids' or k in include}
+
+    def get(self, ids: List[str] = None, where: Dict[str, Any] = None,
+            include: List[str] = None, limit: int = None, offset: int = None,
+            **kwargs) -> Dict[str, Any]:
+        include = include or ['documents', 'metadatas']
+        with self._lock:
+            rows = self._matching_rows(where, ids)
+            if offset:
+                rows = rows[offset:]
+            if limit is not None:
+                rows = rows[:limit]
+            out = {'ids': [self._ids[r] for r in rows]}
+            if 'documents' in include:
+                out['documents'] = self._read_documents(rows)
+            if 'metadatas' in include:
+                out['metadatas'] = [self._metadatas[r] for r in rows]
+            if 'embeddings' in include:
+                out['embeddings'] = (dequantize(self._codes[rows], self._scales[rows]).tolist()
+                                     if rows.size else [])
+        return out
+
+    def delete(self, ids: List[str] = None, where: Dict[str, Any] = None):
+        with self._lock:
+            rows = self._matching_rows(where, ids) if (ids is not None or where) else np.zeros(0, dtype=np.int64)
+            deleted = [self._ids[r] for r in rows]
+            for r in rows:
+                self._kill_row(int(r))
+            if not deleted:
+                return
+            self._columns.clear()
+            self._append_log([json.dumps({'op': 'del', 'id': i}, ensure_ascii=False) for i in deleted])
+            dead = self._dead_count()
+            if dead >= self.COMPACT_MIN_DEAD and dead > len(self._rows):
+                self._compact()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            live = len(self._rows)
+            bytes_per_vector = (self._dimension * np.dtype(self._code_dtype()).itemsize
+                                + (4 if self.fmt == 'int8' else 0))
+            return {
+                'format': self.fmt,
+                'count': live,
+                'dimension': self._dimension,
+                'dead_rows': self._dead_count(),
+                'vector_bytes': live * bytes_per_vector,
+                'float32_bytes': live * self._dimension * 4,
+                'log_bytes': self._log_path.stat().st_size if self._log_path.exists() else 0,
+            }
@@ -4,6 +4,7 @@ RAG 检索模块
 实现双轨混合检索增强生成，融合 ChromaDB 向量检索与 Neo4j 知识图谱检索
 """
 
+import asyncio
 import concurrent.futures
 from typing import Dict, Any, List, Optional
 from loguru import logger
@@ -15,6 +16,17 @@ from Agent.config.memory_budget import memory_budget
 # 单个RAG条目的字符上限，从 rag_context_max_chars 派生（约为1/4，最少200）
 _RAG_ITEM_MAX_CHARS = max(memory_budget.rag_context_max_chars // 4, 200)
 
+# 同步 retrieve_context 的图谱检索线程池（进程内共享，避免每次调用创建线程池）
+_kg_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+
+def _get_kg_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _kg_executor
+    if _kg_executor is None:
+        _kg_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix='rag-kg')
+    return _kg_executor
+
 
 class RAGRetriever:
     """
@@ -75,18 +87,16 @@ class RAGRetriever:
         has_kg = self._kg_available()
 
         if has_vector and has_kg:
-            # 双轨并行检索
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-                v_future = executor.submit(self.vector_store.hybrid_search, query, user_id, top_k)
-                kg_future = executor.submit(self._retrieve_from_knowledge_graph, query, top_k)
-                try:
-                    vector_results = v_future.result(timeout=30)
-                except Exception as e:
-                    logger.debug(f"向量检索失败: {e}")
-                try:
-                    graph_results = kg_future.result(timeout=30)
-                except Exception as e:
-                    logger.debug(f"知识图谱检索失败: {e}")
+            # 双轨并行检索：图谱轨道提交到共享线程池，向量轨道在当前线程执行
+            kg_future = _get_kg_executor().submit(self._retrieve_from_knowledge_graph, query, top_k)
+            try:
+                vector_results = self.vector_store.hybrid_search(query, user_id, top_k)
+            except Exception as e:
+                logger.debug(f"向量检索失败: {e}")
+            try:
+                graph_results = kg_future.result(timeout=30)
+            except Exception as e:
+                logger.debug(f"知识图谱检索失败: {e}")
         elif has_vector:
             vector_results = self.vector_store.hybrid_search(query, user_id, top_k)
         elif has_kg:
@@ -95,12 +105,49 @@ class RAGRetriever:
         vector_results['knowledge_graph'] = graph_results
         return vector_results
 
+    async def retrieve_context_async(self, query: str, user_id: str = None,
+                                     top_k: int = 3) -> Dict[str, Any]:
+        """
+        retrieve_context 的异步版本
+
+        向量检索走 VectorStore 专用检索线程池，图谱检索走知识图谱异步驱动，
+        两轨并发且不阻塞事件循环。
+        """
+        vector_results = {'conversations': [], 'heritage_knowledge': [], 'attractions': []}
+        graph_results = []
+
+        has_vector = self.vector_store is not None
+        has_kg = await asyncio.to_thread(self._kg_available)
+
+        tasks = []
+        if has_vector:
+            tasks.append(self.vector_store.hybrid_search_async(query, user_id, top_k))
+        if has_kg:
+            tasks.append(self._retrieve_from_knowledge_graph_async(query, top_k))
+
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        if has_vector:
+            v_outcome = outcomes.pop(0)
+            if isinstance(v_outcome, Exception):
+                logger.debug(f"向量检索失败: {v_outcome}")
+            else:
+                vector_results = v_outcome
+        if has_kg:
+            kg_outcome = outcomes.pop(0)
+            if isinstance(kg_outcome, Exception):
+                logger.debug(f"知识图谱检索失败: {kg_outcome}")
+            else:
+                graph_results = kg_outcome
+
+        vector_results['knowledge_graph'] = graph_results
+        return vector_results
+
     def _retrieve_from_knowledge_graph(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         """
         从 Neo4j 知识图谱检索结构化事实
         
         策略:
-        1. 关键词匹配查询非遗项目节点
+        1. 全文索引（CJK 分词）按相关度检索非遗项目节点，索引不可用时回退 CONTAINS
         2. 沿关系边扩展查询关联实体（类别、地区、级别）
         3. 返回带关系锚定的结构化事实
         """
@@ -108,45 +155,48 @@ class RAGRetriever:
         if not kg or not kg.is_connected():
             return []
 
-        results = []
         try:
-            with kg.driver.session() as session:
-                cypher = """
-                    MATCH (h:Heritage)
-                    WHERE h.name CONTAINS $kw 
-                       OR h.category CONTAINS $kw 
-                       OR h.region CONTAINS $kw
-                       OR h.description CONTAINS $kw
-                    OPTIONAL MATCH (h)-[:BELONGS_TO]->(c:Category)
-                    OPTIONAL MATCH (h)-[:LOCATED_AT]->(r:Region)
-                    OPTIONAL MATCH (h)-[:HAS_LEVEL]->(l:Level)
-                    RETURN h.id AS id, h.name AS name, h.category AS category,
-                           h.region AS region, h.level AS level,
-                           h.description AS description,
-                           collect(DISTINCT c.name) AS related_categories,
-                           collect(DISTINCT r.name) AS related_regions,
-                           collect(DISTINCT l.name) AS related_levels
-                    LIMIT $top_k
-                """
-                result = session.run(cypher, kw=query, top_k=top_k)
-                for record in result:
-                    item = {
-                        'id': record.get('id'),
-                        'name': record.get('name', ''),
-                        'category': record.get('category', ''),
-                        'region': record.get('region', ''),
-                        'level': record.get('level', ''),
-                        'description': (record.get('description') or '')[:_RAG_ITEM_MAX_CHARS],
-                        'related_categories': [c for c in record.get('related_categories', []) if c],
-                        'related_regions': [r for r in record.get('related_regions', []) if r],
-                        'related_levels': [l for l in record.get('related_levels', []) if l],
-                        'source': 'knowledge_graph',
-                    }
-                    results.append(item)
-            if results:
-                logger.info(f"知识图谱检索到 {len(results)} 条结构化事实: {query}")
+            records = kg.search_heritage_by_keyword(query, limit=top_k, expand_relations=True)
+            return self._format_graph_records(query, records)
         except Exception as e:
             logger.debug(f"知识图谱检索失败: {e}")
+            return []
+
+    async def _retrieve_from_knowledge_graph_async(self, query: str,
+                                                   top_k: int = 3) -> List[Dict[str, Any]]:
+        """_retrieve_from_knowledge_graph 的异步版本（走知识图谱异步驱动）"""
+        kg = self.knowledge_graph
+        if not kg:
+            return []
+
+        try:
+            records = await kg.asearch_heritage_by_keyword(
+                query, limit=top_k, expand_relations=True)
+            return self._format_graph_records(query, records)
+        except Exception as e:
+            logger.debug(f"知识图谱检索失败: {e}")
+            return []
+
+    @staticmethod
+    def _format_graph_records(query: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results = []
+        for record in records:
+            item = {
+                'id': record.get('id'),
+                'name': record.get('name', ''),
+                'category': record.get('category', ''),
+                'region': record.get('region', ''),
+                'level': record.get('level', ''),
+                'description': (record.get('description') or '')[:_RAG_ITEM_MAX_CHARS],
+                'related_categories': [c for c in record.get('related_categories', []) if c],
+                'related_regions': [r for r in record.get('related_regions', []) if r],
+                'related_levels': [l for l in record.get('related_levels', []) if l],
+                'score': record.get('score'),
+                'source': 'knowledge_graph',
+            }
+            results.append(item)
+        if results:
+            logger.info(f"知识图谱检索到 {len(results)} 条结构化事实: {query}")
         return results
 
     def build_rag_prompt(self, query: str, user_id: str = None,
@@ -167,7 +217,16 @@ class RAGRetriever:
             包含双轨检索上下文的提示词
         """
         context = self.retrieve_context(query, user_id, top_k)
+        return self._format_context(context)
+
+    async def build_rag_prompt_async(self, query: str, user_id: str = None,
+                                     top_k: int = 3) -> str:
+        """build_rag_prompt 的异步版本"""
+        context = await self.retrieve_context_async(query, user_id, top_k)
+        return self._format_context(context)
 
+    def _format_context(self, context: Dict[str, Any]) -> str:
+        """将双轨检索结果格式化为提示词片段"""
         sections = []
 
         if context['conversations']:
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+L2 个性化推荐引擎
+UserRecommendTool 每次触发时，原实现在同一个 session 中依次执行五个推荐策略，
+后一个策略要等前一个返回，其中语义推荐还包含一次 LLM 类别映射。本模块：
+
+  - 先取用户已关联的非遗（PREFERS / PLANNED / EXPORTED），再把五个策略并发提交到专用线程池，
+    每个策略使用独立 session
+  - 各策略按名次归一化后加权求和，多个策略共同命中的非遗得分累加
+  - 按用户缓存排序结果；仅在该用户的偏好或 PREFERS / PLANNED / EXPORTED 关系变更
+    （由 L2GraphStore 的写入方法调用 invalidate）或知识图谱 Heritage 数据代数变化时失效
+  - 记录每个策略的耗时、命中数、失败与超时
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from Agent.config.memory_budget import memory_budget
+
+# (策略名, L2GraphStore 方法名, 权重)，顺序即同分时的优先级
+RECOMMEND_STRATEGIES: Tuple[Tuple[str, str, float], ...] = (
+    ('preference', '_recommend_by_preference', 1.0),
+    ('prefers_near', '_recommend_by_prefers_near', 0.8),
+    ('region', '_recommend_by_region', 0.6),
+    ('semantic', '_recommend_by_semantic', 0.5),
+    ('association', '_recommend_by_association', 0.4),
+)
+
+_recommend_executor: Optional[ThreadPoolExecutor] = None
+_recommend_executor_lock = threading.Lock()
+
+
+def _get_recommend_executor() -> ThreadPoolExecutor:
+    """推荐策略专用线程池"""
+    global _recommend_executor
+    if _recommend_executor is None:
+        with _recommend_executor_lock:
+            if _recommend_executor is None:
+                _recommend_executor = ThreadPoolExecutor(
+                    max_workers=max(1, memory_budget.l2_recommend_workers),
+                    thread_name_prefix='l2-recommend',
+                )
+    return _recommend_executor
+
+
+def shutdown_recommend_executor():
+    """关闭推荐策略线程池"""
+    global _recommend_executor
+    if _recommend_executor is not None:
+        _recommend_executor.shutdown(wait=False)
+        _recommend_executor = None
+
+
+def merge_strategy_results(results: Dict[str, List[Dict[str, Any]]],
+                           strategies=RECOMMEND_STRATEGIES) -> List[Dict[str, Any]]:
+    """加权合并各策略结果
+
+    策略内第 i 名（共 n 条）得分 weight × (n - i) / n；同一非遗的各策略得分累加，
+    reason 取贡献最大的策略，reasons 按贡献降序列出全部命中策略。
+    """
+    merged: Dict[Any, Dict[str, Any]] = {}
+    for priority, (name, _, weight) in enumerate(strategies):
+        rows = results.get(name) or []
+        n = len(rows)
+        for rank, row in enumerate(rows):
+            hid = row.get('id')
+            if hid is None:
+                continue
+            contribution = weight * (n - rank) / n
+            entry = merged.get(hid)
+            if entry is None:
+                entry = merged[hid] = {'row': dict(row), 'score': 0.0, 'hits': [], 'best': (priority, rank)}
+            else:
+                for key, value in row.items():
+                    entry['row'].setdefault(key, value)
+            entry['score'] += contribution
+            entry['hits'].append((contribution, -priority, row.get('reason')))
+
+    ranked = []
+    for entry in merged.values():
+        hits = sorted(entry['hits'], reverse=True)
+        row = entry['row']
+        row['reason'] = hits[0][2]
+        row['reasons'] = [reason for _, _, reason in hits]
+        row['score'] = round(entry['score'], 4)
+        ranked.append((-entry['score'], entry['best'], row))
+    ranked.sort(key=lambda x: (x[0], x[1]))
+    return [row for _, _, row in ranked]
+
+
+class _StrategyStats:
+    """单个策略的耗时与命中统计"""
+
+    SAMPLES = 200
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+        self.samples: deque = deque(maxlen=self.SAMPLES)
+
+    def record(self, elapsed_ms: float, rows: int):
+        self.calls += 1
+        self.rows += rows
+        self.total_ms += elapsed_ms
+        self.last_ms = elapsed_ms
+        self.samples.append(elapsed_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        samples = sorted(self.samples)
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'avg_rows': round(self.rows / self.calls, 2) if self.calls else 0.0,
+            'avg_ms': round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2) if samples else None,
+            'last_ms': round(self.last_ms, 2),
+        }
+
+
+class RecommendationEngine:
+    """并发执行推荐策略、加权合并并按用户缓存的推荐引擎"""
+
+    def __init__(self, store, cache_size: int = None, pool_size: int = None,
+                 strategy_timeout: float = None):
+        """
+        Args:
+            store: L2GraphStore（提供 kg.driver、_get_existing_heritage_ids 与各 _recommend_by_* 策略）
+            cache_size: 最多缓存的用户数（LRU）
+            pool_size: 每个策略取回的候选数，也是缓存的排序列表长度下限
+            strategy_timeout: 单个策略的等待上限（秒），超时的策略本次不参与合并
+        """
+        self.store = store
+        self.cache_size = max(1, cache_size or memory_budget.l2_recommend_cache_size)
+        self.pool_size = max(1, pool_size or memory_budget.l2_recommend_pool_size)
+        self.strategy_timeout = strategy_timeout or memory_budget.l2_recommend_strategy_timeout
+
+        self._lock = threading.Lock()
+        # user_id → (排序列表, 候选数, Heritage 数据代数, 写入时间)
+        self._cache: "OrderedDict[str, Tuple[List[Dict[str, Any]], int, int, float]]" = OrderedDict()
+        # 任意用户失效时递增；计算期间发生过失效则结果不写缓存，避免写回过期结果
+        self._epoch = 0
+        self._strategy_stats: Dict[str, _StrategyStats] = {
+            name: _StrategyStats() for name, _, _ in RECOMMEND_STRATEGIES}
+        self._stats = {'requests': 0, 'cache_hits': 0, 'cache_misses': 0,
+                       'invalidations': 0, 'partial_results': 0, 'last_total_ms': 0.0}
+
+    # ──────────────────────────────
+    # 缓存
+    # ──────────────────────────────
+
+    def _generation(self) -> int:
+        kg = self.store.kg
+        return kg.get_heritage_generation() if kg and hasattr(kg, 'get_heritage_generation') else 0
+
+    def invalidate(self, user_id: str = None):
+        """用户偏好或非遗关系变更后调用，不传 user_id 表示全部失效"""
+        with self._lock:
+            self._epoch += 1
+            self._stats['invalidations'] += 1
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(user_id, None)
+
+    def _cached(self, user_id: str, limit: int, generation: int) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is None:
+                return None
+            ranked, pool, cached_generation, _ = entry
+            # 候选数不足以覆盖 limit 时（且当时各策略未被候选数截断）才需要重算
+            if cached_generation != generation or (limit > pool and len(ranked) >= pool):
+                return None
+            self._cache.move_to_end(user_id)
+            return [dict(row) for row in ranked[:limit]]
+
+    def _store(self, user_id: str, ranked: List[Dict[str, Any]], pool: int,
+               generation: int, epoch: int):
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            self._cache[user_id] = (ranked, pool, generation, time.time())
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # ──────────────────────────────
+    # 推荐
+    # ──────────────────────────────
+
+    def recommend(self, user_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+        generation = self._generation()
+        with self._lock:
+            self._stats['requests'] += 1
+        cached = self._cached(user_id, limit, generation)
+        if cached is not None:
+            with self._lock:
+                self._stats['cache_hits'] += 1
+            return cached
+
+        with self._lock:
+            self._stats['cache_misses'] += 1
+            epoch = self._epoch
+        start = time.perf_counter()
+        pool = max(limit, self.pool_size)
+
+        with self.store.kg.driver.session() as session:
+            existing_ids = self.store._get_existing_heritage_ids(session, user_id)
+
+        results, complete = self._run_strategies(user_id, existing_ids, pool)
+        ranked = merge_strategy_results(results)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._stats['last_total_ms'] = round(total_ms, 2)
+            if not complete:
+                self._stats['partial_results'] += 1
+        if complete:
+            self._store(user_id, ranked, pool, generation, epoch)
+        latencies = {name: round(s.last_ms, 1) for name, s in self._strategy_stats.items() if name in results}
+        logger.debug(f"个性化推荐: user={user_id}, 候选 {len(ranked)} 个, 总耗时 {total_ms:.1f}ms, 策略耗时 {latencies}")
+        return [dict(row) for row in ranked[:limit]]
+
+    def _run_strategy(self, name: str, method: str, user_id: str,
+                      existing_ids: set, pool: int) -> List[Dict[str, Any]]:
+        start = time.perf_counter()
+        strategy = getattr(self.store, method)
+        with self.store.kg.driver.session() as session:
+            rows = strategy(session, user_id, existing_ids, set(), pool)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._strategy_stats[name].record(elapsed_ms, len(rows))
+        return rows
+
+    def _run_strategies(self, user_id: str, existing_ids: set,
+                        pool: int) -> Tuple[Dict[str, List[Dict[str, Any]]], bool]:
+        """并发执行全部策略，返回 ({策略名: 结果}, 是否全部成功)"""
+        executor = _get_recommend_executor()
+        futures = {
+            name: executor.submit(self._run_strategy, name, method, user_id, existing_ids, pool)
+            for name, method, _ in RECOMMEND_STRATEGIES
+        }
+        deadline = time.monotonic() + self.strategy_timeout
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        complete = True
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                complete = False
+                with self._lock:
+                    self._strategy_stats[name].timeouts += 1
+                logger.warning(f"推荐策略 {name} 超时（>{self.strategy_timeout}s），本次跳过")
+            except Exception as e:
+                complete = False
+                with self._lock:
+                    self._strategy_stats[name].errors += 1
+                logger.warning(f"推荐策略 {name} 失败: {e}")
+        return results, complete
+
+    # ──────────────────────────────
+    # 指标
+    # ──────────────────────────────
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._stats['cache_hits']
+            lookups = hits + self._stats['cache_misses']
+            return {
+                **self._stats,
+                'cache_hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'cached_users': len(self._cache),
+                'cache_size': self.cache_size,
+                'pool_size': self.pool_size,
+                'strategies': {
+                    name: dict(self._strategy_stats[name].to_dict(), weight=weight)
+                    for name, _, weight in RECOMMEND_STRATEGIES
+                },
+            }
@@ -29,12 +29,14 @@ class SessionArchive:
         summary: Dict[str, Any],
         statistics: Dict[str, Any],
         timestamp: str = None,
+        importance: float = None,
     ):
         self.session_id = session_id
         self.user_id = user_id
         self.summary = summary
         self.statistics = statistics
         self.timestamp = timestamp or datetime.now().isoformat()
+        self.importance = importance
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -43,6 +45,7 @@ class SessionArchive:
             "timestamp": self.timestamp,
             "summary": self.summary,
             "statistics": self.statistics,
+            "importance": self.importance,
         }
 
 
@@ -98,9 +101,13 @@ class SessionArchiver:
             entities = self._extract_session_entities(recent_turns, summary)
             statistics = self._compute_statistics(recent_turns)
 
+            from Agent.memory.importance_scorer import get_importance_scorer
+            importance = get_importance_scorer().score_session(recent_turns)
+
             archive = SessionArchive(
                 session_id=session_id,
                 user_id=user_id,
+                importance=importance,
                 summary={
                     "topic": summary.get("topic", ""),
                     "key_decisions": summary.get("key_decisions", []),
@@ -315,6 +322,9 @@ class SessionArchiver:
                 "timestamp": metadata.get("timestamp", ""),
                 "topic": metadata.get("summary", {}).get("topic", "")[:200],
             }
+            # 会话级重要性（按全部对话轮次评分），供向量保留任务判断归档价值
+            if metadata.get("importance") is not None:
+                meta["importance"] = round(float(metadata["importance"]), 4)
 
             collection.add(
                 ids=[doc_id],
@@ -350,7 +360,7 @@ class SessionArchiver:
             try:
                 from Agent.memory.coordinator import get_memory_coordinator
                 coordinator = get_memory_coordinator()
-                resolved_id = coordinator._resolve_heritage_by_name(name)
+                resolved_id = await coordinator._resolve_heritage_by_name(name)
                 if resolved_id:
                     ok = self.l2_store.link_user_heritage(
                         user_id, resolved_id,
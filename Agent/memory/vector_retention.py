@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+向量保留与压缩任务
+conversations / session_archives 两个集合只增不减，本任务定期回收过期或低价值的向量：
+
+  1. 过期: 超过保留天数（对话 CONVERSATION_VECTOR_TTL_DAYS，归档 SESSION_ARCHIVE_TTL_DAYS）
+  2. 低重要性: 超过宽限期且经时间衰减后的 ImportanceScorer 分数低于阈值
+     （对话按单轮评分；归档用归档时按整段会话评分并写入元数据的 importance，
+     旧归档缺少该字段时不按重要性回收）
+  3. 用户配额: 每个用户在每个集合中最多保留 N 条，按衰减分数降采样
+
+先分页扫描元数据做出决策，再分批删除，由 ResourceManager 定时器调度。
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from loguru import logger
+
+from Agent.config.memory_budget import memory_budget
+from .importance_scorer import get_importance_scorer
+
+
+class VectorRetentionJob:
+    """对话 / 归档向量的保留策略执行器"""
+
+    SCAN_PAGE_SIZE = 1000
+
+    def __init__(self):
+        self.scorer = get_importance_scorer()
+        self._last_run: float = 0.0
+        self._last_report: Dict[str, Any] = {}
+
+    # ──────────────────────────────
+    # 元数据解析
+    # ──────────────────────────────
+
+    @staticmethod
+    def _entry_timestamp(collection_key: str, meta: Dict[str, Any]) -> Optional[float]:
+        """取条目写入时间（epoch 秒），旧数据缺失时返回 None"""
+        if collection_key == 'conversations':
+            created_at = meta.get('created_at')
+            return float(created_at) if created_at else None
+        timestamp = meta.get('timestamp')
+        if not timestamp:
+            return None
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except (TypeError, ValueError):
+            return None
+
+    def _entry_importance(self, collection_key: str, document: str,
+                          meta: Dict[str, Any]) -> Optional[float]:
+        """条目的原始重要性；旧归档缺少会话级 importance 时返回 None（不按重要性回收）"""
+        if collection_key == 'conversations':
+            return self.scorer.score_conversation_turn(
+                document or '', meta.get('role', 'user')).composite
+        importance = meta.get('importance')
+        return float(importance) if importance is not None else None
+
+    def _ttl_days(self, collection_key: str) -> int:
+        if collection_key == 'conversations':
+            return memory_budget.conversation_vector_ttl_days
+        return memory_budget.session_archive_ttl_days
+
+    # ──────────────────────────────
+    # 决策
+    # ──────────────────────────────
+
+    def _plan_collection(self, collection_key: str, collection) -> Dict[str, Any]:
+        """扫描集合，返回待删除 id 及各原因计数"""
+        now = time.time()
+        ttl_days = self._ttl_days(collection_key)
+        grace_days = memory_budget.vector_retention_grace_days
+        min_importance = memory_budget.vector_retention_min_importance
+        quota = memory_budget.vector_retention_user_quota
+
+        plan = {'scanned': 0, 'expired': [], 'low_importance': [], 'over_quota': []}
+        survivors: Dict[str, List[tuple]] = {}
+
+        total = collection.count()
+        for offset in range(0, total, self.SCAN_PAGE_SIZE):
+            page = collection.get(limit=self.SCAN_PAGE_SIZE, offset=offset,
+                                  include=['documents', 'metadatas'])
+            ids = page.get('ids') or []
+            documents = page.get('documents') or [''] * len(ids)
+            metadatas = page.get('metadatas') or [{}] * len(ids)
+            plan['scanned'] += len(ids)
+
+            for doc_id, document, meta in zip(ids, documents, metadatas):
+                meta = meta or {}
+                ts = self._entry_timestamp(collection_key, meta)
+                age_days = (now - ts) / 86400 if ts else None
+
+                if ttl_days > 0 and age_days is not None and age_days > ttl_days:
+                    plan['expired'].append(doc_id)
+                    continue
+
+                score = self._entry_importance(collection_key, document, meta)
+                prunable = score is not None
+                if score is None:
+                    score = 1.0
+                if age_days is not None:
+                    score = self.scorer.apply_time_decay(score, int(age_days))
+                    if (prunable and age_days >= grace_days
+                            and not self.scorer.should_retain(score, min_importance)):
+                        plan['low_importance'].append(doc_id)
+                        continue
+
+                survivors.setdefault(meta.get('user_id', ''), []).append((score, ts or 0.0, doc_id))
+
+        if quota > 0:
+            for entries in survivors.values():
+                if len(entries) <= quota:
+                    continue
+                entries.sort(key=lambda e: (e[0], e[1]), reverse=True)
+                plan['over_quota'].extend(doc_id for _, _, doc_id in entries[quota:])
+
+        return plan
+
+    # ──────────────────────────────
+    # 执行
+    # ──────────────────────────────
+
+    def _delete_batched(self, collection, ids: List[str], batch_size: int) -> Dict[str, int]:
+        deleted = 0
+        failed = 0
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            try:
+                collection.delete(ids=batch)
+                deleted += len(batch)
+            except Exception as e:
+                failed += len(batch)
+                logger.warning(f"批量删除向量失败 ({len(batch)} 条): {e}")
+        return {'deleted': deleted, 'failed': failed}
+
+    def run(self, dry_run: bool = False) -> Dict[str, Any]:
+        """执行一次保留策略
+
+        Args:
+            dry_run: 仅统计不删除
+
+        Returns:
+            {collections: {key: {scanned, expired, low_importance, over_quota,
+             deleted, failed, remaining, elapsed_ms}}, reclaimed, elapsed_ms}
+        """
+        from .vector_store import get_vector_store
+
+        vector_store = get_vector_store()
+        batch_size = max(1, memory_budget.vector_retention_delete_batch)
+        start = time.perf_counter()
+        report = {'collections': {}, 'reclaimed': 0, 'dry_run': dry_run}
+
+        for key in ('conversations', 'session_archives'):
+            collection = vector_store.collections.get(key)
+            if collection is None:
+                continue
+            t0 = time.perf_counter()
+            try:
+                plan = self._plan_collection(key, collection)
+            except Exception as e:
+                logger.warning(f"扫描集合 {key} 失败，跳过本轮保留任务: {e}")
+                continue
+
+            to_delete = plan['expired'] + plan['low_importance'] + plan['over_quota']
+            result = ({'deleted': 0, 'failed': 0} if dry_run
+                      else self._delete_batched(collection, to_delete, batch_size))
+            try:
+                remaining = collection.count()
+            except Exception:
+                remaining = None
+
+            report['collections'][key] = {
+                'scanned': plan['scanned'],
+                'expired': len(plan['expired']),
+                'low_importance': len(plan['low_importance']),
+                'over_quota': len(plan['over_quota']),
+                'deleted': result['deleted'],
+                'failed': result['failed'],
+                'remaining': remaining,
+                'elapsed_ms': round((time.perf_counter() - t0) * 1000, 2),
+            }
+            report['reclaimed'] += result['deleted']
+
+        report['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        self._last_run = time.time()
+        self._last_report = report
+        logger.info(
+            f"向量保留任务完成: 回收 {report['reclaimed']} 条, 耗时 {report['elapsed_ms']}ms, "
+            f"明细 {report['collections']}"
+        )
+        return report
+
+    def is_due(self) -> bool:
+        interval = memory_budget.vector_retention_interval_hours * 3600
+        return time.time() - self._last_run >= interval
+
+    def get_last_report(self) -> Dict[str, Any]:
+        return dict(self._last_report)
+
+
+_vector_retention_job: Optional[VectorRetentionJob] = None
+
+
+def get_vector_retention_job() -> VectorRetentionJob:
+    """获取向量保留任务单例"""
+    global _vector_retention_job
+    if _vector_retention_job is None:
+        _vector_retention_job = VectorRetentionJob()
+    return _vector_retention_job
@@ -6,13 +6,22 @@
 """
 
 import os
+import time
+import queue
+import asyncio
 import hashlib
+import threading
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterable
 from loguru import logger
 import chromadb
 from sentence_transformers import SentenceTransformer
 
+from .exact_index import ExactVectorIndex
+from .quantized_collection import QuantizedCollection, QUANTIZATION_FORMATS
+
 try:
     from cachetools import TTLCache
     CACHE_AVAILABLE = True
@@ -22,40 +31,201 @@ except ImportError:
 
 
 class SimpleCache:
-    """简单缓存实现（当 cachetools 不可用时）"""
+    """简单缓存实现（当 cachetools 不可用时），并发检索线程共享，读写加锁"""
     
     def __init__(self, maxsize: int = 1000, ttl: float = 300):
         self._cache: Dict[str, Any] = {}
         self._timestamps: Dict[str, float] = {}
         self._maxsize = maxsize
         self._ttl = ttl
+        self._lock = threading.Lock()
     
     def get(self, key: str) -> Optional[Any]:
-        import time
-        if key in self._cache:
-            if time.time() - self._timestamps.get(key, 0) < self._ttl:
-                return self._cache[key]
-            else:
+        with self._lock:
+            if key in self._cache:
+                if time.time() - self._timestamps.get(key, 0) < self._ttl:
+                    return self._cache[key]
                 del self._cache[key]
                 del self._timestamps[key]
-        return None
+            return None
+    
+    def set(self, key: str, value: Any):
+        with self._lock:
+            if key not in self._cache and len(self._cache) >= self._maxsize:
+                oldest = min(self._timestamps, key=self._timestamps.get)
+                del self._cache[oldest]
+                del self._timestamps[oldest]
+            self._cache[key] = value
+            self._timestamps[key] = time.time()
+    
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._timestamps.clear()
+
+
+class LockedTTLCache:
+    """cachetools.TTLCache 的线程安全封装，提供与 SimpleCache 相同的 get/set/clear 接口
+
+    TTLCache 本身不是线程安全的，hybrid_search 的并发检索线程会同时读写。
+    """
+    
+    def __init__(self, maxsize: int = 1000, ttl: float = 300):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._cache.get(key)
     
     def set(self, key: str, value: Any):
-        import time
-        if len(self._cache) >= self._maxsize:
-            oldest = min(self._timestamps, key=self._timestamps.get)
-            del self._cache[oldest]
-            del self._timestamps[oldest]
-        self._cache[key] = value
-        self._timestamps[key] = time.time()
+        with self._lock:
+            self._cache[key] = value
+    
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class EmbeddingBatchScheduler:
+    """嵌入微批调度器
+
+    将时间窗口内（window_ms 毫秒或 max_batch_size 条）到达的单条编码请求
+    合并为一次 model.encode 批量前向，再分别回填各调用方的 Future。
+    同步调用方使用 encode()，asyncio 调用方使用 encode_async()。
+    """
+
+    _STOP = object()
+
+    def __init__(self, encode_fn, window_ms: float = 5, max_batch_size: int = 32):
+        """
+        Args:
+            encode_fn: 批量编码函数，接收 List[str] 返回 List[List[float]]
+            window_ms: 攒批等待窗口（毫秒）
+            max_batch_size: 单批最大条数，达到即立即执行
+        """
+        self._encode_fn = encode_fn
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self._batch_count = 0
+        self._item_count = 0
+        self._max_batch_seen = 0
+        self._last_batch_size = 0
+        self._encode_ms_total = 0.0
+        self._errors = 0
+
+    def _ensure_worker(self):
+        if self._worker and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name="embedding-batcher", daemon=True)
+            self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """提交单条文本，返回 concurrent.futures.Future"""
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str, timeout: float = 30) -> List[float]:
+        """同步调用：提交并阻塞等待结果"""
+        return self.submit(text).result(timeout=timeout)
+
+    async def encode_async(self, text: str) -> List[float]:
+        """异步调用：提交并在事件循环中等待结果，不阻塞其他协程"""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _collect_batch(self, first) -> List[tuple]:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                self._queue.put(self._STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is self._STOP:
+                return
+            batch = self._collect_batch(first)
+            pending = [(text, fut) for text, fut in batch if fut.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+
+            # 同批内相同文本只编码一次
+            unique_texts = list(dict.fromkeys(text for text, _ in pending))
+            t0 = time.perf_counter()
+            try:
+                embeddings = self._encode_fn(unique_texts)
+                by_text = dict(zip(unique_texts, embeddings))
+                for text, fut in pending:
+                    fut.set_result(by_text[text])
+            except Exception as e:
+                logger.warning(f"嵌入微批编码失败 ({len(pending)} 条): {e}")
+                with self._stats_lock:
+                    self._errors += 1
+                for _, fut in pending:
+                    fut.set_exception(e)
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+
+            with self._stats_lock:
+                self._batch_count += 1
+                self._item_count += len(pending)
+                self._last_batch_size = len(pending)
+                self._max_batch_seen = max(self._max_batch_seen, len(pending))
+                self._encode_ms_total += elapsed_ms
+
+    def stop(self):
+        """停止后台线程（已入队请求会先处理完）"""
+        if self._worker and self._worker.is_alive():
+            self._queue.put(self._STOP)
+            self._worker.join(timeout=5)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            batches = self._batch_count
+            return {
+                'queue_depth': self._queue.qsize(),
+                'batch_count': batches,
+                'item_count': self._item_count,
+                'avg_batch_size': round(self._item_count / batches, 2) if batches else 0.0,
+                'max_batch_size': self._max_batch_seen,
+                'last_batch_size': self._last_batch_size,
+                'avg_encode_ms': round(self._encode_ms_total / batches, 2) if batches else 0.0,
+                'errors': self._errors,
+                'window_ms': round(self.window * 1000, 2),
+                'batch_limit': self.max_batch_size,
+            }
 
 
 class EmbeddingModel:
     """嵌入模型封装（单例模式），支持缓存"""
     
     _instance = None
+    # 嵌入服务熔断：失败后按指数退避（秒）重新探测 /health
+    REMOTE_RETRY_MIN_SECONDS = 1.0
+    REMOTE_RETRY_MAX_SECONDS = 60.0
     
-    def __new__(cls, model_name: str = "BAAI/bge-small-zh", local_model_path: str = None):
+    def __new__(cls, model_name: str = "BAAI/bge-small-zh", local_model_path: str = None,
+                allow_remote: bool = True):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance.model_name = model_name
@@ -63,38 +233,206 @@ class EmbeddingModel:
             cls._instance.model = None
             cls._instance.dimension = None
             cls._instance._embedding_cache = None
+            cls._instance._disk_cache = None
+            cls._instance._batch_scheduler = None
+            cls._instance._remote = None
+            cls._instance._remote_retry_at = 0.0
+            cls._instance._remote_backoff = 0.0
+            cls._instance._model_lock = threading.Lock()
+            cls._instance.startup_ms = None
         return cls._instance
     
-    def __init__(self, model_name: str = "BAAI/bge-small-zh", local_model_path: str = None):
-        if self.model is None:
-            if local_model_path and os.path.exists(local_model_path):
-                logger.info(f"从本地加载嵌入模型: {local_model_path}")
-                self.model = SentenceTransformer(local_model_path)
-            else:
-                logger.info(f"加载嵌入模型: {model_name}")
-                os.environ['HF_HUB_OFFLINE'] = '1'
-                try:
-                    self.model = SentenceTransformer(model_name)
-                except Exception as e:
-                    logger.warning(f"离线模式加载失败，尝试在线下载: {e}")
-                    os.environ.pop('HF_HUB_OFFLINE', None)
-                    self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = "BAAI/bge-small-zh", local_model_path: str = None,
+                 allow_remote: bool = True):
+        """
+        Args:
+            allow_remote: 是否允许使用共享嵌入服务（服务端自身加载模型时传 False）
+        """
+        if self.model is None and self._remote is None:
+            start = time.perf_counter()
+            if allow_remote:
+                self._remote = self._connect_service()
             
-            self.dimension = self.model.get_sentence_embedding_dimension()
+            if self._remote is None:
+                self._load_local_model()
             
             if CACHE_AVAILABLE:
-                self._embedding_cache = TTLCache(maxsize=2000, ttl=600)
+                self._embedding_cache = LockedTTLCache(maxsize=2000, ttl=600)
             else:
                 self._embedding_cache = SimpleCache(maxsize=2000, ttl=600)
             
-            logger.info(f"嵌入模型加载完成，维度: {self.dimension}")
+            # 客户端模式下持久化缓存由嵌入服务持有，避免多进程同时写同一缓存文件
+            if self._remote is None:
+                self._disk_cache = self._init_disk_cache()
+            self._batch_scheduler = self._init_batch_scheduler()
+            self.startup_ms = round((time.perf_counter() - start) * 1000, 2)
+            
+            logger.info(
+                f"嵌入模型就绪（{'共享服务' if self._remote else '进程内'}），"
+                f"维度: {self.dimension}，耗时 {self.startup_ms}ms"
+            )
+    
+    def _load_local_model(self):
+        """在当前进程内加载 SentenceTransformer 模型"""
+        if self.local_model_path and os.path.exists(self.local_model_path):
+            logger.info(f"从本地加载嵌入模型: {self.local_model_path}")
+            self.model = SentenceTransformer(self.local_model_path)
+        else:
+            logger.info(f"加载嵌入模型: {self.model_name}")
+            os.environ['HF_HUB_OFFLINE'] = '1'
+            try:
+                self.model = SentenceTransformer(self.model_name)
+            except Exception as e:
+                logger.warning(f"离线模式加载失败，尝试在线下载: {e}")
+                os.environ.pop('HF_HUB_OFFLINE', None)
+                self.model = SentenceTransformer(self.model_name)
+        
+        self.dimension = self.model.get_sentence_embedding_dimension()
+    
+    def _connect_service(self):
+        """连接共享嵌入服务，未配置或不可达时返回 None"""
+        from Agent.config.settings import config
+        if not config.EMBEDDING_SERVICE_URL:
+            return None
+        
+        from .embedding_service import EmbeddingServiceClient
+        client = EmbeddingServiceClient(config.EMBEDDING_SERVICE_URL,
+                                        timeout=config.EMBEDDING_SERVICE_TIMEOUT)
+        health = client.health()
+        if not health:
+            logger.warning(f"嵌入服务不可达，回退为进程内加载模型: {config.EMBEDDING_SERVICE_URL}")
+            return None
+        
+        self.dimension = health.get('dimension')
+        logger.info(f"已连接共享嵌入服务: {config.EMBEDDING_SERVICE_URL} (model={health.get('model')})")
+        return client
+    
+    def _remote_available(self) -> bool:
+        """熔断器：正常时走嵌入服务；熔断期内走本地，退避到期后探测 /health 决定是否恢复"""
+        with self._model_lock:
+            if not self._remote_retry_at:
+                return True
+            now = time.monotonic()
+            if now < self._remote_retry_at:
+                return False
+            # 预占下一次探测时间，避免多个线程同时探测
+            self._remote_retry_at = now + self._remote_backoff
+        
+        if not self._remote.health():
+            self._open_circuit("健康检查未通过")
+            return False
+        
+        with self._model_lock:
+            self._remote_retry_at = 0.0
+            self._remote_backoff = 0.0
+            # 恢复共享服务后释放本地模型，保持每个 worker 不常驻模型
+            self.model = None
+        logger.info("嵌入服务已恢复，切回共享服务")
+        return True
+    
+    def _open_circuit(self, reason):
+        """嵌入服务不可用：进入熔断期，退避时间指数增长"""
+        with self._model_lock:
+            self._remote_backoff = min(
+                max(self._remote_backoff * 2, self.REMOTE_RETRY_MIN_SECONDS),
+                self.REMOTE_RETRY_MAX_SECONDS)
+            self._remote_retry_at = time.monotonic() + self._remote_backoff
+            backoff = self._remote_backoff
+        logger.warning(f"嵌入服务不可用，{backoff:.0f}s 内使用进程内模型: {reason}")
+    
+    def _local_model(self):
+        """按需加载进程内模型（仅在本地模式或嵌入服务熔断时使用）"""
+        with self._model_lock:
+            if self.model is None:
+                if self._remote is not None:
+                    logger.warning("嵌入服务不可用，临时加载进程内模型")
+                self._load_local_model()
+            return self.model
+    
+    @property
+    def is_remote(self) -> bool:
+        return self._remote is not None
+    
+    def _init_disk_cache(self):
+        """初始化持久化嵌入缓存，失败时仅使用内存缓存"""
+        from Agent.config.settings import config
+        if not config.EMBEDDING_CACHE_ENABLED:
+            return None
+        try:
+            from .embedding_cache import PersistentEmbeddingCache
+            cache_dir = Path(__file__).parent.parent / "data" / "embedding_cache"
+            return PersistentEmbeddingCache(
+                cache_dir=str(cache_dir),
+                model_name=self.model_name,
+                dimension=self.dimension,
+                capacity=config.EMBEDDING_CACHE_MAX_ENTRIES,
+            )
+        except Exception as e:
+            logger.warning(f"持久化嵌入缓存初始化失败，仅使用内存缓存: {e}")
+            return None
+    
+    def _init_batch_scheduler(self) -> Optional[EmbeddingBatchScheduler]:
+        """初始化单条编码的微批调度器"""
+        from Agent.config.settings import config
+        if not config.EMBEDDING_BATCH_ENABLED:
+            return None
+        return EmbeddingBatchScheduler(
+            self._encode_uncached,
+            window_ms=config.EMBEDDING_BATCH_WINDOW_MS,
+            max_batch_size=config.EMBEDDING_BATCH_MAX_SIZE,
+        )
+    
+    def _encode_uncached(self, texts: List[str]) -> List[List[float]]:
+        """直接调用模型批量编码（不经缓存）；客户端模式下转发给嵌入服务"""
+        remote = self._remote
+        if remote is not None and self._remote_available():
+            try:
+                return remote.encode(texts)
+            except Exception as e:
+                self._open_circuit(e)
+        return self._local_model().encode(texts, normalize_embeddings=True).tolist()
+    
+    def flush_cache(self):
+        """将持久化嵌入缓存落盘（关闭时调用）"""
+        if self._disk_cache:
+            self._disk_cache.flush()
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取持久化嵌入缓存统计"""
+        return self._disk_cache.get_stats() if self._disk_cache else {}
+    
+    def get_scheduler_stats(self) -> Dict[str, Any]:
+        """获取微批调度器统计（队列深度、批大小等）"""
+        return self._batch_scheduler.get_stats() if self._batch_scheduler else {}
+    
+    def get_runtime_stats(self) -> Dict[str, Any]:
+        """运行模式、模型就绪耗时与当前进程 RSS，用于对比是否启用共享嵌入服务"""
+        from .embedding_service import process_rss_mb
+        if self._remote is None:
+            mode = 'local'
+        else:
+            mode = 'remote_fallback' if self._remote_retry_at else 'remote'
+        stats = {
+            'mode': mode,
+            'startup_ms': self.startup_ms,
+            'rss_mb': process_rss_mb(),
+        }
+        if self._remote:
+            stats['service'] = self._remote.get_stats()
+        return stats
+    
+    def shutdown(self):
+        """停止微批调度器并将嵌入缓存落盘"""
+        if self._batch_scheduler:
+            self._batch_scheduler.stop()
+        self.flush_cache()
     
     def _get_cache_key(self, text: str) -> str:
         """生成缓存键"""
         return hashlib.md5(text.encode('utf-8')).hexdigest()
     
     def encode(self, texts: List[str]) -> List[List[float]]:
-        """将文本列表转换为向量"""
+        """将文本列表转换为向量（内存缓存 → 磁盘缓存 → 模型）"""
         results = []
         uncached_texts = []
         uncached_indices = []
@@ -108,32 +446,114 @@ class EmbeddingModel:
                 uncached_texts.append(text)
                 uncached_indices.append(i)
         
+        if uncached_texts and self._disk_cache:
+            keys = [self._get_cache_key(t) for t in uncached_texts]
+            found = self._disk_cache.get_many(keys)
+            if found:
+                remaining_texts = []
+                remaining_indices = []
+                for idx, text, key in zip(uncached_indices, uncached_texts, keys):
+                    embedding = found.get(key)
+                    if embedding is None:
+                        remaining_texts.append(text)
+                        remaining_indices.append(idx)
+                        continue
+                    results.append((idx, embedding))
+                    if self._embedding_cache:
+                        self._embedding_cache.set(key, embedding)
+                uncached_texts, uncached_indices = remaining_texts, remaining_indices
+        
         if uncached_texts:
-            new_embeddings = self.model.encode(uncached_texts, normalize_embeddings=True).tolist()
+            new_embeddings = self._encode_uncached(uncached_texts)
+            disk_items = {}
             for idx, text, embedding in zip(uncached_indices, uncached_texts, new_embeddings):
                 results.append((idx, embedding))
+                cache_key = self._get_cache_key(text)
                 if self._embedding_cache:
-                    cache_key = self._get_cache_key(text)
                     self._embedding_cache.set(cache_key, embedding)
+                disk_items[cache_key] = embedding
+            if self._disk_cache:
+                self._disk_cache.set_many(disk_items)
         
         results.sort(key=lambda x: x[0])
         return [r[1] for r in results]
     
-    def encode_single(self, text: str) -> List[float]:
-        """将单个文本转换为向量（带缓存）"""
-        cache_key = self._get_cache_key(text)
-        
+    def _lookup_cached(self, cache_key: str) -> Optional[List[float]]:
+        """依次查内存缓存、磁盘缓存"""
         if self._embedding_cache:
             cached = self._embedding_cache.get(cache_key)
             if cached is not None:
                 return cached
         
-        embedding = self.model.encode(text, normalize_embeddings=True).tolist()
-        
+        if self._disk_cache:
+            cached = self._disk_cache.get(cache_key)
+            if cached is not None:
+                if self._embedding_cache:
+                    self._embedding_cache.set(cache_key, cached)
+                return cached
+        return None
+    
+    def _store_cached(self, cache_key: str, embedding: List[float]):
         if self._embedding_cache:
             self._embedding_cache.set(cache_key, embedding)
+        if self._disk_cache:
+            self._disk_cache.set(cache_key, embedding)
+    
+    def encode_single(self, text: str) -> List[float]:
+        """将单个文本转换为向量（带缓存，未命中时经微批调度器合并编码）"""
+        cache_key = self._get_cache_key(text)
+        cached = self._lookup_cached(cache_key)
+        if cached is not None:
+            return cached
+        
+        if self._batch_scheduler:
+            embedding = self._batch_scheduler.encode(text)
+        else:
+            embedding = self._encode_uncached([text])[0]
         
+        self._store_cached(cache_key, embedding)
         return embedding
+    
+    async def encode_single_async(self, text: str) -> List[float]:
+        """encode_single 的协程版本，等待微批结果时不阻塞事件循环"""
+        cache_key = self._get_cache_key(text)
+        cached = self._lookup_cached(cache_key)
+        if cached is not None:
+            return cached
+        
+        if self._batch_scheduler:
+            embedding = await self._batch_scheduler.encode_async(text)
+        else:
+            embedding = (await asyncio.to_thread(self._encode_uncached, [text]))[0]
+        
+        self._store_cached(cache_key, embedding)
+        return embedding
+
+
+_search_executor: Optional[ThreadPoolExecutor] = None
+_search_executor_lock = threading.Lock()
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    """向量检索专用线程池（与工具 _run_async 线程池、RAG 双轨线程池隔离）"""
+    global _search_executor
+    if _search_executor is None:
+        with _search_executor_lock:
+            if _search_executor is None:
+                from Agent.config.settings import config
+                _search_executor = ThreadPoolExecutor(
+                    max_workers=max(1, config.VECTOR_SEARCH_MAX_WORKERS),
+                    thread_name_prefix="vector_search_",
+                )
+    return _search_executor
+
+
+def shutdown_search_executor():
+    """关闭向量检索线程池"""
+    global _search_executor
+    if _search_executor is not None:
+        _search_executor.shutdown(wait=False)
+        _search_executor = None
 
 
 class VectorStore:
@@ -147,6 +567,9 @@ class VectorStore:
         'user_preferences': 'user_preferences',
     }
     
+    # 可启用量化存储的集合（随对话持续增长）
+    QUANTIZABLE_COLLECTIONS = ('conversations', 'session_archives')
+    
     def __init__(self, persist_directory: str = None, embedding_model: str = None, 
                  local_model_path: str = None):
         data_dir = Path(__file__).parent.parent / "data"
@@ -169,10 +592,15 @@ class VectorStore:
         self.embedding_model = EmbeddingModel(embedding_model, local_model_path)
         
         self.collections = {}
+        self._heritage_index = None
         self._init_collections()
         
+        from Agent.config.settings import config
+        if config.HERITAGE_EXACT_INDEX_ENABLED:
+            self._heritage_index = ExactVectorIndex('heritage_knowledge')
+        
         if CACHE_AVAILABLE:
-            self._query_cache = TTLCache(maxsize=1000, ttl=300)
+            self._query_cache = LockedTTLCache(maxsize=1000, ttl=300)
         else:
             self._query_cache = SimpleCache(maxsize=1000, ttl=300)
         
@@ -187,7 +615,17 @@ class VectorStore:
     
     def _init_collections(self):
         """初始化所有集合，自动修复损坏的HNSW索引"""
+        from Agent.config.settings import config
+        quantization = (config.VECTOR_QUANTIZATION or 'none').lower()
+        if quantization != 'none' and quantization not in QUANTIZATION_FORMATS:
+            logger.warning(f"未知的 VECTOR_QUANTIZATION={quantization}，使用 Chroma 全精度存储")
+            quantization = 'none'
+        
         for key, name in self.COLLECTIONS.items():
+            if quantization != 'none' and key in self.QUANTIZABLE_COLLECTIONS:
+                self.collections[key] = self._init_quantized_collection(
+                    key, name, quantization, config.VECTOR_QUANTIZED_RERANK_FACTOR)
+                continue
             try:
                 self.collections[key] = self.client.get_or_create_collection(
                     name=name,
@@ -199,6 +637,45 @@ class VectorStore:
                 logger.warning(f"集合 '{name}' 初始化异常，尝试重建: {e}")
                 self._rebuild_collection(key, name)
     
+    def _init_quantized_collection(self, key: str, name: str, fmt: str,
+                                   rerank_factor: int) -> QuantizedCollection:
+        """创建量化集合；首次启用时从同名 Chroma 集合导入已有向量"""
+        directory = Path(self.persist_directory).parent / "quantized" / name
+        collection = QuantizedCollection(
+            name, str(directory), fmt=fmt, rerank_factor=rerank_factor,
+            rerank_encoder=self.embedding_model.encode,
+        )
+        if collection.count() == 0:
+            self._import_chroma_vectors(name, collection)
+        logger.info(f"集合 '{name}' 使用量化存储 ({fmt})，共 {collection.count()} 条")
+        return collection
+    
+    def _import_chroma_vectors(self, name: str, target: QuantizedCollection,
+                               page_size: int = 1000):
+        """分页导出 Chroma 集合中的向量写入量化集合
+
+        原集合默认保留以便回退到全精度存储；VECTOR_QUANTIZED_DROP_SOURCE=true 时，
+        全部条目导入成功后删除原集合以释放磁盘空间。
+        """
+        from Agent.config.settings import config
+        try:
+            source = self.client.get_or_create_collection(
+                name=name, metadata={"hnsw:space": "cosine"})
+            total = source.count()
+            for offset in range(0, total, page_size):
+                page = source.get(limit=page_size, offset=offset,
+                                  include=['embeddings', 'documents', 'metadatas'])
+                if page.get('ids'):
+                    target.upsert(page['ids'], page['embeddings'],
+                                  page.get('documents'), page.get('metadatas'))
+            if total:
+                logger.info(f"已从 Chroma 集合 '{name}' 导入 {total} 条向量到量化存储")
+            if total and config.VECTOR_QUANTIZED_DROP_SOURCE and target.count() >= total:
+                self.client.delete_collection(name)
+                logger.info(f"已删除原 Chroma 集合 '{name}'")
+        except Exception as e:
+            logger.warning(f"从 Chroma 集合 '{name}' 导入向量失败: {e}")
+    
     def _rebuild_collection(self, key: str, name: str):
         """删除损坏集合并重新创建，重建后触发数据同步"""
         import shutil
@@ -214,6 +691,8 @@ class VectorStore:
                 metadata={"hnsw:space": "cosine"}
             )
             logger.warning(f"集合 '{name}' 重建完成（数据已丢失），需要重新同步数据")
+            if key == 'heritage_knowledge' and self._heritage_index is not None:
+                self._heritage_index.clear()
             self._trigger_resync_if_needed(key)
         except Exception as e2:
             logger.error(f"集合 '{name}' 重建失败: {e2}")
@@ -257,7 +736,8 @@ class VectorStore:
             'session_id': session_id,
             'user_id': user_id,
             'role': role,
-            'content_preview': content[:100]
+            'content_preview': content[:100],
+            'created_at': int(time.time())
         }
         if metadata:
             meta.update(metadata)
@@ -274,6 +754,20 @@ class VectorStore:
             logger.error(f"添加对话向量失败: {e}")
             return False
     
+    @staticmethod
+    def _build_heritage_meta(heritage_id: int, name: str,
+                             metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """构建非遗知识向量元数据（过滤 None 值，Chroma 不接受空值）"""
+        meta = {
+            'heritage_id': heritage_id,
+            'name': name
+        }
+        if metadata:
+            for k, v in metadata.items():
+                if v is not None:
+                    meta[k] = v
+        return meta
+
     def add_heritage_knowledge(self, heritage_id: int, name: str, 
                                content: str, metadata: Dict[str, Any] = None):
         """添加非遗知识向量"""
@@ -284,14 +778,7 @@ class VectorStore:
         
         embedding = self.embedding_model.encode_single(content)
         
-        meta = {
-            'heritage_id': heritage_id,
-            'name': name
-        }
-        if metadata:
-            for k, v in metadata.items():
-                if v is not None:
-                    meta[k] = v
+        meta = self._build_heritage_meta(heritage_id, name, metadata)
         
         try:
             self.collections['heritage_knowledge'].upsert(
@@ -300,11 +787,129 @@ class VectorStore:
                 documents=[content],
                 metadatas=[meta]
             )
+            if self._heritage_index is not None:
+                self._heritage_index.upsert([doc_id], [embedding], [content], [meta])
             return True
         except Exception as e:
             logger.error(f"添加非遗知识向量失败: {e}")
             return False
     
+    def delete_heritage_knowledge(self, heritage_ids: List[int]) -> int:
+        """删除指定非遗的知识向量，返回删除条数"""
+        if not heritage_ids or 'heritage_knowledge' not in self.collections:
+            return 0
+        
+        doc_ids = [f"heritage_{hid}" for hid in heritage_ids]
+        try:
+            self.collections['heritage_knowledge'].delete(ids=doc_ids)
+        except Exception as e:
+            logger.error(f"删除非遗知识向量失败: {e}")
+            return 0
+        if self._heritage_index is not None:
+            self._heritage_index.remove(doc_ids)
+        self.clear_query_cache()
+        return len(doc_ids)
+    
+    def clear_query_cache(self):
+        """清空检索结果缓存（知识数据变更后调用）"""
+        if self._query_cache is not None:
+            self._query_cache.clear()
+    
+    def add_heritage_knowledge_bulk(self, documents: Iterable[Dict[str, Any]],
+                                    batch_size: int = None) -> Dict[str, Any]:
+        """批量写入非遗知识向量：按固定批次编码，每批一次 upsert
+
+        Args:
+            documents: 可迭代的文档，每项含 heritage_id / name / content / metadata(可选)
+            batch_size: 每批文档数，默认取 config.VECTOR_SYNC_BATCH_SIZE
+
+        Returns:
+            {success, vector_count, failed_count, batch_count, elapsed_ms,
+             batches: [{index, size, encode_ms, upsert_ms, success}]}
+        """
+        if 'heritage_knowledge' not in self.collections:
+            return {'success': False, 'error': '集合 heritage_knowledge 不可用',
+                    'vector_count': 0, 'failed_count': 0, 'batch_count': 0,
+                    'elapsed_ms': 0.0, 'batches': []}
+
+        if not batch_size:
+            from Agent.config.settings import config
+            batch_size = config.VECTOR_SYNC_BATCH_SIZE
+        batch_size = max(1, batch_size)
+
+        collection = self.collections['heritage_knowledge']
+        stats = {
+            'vector_count': 0,
+            'failed_count': 0,
+            'batches': [],
+        }
+        start = time.perf_counter()
+
+        def _flush(batch: Dict[str, tuple]):
+            ids = list(batch.keys())
+            contents = [batch[i][0] for i in ids]
+            metas = [batch[i][1] for i in ids]
+            info = {'index': len(stats['batches']), 'size': len(ids),
+                    'encode_ms': 0.0, 'upsert_ms': 0.0, 'success': False}
+            try:
+                t0 = time.perf_counter()
+                embeddings = self.embedding_model.encode(contents)
+                t1 = time.perf_counter()
+                collection.upsert(
+                    ids=ids,
+                    embeddings=embeddings,
+                    documents=contents,
+                    metadatas=metas
+                )
+                if self._heritage_index is not None:
+                    self._heritage_index.upsert(ids, embeddings, contents, metas)
+                t2 = time.perf_counter()
+                info.update(encode_ms=round((t1 - t0) * 1000, 2),
+                            upsert_ms=round((t2 - t1) * 1000, 2),
+                            success=True)
+                stats['vector_count'] += len(ids)
+            except Exception as e:
+                logger.error(f"批量写入非遗知识向量失败 (batch={info['index']}): {e}")
+                stats['failed_count'] += len(ids)
+            stats['batches'].append(info)
+            logger.debug(
+                f"非遗向量批次 {info['index']}: {info['size']} 条, "
+                f"encode={info['encode_ms']}ms, upsert={info['upsert_ms']}ms"
+            )
+
+        # 以 doc_id 为键，同批内重复 id 保留最后一条（Chroma 同批重复 id 会报错）
+        pending: Dict[str, tuple] = {}
+        for doc in documents:
+            heritage_id = doc.get('heritage_id')
+            content = doc.get('content')
+            if heritage_id is None or not content:
+                stats['failed_count'] += 1
+                continue
+            doc_id = f"heritage_{heritage_id}"
+            meta = self._build_heritage_meta(heritage_id, doc.get('name', ''),
+                                             doc.get('metadata'))
+            pending.pop(doc_id, None)
+            pending[doc_id] = (content, meta)
+            if len(pending) >= batch_size:
+                _flush(pending)
+                pending = {}
+        if pending:
+            _flush(pending)
+
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(
+            f"非遗知识向量批量写入完成: {stats['vector_count']} 条, "
+            f"{len(stats['batches'])} 批, 失败 {stats['failed_count']} 条, 耗时 {elapsed_ms}ms"
+        )
+        return {
+            'success': stats['failed_count'] == 0,
+            'vector_count': stats['vector_count'],
+            'failed_count': stats['failed_count'],
+            'batch_count': len(stats['batches']),
+            'elapsed_ms': elapsed_ms,
+            'batches': stats['batches'],
+        }
+
     def add_user_preference(self, pref_id: str, user_id: str,
                             pref_type: str, content: str,
                             metadata: Dict[str, Any] = None):
@@ -413,71 +1018,85 @@ class VectorStore:
             logger.error(f"添加景点向量失败: {e}")
             return False
     
-    def search_conversations(self, query: str, user_id: str = None, 
-                            n_results: int = 5) -> List[Dict[str, Any]]:
-        """检索相关对话"""
+    @staticmethod
+    def _format_query_results(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """将 Chroma query 返回值展开为 [{content, metadata, distance}]"""
+        formatted_results = []
+        if results['documents'] and results['documents'][0]:
+            for i, doc in enumerate(results['documents'][0]):
+                formatted_results.append({
+                    'content': doc,
+                    'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
+                    'distance': results['distances'][0][i] if results['distances'] else 0
+                })
+        return formatted_results
+
+    def _query_collection(self, key: str, query_embedding: List[float],
+                          n_results: int, where: Dict = None) -> List[Dict[str, Any]]:
+        """用已计算好的查询向量检索单个集合（异常由调用方处理）"""
+        results = self.collections[key].query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            where=where,
+            include=['documents', 'metadatas', 'distances']
+        )
+        return self._format_query_results(results)
+
+    def _search_conversations_by_embedding(self, query_embedding: List[float],
+                                           user_id: str = None,
+                                           n_results: int = 5) -> List[Dict[str, Any]]:
         if 'conversations' not in self.collections:
             return []
         
-        query_embedding = self.embedding_model.encode_single(query)
-        
         where_filter = None
         if user_id:
             where_filter = {"user_id": user_id}
         
         try:
-            results = self.collections['conversations'].query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                where=where_filter,
-                include=['documents', 'metadatas', 'distances']
-            )
-            
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    formatted_results.append({
-                        'content': doc,
-                        'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
-                        'distance': results['distances'][0][i] if results['distances'] else 0
-                    })
-            
-            return formatted_results
+            return self._query_collection('conversations', query_embedding, n_results, where_filter)
         except Exception as e:
             logger.error(f"检索对话失败: {e}")
             return []
-    
-    def search_heritage_knowledge(self, query: str, 
-                                  n_results: int = 5) -> List[Dict[str, Any]]:
-        """检索非遗知识（带缓存）"""
+
+    @staticmethod
+    def _build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """将 {字段: 值或值列表} 转为 Chroma where 条件"""
+        if not filters:
+            return None
+        clauses = []
+        for field, value in filters.items():
+            if value in (None, '', []):
+                continue
+            if isinstance(value, (list, tuple, set)):
+                clauses.append({field: {'$in': list(value)}})
+            else:
+                clauses.append({field: value})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+    def _heritage_index_ready(self) -> bool:
+        return self._heritage_index is not None and len(self._heritage_index) > 0
+
+    def _search_heritage_by_embedding(self, query: str, query_embedding: List[float],
+                                      n_results: int = 5,
+                                      filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        if self._heritage_index_ready():
+            formatted_results = self._heritage_index.search(query_embedding, n_results, filters)
+            if self._query_cache:
+                cache_key = self._get_query_cache_key(query, 'heritage_knowledge', n_results, filters)
+                self._query_cache.set(cache_key, formatted_results)
+            return formatted_results
+        
         if 'heritage_knowledge' not in self.collections:
             return []
         
-        cache_key = self._get_query_cache_key(query, 'heritage_knowledge', n_results)
-        cached_result = self._query_cache.get(cache_key) if self._query_cache else None
-        if cached_result is not None:
-            logger.debug(f"缓存命中: {query[:30]}...")
-            return cached_result
-        
-        query_embedding = self.embedding_model.encode_single(query)
-        
         try:
-            results = self.collections['heritage_knowledge'].query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                include=['documents', 'metadatas', 'distances']
-            )
-            
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    formatted_results.append({
-                        'content': doc,
-                        'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
-                        'distance': results['distances'][0][i] if results['distances'] else 0
-                    })
+            formatted_results = self._query_collection(
+                'heritage_knowledge', query_embedding, n_results, self._build_where(filters))
             
             if self._query_cache:
+                cache_key = self._get_query_cache_key(query, 'heritage_knowledge', n_results, filters)
                 self._query_cache.set(cache_key, formatted_results)
             
             return formatted_results
@@ -485,6 +1104,52 @@ class VectorStore:
             logger.warning(f"检索非遗知识失败，尝试重建集合: {e}")
             self._rebuild_collection('heritage_knowledge', self.COLLECTIONS['heritage_knowledge'])
             return []
+
+    def _search_attractions_by_embedding(self, query_embedding: List[float],
+                                         n_results: int = 5) -> List[Dict[str, Any]]:
+        if 'attractions' not in self.collections:
+            return []
+        
+        try:
+            return self._query_collection('attractions', query_embedding, n_results)
+        except Exception as e:
+            logger.error(f"检索景点失败: {e}")
+            return []
+
+    def _get_cached_heritage_results(self, query: str, n_results: int,
+                                     filters: Dict[str, Any] = None) -> Optional[List[Dict[str, Any]]]:
+        cache_key = self._get_query_cache_key(query, 'heritage_knowledge', n_results, filters)
+        cached_result = self._query_cache.get(cache_key) if self._query_cache else None
+        if cached_result is not None:
+            logger.debug(f"缓存命中: {query[:30]}...")
+        return cached_result
+
+    def search_conversations(self, query: str, user_id: str = None, 
+                            n_results: int = 5) -> List[Dict[str, Any]]:
+        """检索相关对话"""
+        if 'conversations' not in self.collections:
+            return []
+        
+        query_embedding = self.embedding_model.encode_single(query)
+        return self._search_conversations_by_embedding(query_embedding, user_id, n_results)
+    
+    def search_heritage_knowledge(self, query: str, n_results: int = 5,
+                                  filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """检索非遗知识（带缓存）
+
+        Args:
+            filters: 可选元数据过滤 {category/region/level: 值或值列表}，
+                     精确索引可用时在索引内下推过滤，否则转为 Chroma where
+        """
+        if 'heritage_knowledge' not in self.collections and not self._heritage_index_ready():
+            return []
+        
+        cached_result = self._get_cached_heritage_results(query, n_results, filters)
+        if cached_result is not None:
+            return cached_result
+        
+        query_embedding = self.embedding_model.encode_single(query)
+        return self._search_heritage_by_embedding(query, query_embedding, n_results, filters)
     
     def search_attractions(self, query: str, 
                           n_results: int = 5) -> List[Dict[str, Any]]:
@@ -493,35 +1158,141 @@ class VectorStore:
             return []
         
         query_embedding = self.embedding_model.encode_single(query)
-        
-        try:
-            results = self.collections['attractions'].query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                include=['documents', 'metadatas', 'distances']
-            )
-            
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    formatted_results.append({
-                        'content': doc,
-                        'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
-                        'distance': results['distances'][0][i] if results['distances'] else 0
-                    })
-            
-            return formatted_results
-        except Exception as e:
-            logger.error(f"检索景点失败: {e}")
-            return []
+        return self._search_attractions_by_embedding(query_embedding, n_results)
     
+    def _hybrid_search_tasks(self, query: str, query_embedding: List[float],
+                             user_id: str, n_results: int,
+                             cached_heritage: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """构造三路集合检索任务（均复用同一查询向量），命中缓存的路由直接给出结果"""
+        tasks = {
+            'conversations': functools.partial(
+                self._search_conversations_by_embedding, query_embedding, user_id, n_results),
+            'attractions': functools.partial(
+                self._search_attractions_by_embedding, query_embedding, n_results),
+        }
+        if cached_heritage is None:
+            tasks['heritage_knowledge'] = functools.partial(
+                self._search_heritage_by_embedding, query, query_embedding, n_results)
+        return tasks
+
     def hybrid_search(self, query: str, user_id: str = None, 
                      n_results: int = 3) -> Dict[str, List[Dict[str, Any]]]:
-        """混合检索：同时检索对话、知识、景点"""
+        """混合检索：查询只编码一次，三个集合的 Chroma 查询并发执行"""
+        cached_heritage = self._get_cached_heritage_results(query, n_results)
+        query_embedding = self.embedding_model.encode_single(query)
+        tasks = self._hybrid_search_tasks(query, query_embedding, user_id, n_results, cached_heritage)
+
+        executor = _get_search_executor()
+        futures = {key: executor.submit(task) for key, task in tasks.items()}
+        results = {key: future.result() for key, future in futures.items()}
+        return {
+            'conversations': results['conversations'],
+            'heritage_knowledge': results.get('heritage_knowledge', cached_heritage),
+            'attractions': results['attractions']
+        }
+    
+    # ──────────────────────────────
+    # 异步检索（在专用线程池中执行，不阻塞事件循环）
+    # ──────────────────────────────
+
+    async def _run_in_search_executor(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_search_executor(), functools.partial(func, *args))
+
+    async def search_conversations_async(self, query: str, user_id: str = None,
+                                         n_results: int = 5) -> List[Dict[str, Any]]:
+        """search_conversations 的异步版本"""
+        return await self._run_in_search_executor(
+            self.search_conversations, query, user_id, n_results)
+
+    async def search_heritage_knowledge_async(self, query: str, n_results: int = 5,
+                                              filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """search_heritage_knowledge 的异步版本"""
+        return await self._run_in_search_executor(
+            self.search_heritage_knowledge, query, n_results, filters)
+
+    async def search_attractions_async(self, query: str,
+                                       n_results: int = 5) -> List[Dict[str, Any]]:
+        """search_attractions 的异步版本"""
+        return await self._run_in_search_executor(
+            self.search_attractions, query, n_results)
+
+    async def hybrid_search_async(self, query: str, user_id: str = None,
+                                  n_results: int = 3) -> Dict[str, List[Dict[str, Any]]]:
+        """hybrid_search 的异步版本：查询只编码一次，三路 Chroma 查询并发执行"""
+        cached_heritage = self._get_cached_heritage_results(query, n_results)
+        query_embedding = await self.embedding_model.encode_single_async(query)
+        tasks = self._hybrid_search_tasks(query, query_embedding, user_id, n_results, cached_heritage)
+
+        loop = asyncio.get_running_loop()
+        executor = _get_search_executor()
+        keys = list(tasks.keys())
+        outputs = await asyncio.gather(
+            *(loop.run_in_executor(executor, tasks[key]) for key in keys))
+        results = dict(zip(keys, outputs))
+        return {
+            'conversations': results['conversations'],
+            'heritage_knowledge': results.get('heritage_knowledge', cached_heritage),
+            'attractions': results['attractions']
+        }
+    
+    def load_heritage_index(self) -> int:
+        """从 Chroma 全量加载非遗精确向量索引，返回加载条数（未启用或失败返回 0）"""
+        if self._heritage_index is None or 'heritage_knowledge' not in self.collections:
+            return 0
+        try:
+            start = time.perf_counter()
+            count = self._heritage_index.load_from_collection(self.collections['heritage_knowledge'])
+            logger.info(f"非遗精确向量索引加载耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+            return count
+        except Exception as e:
+            logger.warning(f"加载非遗精确向量索引失败，检索将使用 Chroma: {e}")
+            self._heritage_index.clear()
+            return 0
+    
+    def get_heritage_embeddings(self) -> Dict[Any, Any]:
+        """返回 {heritage_id: 向量}（供相关非遗预计算），优先读精确索引快照"""
+        try:
+            if self._heritage_index_ready():
+                metadatas, embeddings = self._heritage_index.export()
+            elif 'heritage_knowledge' in self.collections:
+                data = self.collections['heritage_knowledge'].get(include=['embeddings', 'metadatas'])
+                metadatas = data.get('metadatas') or []
+                embeddings = data.get('embeddings')
+                if embeddings is None:
+                    embeddings = []
+            else:
+                return {}
+        except Exception as e:
+            logger.warning(f"读取非遗知识向量失败: {e}")
+            return {}
+        return {
+            meta['heritage_id']: emb
+            for meta, emb in zip(metadatas, embeddings)
+            if meta and meta.get('heritage_id') is not None
+        }
+
+    def get_heritage_index_stats(self) -> Dict[str, Any]:
+        """获取非遗精确向量索引统计"""
+        if self._heritage_index is None:
+            return {'enabled': False}
+        return {'enabled': True, **self._heritage_index.get_stats()}
+    
+    def get_embedding_stats(self) -> Dict[str, Any]:
+        """获取嵌入层统计（持久化缓存 + 微批调度器）"""
+        return {
+            'disk_cache': self.embedding_model.get_cache_stats(),
+            'batch_scheduler': self.embedding_model.get_scheduler_stats(),
+            'runtime': self.embedding_model.get_runtime_stats(),
+        }
+    
+    def get_quantization_stats(self) -> Dict[str, Any]:
+        """获取量化集合的存储统计"""
         return {
-            'conversations': self.search_conversations(query, user_id, n_results),
-            'heritage_knowledge': self.search_heritage_knowledge(query, n_results),
-            'attractions': self.search_attractions(query, n_results)
+            key: collection.get_stats()
+            for key, collection in self.collections.items()
+            if isinstance(collection, QuantizedCollection)
         }
     
     def get_collection_stats(self) -> Dict[str, int]:
@@ -28,7 +28,7 @@ def require_knowledge_graph(func: Callable) -> Callable:
     return wrapper
 
 
-def resolve_heritage_id(kg, heritage_id: int = None, heritage_name: str = None) -> Optional[int]:
+async def resolve_heritage_id(kg, heritage_id: int = None, heritage_name: str = None) -> Optional[int]:
     """
     解析 heritage_id，支持通过名称查找
     
@@ -43,10 +43,14 @@ def resolve_heritage_id(kg, heritage_id: int = None, heritage_name: str = None)
     if heritage_id:
         return heritage_id
     if heritage_name:
+        # 名称完全一致时直接命中目录快照，免去一次向量检索
+        exact = kg.query_heritage_by_name(heritage_name) if kg else None
+        if exact:
+            return exact['id']
         try:
             from Agent.memory.heritage_query_service import get_heritage_query_service
             query_service = get_heritage_query_service()
-            results = query_service.hybrid_query(heritage_name, top_k=1)
+            results = await query_service.hybrid_query_async(heritage_name, top_k=1)
             if results:
                 return results[0].get('id')
         except Exception as e:
@@ -171,7 +175,12 @@ class HeritageSearchTool(BaseTool):
                         logger.info(f"heritage_id 是字符串，转为 keywords 搜索: {keywords}")
                 
                 if heritage_id is not None:
-                    heritage = query_service.query_by_id(heritage_id)
+                    # 节点 + 传承人 + 朝代 + 邻近项目一次往返取回（带档案缓存）
+                    dossier = None
+                    if kg and kg.is_connected():
+                        dossier = await kg.aquery_heritage_dossier(heritage_id, nearby_limit=3)
+                    heritage = dossier['heritage'] if dossier else \
+                        await query_service.query_by_id_async(heritage_id)
                     if heritage:
                         result = {
                             'success': True,
@@ -179,33 +188,16 @@ class HeritageSearchTool(BaseTool):
                             'count': 1
                         }
 
-                        if kg and kg.is_connected():
-                            # 传承人信息（HAS_INHERITOR + STUDIED_UNDER 遍历）
-                            try:
-                                inheritors = kg.query_inheritors_by_heritage(heritage_id)
-                                if inheritors:
-                                    result['inheritors'] = inheritors
-                                    result['inheritor_count'] = len(inheritors)
-                            except Exception as e:
-                                logger.debug(f"查询传承人失败: {e}")
-
-                            # 朝代信息（ORIGINATED_IN 遍历）
-                            try:
-                                dynasties = kg.query_heritage_dynasties(heritage_id)
-                                if dynasties:
-                                    result['dynasties'] = dynasties
-                            except Exception as e:
-                                logger.debug(f"查询朝代失败: {e}")
-
-                            # 邻近项目
-                            if include_nearby:
-                                try:
-                                    nearby = kg.query_nearby_heritages_by_id(heritage_id, limit=3)
-                                    if nearby:
-                                        result['nearby_heritages'] = nearby
-                                        result['nearby_hint'] = f"发现{len(nearby)}个邻近非遗项目可顺访"
-                                except Exception as e:
-                                    logger.debug(f"查询邻近项目失败: {e}")
+                        if dossier:
+                            if dossier['inheritors']:
+                                result['inheritors'] = dossier['inheritors']
+                                result['inheritor_count'] = len(dossier['inheritors'])
+                            if dossier['dynasties']:
+                                result['dynasties'] = dossier['dynasties']
+                            nearby = dossier['nearby_heritages']
+                            if include_nearby and nearby:
+                                result['nearby_heritages'] = nearby
+                                result['nearby_hint'] = f"发现{len(nearby)}个邻近非遗项目可顺访"
 
                         return result
                     else:
@@ -215,7 +207,7 @@ class HeritageSearchTool(BaseTool):
                         }
             
             if keywords and keywords.strip():
-                results = query_service.hybrid_query(keywords, region, category, top_k=10)
+                results = await query_service.hybrid_query_async(keywords, region, category, top_k=10)
             elif region and region.strip():
                 results = query_service.query_by_region(region, limit=10)
                 if category and category.strip():
@@ -239,7 +231,7 @@ class HeritageSearchTool(BaseTool):
                 hid = first_item.get('id')
                 if hid:
                     try:
-                        nearby = kg.query_nearby_heritages_by_id(hid, limit=3)
+                        nearby = await kg.aquery_nearby_heritages_by_id(hid, limit=3)
                         if nearby:
                             result['nearby_heritages'] = nearby
                             result['nearby_hint'] = f"发现{len(nearby)}个邻近非遗项目可顺访"
@@ -4,6 +4,7 @@
 封装知识图谱的查询能力，供 Agent 调用
 """
 
+import asyncio
 from typing import Dict, Any
 from loguru import logger
 
@@ -68,7 +69,7 @@ class NearbyHeritageTool(BaseTool):
         heritage_name = kwargs.get('heritage_name')
         limit = kwargs.get('limit', 5)
         
-        heritage_id = resolve_heritage_id(kg, heritage_id, heritage_name)
+        heritage_id = await resolve_heritage_id(kg, heritage_id, heritage_name)
         
         if not heritage_id:
             return {
@@ -77,7 +78,7 @@ class NearbyHeritageTool(BaseTool):
             }
         
         try:
-            nearby = kg.query_nearby_heritages_by_id(heritage_id, limit=limit)
+            nearby = await kg.aquery_nearby_heritages_by_id(heritage_id, limit=limit)
             
             return {
                 "success": True,
@@ -153,7 +154,7 @@ class UserRecommendTool(BaseTool):
             l2_store = get_l2_graph_store()
             if not l2_store.is_available():
                 return {"success": False, "error": "知识图谱未连接"}
-            recommendations = l2_store.recommend_for_user(user_id, limit)
+            recommendations = await asyncio.to_thread(l2_store.recommend_for_user, user_id, limit)
             return {
                 "success": True,
                 "user_id": user_id,
@@ -220,7 +221,7 @@ class RelatedHeritageTool(BaseTool):
                 },
                 "relation_type": {
                     "type": "string",
-                    "description": "关系类型：category(同类)、region(同地区)、all(全部)",
+                    "description": "关系类型：category(同类)、region(同地区)、level(同级别)、dynasty(同朝代)、all(按综合相关度排序)",
                     "default": "all"
                 },
                 "limit": {
@@ -239,7 +240,7 @@ class RelatedHeritageTool(BaseTool):
         relation_type = kwargs.get('relation_type', 'all')
         limit = kwargs.get('limit', 5)
         
-        heritage_id = resolve_heritage_id(kg, heritage_id, heritage_name)
+        heritage_id = await resolve_heritage_id(kg, heritage_id, heritage_name)
         
         if not heritage_id:
             return {
@@ -409,11 +410,9 @@ class RouteHintTool(BaseTool):
             }
         
         try:
-            all_nearby = {}
-            for hid in heritage_ids:
-                nearby = kg.query_nearby_heritages_by_id(hid, limit=3)
-                if nearby:
-                    all_nearby[hid] = nearby
+            nearby_lists = await asyncio.gather(
+                *(kg.aquery_nearby_heritages_by_id(hid, limit=3) for hid in heritage_ids))
+            all_nearby = {hid: nearby for hid, nearby in zip(heritage_ids, nearby_lists) if nearby}
             
             recommendations = []
             seen_ids = set(heritage_ids)
@@ -526,8 +525,8 @@ class HeritageTimelineTool(BaseTool):
 
         try:
             if heritage_id:
-                dynasties = kg.query_heritage_dynasties(heritage_id)
-                heritage = kg.query_heritage_by_id(heritage_id)
+                dynasties = await asyncio.to_thread(kg.query_heritage_dynasties, heritage_id)
+                heritage = await kg.aquery_heritage_by_id(heritage_id)
                 return {
                     "success": True,
                     "heritage_id": heritage_id,